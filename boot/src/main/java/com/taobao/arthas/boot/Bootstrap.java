@@ -2,7 +2,11 @@ package com.taobao.arthas.boot;
 
 import java.io.ByteArrayOutputStream;
 import java.io.File;
+import java.io.FileInputStream;
+import java.io.FileOutputStream;
 import java.io.IOException;
+import java.io.InputStream;
+import java.io.OutputStream;
 import java.lang.reflect.InvocationTargetException;
 import java.lang.reflect.Method;
 import java.net.URL;
@@ -12,8 +16,12 @@ import java.util.ArrayList;
 import java.util.Arrays;
 import java.util.Collections;
 import java.util.List;
+import java.util.Properties;
 import java.util.Scanner;
 import java.util.TimeZone;
+import java.util.concurrent.Callable;
+import java.util.concurrent.ExecutionException;
+import java.util.concurrent.FutureTask;
 import java.util.concurrent.TimeUnit;
 import java.util.logging.Level;
 import java.util.InputMismatchException;
@@ -23,6 +31,7 @@ import javax.xml.parsers.ParserConfigurationException;
 import org.xml.sax.SAXException;
 
 import com.taobao.arthas.common.AnsiLog;
+import com.taobao.arthas.common.IOUtils;
 import com.taobao.arthas.common.JavaVersionUtils;
 import com.taobao.arthas.common.SocketUtils;
 import com.taobao.arthas.common.UsageRender;
@@ -63,6 +72,11 @@ public class Bootstrap {
     private static final int DEFAULT_HTTP_PORT = 8563;
     private static final String DEFAULT_TARGET_IP = "127.0.0.1";
     private static File ARTHAS_LIB_DIR;
+    /**
+     * 最近一次从 ~/.arthas/lib 解析出的 arthas home，在 RESOLVED_HOME_CACHE_MILLIS 内不再检查远程的最新版本
+     */
+    private static final String RESOLVED_HOME_CACHE_FILE = ".resolved-home.properties";
+    private static final long RESOLVED_HOME_CACHE_MILLIS = TimeUnit.DAYS.toMillis(1);
 
     private boolean help = false;
 
@@ -281,7 +295,8 @@ public class Bootstrap {
             }
         }
 
-        Bootstrap bootstrap = new Bootstrap();
+        final StartupTimer timer = new StartupTimer();
+        final Bootstrap bootstrap = new Bootstrap();
 
         CLI cli = CLIConfigurator.define(Bootstrap.class);
         CommandLine commandLine = cli.parse(Arrays.asList(args));
@@ -322,6 +337,25 @@ public class Bootstrap {
                             JavaVersionUtils.javaVersionStr());
         }
 
+        timer.mark("parse args");
+
+        // 查找 arthas home 可能要访问远程仓库，放到后台线程里，和端口检查、选择进程同时进行
+        FutureTask<ResolvedArthasHome> arthasHomeTask = new FutureTask<ResolvedArthasHome>(
+                        new Callable<ResolvedArthasHome>() {
+                            @Override
+                            public ResolvedArthasHome call() throws Exception {
+                                long start = System.nanoTime();
+                                try {
+                                    return resolveArthasHome(bootstrap);
+                                } finally {
+                                    timer.record("resolve arthas home", System.nanoTime() - start);
+                                }
+                            }
+                        });
+        Thread arthasHomeThread = new Thread(arthasHomeTask, "arthas-home-resolver");
+        arthasHomeThread.setDaemon(true);
+        arthasHomeThread.start();
+
         // check telnet/http port
         long telnetPortPid = -1;
         long httpPortPid = -1;
@@ -338,6 +372,8 @@ public class Bootstrap {
             }
         }
 
+        timer.mark("check port");
+
         long pid = bootstrap.getPid();
         // select pid
         if (pid < 0) {
@@ -353,6 +389,8 @@ public class Bootstrap {
             }
         }
 
+        timer.mark("select process");
+
         checkTelnetPortPid(bootstrap, telnetPortPid, pid);
 
         if (httpPortPid > 0 && pid != httpPortPid) {
@@ -364,99 +402,21 @@ public class Bootstrap {
             System.exit(1);
         }
 
-        // find arthas home
-        File arthasHomeDir = null;
-        if (bootstrap.getArthasHome() != null) {
-            verifyArthasHome(bootstrap.getArthasHome());
-            arthasHomeDir = new File(bootstrap.getArthasHome());
-        }
-        if (arthasHomeDir == null && bootstrap.getUseVersion() != null) {
-            // try to find from ~/.arthas/lib
-            File specialVersionDir = new File(System.getProperty("user.home"), ".arthas" + File.separator + "lib"
-                            + File.separator + bootstrap.getUseVersion() + File.separator + "arthas");
-            if (!specialVersionDir.exists()) {
-                // try to download arthas from remote server.
-                DownloadUtils.downArthasPackaging(bootstrap.getRepoMirror(), bootstrap.isuseHttp(),
-                                bootstrap.getUseVersion(), ARTHAS_LIB_DIR.getAbsolutePath());
-            }
-            verifyArthasHome(specialVersionDir.getAbsolutePath());
-            arthasHomeDir = specialVersionDir;
-        }
-
-        // Try set the directory where arthas-boot.jar is located to arhtas home
-        if (arthasHomeDir == null) {
-            CodeSource codeSource = Bootstrap.class.getProtectionDomain().getCodeSource();
-            if (codeSource != null) {
-                try {
-                    // https://stackoverflow.com/a/17870390
-                    File bootJarPath = new File(codeSource.getLocation().toURI().getSchemeSpecificPart());
-                    verifyArthasHome(bootJarPath.getParent());
-                    arthasHomeDir = bootJarPath.getParentFile();
-                } catch (Throwable e) {
-                    // ignore
-                }
-
-            }
-        }
-
-        // try to download from remote server
-        if (arthasHomeDir == null) {
-            boolean checkFile =  ARTHAS_LIB_DIR.exists() || ARTHAS_LIB_DIR.mkdirs();
-            if(!checkFile){
-                AnsiLog.error("cannot create directory {}: maybe permission denied", ARTHAS_LIB_DIR.getAbsolutePath());
-                System.exit(1);
-            }
-
-            /**
-             * <pre>
-             * 1. get local latest version
-             * 2. get remote latest version
-             * 3. compare two version
-             * </pre>
-             */
-            List<String> versionList = listNames(ARTHAS_LIB_DIR);
-            Collections.sort(versionList);
-
-            String localLastestVersion = null;
-            if (!versionList.isEmpty()) {
-                localLastestVersion = versionList.get(versionList.size() - 1);
-            }
-
-            String remoteLastestVersion = DownloadUtils.readLatestReleaseVersion();
-
-            boolean needDownload = false;
-            if (localLastestVersion == null) {
-                if (remoteLastestVersion == null) {
-                    // exit
-                    AnsiLog.error("Can not find Arthas under local: {} and remote repo mirror: {}", ARTHAS_LIB_DIR,
-                            bootstrap.getRepoMirror());
-                    AnsiLog.error(
-                            "Unable to download arthas from remote server, please download the full package according to wiki: https://github.com/alibaba/arthas");
-                    System.exit(1);
-                } else {
-                    needDownload = true;
-                }
-            } else {
-                if (remoteLastestVersion != null) {
-                    if (localLastestVersion.compareTo(remoteLastestVersion) < 0) {
-                        AnsiLog.info("local lastest version: {}, remote lastest version: {}, try to download from remote.",
-                                        localLastestVersion, remoteLastestVersion);
-                        needDownload = true;
-                    }
-                }
-            }
-            if (needDownload) {
-                // try to download arthas from remote server.
-                DownloadUtils.downArthasPackaging(bootstrap.getRepoMirror(), bootstrap.isuseHttp(),
-                                remoteLastestVersion, ARTHAS_LIB_DIR.getAbsolutePath());
-                localLastestVersion = remoteLastestVersion;
-            }
-
-            // get the latest version
-            arthasHomeDir = new File(ARTHAS_LIB_DIR, localLastestVersion + File.separator + "arthas");
+        // 等待后台线程查找 arthas home，需要下载时在主线程里下载
+        ResolvedArthasHome resolved = waitArthasHome(arthasHomeTask);
+        timer.mark("wait arthas home");
+        File arthasHomeDir = resolved.home;
+        if (resolved.downloadVersion != null) {
+            // try to download arthas from remote server.
+            DownloadUtils.downArthasPackaging(bootstrap.getRepoMirror(), bootstrap.isuseHttp(),
+                            resolved.downloadVersion, ARTHAS_LIB_DIR.getAbsolutePath());
+            timer.mark("download arthas");
         }
 
         verifyArthasHome(arthasHomeDir.getAbsolutePath());
+        if (resolved.cacheable) {
+            saveResolvedArthasHome(arthasHomeDir);
+        }
 
         AnsiLog.info("arthas home: " + arthasHomeDir);
 
@@ -506,8 +466,11 @@ public class Bootstrap {
             ProcessUtils.startArthasCore(pid, attachArgs);
 
             AnsiLog.info("Attach process {} success.", pid);
+            timer.mark("attach");
         }
 
+        AnsiLog.debug(timer.report());
+
         if (bootstrap.isAttachOnly()) {
             System.exit(0);
         }
@@ -549,6 +512,158 @@ public class Bootstrap {
         mainMethod.invoke(null, new Object[] { telnetArgs.toArray(new String[0]) });
     }
 
+    /**
+     * <pre>
+     * 查找 arthas home，在后台线程里执行，不下载：
+     * 1. 指定了 arthas-home 或者 use-version 时直接使用
+     * 2. arthas-boot.jar 所在的目录
+     * 3. 最近一次解析出的 ~/.arthas/lib 下的版本，见 RESOLVED_HOME_CACHE_MILLIS
+     * 4. 比较 ~/.arthas/lib 下的最新版本和远程的最新版本
+     * </pre>
+     */
+    private static ResolvedArthasHome resolveArthasHome(Bootstrap bootstrap) {
+        if (bootstrap.getArthasHome() != null) {
+            verifyArthasHome(bootstrap.getArthasHome());
+            return new ResolvedArthasHome(new File(bootstrap.getArthasHome()), null, false);
+        }
+        if (bootstrap.getUseVersion() != null) {
+            // try to find from ~/.arthas/lib
+            File specialVersionDir = new File(System.getProperty("user.home"), ".arthas" + File.separator + "lib"
+                            + File.separator + bootstrap.getUseVersion() + File.separator + "arthas");
+            String downloadVersion = specialVersionDir.exists() ? null : bootstrap.getUseVersion();
+            return new ResolvedArthasHome(specialVersionDir, downloadVersion, false);
+        }
+
+        // Try set the directory where arthas-boot.jar is located to arhtas home
+        CodeSource codeSource = Bootstrap.class.getProtectionDomain().getCodeSource();
+        if (codeSource != null) {
+            try {
+                // https://stackoverflow.com/a/17870390
+                File bootJarPath = new File(codeSource.getLocation().toURI().getSchemeSpecificPart());
+                verifyArthasHome(bootJarPath.getParent());
+                return new ResolvedArthasHome(bootJarPath.getParentFile(), null, false);
+            } catch (Throwable e) {
+                // ignore
+            }
+        }
+
+        File cachedHome = readResolvedArthasHome();
+        if (cachedHome != null) {
+            AnsiLog.debug("Use cached arthas home: " + cachedHome);
+            return new ResolvedArthasHome(cachedHome, null, false);
+        }
+
+        // try to download from remote server
+        boolean checkFile =  ARTHAS_LIB_DIR.exists() || ARTHAS_LIB_DIR.mkdirs();
+        if(!checkFile){
+            throw new IllegalStateException("cannot create directory " + ARTHAS_LIB_DIR.getAbsolutePath()
+                            + ": maybe permission denied");
+        }
+
+        /**
+         * <pre>
+         * 1. get local latest version
+         * 2. get remote latest version
+         * 3. compare two version
+         * </pre>
+         */
+        List<String> versionList = listNames(ARTHAS_LIB_DIR);
+        Collections.sort(versionList);
+
+        String localLastestVersion = null;
+        if (!versionList.isEmpty()) {
+            localLastestVersion = versionList.get(versionList.size() - 1);
+        }
+
+        String remoteLastestVersion = DownloadUtils.readLatestReleaseVersion();
+
+        boolean needDownload = false;
+        if (localLastestVersion == null) {
+            if (remoteLastestVersion == null) {
+                throw new IllegalStateException("Can not find Arthas under local: " + ARTHAS_LIB_DIR
+                                + " and remote repo mirror: " + bootstrap.getRepoMirror() + "\n"
+                                + "Unable to download arthas from remote server, please download the full package according to wiki: https://github.com/alibaba/arthas");
+            } else {
+                needDownload = true;
+            }
+        } else {
+            if (remoteLastestVersion != null) {
+                if (localLastestVersion.compareTo(remoteLastestVersion) < 0) {
+                    AnsiLog.info("local lastest version: {}, remote lastest version: {}, try to download from remote.",
+                                    localLastestVersion, remoteLastestVersion);
+                    needDownload = true;
+                }
+            }
+        }
+        String version = needDownload ? remoteLastestVersion : localLastestVersion;
+        // get the latest version
+        return new ResolvedArthasHome(new File(ARTHAS_LIB_DIR, version + File.separator + "arthas"),
+                        needDownload ? version : null, true);
+    }
+
+    private static ResolvedArthasHome waitArthasHome(FutureTask<ResolvedArthasHome> arthasHomeTask) {
+        try {
+            return arthasHomeTask.get();
+        } catch (InterruptedException e) {
+            Thread.currentThread().interrupt();
+            throw new IllegalStateException("Interrupted while finding arthas home", e);
+        } catch (ExecutionException e) {
+            Throwable cause = e.getCause();
+            if (cause instanceof IllegalStateException) {
+                AnsiLog.error(cause.getMessage());
+                System.exit(1);
+            }
+            if (cause instanceof RuntimeException) {
+                throw (RuntimeException) cause;
+            }
+            throw new IllegalStateException(cause);
+        }
+    }
+
+    /**
+     * @return 缓存没有过期并且 arthas home 仍然有效时返回，否则返回 null
+     */
+    private static File readResolvedArthasHome() {
+        File cacheFile = new File(ARTHAS_LIB_DIR, RESOLVED_HOME_CACHE_FILE);
+        if (!cacheFile.isFile()
+                        || System.currentTimeMillis() - cacheFile.lastModified() > RESOLVED_HOME_CACHE_MILLIS) {
+            return null;
+        }
+        Properties properties = new Properties();
+        InputStream in = null;
+        try {
+            in = new FileInputStream(cacheFile);
+            properties.load(in);
+            String home = properties.getProperty("arthas.home");
+            if (home == null) {
+                return null;
+            }
+            verifyArthasHome(home);
+            return new File(home);
+        } catch (Throwable e) {
+            AnsiLog.debug(e);
+            return null;
+        } finally {
+            IOUtils.close(in);
+        }
+    }
+
+    private static void saveResolvedArthasHome(File arthasHomeDir) {
+        File cacheFile = new File(ARTHAS_LIB_DIR, RESOLVED_HOME_CACHE_FILE);
+        Properties properties = new Properties();
+        properties.setProperty("arthas.home", arthasHomeDir.getAbsolutePath());
+        properties.setProperty("arthas.version", arthasHomeDir.getParentFile().getName());
+        OutputStream out = null;
+        try {
+            out = new FileOutputStream(cacheFile);
+            properties.store(out, "arthas-boot resolved arthas home");
+        } catch (Throwable e) {
+            AnsiLog.debug(e);
+        } finally {
+            IOUtils.close(out);
+        }
+    }
+
     private static void checkTelnetPortPid(Bootstrap bootstrap, long telnetPortPid, long targetPid) {
         if (telnetPortPid > 0 && targetPid != telnetPortPid) {
             AnsiLog.error("The telnet port {} is used by process {} instead of target process {}, you will connect to an unexpected process.",
@@ -767,4 +882,22 @@ public class Bootstrap {
     public String getSelect() {
 		return select;
 	}
+
+    private static class ResolvedArthasHome {
+        private final File home;
+        /**
+         * 不为 null 时需要先下载这个版本
+         */
+        private final String downloadVersion;
+        /**
+         * 是否保存到 RESOLVED_HOME_CACHE_FILE，只缓存需要访问远程仓库才能确定的版本
+         */
+        private final boolean cacheable;
+
+        ResolvedArthasHome(File home, String downloadVersion, boolean cacheable) {
+            this.home = home;
+            this.downloadVersion = downloadVersion;
+            this.cacheable = cacheable;
+        }
+    }
 }
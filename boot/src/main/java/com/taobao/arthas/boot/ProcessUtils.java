@@ -1,6 +1,7 @@
 package com.taobao.arthas.boot;
 
 import java.io.File;
+import java.io.FileInputStream;
 import java.io.IOException;
 import java.io.InputStream;
 import java.io.OutputStream;
@@ -9,6 +10,7 @@ import java.lang.reflect.Method;
 import java.net.URL;
 import java.net.URLClassLoader;
 import java.util.ArrayList;
+import java.util.Arrays;
 import java.util.Collections;
 import java.util.Comparator;
 import java.util.Iterator;
@@ -23,6 +25,7 @@ import com.taobao.arthas.common.AnsiLog;
 import com.taobao.arthas.common.ExecutingCommand;
 import com.taobao.arthas.common.IOUtils;
 import com.taobao.arthas.common.JavaVersionUtils;
+import com.taobao.arthas.common.OSUtils;
 import com.taobao.arthas.common.PidUtils;
 
 /**
@@ -33,6 +36,14 @@ import com.taobao.arthas.common.PidUtils;
 public class ProcessUtils {
     private static String FOUND_JAVA_HOME = null;
 
+    private static final String HSPERFDATA_PREFIX = "hsperfdata_";
+    /**
+     * java launcher 中后面跟着参数值的选项
+     */
+    private static final List<String> LAUNCHER_OPTIONS_WITH_VALUE = Arrays.asList("-cp", "-classpath",
+            "--class-path", "-p", "--module-path", "--upgrade-module-path", "--add-modules", "--limit-modules",
+            "--add-reads", "--add-exports", "--add-opens", "--patch-module");
+
     //status code from com.taobao.arthas.client.TelnetConsole
     /**
      * Process success
@@ -53,7 +64,10 @@ public class ProcessUtils {
 
     @SuppressWarnings("resource")
     public static long select(boolean v, long telnetPortPid, String select) throws InputMismatchException {
-        Map<Long, String> processMap = listProcessByJps(v);
+        Map<Long, String> processMap = listProcessByPerfData(v);
+        if (processMap.isEmpty()) {
+            processMap = listProcessByJps(v);
+        }
         // Put the port that is already listening at the first
         if (telnetPortPid > 0 && processMap.containsKey(telnetPortPid)) {
             String telnetPortProcess = processMap.get(telnetPortPid);
@@ -120,6 +134,154 @@ public class ProcessUtils {
         return -1;
     }
 
+    /**
+     * <pre>
+     * 不启动 jps，直接读取 hsperfdata 文件和 /proc 列出 java 进程，和 jps 一样：
+     * 1. java.io.tmpdir/hsperfdata_&lt;user&gt;/&lt;pid&gt; 是 jvm 启动时创建的 perf data 文件，文件名就是 pid
+     * 2. 从 /proc/&lt;pid&gt;/cmdline 解析出 main class 或者 jar，格式和 jps -l (-v) 的输出一致
+     * 只支持 linux，没有找到进程时返回空，由调用方回退到 jps
+     * </pre>
+     */
+    static Map<Long, String> listProcessByPerfData(boolean v) {
+        Map<Long, String> result = new LinkedHashMap<Long, String>();
+        File proc = new File("/proc");
+        if (!OSUtils.isLinux() || !proc.isDirectory()) {
+            return result;
+        }
+
+        File tmpDir = new File(System.getProperty("java.io.tmpdir"));
+        File[] perfDataDirs = tmpDir.listFiles();
+        if (perfDataDirs == null) {
+            return result;
+        }
+        AnsiLog.debug("Try to list java process from hsperfdata under: " + tmpDir);
+
+        List<Long> pids = new ArrayList<Long>();
+        for (File perfDataDir : perfDataDirs) {
+            if (!perfDataDir.getName().startsWith(HSPERFDATA_PREFIX) || !perfDataDir.isDirectory()) {
+                continue;
+            }
+            String[] names = perfDataDir.list();
+            if (names == null) {
+                continue;
+            }
+            for (String name : names) {
+                try {
+                    pids.add(Long.parseLong(name));
+                } catch (NumberFormatException e) {
+                    // ignore
+                }
+            }
+        }
+        Collections.sort(pids);
+
+        long currentPid = Long.parseLong(PidUtils.currentPid());
+        for (Long pid : pids) {
+            if (pid == currentPid) {
+                continue;
+            }
+            // 进程退出时 hsperfdata 文件可能没有删除
+            File procDir = new File(proc, String.valueOf(pid));
+            if (!procDir.isDirectory()) {
+                continue;
+            }
+            List<String> cmdline = readCmdline(new File(procDir, "cmdline"));
+            if (!cmdline.isEmpty() && "jps".equals(executableName(cmdline.get(0)))) { // skip jps
+                continue;
+            }
+            result.put(pid, toJpsLine(pid, cmdline, v));
+        }
+
+        AnsiLog.debug("hsperfdata result: " + result.values());
+        return result;
+    }
+
+    private static String executableName(String executable) {
+        String name = new File(executable).getName();
+        if (name.endsWith(".exe")) {
+            name = name.substring(0, name.length() - ".exe".length());
+        }
+        return name;
+    }
+
+    private static List<String> readCmdline(File cmdlineFile) {
+        List<String> args = new ArrayList<String>();
+        InputStream in = null;
+        try {
+            in = new FileInputStream(cmdlineFile);
+            byte[] bytes = IOUtils.getBytes(in);
+            int start = 0;
+            for (int i = 0; i < bytes.length; ++i) {
+                if (bytes[i] == 0) {
+                    args.add(new String(bytes, start, i - start));
+                    start = i + 1;
+                }
+            }
+            if (start < bytes.length) {
+                args.add(new String(bytes, start, bytes.length - start));
+            }
+        } catch (IOException e) {
+            // no permission, or the process has exited
+        } finally {
+            IOUtils.close(in);
+        }
+        return args;
+    }
+
+    /**
+     * 把 java 命令行转换为 jps -l 的格式：pid mainClass/jar，v 为 true 时和 jps -v 一样再加上 jvm 参数
+     */
+    static String toJpsLine(long pid, List<String> cmdline, boolean v) {
+        if (cmdline.isEmpty()) {
+            return pid + " -- process information unavailable";
+        }
+        String main = "";
+        List<String> jvmArgs = new ArrayList<String>();
+        String executable = executableName(cmdline.get(0));
+        if (!"java".equals(executable) && !"javaw".equals(executable)) {
+            // jdk 自带的工具（jcmd/jstat 等）或者其它嵌入 jvm 的 launcher，命令行里没有 main class
+            main = executable;
+        }
+        for (int i = 1; main.isEmpty() && i < cmdline.size(); ++i) {
+            String arg = cmdline.get(i);
+            if ("-jar".equals(arg) || "-m".equals(arg) || "--module".equals(arg)) {
+                if (i + 1 < cmdline.size()) {
+                    main = cmdline.get(i + 1);
+                }
+                break;
+            }
+            if (arg.startsWith("--module=")) {
+                main = arg.substring("--module=".length());
+                break;
+            }
+            if (LAUNCHER_OPTIONS_WITH_VALUE.contains(arg)) {
+                // -cp xxx 这类参数，跳过参数值
+                ++i;
+                continue;
+            }
+            if (arg.startsWith("-")) {
+                if (!arg.startsWith("--class-path=") && !arg.startsWith("--module-path=")) {
+                    jvmArgs.add(arg);
+                }
+                continue;
+            }
+            if (arg.startsWith("@")) {
+                // @argfiles
+                continue;
+            }
+            main = arg;
+            break;
+        }
+
+        StringBuilder line = new StringBuilder().append(pid).append(' ').append(main);
+        if (v) {
+            for (String jvmArg : jvmArgs) {
+                line.append(' ').append(jvmArg);
+            }
+        }
+        return line.toString();
+    }
+
     private static Map<Long, String> listProcessByJps(boolean v) {
         Map<Long, String> result = new LinkedHashMap<Long, String>();
 
@@ -0,0 +1,43 @@
+package com.taobao.arthas.boot;
+
+import java.util.ArrayList;
+import java.util.List;
+import java.util.concurrent.TimeUnit;
+
+import com.taobao.arthas.common.AnsiLog;
+
+/**
+ * <pre>
+ * 记录 arthas-boot 启动各个阶段的耗时，--verbose 时打印出来。
+ * 后台线程里执行的阶段（比如查找 arthas home）通过 record 记录，和主线程的阶段是重叠的。
+ * </pre>
+ */
+class StartupTimer {
+    private final long startTime = System.nanoTime();
+    private long lastTime = startTime;
+    private final List<String> phases = new ArrayList<String>();
+
+    /**
+     * 记录从上一个阶段结束到现在的耗时
+     */
+    synchronized void mark(String phase) {
+        long now = System.nanoTime();
+        record(phase, now - lastTime);
+        lastTime = now;
+    }
+
+    synchronized void record(String phase, long costNanos) {
+        long costMillis = TimeUnit.NANOSECONDS.toMillis(costNanos);
+        phases.add(phase + ": " + costMillis + " ms");
+        AnsiLog.debug("Startup phase {} cost {} ms", phase, costMillis);
+    }
+
+    synchronized String report() {
+        StringBuilder sb = new StringBuilder("Startup phases: ");
+        for (String phase : phases) {
+            sb.append(phase).append(", ");
+        }
+        return sb.append("total: ").append(TimeUnit.NANOSECONDS.toMillis(System.nanoTime() - startTime))
+                .append(" ms").toString();
+    }
+}
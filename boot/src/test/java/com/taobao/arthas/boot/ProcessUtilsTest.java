@@ -0,0 +1,37 @@
+package com.taobao.arthas.boot;
+
+import java.util.Arrays;
+import java.util.Collections;
+
+import org.junit.Assert;
+import org.junit.Test;
+
+public class ProcessUtilsTest {
+
+    @Test
+    public void testMainClass() {
+        Assert.assertEquals("123 demo.MathGame", ProcessUtils.toJpsLine(123,
+                        Arrays.asList("/opt/jdk/bin/java", "-Xmx64m", "-cp", "a.jar:b.jar", "demo.MathGame", "arg1"),
+                        false));
+        Assert.assertEquals("123 demo.MathGame -Xmx64m -Dfoo=bar", ProcessUtils.toJpsLine(123, Arrays.asList(
+                        "java", "-Xmx64m", "-classpath", "a.jar", "-Dfoo=bar", "demo.MathGame", "arg1"), true));
+    }
+
+    @Test
+    public void testJarAndModule() {
+        Assert.assertEquals("123 /tmp/math-game.jar -Xss1m", ProcessUtils.toJpsLine(123,
+                        Arrays.asList("java", "-Xss1m", "-jar", "/tmp/math-game.jar", "-jar"), true));
+        Assert.assertEquals("123 demo/demo.MathGame", ProcessUtils.toJpsLine(123,
+                        Arrays.asList("java", "-p", "mods", "-m", "demo/demo.MathGame"), false));
+        Assert.assertEquals("123 demo/demo.MathGame", ProcessUtils.toJpsLine(123,
+                        Arrays.asList("java", "--module-path=mods", "--module=demo/demo.MathGame"), true));
+    }
+
+    @Test
+    public void testOtherLauncher() {
+        Assert.assertEquals("123 jcmd", ProcessUtils.toJpsLine(123, Arrays.asList("/opt/jdk/bin/jcmd", "456", "help"),
+                        false));
+        Assert.assertEquals("123 -- process information unavailable",
+                        ProcessUtils.toJpsLine(123, Collections.<String>emptyList(), false));
+    }
+}
@@ -116,6 +116,11 @@ public class MethodProcessor {
     
     private LocationFilter locationFilter = new DefaultLocationFilter();
 
+    /**
+     * 为 {@link com.taobao.arthas.bytekit.asm.binding.SiteIdBinding} 分配 site id，不设置时不能使用 SiteId binding
+     */
+    private SiteIdAllocator siteIdAllocator;
+
     public MethodProcessor(final ClassNode classNode, final MethodNode methodNode) {
         this(classNode, methodNode, false);
     }
@@ -656,6 +661,14 @@ public class MethodProcessor {
         return locationFilter;
     }
 
+    public SiteIdAllocator getSiteIdAllocator() {
+        return siteIdAllocator;
+    }
+
+    public void setSiteIdAllocator(SiteIdAllocator siteIdAllocator) {
+        this.siteIdAllocator = siteIdAllocator;
+    }
+
     /**
      * TODO 可以考虑实现修改值的功能，原理是传入的 args实际转化为一个stack上的slot，只要在inline之后，把 stack上面的对应的slot保存到想要保存的位置就可以了。
      * @param owner
@@ -0,0 +1,18 @@
+package com.taobao.arthas.bytekit.asm;
+
+import com.taobao.arthas.bytekit.asm.binding.BindingContext;
+
+/**
+ * 在增强时为每一个插入点分配一个 int id，运行时回调只需要传递这个 id，不需要再传递和解析字符串
+ * 
+ * @see com.taobao.arthas.bytekit.asm.binding.SiteIdBinding
+ */
+public interface SiteIdAllocator {
+
+    /**
+     * 
+     * @param bindingContext 当前插入点的上下文，可以从中获取 location 和 MethodProcessor
+     * @return 分配的 site id
+     */
+    int allocate(BindingContext bindingContext);
+}
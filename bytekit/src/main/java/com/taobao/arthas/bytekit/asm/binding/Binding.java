@@ -327,6 +327,23 @@ public abstract class Binding {
         }
     }
 
+    /**
+     * site id 是 int，没有可以代替的 null 值，所以不支持 optional，MethodProcessor 上没有 SiteIdAllocator 时增强失败
+     */
+    @Documented
+    @Retention(RetentionPolicy.RUNTIME)
+    @java.lang.annotation.Target(ElementType.PARAMETER)
+    @BindingParserHandler(parser = SiteIdBindingParser.class)
+    public static @interface SiteId {
+    }
+
+    public static class SiteIdBindingParser implements BindingParser {
+        @Override
+        public Binding parse(Annotation annotation) {
+            return new SiteIdBinding();
+        }
+    }
+
     @Documented
     @Retention(RetentionPolicy.RUNTIME)
     @java.lang.annotation.Target(ElementType.PARAMETER)
@@ -24,27 +24,7 @@ public class InvokeInfoBinding extends Binding {
             MethodInsnNodeWare methodInsnNodeWare = (MethodInsnNodeWare) location;
             MethodInsnNode methodInsnNode = methodInsnNodeWare.methodInsnNode();
 
-            int line = -1;
-
-            if (location.isWhenComplete() == false) {
-                AbstractInsnNode insnNode = methodInsnNode.getPrevious();
-                while (insnNode != null) {
-                    if (insnNode instanceof LineNumberNode) {
-                        line = ((LineNumberNode) insnNode).line;
-                        break;
-                    }
-                    insnNode = insnNode.getPrevious();
-                }
-            } else {
-                AbstractInsnNode insnNode = methodInsnNode.getNext();
-                while (insnNode != null) {
-                    if (insnNode instanceof LineNumberNode) {
-                        line = ((LineNumberNode) insnNode).line;
-                        break;
-                    }
-                    insnNode = insnNode.getNext();
-                }
-            }
+            int line = lineNumber(location, methodInsnNode);
 
             String result = methodInsnNode.owner + "|" + methodInsnNode.name + "|" + methodInsnNode.desc + "|" + line;
             AsmOpUtils.push(instructions, result);
@@ -56,6 +36,34 @@ public class InvokeInfoBinding extends Binding {
 
     }
 
+    /**
+     * 查找 invoke 指令对应的行号，没有找到时返回 -1
+     */
+    public static int lineNumber(Location location, MethodInsnNode methodInsnNode) {
+        int line = -1;
+
+        if (location.isWhenComplete() == false) {
+            AbstractInsnNode insnNode = methodInsnNode.getPrevious();
+            while (insnNode != null) {
+                if (insnNode instanceof LineNumberNode) {
+                    line = ((LineNumberNode) insnNode).line;
+                    break;
+                }
+                insnNode = insnNode.getPrevious();
+            }
+        } else {
+            AbstractInsnNode insnNode = methodInsnNode.getNext();
+            while (insnNode != null) {
+                if (insnNode instanceof LineNumberNode) {
+                    line = ((LineNumberNode) insnNode).line;
+                    break;
+                }
+                insnNode = insnNode.getNext();
+            }
+        }
+        return line;
+    }
+
     @Override
     public Type getType(BindingContext bindingContext) {
         return Type.getType(String.class);
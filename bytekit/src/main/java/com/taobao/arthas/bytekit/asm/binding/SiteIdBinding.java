@@ -0,0 +1,32 @@
+package com.taobao.arthas.bytekit.asm.binding;
+
+import com.alibaba.arthas.deps.org.objectweb.asm.Type;
+import com.alibaba.arthas.deps.org.objectweb.asm.tree.InsnList;
+import com.taobao.arthas.bytekit.asm.SiteIdAllocator;
+import com.taobao.arthas.bytekit.utils.AsmOpUtils;
+
+/**
+ * 把增强时分配的 site id 以 int 常量的方式放到栈上，id 由 MethodProcessor 上的 {@link SiteIdAllocator} 分配
+ */
+public class SiteIdBinding extends Binding {
+
+    @Override
+    public boolean check(BindingContext bindingContext) {
+        return bindingContext.getMethodProcessor().getSiteIdAllocator() != null;
+    }
+
+    @Override
+    public void pushOntoStack(InsnList instructions, BindingContext bindingContext) {
+        SiteIdAllocator siteIdAllocator = bindingContext.getMethodProcessor().getSiteIdAllocator();
+        if (siteIdAllocator == null) {
+            throw new IllegalArgumentException("SiteIdBinding require a SiteIdAllocator in MethodProcessor.");
+        }
+        AsmOpUtils.push(instructions, siteIdAllocator.allocate(bindingContext));
+    }
+
+    @Override
+    public Type getType(BindingContext bindingContext) {
+        return Type.INT_TYPE;
+    }
+
+}
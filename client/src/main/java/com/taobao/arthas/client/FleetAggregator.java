@@ -0,0 +1,193 @@
+package com.taobao.arthas.client;
+
+import java.util.ArrayList;
+import java.util.Collections;
+import java.util.Comparator;
+import java.util.LinkedHashMap;
+import java.util.List;
+import java.util.Map;
+
+import com.taobao.arthas.client.FleetExecutor.AgentResult;
+
+/**
+ * <pre>
+ * 汇总所有 agent 的结果：
+ * 1. monitor：按 class/method 累加 total/success/failed/cost，重新计算 avg-rt 和 fail-rate
+ * 2. thread：所有 agent 的 busyThreads 按 cpu 排序，取整个集群的 top N
+ * </pre>
+ */
+class FleetAggregator {
+
+    private final int topN;
+
+    private int succeededAgents;
+    private int failedAgents;
+    private long maxCostMillis;
+
+    private final Map<String, MonitorStat> monitorStats = new LinkedHashMap<String, MonitorStat>();
+    private final List<BusyThread> busyThreads = new ArrayList<BusyThread>();
+
+    FleetAggregator(int topN) {
+        this.topN = topN;
+    }
+
+    void add(AgentResult result) {
+        maxCostMillis = Math.max(maxCostMillis, result.costMillis);
+        if (!result.isSuccess()) {
+            failedAgents++;
+            return;
+        }
+        succeededAgents++;
+        for (Map<String, Object> item : results(result.response)) {
+            String type = (String) item.get("type");
+            if ("monitor".equals(type)) {
+                addMonitor(item);
+            } else if ("thread".equals(type)) {
+                addThread(result.target, item);
+            }
+        }
+    }
+
+    @SuppressWarnings("unchecked")
+    static List<Map<String, Object>> results(Map<String, Object> response) {
+        Object body = response.get("body");
+        if (body instanceof Map) {
+            Object results = ((Map<String, Object>) body).get("results");
+            if (results instanceof List) {
+                List<Map<String, Object>> list = new ArrayList<Map<String, Object>>();
+                for (Object item : (List<Object>) results) {
+                    if (item instanceof Map) {
+                        list.add((Map<String, Object>) item);
+                    }
+                }
+                return list;
+            }
+        }
+        return Collections.emptyList();
+    }
+
+    @SuppressWarnings("unchecked")
+    private void addMonitor(Map<String, Object> item) {
+        Object dataList = item.get("monitorDataList");
+        if (!(dataList instanceof List)) {
+            return;
+        }
+        for (Object element : (List<Object>) dataList) {
+            if (!(element instanceof Map)) {
+                continue;
+            }
+            Map<String, Object> data = (Map<String, Object>) element;
+            String key = data.get("className") + "#" + data.get("methodName");
+            MonitorStat stat = monitorStats.get(key);
+            if (stat == null) {
+                stat = new MonitorStat(key);
+                monitorStats.put(key, stat);
+            }
+            stat.total += number(data.get("total")).longValue();
+            stat.success += number(data.get("success")).longValue();
+            stat.failed += number(data.get("failed")).longValue();
+            stat.cost += number(data.get("cost")).doubleValue();
+        }
+    }
+
+    @SuppressWarnings("unchecked")
+    private void addThread(String target, Map<String, Object> item) {
+        Object threads = item.get("busyThreads");
+        if (!(threads instanceof List)) {
+            return;
+        }
+        for (Object element : (List<Object>) threads) {
+            if (!(element instanceof Map)) {
+                continue;
+            }
+            Map<String, Object> thread = (Map<String, Object>) element;
+            busyThreads.add(new BusyThread(target, number(thread.get("id")).longValue(),
+                            String.valueOf(thread.get("name")), number(thread.get("cpu")).doubleValue(),
+                            String.valueOf(thread.get("state"))));
+        }
+    }
+
+    private static Number number(Object value) {
+        return value instanceof Number ? (Number) value : Integer.valueOf(0);
+    }
+
+    boolean allSucceeded() {
+        return failedAgents == 0;
+    }
+
+    List<MonitorStat> getMonitorStats() {
+        return new ArrayList<MonitorStat>(monitorStats.values());
+    }
+
+    /**
+     * @return 整个集群 cpu 占用最高的 topN 个线程
+     */
+    List<BusyThread> getTopThreads() {
+        List<BusyThread> sorted = new ArrayList<BusyThread>(busyThreads);
+        Collections.sort(sorted, new Comparator<BusyThread>() {
+            @Override
+            public int compare(BusyThread t1, BusyThread t2) {
+                return Double.compare(t2.cpu, t1.cpu);
+            }
+        });
+        return sorted.size() > topN ? sorted.subList(0, topN) : sorted;
+    }
+
+    String report() {
+        StringBuilder sb = new StringBuilder();
+        sb.append("Fleet summary: ").append(succeededAgents).append(" succeeded, ").append(failedAgents)
+                        .append(" failed, slowest agent ").append(maxCostMillis).append(" ms\n");
+        if (!monitorStats.isEmpty()) {
+            sb.append(String.format("%-60s %10s %10s %10s %12s %10s%n", "method", "total", "success", "fail",
+                            "avg-rt(ms)", "fail-rate"));
+            for (MonitorStat stat : monitorStats.values()) {
+                sb.append(String.format("%-60s %10d %10d %10d %12.2f %9.2f%%%n", stat.method, stat.total,
+                                stat.success, stat.failed, stat.avgRt(), stat.failRate()));
+            }
+        }
+        if (!busyThreads.isEmpty()) {
+            sb.append(String.format("%-24s %8s %-40s %-14s %8s%n", "agent", "id", "name", "state", "cpu(%)"));
+            for (BusyThread thread : getTopThreads()) {
+                sb.append(String.format("%-24s %8d %-40s %-14s %8.2f%n", thread.target, thread.id, thread.name,
+                                thread.state, thread.cpu));
+            }
+        }
+        return sb.toString();
+    }
+
+    static class MonitorStat {
+        final String method;
+        long total;
+        long success;
+        long failed;
+        double cost;
+
+        MonitorStat(String method) {
+            this.method = method;
+        }
+
+        double avgRt() {
+            return total == 0 ? 0 : cost / total;
+        }
+
+        double failRate() {
+            return total == 0 ? 0 : 100.0d * failed / total;
+        }
+    }
+
+    static class BusyThread {
+        final String target;
+        final long id;
+        final String name;
+        final double cpu;
+        final String state;
+
+        BusyThread(String target, long id, String name, double cpu, String state) {
+            this.target = target;
+            this.id = id;
+            this.name = name;
+            this.cpu = cpu;
+            this.state = state;
+        }
+    }
+}
@@ -0,0 +1,193 @@
+package com.taobao.arthas.client;
+
+import java.io.BufferedReader;
+import java.io.File;
+import java.io.FileReader;
+import java.io.IOException;
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.List;
+import java.util.Map;
+
+import com.taobao.arthas.client.FleetExecutor.AgentResult;
+import com.taobao.arthas.common.UsageRender;
+import com.taobao.middleware.cli.CLI;
+import com.taobao.middleware.cli.CommandLine;
+import com.taobao.middleware.cli.UsageMessageFormatter;
+import com.taobao.middleware.cli.annotations.CLIConfigurator;
+import com.taobao.middleware.cli.annotations.Description;
+import com.taobao.middleware.cli.annotations.Name;
+import com.taobao.middleware.cli.annotations.Option;
+import com.taobao.middleware.cli.annotations.Summary;
+
+/**
+ * <pre>
+ * 在多个 arthas agent 上执行同一个命令，通过每个 agent 的 http api(默认 8563 端口)。
+ * 每个 agent 的结果在返回时立即输出，最后输出整个集群的汇总（monitor/thread 命令）。
+ * </pre>
+ */
+@Name("arthas-fleet")
+@Summary("Execute a command on many arthas agents")
+@Description("EXAMPLES:\n"
+        + "  java -cp arthas-client.jar com.taobao.arthas.client.FleetConsole --targets 127.0.0.1:8563,127.0.0.1:8564 -c 'thread -n 3'\n"
+        + "  java -cp arthas-client.jar com.taobao.arthas.client.FleetConsole --targets-file hosts.txt -c 'monitor -c 5 -n 1 demo.MathGame primeFactors'\n")
+public class FleetConsole {
+
+    private boolean help = false;
+
+    private String targets;
+    private String targetsFile;
+    private String command;
+    private int concurrency = 16;
+    private int timeout = 10000;
+    private int top = 3;
+
+    @Option(longName = "help", flag = true)
+    @Description("Print usage")
+    public void setHelp(boolean help) {
+        this.help = help;
+    }
+
+    @Option(longName = "targets")
+    @Description("The agent http addresses, host:port separated by ,")
+    public void setTargets(String targets) {
+        this.targets = targets;
+    }
+
+    @Option(longName = "targets-file")
+    @Description("The file of agent http addresses, one host:port per line")
+    public void setTargetsFile(String targetsFile) {
+        this.targetsFile = targetsFile;
+    }
+
+    @Option(shortName = "c", longName = "command", required = true)
+    @Description("Command to execute on every agent")
+    public void setCommand(String command) {
+        this.command = command;
+    }
+
+    @Option(longName = "concurrency")
+    @Description("The max number of agents connected at the same time, default 16")
+    public void setConcurrency(int concurrency) {
+        this.concurrency = concurrency;
+    }
+
+    @Option(shortName = "t", longName = "timeout")
+    @Description("The timeout (ms) of every agent, default 10000")
+    public void setTimeout(int timeout) {
+        this.timeout = timeout;
+    }
+
+    @Option(longName = "top")
+    @Description("The number of busiest threads of the whole fleet to print, default 3")
+    public void setTop(int top) {
+        this.top = top;
+    }
+
+    public static void main(String[] args) {
+        try {
+            System.exit(process(args));
+        } catch (Throwable e) {
+            e.printStackTrace();
+            System.out.println(usage(CLIConfigurator.define(FleetConsole.class)));
+            System.exit(TelnetConsole.STATUS_ERROR);
+        }
+    }
+
+    public static int process(String[] args) throws IOException, InterruptedException {
+        FleetConsole fleetConsole = new FleetConsole();
+        CLI cli = CLIConfigurator.define(FleetConsole.class);
+        CommandLine commandLine = cli.parse(Arrays.asList(args));
+        CLIConfigurator.inject(commandLine, fleetConsole);
+
+        if (fleetConsole.help) {
+            System.out.println(usage(cli));
+            return TelnetConsole.STATUS_ERROR;
+        }
+
+        List<String> targetList = fleetConsole.readTargets();
+        if (targetList.isEmpty()) {
+            throw new IllegalArgumentException("no targets, please specify --targets or --targets-file");
+        }
+        if (fleetConsole.concurrency <= 0 || fleetConsole.timeout <= 0) {
+            throw new IllegalArgumentException("concurrency and timeout must be positive");
+        }
+
+        final FleetAggregator aggregator = new FleetAggregator(fleetConsole.top);
+        FleetExecutor executor = new FleetExecutor(fleetConsole.concurrency, fleetConsole.timeout);
+        executor.execute(targetList, fleetConsole.command, new FleetExecutor.ResultListener() {
+            @Override
+            public void onResult(AgentResult result) {
+                System.out.println(format(result));
+                aggregator.add(result);
+            }
+        });
+
+        System.out.println();
+        System.out.print(aggregator.report());
+        return aggregator.allSucceeded() ? TelnetConsole.STATUS_OK : TelnetConsole.STATUS_EXEC_ERROR;
+    }
+
+    static String format(AgentResult result) {
+        StringBuilder sb = new StringBuilder();
+        sb.append('[').append(result.target).append("] ");
+        if (result.response == null) {
+            return sb.append("ERROR ").append(result.costMillis).append(" ms: ").append(result.error).toString();
+        }
+        sb.append(result.response.get("state")).append(' ').append(result.costMillis).append(" ms");
+        if (!result.isSuccess()) {
+            return sb.append(": ").append(result.response.get("message")).toString();
+        }
+        for (Map<String, Object> item : FleetAggregator.results(result.response)) {
+            // 忽略 command/status 等过程信息，只输出命令的结果
+            Object type = item.get("type");
+            if ("command".equals(type) || "input_status".equals(type) || "status".equals(type)) {
+                continue;
+            }
+            sb.append("\n  ").append(SimpleJson.toJson(item));
+        }
+        return sb.toString();
+    }
+
+    private List<String> readTargets() throws IOException {
+        List<String> list = new ArrayList<String>();
+        if (targets != null) {
+            for (String target : targets.split(",")) {
+                addTarget(list, target);
+            }
+        }
+        if (targetsFile != null) {
+            File file = new File(targetsFile);
+            if (!file.exists()) {
+                throw new IllegalArgumentException("targets file do not exist: " + targetsFile);
+            }
+            BufferedReader br = new BufferedReader(new FileReader(file));
+            try {
+                String line;
+                while ((line = br.readLine()) != null) {
+                    if (!line.trim().startsWith("#")) {
+                        addTarget(list, line);
+                    }
+                }
+            } finally {
+                br.close();
+            }
+        }
+        return list;
+    }
+
+    private static void addTarget(List<String> list, String target) {
+        target = target.trim();
+        if (!target.isEmpty() && !list.contains(target)) {
+            list.add(target);
+        }
+    }
+
+    private static String usage(CLI cli) {
+        StringBuilder usageStringBuilder = new StringBuilder();
+        UsageMessageFormatter usageMessageFormatter = new UsageMessageFormatter();
+        usageMessageFormatter.setOptionComparator(null);
+        cli.usage(usageStringBuilder, usageMessageFormatter);
+        return UsageRender.render(usageStringBuilder.toString());
+    }
+}
@@ -0,0 +1,173 @@
+package com.taobao.arthas.client;
+
+import java.io.ByteArrayOutputStream;
+import java.io.IOException;
+import java.io.InputStream;
+import java.io.OutputStream;
+import java.net.HttpURLConnection;
+import java.net.URL;
+import java.util.LinkedHashMap;
+import java.util.List;
+import java.util.Map;
+import java.util.concurrent.Callable;
+import java.util.concurrent.CompletionService;
+import java.util.concurrent.ExecutionException;
+import java.util.concurrent.ExecutorCompletionService;
+import java.util.concurrent.ExecutorService;
+import java.util.concurrent.LinkedBlockingQueue;
+import java.util.concurrent.ThreadFactory;
+import java.util.concurrent.ThreadPoolExecutor;
+import java.util.concurrent.TimeUnit;
+import java.util.concurrent.atomic.AtomicInteger;
+
+/**
+ * <pre>
+ * 通过 http api 在多个 arthas agent 上并发执行同一个命令：
+ * 1. 最多 concurrency 个并发连接，每个线程同一时间只有一个连接
+ * 2. 每个 agent 有独立的超时：命令的 execTimeout，以及连接/读取超时
+ * 3. 结果按完成的顺序在调用线程里回调，先完成的 agent 先输出
+ * </pre>
+ */
+class FleetExecutor {
+    private static final int MAX_CONNECT_TIMEOUT = 5000;
+    /**
+     * agent 在 execTimeout 之后中断命令并返回结果，读取超时多等一会
+     */
+    private static final int READ_TIMEOUT_PADDING = 5000;
+
+    private final int concurrency;
+    private final int timeoutMillis;
+
+    FleetExecutor(int concurrency, int timeoutMillis) {
+        this.concurrency = concurrency;
+        this.timeoutMillis = timeoutMillis;
+    }
+
+    interface ResultListener {
+        void onResult(AgentResult result);
+    }
+
+    static class AgentResult {
+        final String target;
+        /**
+         * http api 返回的 json，失败时为 null
+         */
+        final Map<String, Object> response;
+        final String error;
+        final long costMillis;
+
+        AgentResult(String target, Map<String, Object> response, String error, long costMillis) {
+            this.target = target;
+            this.response = response;
+            this.error = error;
+            this.costMillis = costMillis;
+        }
+
+        boolean isSuccess() {
+            return response != null && "SUCCEEDED".equals(response.get("state"));
+        }
+    }
+
+    void execute(List<String> targets, final String command, ResultListener listener) throws InterruptedException {
+        ExecutorService executor = new ThreadPoolExecutor(concurrency, concurrency, 0, TimeUnit.MILLISECONDS,
+                        new LinkedBlockingQueue<Runnable>(), new ThreadFactory() {
+                            private final AtomicInteger count = new AtomicInteger();
+
+                            @Override
+                            public Thread newThread(Runnable r) {
+                                Thread thread = new Thread(r, "arthas-fleet-" + count.incrementAndGet());
+                                thread.setDaemon(true);
+                                return thread;
+                            }
+                        });
+        try {
+            CompletionService<AgentResult> completionService = new ExecutorCompletionService<AgentResult>(executor);
+            for (final String target : targets) {
+                completionService.submit(new Callable<AgentResult>() {
+                    @Override
+                    public AgentResult call() {
+                        return executeOne(target, command);
+                    }
+                });
+            }
+            for (int i = 0; i < targets.size(); ++i) {
+                try {
+                    listener.onResult(completionService.take().get());
+                } catch (ExecutionException e) {
+                    // executeOne 不会抛出异常
+                    throw new IllegalStateException(e.getCause());
+                }
+            }
+        } finally {
+            executor.shutdownNow();
+        }
+    }
+
+    @SuppressWarnings("unchecked")
+    AgentResult executeOne(String target, String command) {
+        long start = System.currentTimeMillis();
+        HttpURLConnection connection = null;
+        try {
+            Map<String, Object> request = new LinkedHashMap<String, Object>();
+            request.put("action", "exec");
+            request.put("command", command);
+            request.put("execTimeout", timeoutMillis);
+            byte[] body = SimpleJson.toJson(request).getBytes("UTF-8");
+
+            connection = (HttpURLConnection) new URL(apiUrl(target)).openConnection();
+            connection.setConnectTimeout(Math.min(timeoutMillis, MAX_CONNECT_TIMEOUT));
+            connection.setReadTimeout(timeoutMillis + READ_TIMEOUT_PADDING);
+            connection.setRequestMethod("POST");
+            connection.setDoOutput(true);
+            connection.setRequestProperty("Content-Type", "application/json");
+            connection.setFixedLengthStreamingMode(body.length);
+            OutputStream out = connection.getOutputStream();
+            try {
+                out.write(body);
+            } finally {
+                out.close();
+            }
+
+            int status = connection.getResponseCode();
+            if (status != HttpURLConnection.HTTP_OK) {
+                return new AgentResult(target, null, "http status " + status, System.currentTimeMillis() - start);
+            }
+            String json = readString(connection.getInputStream());
+            Object response = SimpleJson.parse(json);
+            if (!(response instanceof Map)) {
+                return new AgentResult(target, null, "illegal response: " + json, System.currentTimeMillis() - start);
+            }
+            return new AgentResult(target, (Map<String, Object>) response, null, System.currentTimeMillis() - start);
+        } catch (Throwable e) {
+            return new AgentResult(target, null, e.toString(), System.currentTimeMillis() - start);
+        } finally {
+            if (connection != null) {
+                connection.disconnect();
+            }
+        }
+    }
+
+    /**
+     * target 可以是 host:port，或者完整的 http api 地址
+     */
+    static String apiUrl(String target) {
+        if (target.startsWith("http://") || target.startsWith("https://")) {
+            return target;
+        }
+        return "http://" + target + "/api";
+    }
+
+    private static String readString(InputStream in) throws IOException {
+        try {
+            ByteArrayOutputStream out = new ByteArrayOutputStream();
+            byte[] buffer = new byte[8192];
+            int len;
+            while ((len = in.read(buffer)) != -1) {
+                out.write(buffer, 0, len);
+            }
+            return out.toString("UTF-8");
+        } finally {
+            in.close();
+        }
+    }
+}
@@ -0,0 +1,283 @@
+package com.taobao.arthas.client;
+
+import java.util.ArrayList;
+import java.util.Iterator;
+import java.util.LinkedHashMap;
+import java.util.List;
+import java.util.Map;
+import java.util.Map.Entry;
+
+/**
+ * <pre>
+ * arthas-client 不依赖 json 库，这里只实现 http api 需要的部分：
+ * 解析为 Map/List/String/Number/Boolean/null，以及把这些类型序列化为 json。
+ * </pre>
+ */
+class SimpleJson {
+
+    private final String json;
+    private int pos;
+
+    private SimpleJson(String json) {
+        this.json = json;
+    }
+
+    static Object parse(String json) {
+        SimpleJson parser = new SimpleJson(json);
+        Object value = parser.readValue();
+        parser.skipWhitespace();
+        if (parser.pos != json.length()) {
+            throw parser.error("unexpected trailing content");
+        }
+        return value;
+    }
+
+    static String toJson(Object value) {
+        StringBuilder sb = new StringBuilder();
+        write(sb, value);
+        return sb.toString();
+    }
+
+    private static void write(StringBuilder sb, Object value) {
+        if (value == null) {
+            sb.append("null");
+        } else if (value instanceof String) {
+            writeString(sb, (String) value);
+        } else if (value instanceof Number || value instanceof Boolean) {
+            sb.append(value);
+        } else if (value instanceof Map) {
+            sb.append('{');
+            Iterator<? extends Entry<?, ?>> it = ((Map<?, ?>) value).entrySet().iterator();
+            while (it.hasNext()) {
+                Entry<?, ?> entry = it.next();
+                writeString(sb, String.valueOf(entry.getKey()));
+                sb.append(':');
+                write(sb, entry.getValue());
+                if (it.hasNext()) {
+                    sb.append(',');
+                }
+            }
+            sb.append('}');
+        } else if (value instanceof List) {
+            sb.append('[');
+            Iterator<?> it = ((List<?>) value).iterator();
+            while (it.hasNext()) {
+                write(sb, it.next());
+                if (it.hasNext()) {
+                    sb.append(',');
+                }
+            }
+            sb.append(']');
+        } else {
+            writeString(sb, value.toString());
+        }
+    }
+
+    private static void writeString(StringBuilder sb, String s) {
+        sb.append('"');
+        for (int i = 0; i < s.length(); ++i) {
+            char c = s.charAt(i);
+            switch (c) {
+            case '"':
+                sb.append("\\\"");
+                break;
+            case '\\':
+                sb.append("\\\\");
+                break;
+            case '\n':
+                sb.append("\\n");
+                break;
+            case '\r':
+                sb.append("\\r");
+                break;
+            case '\t':
+                sb.append("\\t");
+                break;
+            default:
+                if (c < 0x20) {
+                    sb.append(String.format("\\u%04x", (int) c));
+                } else {
+                    sb.append(c);
+                }
+            }
+        }
+        sb.append('"');
+    }
+
+    private Object readValue() {
+        skipWhitespace();
+        if (pos >= json.length()) {
+            throw error("unexpected end");
+        }
+        char c = json.charAt(pos);
+        switch (c) {
+        case '{':
+            return readObject();
+        case '[':
+            return readArray();
+        case '"':
+            return readString();
+        case 't':
+            expect("true");
+            return Boolean.TRUE;
+        case 'f':
+            expect("false");
+            return Boolean.FALSE;
+        case 'n':
+            expect("null");
+            return null;
+        default:
+            return readNumber();
+        }
+    }
+
+    private Map<String, Object> readObject() {
+        Map<String, Object> map = new LinkedHashMap<String, Object>();
+        ++pos;
+        skipWhitespace();
+        if (peek() == '}') {
+            ++pos;
+            return map;
+        }
+        while (true) {
+            skipWhitespace();
+            if (peek() != '"') {
+                throw error("expect string key");
+            }
+            String key = readString();
+            skipWhitespace();
+            if (peek() != ':') {
+                throw error("expect ':'");
+            }
+            ++pos;
+            map.put(key, readValue());
+            skipWhitespace();
+            char c = peek();
+            ++pos;
+            if (c == '}') {
+                return map;
+            }
+            if (c != ',') {
+                throw error("expect ',' or '}'");
+            }
+        }
+    }
+
+    private List<Object> readArray() {
+        List<Object> list = new ArrayList<Object>();
+        ++pos;
+        skipWhitespace();
+        if (peek() == ']') {
+            ++pos;
+            return list;
+        }
+        while (true) {
+            list.add(readValue());
+            skipWhitespace();
+            char c = peek();
+            ++pos;
+            if (c == ']') {
+                return list;
+            }
+            if (c != ',') {
+                throw error("expect ',' or ']'");
+            }
+        }
+    }
+
+    private String readString() {
+        StringBuilder sb = new StringBuilder();
+        ++pos;
+        while (pos < json.length()) {
+            char c = json.charAt(pos++);
+            if (c == '"') {
+                return sb.toString();
+            }
+            if (c != '\\') {
+                sb.append(c);
+                continue;
+            }
+            if (pos >= json.length()) {
+                break;
+            }
+            char escaped = json.charAt(pos++);
+            switch (escaped) {
+            case 'b':
+                sb.append('\b');
+                break;
+            case 'f':
+                sb.append('\f');
+                break;
+            case 'n':
+                sb.append('\n');
+                break;
+            case 'r':
+                sb.append('\r');
+                break;
+            case 't':
+                sb.append('\t');
+                break;
+            case 'u':
+                if (pos + 4 > json.length()) {
+                    throw error("bad unicode escape");
+                }
+                sb.append((char) Integer.parseInt(json.substring(pos, pos + 4), 16));
+                pos += 4;
+                break;
+            default:
+                sb.append(escaped);
+            }
+        }
+        throw error("unterminated string");
+    }
+
+    private Number readNumber() {
+        int start = pos;
+        boolean decimal = false;
+        while (pos < json.length()) {
+            char c = json.charAt(pos);
+            if (c == '.' || c == 'e' || c == 'E') {
+                decimal = true;
+            } else if (!(c == '-' || c == '+' || (c >= '0' && c <= '9'))) {
+                break;
+            }
+            ++pos;
+        }
+        String number = json.substring(start, pos);
+        if (number.isEmpty()) {
+            throw error("unexpected character");
+        }
+        try {
+            if (decimal) {
+                return Double.parseDouble(number);
+            }
+            return Long.parseLong(number);
+        } catch (NumberFormatException e) {
+            throw error("bad number: " + number);
+        }
+    }
+
+    private void expect(String literal) {
+        if (!json.startsWith(literal, pos)) {
+            throw error("expect " + literal);
+        }
+        pos += literal.length();
+    }
+
+    private char peek() {
+        if (pos >= json.length()) {
+            throw error("unexpected end");
+        }
+        return json.charAt(pos);
+    }
+
+    private void skipWhitespace() {
+        while (pos < json.length() && Character.isWhitespace(json.charAt(pos))) {
+            ++pos;
+        }
+    }
+
+    private IllegalArgumentException error(String message) {
+        return new IllegalArgumentException(message + " at position " + pos);
+    }
+}
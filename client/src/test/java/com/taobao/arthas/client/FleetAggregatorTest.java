@@ -0,0 +1,79 @@
+package com.taobao.arthas.client;
+
+import java.util.List;
+import java.util.Map;
+
+import org.junit.Assert;
+import org.junit.Test;
+
+import com.taobao.arthas.client.FleetAggregator.BusyThread;
+import com.taobao.arthas.client.FleetAggregator.MonitorStat;
+import com.taobao.arthas.client.FleetExecutor.AgentResult;
+
+/**
+ *
+ * @see FleetAggregator
+ */
+public class FleetAggregatorTest {
+
+    @SuppressWarnings("unchecked")
+    private static AgentResult result(String target, String json) {
+        return new AgentResult(target, (Map<String, Object>) SimpleJson.parse(json), null, 10);
+    }
+
+    private static String monitor(int total, int failed, double cost) {
+        return "{\"state\":\"SUCCEEDED\",\"body\":{\"results\":[{\"type\":\"command\",\"state\":\"SCHEDULED\"},"
+                        + "{\"type\":\"monitor\",\"monitorDataList\":[{\"className\":\"demo.MathGame\","
+                        + "\"methodName\":\"primeFactors\",\"total\":" + total + ",\"success\":" + (total - failed)
+                        + ",\"failed\":" + failed + ",\"cost\":" + cost + "}]}]}}";
+    }
+
+    private static String thread(String... nameAndCpu) {
+        StringBuilder sb = new StringBuilder(
+                        "{\"state\":\"SUCCEEDED\",\"body\":{\"results\":[{\"type\":\"thread\",\"busyThreads\":[");
+        for (int i = 0; i < nameAndCpu.length; i += 2) {
+            if (i > 0) {
+                sb.append(',');
+            }
+            sb.append("{\"id\":").append(i + 1).append(",\"name\":\"").append(nameAndCpu[i])
+                            .append("\",\"state\":\"RUNNABLE\",\"cpu\":").append(nameAndCpu[i + 1]).append('}');
+        }
+        return sb.append("]}]}}").toString();
+    }
+
+    @Test
+    public void testMonitor() {
+        FleetAggregator aggregator = new FleetAggregator(3);
+        aggregator.add(result("a:8563", monitor(10, 2, 20.0)));
+        aggregator.add(result("b:8563", monitor(30, 0, 20.0)));
+        aggregator.add(new AgentResult("c:8563", null, "connect timed out", 5000));
+
+        List<MonitorStat> stats = aggregator.getMonitorStats();
+        Assert.assertEquals(1, stats.size());
+        MonitorStat stat = stats.get(0);
+        Assert.assertEquals("demo.MathGame#primeFactors", stat.method);
+        Assert.assertEquals(40, stat.total);
+        Assert.assertEquals(38, stat.success);
+        Assert.assertEquals(2, stat.failed);
+        Assert.assertEquals(1.0d, stat.avgRt(), 0.0001d);
+        Assert.assertEquals(5.0d, stat.failRate(), 0.0001d);
+
+        Assert.assertFalse(aggregator.allSucceeded());
+        Assert.assertTrue(aggregator.report().startsWith("Fleet summary: 2 succeeded, 1 failed, slowest agent 5000 ms"));
+    }
+
+    @Test
+    public void testTopThreads() {
+        FleetAggregator aggregator = new FleetAggregator(2);
+        aggregator.add(result("a:8563", thread("main", "10.5", "worker-1", "3")));
+        aggregator.add(result("b:8563", thread("worker-2", "50", "gc", "0.1")));
+
+        List<BusyThread> threads = aggregator.getTopThreads();
+        Assert.assertEquals(2, threads.size());
+        Assert.assertEquals("b:8563", threads.get(0).target);
+        Assert.assertEquals("worker-2", threads.get(0).name);
+        Assert.assertEquals("a:8563", threads.get(1).target);
+        Assert.assertEquals("main", threads.get(1).name);
+        Assert.assertTrue(aggregator.allSucceeded());
+    }
+}
@@ -0,0 +1,50 @@
+package com.taobao.arthas.client;
+
+import java.util.Arrays;
+import java.util.LinkedHashMap;
+import java.util.List;
+import java.util.Map;
+
+import org.junit.Assert;
+import org.junit.Test;
+
+/**
+ *
+ * @see SimpleJson
+ */
+public class SimpleJsonTest {
+
+    @Test
+    @SuppressWarnings("unchecked")
+    public void testParse() {
+        Map<String, Object> map = (Map<String, Object>) SimpleJson
+                        .parse("{\"state\":\"SUCCEEDED\",\"body\":{\"results\":[{\"total\":12,\"cost\":1.5}],"
+                                        + "\"timeExpired\":false,\"message\":null,\"name\":\"a\\\"b\\u0041\"}}");
+        Assert.assertEquals("SUCCEEDED", map.get("state"));
+        Map<String, Object> body = (Map<String, Object>) map.get("body");
+        Assert.assertEquals(Boolean.FALSE, body.get("timeExpired"));
+        Assert.assertTrue(body.containsKey("message"));
+        Assert.assertNull(body.get("message"));
+        Assert.assertEquals("a\"bA", body.get("name"));
+        Map<String, Object> result = ((List<Map<String, Object>>) body.get("results")).get(0);
+        Assert.assertEquals(12L, result.get("total"));
+        Assert.assertEquals(1.5d, result.get("cost"));
+    }
+
+    @Test(expected = IllegalArgumentException.class)
+    public void testParseError() {
+        SimpleJson.parse("{\"state\":}");
+    }
+
+    @Test
+    public void testToJson() {
+        Map<String, Object> map = new LinkedHashMap<String, Object>();
+        map.put("action", "exec");
+        map.put("command", "watch demo.MathGame primeFactors \"{params}\"\n");
+        map.put("execTimeout", 5000);
+        map.put("list", Arrays.asList(1, true, null));
+        Assert.assertEquals("{\"action\":\"exec\",\"command\":\"watch demo.MathGame primeFactors \\\"{params}\\\"\\n\","
+                        + "\"execTimeout\":5000,\"list\":[1,true,null]}", SimpleJson.toJson(map));
+        Assert.assertEquals(map.get("command"), SimpleJson.parse(SimpleJson.toJson(map.get("command"))));
+    }
+}
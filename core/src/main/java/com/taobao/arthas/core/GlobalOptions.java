@@ -47,6 +47,33 @@ public class GlobalOptions {
     )
     public static volatile boolean isBatchReTransform = true;
 
+    /**
+     * 批量增强时并发 retransform 的线程数<br/>
+     * 类比较多时，分成多批在多个线程里 retransform，字节码的分析和织入可以并行执行
+     */
+    @Option(level = 1,
+            name = "retransform-threads",
+            summary = "Option to set the number of threads to reTransform classes",
+            description = "This option sets the number of threads to reTransform classes in batch mode. "
+                    + "Classes are split into batches sized by the measured transform cost, "
+                    + "1 means all classes are reTransformed in one batch."
+    )
+    public static volatile int retransformThreads = Math.min(4, Runtime.getRuntime().availableProcessors());
+
+    /**
+     * 增强时是否插入 int 类型的 site id<br/>
+     * 打开后 SpyImpl 直接按 site id 取 listener 数组，不需要在每次调用时解析字符串和查 map
+     */
+    @Option(level = 1,
+            name = "fast-dispatch",
+            summary = "Option to dispatch advice by site id",
+            description = "This option enables the enhanced code to dispatch advice by an int site id allocated "
+                    + "when the class is enhanced, instead of parsing the method info string on each call. "
+                    + "Only affects classes enhanced after it is changed. "
+                    + "It is ignored when the spy jar loaded by the JVM is too old to support site ids."
+    )
+    public static volatile boolean isFastDispatch = true;
+
     /**
      * 是否支持json格式化输出<br/>
      * 这个开关打开后，使用json格式输出目标对象，配合-x参数使用
@@ -123,4 +150,137 @@ public class GlobalOptions {
             description = "This option enables print verbose information, default value false."
     )
     public static volatile boolean verbose = false;
+
+    /**
+     * tt 命令在内存里最多保存的记录数
+     */
+    @Option(level = 1,
+            name = "tt-max-records",
+            summary = "Option to limit the number of time fragments kept in memory",
+            description = "This option limits the number of time fragments kept in memory by tt command, "
+                    + "the eldest ones are evicted (or spilled when tt-spill is enabled) when exceeded."
+    )
+    public static volatile int ttMaxRecords = 10000;
+
+    /**
+     * tt 命令在内存里保存的记录估算大小上限
+     */
+    @Option(level = 1,
+            name = "tt-max-bytes",
+            summary = "Option to limit the estimated memory of time fragments",
+            description = "This option limits the estimated bytes of params/return/throw objects kept by tt command, "
+                    + "128 MB by default."
+    )
+    public static volatile long ttMaxBytes = 128 * 1024 * 1024;
+
+    /**
+     * tt 记录的淘汰策略
+     */
+    @Option(level = 1,
+            name = "tt-eviction",
+            summary = "Option to choose the eviction policy of time fragments",
+            description = "This option chooses which time fragment is evicted first when tt store is full, "
+                    + "fifo (the eldest recorded) or lru (the least recently viewed), fifo by default.",
+            values = { "fifo", "lru" }
+    )
+    public static volatile String ttEviction = "fifo";
+
+    /**
+     * 被淘汰的 tt 记录是否序列化到磁盘
+     */
+    @Option(level = 1,
+            name = "tt-spill",
+            summary = "Option to spill evicted time fragments to disk",
+            description = "This option enables evicted time fragments to be serialized into a memory-mapped file "
+                    + "under arthas output dir, so they can still be listed, searched and viewed. "
+                    + "Objects which are not Serializable are kept as their class name and identity hash code."
+    )
+    public static volatile boolean ttSpill = false;
+
+    /**
+     * tt 磁盘文件的大小
+     */
+    @Option(level = 1,
+            name = "tt-spill-max-bytes",
+            summary = "Option to limit the size of tt spill file",
+            description = "This option sets the size of the memory-mapped tt spill file, the eldest spilled "
+                    + "time fragments are overwritten when it is full, 256 MB by default. "
+                    + "Only takes effect before the file is created."
+    )
+    public static volatile long ttSpillMaxBytes = 256 * 1024 * 1024;
+
+    /**
+     * 是否尝试把 ognl 表达式编译成字节码
+     */
+    @Option(level = 1,
+            name = "ognl-compile",
+            summary = "Option to compile ognl expressions",
+            description = "This option enables ognl expressions of watch/trace/tt/monitor to be compiled into bytecode "
+                    + "by javassist, falls back to the interpreter when the expression can not be compiled, "
+                    + "default value false."
+    )
+    public static volatile boolean ognlCompile = false;
+
+    /**
+     * thread/dashboard 共享的后台线程 cpu 采样间隔
+     */
+    @Option(level = 1,
+            name = "thread-sample-interval",
+            summary = "Option to set the interval (in ms) of the background thread cpu sampler",
+            description = "This option sets the interval of the background thread cpu sampler shared by "
+                    + "thread and dashboard, 1000 ms by default, the minimum is 100 ms. "
+                    + "The sampler stops after 15 minutes without any use."
+    )
+    public static volatile long threadSampleInterval = 1000;
+
+    /**
+     * ObjectView 展开对象时每个集合/数组/Map 最多展示的元素个数
+     * @see com.taobao.arthas.core.view.ObjectView
+     */
+    @Option(level = 1,
+            name = "render-max-elements",
+            summary = "Option to limit the number of elements rendered for each collection",
+            description = "This option limits the number of elements rendered for each collection/map/array "
+                    + "when expanding objects, the rest are summarized as '...(N more)', 1000 by default."
+    )
+    public static volatile int renderMaxElements = 1000;
+
+    /**
+     * ObjectView 展开一个对象时最多渲染的节点数
+     * @see com.taobao.arthas.core.view.ObjectView
+     */
+    @Option(level = 1,
+            name = "render-max-nodes",
+            summary = "Option to limit the number of nodes rendered for one object",
+            description = "This option limits the number of nodes rendered when expanding one object, "
+                    + "rendering stops before descending any further once it is exceeded, 100000 by default."
+    )
+    public static volatile int renderMaxNodes = 100000;
+
+    /**
+     * watch 的结果是否在应用线程里只拷贝展开的部分，由后台线程渲染
+     * @see com.taobao.arthas.core.view.ObjectView#snapshot(Object, int)
+     */
+    @Option(level = 1,
+            name = "defer-render",
+            summary = "Option to render watch results off the application thread",
+            description = "This option makes watch snapshot the expanded levels of the result on the application thread "
+                    + "and render it on the command scheduler, at most render-max-nodes objects are copied, "
+                    + "default value false."
+    )
+    public static volatile boolean deferRender = false;
+
+    /**
+     * watch/trace/tt/monitor/stack 的 listener 占用业务线程时间的上限
+     * @see com.taobao.arthas.core.advisor.OverheadGovernor
+     */
+    @Option(level = 1,
+            name = "overhead-budget",
+            summary = "Option to limit the overhead of enhanced methods",
+            description = "This option sets the max percentage of the wall time of enhanced methods spent in "
+                    + "watch/trace/tt/monitor/stack listeners, such as 2%. The listener is sampled when it exceeds "
+                    + "the budget and suspended when 1% sampling still exceeds it, 0 (disabled) by default. "
+                    + "It applies to commands started after it is enabled."
+    )
+    public static volatile String overheadBudget = "0";
 }
@@ -32,4 +32,9 @@ public @interface Option {
      */
     String description();
 
+    /*
+     * 字符串选项可以取的值，为空时不限制
+     */
+    String[] values() default {};
+
 }
\ No newline at end of file
@@ -4,6 +4,8 @@ import java.util.concurrent.atomic.AtomicLong;
 
 import com.taobao.arthas.core.command.express.ExpressException;
 import com.taobao.arthas.core.command.express.ExpressFactory;
+import com.taobao.arthas.core.command.model.MessageModel;
+import com.taobao.arthas.core.command.model.ResultModel;
 import com.taobao.arthas.core.shell.command.CommandProcess;
 import com.taobao.arthas.core.shell.system.Process;
 import com.taobao.arthas.core.shell.system.ProcessAware;
@@ -22,6 +24,10 @@ public abstract class AdviceListenerAdapter implements AdviceListener, ProcessAw
 
     private boolean verbose;
 
+    private InvocationSampler sampler;
+
+    private volatile OverheadGovernor governor;
+
     @Override
     public long id() {
         return id;
@@ -48,19 +54,97 @@ public abstract class AdviceListenerAdapter implements AdviceListener, ProcessAw
     @Override
     final public void before(Class<?> clazz, String methodName, String methodDesc, Object target, Object[] args)
             throws Throwable {
-        before(clazz.getClassLoader(), clazz, new ArthasMethod(clazz, methodName, methodDesc), target, args);
+        OverheadGovernor governor = this.governor;
+        if (governor == null) {
+            sampledBefore(clazz, methodName, methodDesc, target, args);
+            return;
+        }
+        long start = System.nanoTime();
+        if (!governor.enter(clazz, methodName, start)) {
+            return;
+        }
+        try {
+            sampledBefore(clazz, methodName, methodDesc, target, args);
+        } finally {
+            governor.addSelfTime(start);
+        }
     }
 
     @Override
     final public void afterReturning(Class<?> clazz, String methodName, String methodDesc, Object target, Object[] args,
             Object returnObject) throws Throwable {
-        afterReturning(clazz.getClassLoader(), clazz, new ArthasMethod(clazz, methodName, methodDesc), target, args,
-                returnObject);
+        OverheadGovernor governor = this.governor;
+        if (governor == null) {
+            sampledAfterReturning(clazz, methodName, methodDesc, target, args, returnObject);
+            return;
+        }
+        long start = System.nanoTime();
+        try {
+            if (governor.isAdmitted()) {
+                sampledAfterReturning(clazz, methodName, methodDesc, target, args, returnObject);
+            }
+        } finally {
+            governor.exit(start);
+        }
     }
 
     @Override
     final public void afterThrowing(Class<?> clazz, String methodName, String methodDesc, Object target, Object[] args,
             Throwable throwable) throws Throwable {
+        OverheadGovernor governor = this.governor;
+        if (governor == null) {
+            sampledAfterThrowing(clazz, methodName, methodDesc, target, args, throwable);
+            return;
+        }
+        long start = System.nanoTime();
+        try {
+            if (governor.isAdmitted()) {
+                sampledAfterThrowing(clazz, methodName, methodDesc, target, args, throwable);
+            }
+        } finally {
+            governor.exit(start);
+        }
+    }
+
+    private void sampledBefore(Class<?> clazz, String methodName, String methodDesc, Object target, Object[] args)
+            throws Throwable {
+        // 没有被采样到的调用，直接返回，不用构造 ArthasMethod/Advice
+        if (sampler != null && !sampler.enter()) {
+            return;
+        }
+        before(clazz.getClassLoader(), clazz, new ArthasMethod(clazz, methodName, methodDesc), target, args);
+    }
+
+    private void sampledAfterReturning(Class<?> clazz, String methodName, String methodDesc, Object target,
+            Object[] args, Object returnObject) throws Throwable {
+        if (sampler != null) {
+            try {
+                if (sampler.isSampled()) {
+                    afterReturning(clazz.getClassLoader(), clazz, new ArthasMethod(clazz, methodName, methodDesc),
+                            target, args, returnObject);
+                }
+            } finally {
+                sampler.exit();
+            }
+            return;
+        }
+        afterReturning(clazz.getClassLoader(), clazz, new ArthasMethod(clazz, methodName, methodDesc), target, args,
+                returnObject);
+    }
+
+    private void sampledAfterThrowing(Class<?> clazz, String methodName, String methodDesc, Object target,
+            Object[] args, Throwable throwable) throws Throwable {
+        if (sampler != null) {
+            try {
+                if (sampler.isSampled()) {
+                    afterThrowing(clazz.getClassLoader(), clazz, new ArthasMethod(clazz, methodName, methodDesc),
+                            target, args, throwable);
+                }
+            } finally {
+                sampler.exit();
+            }
+            return;
+        }
         afterThrowing(clazz.getClassLoader(), clazz, new ArthasMethod(clazz, methodName, methodDesc), target, args,
                 throwable);
     }
@@ -141,11 +225,70 @@ public abstract class AdviceListenerAdapter implements AdviceListener, ProcessAw
      * @param limit   the limit to be printed
      */
     protected void abortProcess(CommandProcess process, int limit) {
+        if (sampler != null) {
+            sampler.flush();
+            process.appendResult(new MessageModel(sampler.summary()));
+        }
+        if (governor != null && (governor.isAdjusted() || verbose)) {
+            process.appendResult(new MessageModel(governor.summary()));
+        }
         process.write("Command execution times exceed limit: " + limit
                 + ", so command will exit. You can set it with -n option.\n");
         process.end();
     }
 
+    /**
+     * 输出结果，打开采样时由 sampler 决定是否马上输出
+     */
+    protected void appendResult(CommandProcess process, ResultModel model) {
+        if (sampler != null) {
+            sampler.appendResult(model);
+        } else {
+            process.appendResult(model);
+        }
+    }
+
+    /**
+     * trace 在方法体内的 invoke 回调，如果外层的调用没有被采样到，也需要跳过
+     */
+    protected boolean isSampledOut() {
+        OverheadGovernor governor = this.governor;
+        return (governor != null && !governor.isAdmitted()) || (sampler != null && !sampler.isSampled());
+    }
+
+    /**
+     * @return 是否在统计 listener 的开销，没有打开 overhead-budget 时回调不需要计时
+     */
+    protected boolean isGoverned() {
+        return governor != null;
+    }
+
+    /**
+     * 记录 listener 在方法体内的回调耗时，比如 trace 的 invoke 回调
+     */
+    protected void addSelfTime(long startNanos) {
+        OverheadGovernor governor = this.governor;
+        if (governor != null) {
+            governor.addSelfTime(startNanos);
+        }
+    }
+
+    public InvocationSampler getSampler() {
+        return sampler;
+    }
+
+    public void setSampler(InvocationSampler sampler) {
+        this.sampler = sampler;
+    }
+
+    public OverheadGovernor getGovernor() {
+        return governor;
+    }
+
+    public void setGovernor(OverheadGovernor governor) {
+        this.governor = governor;
+    }
+
     public boolean isVerbose() {
         return verbose;
     }
@@ -1,6 +1,8 @@
 package com.taobao.arthas.core.advisor;
 
+import java.lang.ref.WeakReference;
 import java.util.ArrayList;
+import java.util.Arrays;
 import java.util.List;
 import java.util.Map.Entry;
 import java.util.concurrent.ConcurrentHashMap;
@@ -13,6 +15,7 @@ import com.taobao.arthas.core.server.ArthasBootstrap;
 import com.taobao.arthas.core.shell.system.ExecStatus;
 import com.taobao.arthas.core.shell.system.Process;
 import com.taobao.arthas.core.shell.system.ProcessAware;
+import com.taobao.arthas.core.util.scheduler.TaskPriority;
 
 /**
  * 
@@ -56,7 +59,7 @@ public class AdviceListenerManager {
 
     static {
         // 清理失效的 AdviceListener
-        ArthasBootstrap.getInstance().getScheduledExecutorService().scheduleWithFixedDelay(new Runnable() {
+        ArthasBootstrap.getInstance().getCommandScheduler().scheduleWithFixedDelay(null, TaskPriority.BACKGROUND, new Runnable() {
             @Override
             public void run() {
                 try {
@@ -83,11 +86,13 @@ public class AdviceListenerManager {
 
                                     if (newResult.size() != listeners.size()) {
                                         adviceListenerManager.map.put(eee.getKey(), newResult);
+                                        adviceListenerManager.publish(eee.getKey());
                                     }
 
                                 }
                             }
                         }
+                        releaseCollectedSites();
                     }
                 } catch (Throwable e) {
                     try {
@@ -102,9 +107,69 @@ public class AdviceListenerManager {
 
     static private ConcurrentWeakKeyHashMap<ClassLoader, ClassLoaderAdviceListenerManager> adviceListenerMap = new ConcurrentWeakKeyHashMap<ClassLoader, ClassLoaderAdviceListenerManager>();
 
+    private static final AdviceListener[] EMPTY_LISTENERS = new AdviceListener[0];
+
+    /**
+     * 所有 woven site，下标即 site id。 数组元素在写入之后会对 sites 重新做一次 volatile 写，保证读线程可见
+     */
+    private static volatile AdviceSite[] sites = new AdviceSite[1024];
+    private static int siteCount = 0;
+    /**
+     * ClassLoader 被回收之后释放的 site id，可以重新分配
+     */
+    private static final List<Integer> freeSiteIds = new ArrayList<Integer>();
+    private static final Object SITE_LOCK = new Object();
+
+    /**
+     * 增强时分配的插入点，SpyImpl 按 site id 直接取到 listener 数组，不需要拼接字符串和查 map
+     */
+    static class AdviceSite {
+        final int id;
+        final String className;
+        /**
+         * 对于 invoke 插入点，是被调用函数的 owner，否则为 null
+         */
+        final String owner;
+        final String methodName;
+        final String methodDesc;
+        final int line;
+        final String key;
+        /**
+         * ClassLoaderAdviceListenerManager 随 ClassLoader 一起被回收之后，这个 site 就不会再被调用了
+         */
+        final WeakReference<ClassLoaderAdviceListenerManager> manager;
+
+        /**
+         * copy on write，只在 ClassLoaderAdviceListenerManager 的锁里更新
+         */
+        volatile AdviceListener[] listeners = EMPTY_LISTENERS;
+
+        AdviceSite(int id, String className, String owner, String methodName, String methodDesc, int line,
+                String key, ClassLoaderAdviceListenerManager manager) {
+            this.id = id;
+            this.className = className;
+            this.owner = owner;
+            this.methodName = methodName;
+            this.methodDesc = methodDesc;
+            this.line = line;
+            this.key = key;
+            this.manager = new WeakReference<ClassLoaderAdviceListenerManager>(manager);
+        }
+    }
+
     static class ClassLoaderAdviceListenerManager {
         private ConcurrentHashMap<String, List<AdviceListener>> map = new ConcurrentHashMap<String, List<AdviceListener>>();
 
+        /**
+         * listener key -> 使用这个 key 的所有 site
+         */
+        private ConcurrentHashMap<String, List<AdviceSite>> siteMap = new ConcurrentHashMap<String, List<AdviceSite>>();
+
+        /**
+         * site 的完整描述 -> site，同一个类被重复增强时复用之前分配的 id
+         */
+        private ConcurrentHashMap<String, AdviceSite> siteIndex = new ConcurrentHashMap<String, AdviceSite>();
+
         private String key(String className, String methodName, String methodDesc) {
             return className + methodName + methodDesc;
         }
@@ -126,6 +191,7 @@ public class AdviceListenerManager {
                 }
                 if (!listeners.contains(listener)) {
                     listeners.add(listener);
+                    publish(key);
                 }
             }
         }
@@ -141,17 +207,19 @@ public class AdviceListenerManager {
 
         public void registerTraceAdviceListener(String className, String owner, String methodName, String methodDesc,
                 AdviceListener listener) {
+            synchronized (this) {
+                className = className.replace('/', '.');
+                String key = keyForTrace(className, owner, methodName, methodDesc);
 
-            className = className.replace('/', '.');
-            String key = keyForTrace(className, owner, methodName, methodDesc);
-
-            List<AdviceListener> listeners = map.get(key);
-            if (listeners == null) {
-                listeners = new ArrayList<AdviceListener>();
-                map.put(key, listeners);
-            }
-            if (!listeners.contains(listener)) {
-                listeners.add(listener);
+                List<AdviceListener> listeners = map.get(key);
+                if (listeners == null) {
+                    listeners = new ArrayList<AdviceListener>();
+                    map.put(key, listeners);
+                }
+                if (!listeners.contains(listener)) {
+                    listeners.add(listener);
+                    publish(key);
+                }
             }
         }
 
@@ -164,19 +232,127 @@ public class AdviceListenerManager {
 
             return listeners;
         }
+
+        public AdviceSite registerAdviceSite(String className, String methodName, String methodDesc) {
+            className = className.replace('/', '.');
+            String key = key(className, methodName, methodDesc);
+            return registerSite(key, className, null, methodName, methodDesc, -1);
+        }
+
+        public AdviceSite registerTraceAdviceSite(String className, String owner, String methodName,
+                String methodDesc, int line) {
+            className = className.replace('/', '.');
+            String key = keyForTrace(className, owner, methodName, methodDesc);
+            return registerSite(key, className, owner, methodName, methodDesc, line);
+        }
+
+        private AdviceSite registerSite(String key, String className, String owner, String methodName,
+                String methodDesc, int line) {
+            synchronized (this) {
+                // key 里已经包含了 owner，再加上行号，区分同一个函数里的多个 invoke 插入点
+                String siteKey = (owner == null ? "M|" : "I|") + key + '|' + line;
+                AdviceSite site = siteIndex.get(siteKey);
+                if (site != null) {
+                    return site;
+                }
+                site = newAdviceSite(className, owner, methodName, methodDesc, line, key, this);
+
+                List<AdviceSite> keySites = siteMap.get(key);
+                if (keySites == null) {
+                    keySites = new ArrayList<AdviceSite>();
+                    siteMap.put(key, keySites);
+                }
+                keySites.add(site);
+                siteIndex.put(siteKey, site);
+
+                List<AdviceListener> listeners = map.get(key);
+                if (listeners != null) {
+                    site.listeners = listeners.toArray(EMPTY_LISTENERS);
+                }
+                return site;
+            }
+        }
+
+        /**
+         * 把 key 对应的 listener 列表同步到所有相关的 site 上，调用者需要持有当前对象的锁
+         */
+        void publish(String key) {
+            List<AdviceSite> keySites = siteMap.get(key);
+            if (keySites == null) {
+                return;
+            }
+            List<AdviceListener> listeners = map.get(key);
+            AdviceListener[] array = listeners == null ? EMPTY_LISTENERS : listeners.toArray(EMPTY_LISTENERS);
+            for (AdviceSite site : keySites) {
+                site.listeners = array;
+            }
+        }
+    }
+
+    private static AdviceSite newAdviceSite(String className, String owner, String methodName, String methodDesc,
+            int line, String key, ClassLoaderAdviceListenerManager manager) {
+        synchronized (SITE_LOCK) {
+            AdviceSite[] current = sites;
+            int id;
+            if (!freeSiteIds.isEmpty()) {
+                id = freeSiteIds.remove(freeSiteIds.size() - 1);
+            } else {
+                if (siteCount == current.length) {
+                    current = Arrays.copyOf(current, current.length * 2);
+                }
+                id = siteCount++;
+            }
+            AdviceSite site = new AdviceSite(id, className, owner, methodName, methodDesc, line, key, manager);
+            current[id] = site;
+            // volatile write，发布新的 site
+            sites = current;
+            return site;
+        }
+    }
+
+    /**
+     * <pre>
+     * 释放已经被回收的 ClassLoader 的 site，site id 放回 freeSiteIds 里重新分配。
+     * ClassLoader 被回收说明它加载的类都已经卸载了，织入了这些 site id 的字节码不会再执行。
+     * </pre>
+     */
+    static void releaseCollectedSites() {
+        // 让 ClassLoader 已经被回收的 entry 尽快从 map 里去掉，它的 ClassLoaderAdviceListenerManager 才能被回收
+        adviceListenerMap.purgeStaleEntries();
+        synchronized (SITE_LOCK) {
+            AdviceSite[] current = sites;
+            int released = 0;
+            for (int i = 0; i < siteCount; i++) {
+                AdviceSite site = current[i];
+                if (site != null && site.manager.get() == null) {
+                    current[i] = null;
+                    freeSiteIds.add(i);
+                    released++;
+                }
+            }
+            if (released > 0) {
+                sites = current;
+                logger.debug("release {} advice sites of collected classloaders", released);
+            }
+        }
+    }
+
+    /**
+     * 按 site id 查找，site id 非法时返回 null
+     */
+    static AdviceSite adviceSite(int siteId) {
+        AdviceSite[] current = sites;
+        if (siteId < 0 || siteId >= current.length) {
+            return null;
+        }
+        return current[siteId];
     }
 
     public static void registerAdviceListener(ClassLoader classLoader, String className, String methodName,
             String methodDesc, AdviceListener listener) {
-        classLoader = wrap(classLoader);
         className = className.replace('/', '.');
 
-        ClassLoaderAdviceListenerManager manager = adviceListenerMap.get(classLoader);
-
-        if (manager == null) {
-            manager = new ClassLoaderAdviceListenerManager();
-            adviceListenerMap.put(classLoader, manager);
-        }
+        ClassLoaderAdviceListenerManager manager = loaderManager(classLoader);
         manager.registerAdviceListener(className, methodName, methodDesc, listener);
     }
 
@@ -199,16 +375,39 @@ public class AdviceListenerManager {
 
     public static void registerTraceAdviceListener(ClassLoader classLoader, String className, String owner,
             String methodName, String methodDesc, AdviceListener listener) {
-        classLoader = wrap(classLoader);
         className = className.replace('/', '.');
 
-        ClassLoaderAdviceListenerManager manager = adviceListenerMap.get(classLoader);
+        ClassLoaderAdviceListenerManager manager = loaderManager(classLoader);
+        manager.registerTraceAdviceListener(className, owner, methodName, methodDesc, listener);
+    }
+
+    /**
+     * 为 enter/exit/exception 插入点分配 site id
+     */
+    public static int registerAdviceSite(ClassLoader classLoader, String className, String methodName,
+            String methodDesc) {
+        return loaderManager(classLoader).registerAdviceSite(className, methodName, methodDesc).id;
+    }
+
+    /**
+     * 为 trace 的 invoke 插入点分配 site id
+     */
+    public static int registerTraceAdviceSite(ClassLoader classLoader, String className, String owner,
+            String methodName, String methodDesc, int line) {
+        return loaderManager(classLoader).registerTraceAdviceSite(className, owner, methodName, methodDesc, line).id;
+    }
 
+    private static ClassLoaderAdviceListenerManager loaderManager(ClassLoader classLoader) {
+        classLoader = wrap(classLoader);
+        ClassLoaderAdviceListenerManager manager = adviceListenerMap.get(classLoader);
         if (manager == null) {
             manager = new ClassLoaderAdviceListenerManager();
-            adviceListenerMap.put(classLoader, manager);
+            ClassLoaderAdviceListenerManager old = adviceListenerMap.putIfAbsent(classLoader, manager);
+            if (old != null) {
+                manager = old;
+            }
         }
-        manager.registerTraceAdviceListener(className, owner, methodName, methodDesc, listener);
+        return manager;
     }
 
     public static List<AdviceListener> queryTraceAdviceListeners(ClassLoader classLoader, String className,
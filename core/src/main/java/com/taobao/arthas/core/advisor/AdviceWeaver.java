@@ -35,6 +35,12 @@ public class AdviceWeaver {
 
         // 注册监听器
         advices.put(listener.id(), listener);
+
+        // 定时检查 listener 的开销是否超过 overhead-budget
+        OverheadGovernor governor = governor(listener);
+        if (governor != null) {
+            governor.start();
+        }
     }
 
     /**
@@ -49,9 +55,18 @@ public class AdviceWeaver {
 
             // 触发监听器销毁
             listener.destroy();
+
+            OverheadGovernor governor = governor(listener);
+            if (governor != null) {
+                governor.stop();
+            }
         }
     }
 
+    private static OverheadGovernor governor(AdviceListener listener) {
+        return listener instanceof AdviceListenerAdapter ? ((AdviceListenerAdapter) listener).getGovernor() : null;
+    }
+
     public static AdviceListener listener(long id) {
         return advices.get(id);
     }
@@ -0,0 +1,245 @@
+package com.taobao.arthas.core.advisor;
+
+import java.arthas.SpyAPI;
+import java.lang.ref.WeakReference;
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.Collections;
+import java.util.HashSet;
+import java.util.List;
+import java.util.Map;
+import java.util.Set;
+import java.util.WeakHashMap;
+
+import com.alibaba.arthas.deps.org.objectweb.asm.Type;
+import com.alibaba.arthas.deps.org.objectweb.asm.tree.AbstractInsnNode;
+import com.alibaba.arthas.deps.org.objectweb.asm.tree.ClassNode;
+import com.alibaba.arthas.deps.org.objectweb.asm.tree.MethodInsnNode;
+import com.alibaba.arthas.deps.org.objectweb.asm.tree.MethodNode;
+import com.taobao.arthas.core.util.matcher.Matcher;
+
+/**
+ * <pre>
+ * 被增强的类的字节码缓存，按 Class 弱引用保存（Class 同时确定了 ClassLoader），类被卸载之后自动清理。
+ *
+ * 每个类记录：
+ * 1. 原始的字节码，也就是 retransform 时 TransformerManager 收到的字节码
+ * 2. 每个 Enhancer 织入的结果。其它命令或者 reset 触发 retransform 时，同一个 Enhancer 收到同样的字节码，直接返回之前的结果，
+ *    不用再解析成 ClassNode 和织入
+ * 3. 当前字节码里每个方法的元数据：是否已经织入了 SpyAPI，调用了哪些函数。
+ *    新的 listener 要增强的方法都已经织入时，只需要注册到 AdviceListenerManager，不用 retransform
+ * 4. 当前的字节码是由哪些 Enhancer 织入的。这些 Enhancer 都还在 TransformerManager 里时，reset 之后字节码也不会变，不用 retransform
+ * </pre>
+ */
+class ClassBytecodeCache {
+
+    private static final String SPY_API = Type.getInternalName(SpyAPI.class);
+
+    private static final Map<Class<?>, ClassState> states = new WeakHashMap<Class<?>, ClassState>();
+
+    static ClassState get(Class<?> clazz) {
+        synchronized (states) {
+            return states.get(clazz);
+        }
+    }
+
+    static ClassState getOrCreate(Class<?> clazz, byte[] classfileBuffer) {
+        synchronized (states) {
+            ClassState state = states.get(clazz);
+            if (state == null) {
+                state = new ClassState(classfileBuffer);
+                states.put(clazz, state);
+            }
+            return state;
+        }
+    }
+
+    /**
+     * @return 当前被增强的类
+     */
+    static Set<Class<?>> enhancedClasses(Matcher<String> classNameMatcher) {
+        Set<Class<?>> classes = new HashSet<Class<?>>();
+        synchronized (states) {
+            for (Map.Entry<Class<?>, ClassState> entry : states.entrySet()) {
+                Class<?> clazz = entry.getKey();
+                if (clazz != null && entry.getValue().isEnhanced() && classNameMatcher.matching(clazz.getName())) {
+                    classes.add(clazz);
+                }
+            }
+        }
+        return classes;
+    }
+
+    /**
+     * TransformerManager 开始 transform 一个类，之后各个 Enhancer 会重新记录织入的结果
+     */
+    static void beginTransform(Class<?> clazz, byte[] classfileBuffer) {
+        ClassState state = get(clazz);
+        if (state != null) {
+            state.begin(classfileBuffer);
+        }
+    }
+
+    /**
+     * transform 结束，没有被任何 Enhancer 织入的类已经恢复成原始的字节码，不再缓存
+     */
+    static void endTransform(Class<?> clazz) {
+        synchronized (states) {
+            ClassState state = states.get(clazz);
+            if (state != null && !state.isEnhanced()) {
+                states.remove(clazz);
+            }
+        }
+    }
+
+    static class ClassState {
+        private byte[] original;
+        private final Map<Enhancer, Weave> weaves = new WeakHashMap<Enhancer, Weave>();
+        private List<MethodInfo> methods = Collections.emptyList();
+        private final List<WeakReference<Enhancer>> contributors = new ArrayList<WeakReference<Enhancer>>();
+
+        ClassState(byte[] original) {
+            this.original = original;
+        }
+
+        synchronized void begin(byte[] classfileBuffer) {
+            if (!Arrays.equals(original, classfileBuffer)) {
+                // 被其它 agent 修改过，之前的织入结果会因为输入不一样而失效
+                original = classfileBuffer;
+            }
+            methods = Collections.emptyList();
+            contributors.clear();
+        }
+
+        /**
+         * @return enhancer 之前对同样的字节码织入的结果，没有时返回 null
+         */
+        synchronized Weave cached(Enhancer enhancer, byte[] input, boolean fastDispatch) {
+            Weave weave = weaves.get(enhancer);
+            if (weave != null && weave.matches(input, fastDispatch)) {
+                return weave;
+            }
+            return null;
+        }
+
+        synchronized Weave woven(Enhancer enhancer, byte[] input, byte[] output, boolean fastDispatch,
+                List<MethodInfo> methods) {
+            // 第一个 Enhancer 的输入就是原始的字节码，共用一份
+            if (input != original && Arrays.equals(input, original)) {
+                input = original;
+            }
+            Weave weave = new Weave(input, output, fastDispatch, methods);
+            weaves.put(enhancer, weave);
+            record(enhancer, weave);
+            return weave;
+        }
+
+        /**
+         * 后面的 Enhancer 的输入是前面的输出，所以最后一个 Enhancer 的结果就是当前的字节码
+         */
+        synchronized void record(Enhancer enhancer, Weave weave) {
+            methods = weave.methods;
+            contributors.add(new WeakReference<Enhancer>(enhancer));
+        }
+
+        synchronized List<MethodInfo> methods() {
+            return methods;
+        }
+
+        synchronized boolean isEnhanced() {
+            return !contributors.isEmpty();
+        }
+
+        /**
+         * @return 织入当前字节码的 Enhancer 都还在 TransformerManager 里，retransform 之后字节码不会变
+         */
+        synchronized boolean isAllContributorsActive(TransformerManager transformerManager) {
+            for (WeakReference<Enhancer> reference : contributors) {
+                Enhancer enhancer = reference.get();
+                if (enhancer == null || !transformerManager.contains(enhancer)) {
+                    return false;
+                }
+            }
+            return true;
+        }
+    }
+
+    /**
+     * 一个 Enhancer 对一份字节码织入的结果
+     */
+    static class Weave {
+        final byte[] input;
+        final byte[] output;
+        final boolean fastDispatch;
+        final List<MethodInfo> methods;
+
+        Weave(byte[] input, byte[] output, boolean fastDispatch, List<MethodInfo> methods) {
+            this.input = input;
+            this.output = output;
+            this.fastDispatch = fastDispatch;
+            this.methods = methods;
+        }
+
+        boolean matches(byte[] classfileBuffer, boolean fastDispatch) {
+            return this.fastDispatch == fastDispatch && (classfileBuffer == input || Arrays.equals(classfileBuffer, input));
+        }
+    }
+
+    /**
+     * 织入之后的方法的元数据，不引用 ClassNode
+     */
+    static class MethodInfo {
+        final String name;
+        final String desc;
+        final int access;
+        /**
+         * 已经插入了 atEnter
+         */
+        final boolean woven;
+        /**
+         * 已经插入了 atBeforeInvoke，也就是被 trace 过
+         */
+        final boolean traced;
+        /**
+         * 方法里所有的 invoke 指令，owner/name/desc 三个一组
+         */
+        final String[] invokes;
+
+        MethodInfo(String name, String desc, int access, boolean woven, boolean traced, String[] invokes) {
+            this.name = name;
+            this.desc = desc;
+            this.access = access;
+            this.woven = woven;
+            this.traced = traced;
+            this.invokes = invokes;
+        }
+
+        static List<MethodInfo> of(ClassNode classNode) {
+            List<MethodInfo> methods = new ArrayList<MethodInfo>(classNode.methods.size());
+            for (MethodNode methodNode : classNode.methods) {
+                boolean woven = false;
+                boolean traced = false;
+                List<String> invokes = new ArrayList<String>();
+                for (AbstractInsnNode insnNode = methodNode.instructions.getFirst(); insnNode != null; insnNode = insnNode
+                        .getNext()) {
+                    if (insnNode instanceof MethodInsnNode) {
+                        MethodInsnNode methodInsnNode = (MethodInsnNode) insnNode;
+                        if (SPY_API.equals(methodInsnNode.owner)) {
+                            if ("atEnter".equals(methodInsnNode.name)) {
+                                woven = true;
+                            } else if ("atBeforeInvoke".equals(methodInsnNode.name)) {
+                                traced = true;
+                            }
+                        }
+                        invokes.add(methodInsnNode.owner);
+                        invokes.add(methodInsnNode.name);
+                        invokes.add(methodInsnNode.desc);
+                    }
+                }
+                methods.add(new MethodInfo(methodNode.name, methodNode.desc, methodNode.access, woven, traced,
+                        invokes.toArray(new String[invokes.size()])));
+            }
+            return methods;
+        }
+    }
+}
@@ -17,9 +17,13 @@ import java.util.Arrays;
 import java.util.HashSet;
 import java.util.Iterator;
 import java.util.List;
-import java.util.Map;
 import java.util.Set;
-import java.util.WeakHashMap;
+import java.util.concurrent.ExecutionException;
+import java.util.concurrent.ExecutorService;
+import java.util.concurrent.Executors;
+import java.util.concurrent.Future;
+import java.util.concurrent.ThreadFactory;
+import java.util.concurrent.atomic.AtomicInteger;
 
 import com.alibaba.arthas.deps.org.objectweb.asm.ClassReader;
 import com.alibaba.arthas.deps.org.objectweb.asm.Opcodes;
@@ -31,6 +35,9 @@ import com.alibaba.arthas.deps.org.objectweb.asm.tree.MethodNode;
 import com.alibaba.arthas.deps.org.slf4j.Logger;
 import com.alibaba.arthas.deps.org.slf4j.LoggerFactory;
 import com.taobao.arthas.bytekit.asm.MethodProcessor;
+import com.taobao.arthas.bytekit.asm.SiteIdAllocator;
+import com.taobao.arthas.bytekit.asm.binding.BindingContext;
+import com.taobao.arthas.bytekit.asm.binding.InvokeInfoBinding;
 import com.taobao.arthas.bytekit.asm.interceptor.InterceptorProcessor;
 import com.taobao.arthas.bytekit.asm.interceptor.parser.DefaultInterceptorClassParser;
 import com.taobao.arthas.bytekit.asm.location.Location;
@@ -46,6 +53,15 @@ import com.taobao.arthas.core.GlobalOptions;
 import com.taobao.arthas.core.advisor.SpyInterceptors.SpyInterceptor1;
 import com.taobao.arthas.core.advisor.SpyInterceptors.SpyInterceptor2;
 import com.taobao.arthas.core.advisor.SpyInterceptors.SpyInterceptor3;
+import com.taobao.arthas.core.advisor.SpyInterceptors.SpySiteInterceptor1;
+import com.taobao.arthas.core.advisor.SpyInterceptors.SpySiteInterceptor2;
+import com.taobao.arthas.core.advisor.SpyInterceptors.SpySiteInterceptor3;
+import com.taobao.arthas.core.advisor.SpyInterceptors.SpySiteTraceExcludeJDKInterceptor1;
+import com.taobao.arthas.core.advisor.SpyInterceptors.SpySiteTraceExcludeJDKInterceptor2;
+import com.taobao.arthas.core.advisor.SpyInterceptors.SpySiteTraceExcludeJDKInterceptor3;
+import com.taobao.arthas.core.advisor.SpyInterceptors.SpySiteTraceInterceptor1;
+import com.taobao.arthas.core.advisor.SpyInterceptors.SpySiteTraceInterceptor2;
+import com.taobao.arthas.core.advisor.SpyInterceptors.SpySiteTraceInterceptor3;
 import com.taobao.arthas.core.advisor.SpyInterceptors.SpyTraceExcludeJDKInterceptor1;
 import com.taobao.arthas.core.advisor.SpyInterceptors.SpyTraceExcludeJDKInterceptor2;
 import com.taobao.arthas.core.advisor.SpyInterceptors.SpyTraceExcludeJDKInterceptor3;
@@ -56,6 +72,7 @@ import com.taobao.arthas.core.server.ArthasBootstrap;
 import com.taobao.arthas.core.util.ArthasCheckUtils;
 import com.taobao.arthas.core.util.ClassUtils;
 import com.taobao.arthas.core.util.FileUtils;
+import com.taobao.arthas.core.util.InstrumentationUtils;
 import com.taobao.arthas.core.util.SearchUtils;
 import com.taobao.arthas.core.util.affect.EnhancerAffect;
 import com.taobao.arthas.core.util.matcher.Matcher;
@@ -75,15 +92,32 @@ public class Enhancer implements ClassFileTransformer {
     private final Matcher methodNameMatcher;
     private final EnhancerAffect affect;
     private Set<Class<?>> matchingClasses = null;
+    private volatile ProgressListener progressListener;
 
-    // 被增强的类的缓存
-    private final static Map<Class<?>/* Class */, Object> classBytesCache = new WeakHashMap<Class<?>, Object>();
     private static SpyImpl spyImpl = new SpyImpl();
 
+    /**
+     * bootstrap 里可能是之前的 arthas 加载的老版本 spy jar，没有按 site id 分发的函数，这时只能使用字符串的版本，
+     * 否则增强之后的代码会抛 NoSuchMethodError
+     */
+    private static final boolean SPY_SUPPORTS_SITE_ID = spySupportsSiteId();
+
     static {
         SpyAPI.setSpy(spyImpl);
     }
 
+    static boolean spySupportsSiteId() {
+        try {
+            SpyAPI.class.getMethod("atEnter", Class.class, int.class, Object.class, Object[].class);
+            SpyAPI.class.getMethod("atInvokeException", Class.class, int.class, Object.class, Throwable.class);
+            return true;
+        } catch (NoSuchMethodException e) {
+            logger.warn("SpyAPI loaded by the bootstrap classloader does not support site id dispatch, "
+                    + "fall back to method info dispatch. Please restart the JVM to use the new spy jar.");
+            return false;
+        }
+    }
+
     /**
      * @param adviceId          通知编号
      * @param isTracing         可跟踪方法调用
@@ -124,6 +158,21 @@ public class Enhancer implements ClassFileTransformer {
                 return null;
             }
 
+            final boolean fastDispatch = GlobalOptions.isFastDispatch && SPY_SUPPORTS_SITE_ID;
+
+            // 同样的字节码之前已经织入过，比如其它命令或者 reset 触发的 retransform，直接返回之前的结果，listener 也已经注册过了
+            ClassBytecodeCache.ClassState classState = classBeingRedefined == null ? null
+                    : ClassBytecodeCache.getOrCreate(classBeingRedefined, classfileBuffer);
+            if (classState != null) {
+                ClassBytecodeCache.Weave weave = classState.cached(this, classfileBuffer, fastDispatch);
+                if (weave != null) {
+                    classState.record(this, weave);
+                    affect.cCnt(1);
+                    return weave.output;
+                }
+            }
+
+            long analyzeStart = System.nanoTime();
             //keep origin class reader for bytecode optimizations, avoiding JVM metaspace OOM.
             ClassNode classNode = new ClassNode(Opcodes.ASM9);
             ClassReader classReader = AsmUtils.toClassNode(classfileBuffer, classNode);
@@ -135,12 +184,28 @@ public class Enhancer implements ClassFileTransformer {
 
             final List<InterceptorProcessor> interceptorProcessors = new ArrayList<InterceptorProcessor>();
 
-            interceptorProcessors.addAll(defaultInterceptorClassParser.parse(SpyInterceptor1.class));
-            interceptorProcessors.addAll(defaultInterceptorClassParser.parse(SpyInterceptor2.class));
-            interceptorProcessors.addAll(defaultInterceptorClassParser.parse(SpyInterceptor3.class));
+            if (fastDispatch) {
+                interceptorProcessors.addAll(defaultInterceptorClassParser.parse(SpySiteInterceptor1.class));
+                interceptorProcessors.addAll(defaultInterceptorClassParser.parse(SpySiteInterceptor2.class));
+                interceptorProcessors.addAll(defaultInterceptorClassParser.parse(SpySiteInterceptor3.class));
+            } else {
+                interceptorProcessors.addAll(defaultInterceptorClassParser.parse(SpyInterceptor1.class));
+                interceptorProcessors.addAll(defaultInterceptorClassParser.parse(SpyInterceptor2.class));
+                interceptorProcessors.addAll(defaultInterceptorClassParser.parse(SpyInterceptor3.class));
+            }
 
             if (this.isTracing) {
-                if (this.skipJDKTrace == false) {
+                if (fastDispatch) {
+                    if (this.skipJDKTrace == false) {
+                        interceptorProcessors.addAll(defaultInterceptorClassParser.parse(SpySiteTraceInterceptor1.class));
+                        interceptorProcessors.addAll(defaultInterceptorClassParser.parse(SpySiteTraceInterceptor2.class));
+                        interceptorProcessors.addAll(defaultInterceptorClassParser.parse(SpySiteTraceInterceptor3.class));
+                    } else {
+                        interceptorProcessors.addAll(defaultInterceptorClassParser.parse(SpySiteTraceExcludeJDKInterceptor1.class));
+                        interceptorProcessors.addAll(defaultInterceptorClassParser.parse(SpySiteTraceExcludeJDKInterceptor2.class));
+                        interceptorProcessors.addAll(defaultInterceptorClassParser.parse(SpySiteTraceExcludeJDKInterceptor3.class));
+                    }
+                } else if (this.skipJDKTrace == false) {
                     interceptorProcessors.addAll(defaultInterceptorClassParser.parse(SpyTraceInterceptor1.class));
                     interceptorProcessors.addAll(defaultInterceptorClassParser.parse(SpyTraceInterceptor2.class));
                     interceptorProcessors.addAll(defaultInterceptorClassParser.parse(SpyTraceInterceptor3.class));
@@ -151,6 +216,9 @@ public class Enhancer implements ClassFileTransformer {
                 }
             }
 
+            final SiteIdAllocator siteIdAllocator = fastDispatch ? new AdviceSiteIdAllocator(inClassLoader, className)
+                    : null;
+
             List<MethodNode> matchedMethods = new ArrayList<MethodNode>();
             for (MethodNode methodNode : classNode.methods) {
                 if (!isIgnore(methodNode, methodNameMatcher)) {
@@ -158,6 +226,9 @@ public class Enhancer implements ClassFileTransformer {
                 }
             }
 
+            long weaveStart = System.nanoTime();
+            affect.addAnalyzeCost(weaveStart - analyzeStart);
+
             // 用于检查是否已插入了 spy函数，如果已有则不重复处理
             GroupLocationFilter groupLocationFilter = new GroupLocationFilter();
 
@@ -204,6 +275,7 @@ public class Enhancer implements ClassFileTransformer {
                     }
                 }else {
                     MethodProcessor methodProcessor = new MethodProcessor(classNode, methodNode, groupLocationFilter);
+                    methodProcessor.setSiteIdAllocator(siteIdAllocator);
                     for (InterceptorProcessor interceptor : interceptorProcessors) {
                         try {
                             List<Location> locations = interceptor.process(methodProcessor);
@@ -235,9 +307,13 @@ public class Enhancer implements ClassFileTransformer {
             }
 
             byte[] enhanceClassByteArray = AsmUtils.toBytes(classNode, inClassLoader, classReader);
+            affect.addWeaveCost(System.nanoTime() - weaveStart);
 
-            // 增强成功，记录类
-            classBytesCache.put(classBeingRedefined, new Object());
+            // 增强成功，记录织入的结果和方法的元数据
+            if (classState != null) {
+                classState.woven(this, classfileBuffer, enhanceClassByteArray, fastDispatch,
+                        ClassBytecodeCache.MethodInfo.of(classNode));
+            }
 
             // dump the class
             dumpClassIfNecessary(className, enhanceClassByteArray, affect);
@@ -254,6 +330,32 @@ public class Enhancer implements ClassFileTransformer {
         return null;
     }
 
+    /**
+     * 为插入点分配 site id，并登记到 AdviceListenerManager 里，运行时 SpyImpl 按 id 直接取 listener
+     */
+    private static class AdviceSiteIdAllocator implements SiteIdAllocator {
+        private final ClassLoader classLoader;
+        private final String className;
+
+        AdviceSiteIdAllocator(ClassLoader classLoader, String className) {
+            this.classLoader = classLoader;
+            this.className = className;
+        }
+
+        @Override
+        public int allocate(BindingContext bindingContext) {
+            Location location = bindingContext.getLocation();
+            if (location instanceof MethodInsnNodeWare) {
+                MethodInsnNode methodInsnNode = ((MethodInsnNodeWare) location).methodInsnNode();
+                return AdviceListenerManager.registerTraceAdviceSite(classLoader, className, methodInsnNode.owner,
+                        methodInsnNode.name, methodInsnNode.desc,
+                        InvokeInfoBinding.lineNumber(location, methodInsnNode));
+            }
+            MethodNode methodNode = bindingContext.getMethodProcessor().getMethodNode();
+            return AdviceListenerManager.registerAdviceSite(classLoader, className, methodNode.name, methodNode.desc);
+        }
+    }
+
     /**
      * 是否抽象属性
      */
@@ -269,6 +371,11 @@ public class Enhancer implements ClassFileTransformer {
                 || ArthasCheckUtils.isEquals(methodNode.name, "<clinit>");
     }
 
+    private boolean isIgnore(ClassBytecodeCache.MethodInfo methodInfo, Matcher methodNameMatcher) {
+        return isAbstract(methodInfo.access) || !methodNameMatcher.matching(methodInfo.name)
+                || ArthasCheckUtils.isEquals(methodInfo.name, "<clinit>");
+    }
+
     /**
      * dump class to file
      */
@@ -348,6 +455,7 @@ public class Enhancer implements ClassFileTransformer {
      * @throws UnmodifiableClassException 增强失败
      */
     public synchronized EnhancerAffect enhance(final Instrumentation inst) throws UnmodifiableClassException {
+        long searchStart = System.nanoTime();
         // 获取需要增强的类集合
         this.matchingClasses = GlobalOptions.isDisableSubClass
                 ? SearchUtils.searchClass(inst, classNameMatcher)
@@ -355,6 +463,7 @@ public class Enhancer implements ClassFileTransformer {
 
         // 过滤掉无法被增强的类
         filter(matchingClasses);
+        affect.addSearchCost(System.nanoTime() - searchStart);
 
         logger.info("enhance matched classes: {}", matchingClasses);
 
@@ -363,18 +472,35 @@ public class Enhancer implements ClassFileTransformer {
         try {
             ArthasBootstrap.getInstance().getTransformerManager().addTransformer(this, isTracing);
 
+            // 要增强的方法都已经织入过的类，只需要注册 listener，不用 retransform
+            final Set<Class<?>> retransformClasses = new HashSet<Class<?>>();
+            for (Class<?> clazz : matchingClasses) {
+                if (!attach(clazz)) {
+                    retransformClasses.add(clazz);
+                }
+            }
+            if (affect.getAttachedClasses() > 0) {
+                logger.info("attach listener to {} woven classes without retransform", affect.getAttachedClasses());
+            }
+
+            long retransformStart = System.nanoTime();
             // 批量增强
             if (GlobalOptions.isBatchReTransform) {
-                final int size = matchingClasses.size();
+                final int size = retransformClasses.size();
                 final Class<?>[] classArray = new Class<?>[size];
-                arraycopy(matchingClasses.toArray(), 0, classArray, 0, size);
-                if (classArray.length > 0) {
+                arraycopy(retransformClasses.toArray(), 0, classArray, 0, size);
+                int threads = Math.min(GlobalOptions.retransformThreads, size / RetransformBatcher.MIN_BATCH_SIZE);
+                if (threads > 1) {
+                    parallelRetransform(inst, classArray, threads);
+                } else if (classArray.length > 0) {
+                    affect.setRetransformBatches(1);
+                    affect.setRetransformThreads(1);
                     inst.retransformClasses(classArray);
                     logger.info("Success to batch transform classes: " + Arrays.toString(classArray));
                 }
             } else {
                 // for each 增强
-                for (Class<?> clazz : matchingClasses) {
+                for (Class<?> clazz : retransformClasses) {
                     try {
                         inst.retransformClasses(clazz);
                         logger.info("Success to transform class: " + clazz);
@@ -390,14 +516,158 @@ public class Enhancer implements ClassFileTransformer {
                     }
                 }
             }
+            affect.addRetransformCost(System.nanoTime() - retransformStart);
         } catch (Throwable e) {
             logger.error("Enhancer error, matchingClasses: {}", matchingClasses, e);
             affect.setThrowable(e);
+        } finally {
+            InstrumentationUtils.markClassesModified();
         }
 
         return affect;
     }
 
+    /**
+     * <pre>
+     * 类里所有要增强的方法在当前的字节码里都已经织入了 SpyAPI 时，只把 listener 注册到 AdviceListenerManager。
+     * trace 时还要求方法里已经插入了 atBeforeInvoke，和 transform 里处理已经 trace 过的方法一样，注册所有的 invoke 。
+     * 之后这个类再被 retransform 时，当前的 Enhancer 已经在 TransformerManager 里，会正常织入。
+     * </pre>
+     *
+     * @return 是否已经注册，返回 false 时需要 retransform
+     */
+    private boolean attach(Class<?> clazz) {
+        ClassBytecodeCache.ClassState classState = ClassBytecodeCache.get(clazz);
+        if (classState == null || !classState.isEnhanced()) {
+            return false;
+        }
+        List<ClassBytecodeCache.MethodInfo> matchedMethods = new ArrayList<ClassBytecodeCache.MethodInfo>();
+        for (ClassBytecodeCache.MethodInfo methodInfo : classState.methods()) {
+            if (isIgnore(methodInfo, methodNameMatcher)) {
+                continue;
+            }
+            if (!methodInfo.woven || (isTracing && !methodInfo.traced)) {
+                return false;
+            }
+            matchedMethods.add(methodInfo);
+        }
+        if (matchedMethods.isEmpty()) {
+            return false;
+        }
+
+        ClassLoader classLoader = clazz.getClassLoader();
+        String className = clazz.getName();
+        for (ClassBytecodeCache.MethodInfo methodInfo : matchedMethods) {
+            if (isTracing) {
+                String[] invokes = methodInfo.invokes;
+                for (int i = 0; i < invokes.length; i += 3) {
+                    String owner = invokes[i];
+                    if (this.skipJDKTrace && owner.startsWith("java/")) {
+                        continue;
+                    }
+                    // 原始类型的box类型相关的都跳过
+                    if (AsmOpUtils.isBoxType(Type.getObjectType(owner))) {
+                        continue;
+                    }
+                    AdviceListenerManager.registerTraceAdviceListener(classLoader, className, owner, invokes[i + 1],
+                            invokes[i + 2], listener);
+                }
+            }
+            AdviceListenerManager.registerAdviceListener(classLoader, className, methodInfo.name, methodInfo.desc,
+                    listener);
+            affect.addMethodAndCount(classLoader, className, methodInfo.name, methodInfo.desc);
+        }
+        affect.cCnt(1);
+        affect.addAttachedClass();
+        return true;
+    }
+
+    /**
+     * <pre>
+     * 把类分成多批，在多个线程里同时 retransform。
+     * jvm 在调用 retransformClasses 的线程里回调 transform，所以字节码的分析和织入是并行的，
+     * 真正替换类的 VM operation 仍然由 jvm 串行执行。
+     * 每批的大小按已经完成的批次里每个类的平均耗时调整，让每批的耗时差不多。
+     * </pre>
+     */
+    private void parallelRetransform(final Instrumentation inst, Class<?>[] classArray, int threads)
+            throws Throwable {
+        final RetransformBatcher batcher = new RetransformBatcher(classArray);
+        affect.setRetransformThreads(threads);
+
+        final AtomicInteger threadIndex = new AtomicInteger();
+        ExecutorService executorService = Executors.newFixedThreadPool(threads, new ThreadFactory() {
+            @Override
+            public Thread newThread(Runnable r) {
+                Thread t = new Thread(r, "arthas-enhance-" + threadIndex.incrementAndGet());
+                t.setDaemon(true);
+                return t;
+            }
+        });
+        try {
+            List<Future<?>> futures = new ArrayList<Future<?>>(threads);
+            for (int i = 0; i < threads; ++i) {
+                futures.add(executorService.submit(new Runnable() {
+                    @Override
+                    public void run() {
+                        List<Class<?>> batch;
+                        while ((batch = batcher.nextBatch()) != null) {
+                            long start = System.nanoTime();
+                            retransformBatch(inst, batch);
+                            batcher.finish(batch.size(), System.nanoTime() - start);
+                            if (progressListener != null) {
+                                progressListener.progress(batcher.finished(), batcher.total());
+                            }
+                        }
+                    }
+                }));
+            }
+            for (Future<?> future : futures) {
+                try {
+                    future.get();
+                } catch (ExecutionException e) {
+                    throw e.getCause();
+                }
+            }
+        } finally {
+            executorService.shutdownNow();
+        }
+        affect.setRetransformBatches(batcher.batches());
+        logger.info("Success to batch transform {} classes in {} batches with {} threads.", classArray.length,
+                batcher.batches(), threads);
+    }
+
+    /**
+     * 一批类 retransform 失败时，逐个重试，找出失败的类
+     */
+    private void retransformBatch(Instrumentation inst, List<Class<?>> batch) {
+        try {
+            inst.retransformClasses(batch.toArray(new Class<?>[batch.size()]));
+            return;
+        } catch (Throwable t) {
+            logger.warn("batch retransform failed, retry one by one, classes: {}", batch, t);
+        }
+        for (Class<?> clazz : batch) {
+            try {
+                inst.retransformClasses(clazz);
+            } catch (Throwable t) {
+                logger.warn("retransform {} failed.", clazz, t);
+                affect.setThrowable(t);
+            }
+        }
+    }
+
+    public void setProgressListener(ProgressListener progressListener) {
+        this.progressListener = progressListener;
+    }
+
+    /**
+     * 并发 retransform 时的进度回调
+     */
+    public interface ProgressListener {
+        void progress(int finished, int total);
+    }
+
     /**
      * 重置指定的Class
      *
@@ -412,10 +682,15 @@ public class Enhancer implements ClassFileTransformer {
         final EnhancerAffect affect = new EnhancerAffect();
         final Set<Class<?>> enhanceClassSet = new HashSet<Class<?>>();
 
-        for (Class<?> classInCache : classBytesCache.keySet()) {
-            if (classNameMatcher.matching(classInCache.getName())) {
-                enhanceClassSet.add(classInCache);
+        // 织入当前字节码的 Enhancer 都还有效时，retransform 之后字节码还是一样的，跳过这些类
+        TransformerManager transformerManager = ArthasBootstrap.getInstance().getTransformerManager();
+        for (Class<?> enhancedClass : ClassBytecodeCache.enhancedClasses(classNameMatcher)) {
+            ClassBytecodeCache.ClassState classState = ClassBytecodeCache.get(enhancedClass);
+            if (classState != null && transformerManager != null
+                    && classState.isAllContributorsActive(transformerManager)) {
+                continue;
             }
+            enhanceClassSet.add(enhancedClass);
         }
 
         final ClassFileTransformer resetClassFileTransformer = new ClassFileTransformer() {
@@ -430,10 +705,8 @@ public class Enhancer implements ClassFileTransformer {
             enhance(inst, resetClassFileTransformer, enhanceClassSet);
             logger.info("Success to reset classes: " + enhanceClassSet);
         } finally {
-            for (Class<?> resetClass : enhanceClassSet) {
-                classBytesCache.remove(resetClass);
-                affect.cCnt(1);
-            }
+            InstrumentationUtils.markClassesModified();
+            affect.cCnt(enhanceClassSet.size());
         }
 
         return affect;
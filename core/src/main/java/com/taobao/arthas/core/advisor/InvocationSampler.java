@@ -0,0 +1,295 @@
+package com.taobao.arthas.core.advisor;
+
+import java.util.concurrent.ConcurrentLinkedQueue;
+import java.util.concurrent.TimeUnit;
+import java.util.concurrent.atomic.AtomicLong;
+import java.util.concurrent.atomic.AtomicReference;
+import java.util.concurrent.atomic.AtomicReferenceArray;
+
+import com.taobao.arthas.core.command.model.ResultModel;
+import com.taobao.arthas.core.server.ArthasBootstrap;
+import com.taobao.arthas.core.shell.command.CommandProcess;
+import com.taobao.arthas.core.util.metrics.StripedCounter;
+import com.taobao.arthas.core.util.scheduler.ScheduledTask;
+import com.taobao.arthas.core.util.scheduler.TaskPriority;
+
+/**
+ * <pre>
+ * watch/trace/tt 的采样器，在方法入口处（构造 Advice 之前）决定本次调用是否需要被记录。
+ *
+ * 1. sample-rate: 按概率采样
+ * 2. max-per-second: 每秒最多记录多少次
+ * 3. reservoir: 蓄水池采样，每秒从所有调用里均匀地挑出 N 次，在下一秒开始的时候输出。
+ *    业务线程跨过一秒时只把当前的蓄水池换下来，输出都在定时器里做，方法不再被调用时上一秒的结果也能及时输出
+ *
+ * 嵌套的调用（比如递归，或者 trace 多个方法时）沿用最外层调用的结果，保证 before/after 成对。
+ * </pre>
+ */
+public class InvocationSampler {
+
+    static final int DROPPED = -1;
+
+    private static final long WINDOW_MILLIS = 1000;
+
+    private static final long TICK_MILLIS = 100;
+
+    private final CommandProcess process;
+    private final double sampleRate;
+    private final int maxPerSecond;
+    private final int reservoirSize;
+
+    private final StripedCounter total = new StripedCounter();
+    private final StripedCounter dropped = new StripedCounter();
+
+    private final AtomicLong windowStart = new AtomicLong(System.currentTimeMillis());
+    private final AtomicLong windowCount = new AtomicLong();
+    private final AtomicReference<AtomicReferenceArray<ResultModel>> reservoir;
+    /**
+     * 已经结束、等待定时器输出的窗口
+     */
+    private final ConcurrentLinkedQueue<AtomicReferenceArray<ResultModel>> finishedWindows =
+            new ConcurrentLinkedQueue<AtomicReferenceArray<ResultModel>>();
+
+    private ScheduledTask ticker;
+
+    private final ThreadLocal<DecisionStack> decisions = new ThreadLocal<DecisionStack>() {
+        @Override
+        protected DecisionStack initialValue() {
+            return new DecisionStack(1024);
+        }
+    };
+
+    public InvocationSampler(CommandProcess process, double sampleRate, int maxPerSecond, int reservoirSize) {
+        this.process = process;
+        this.sampleRate = sampleRate;
+        this.maxPerSecond = maxPerSecond;
+        this.reservoirSize = reservoirSize;
+        this.reservoir = reservoirSize > 0 ? new AtomicReference<AtomicReferenceArray<ResultModel>>(
+                new AtomicReferenceArray<ResultModel>(reservoirSize)) : null;
+    }
+
+    public static boolean isEnabled(double sampleRate, int maxPerSecond, int reservoirSize) {
+        return sampleRate < 1 || maxPerSecond > 0 || reservoirSize > 0;
+    }
+
+    /**
+     * 蓄水池模式下启动定时器推进窗口，命令结束时需要调用 stop
+     */
+    public synchronized void start() {
+        if (reservoir != null && ticker == null) {
+            ticker = ArthasBootstrap.getInstance().getCommandScheduler().scheduleAtFixedRate(
+                    process.session().getSessionId(), TaskPriority.PERIODIC, new Runnable() {
+                        @Override
+                        public void run() {
+                            tick();
+                        }
+                    }, TICK_MILLIS, TICK_MILLIS, TimeUnit.MILLISECONDS);
+        }
+    }
+
+    public synchronized void stop() {
+        if (ticker != null) {
+            ticker.cancel();
+            ticker = null;
+        }
+    }
+
+    /**
+     * 定时器回调，窗口结束时换下蓄水池，输出所有已经结束的窗口
+     */
+    void tick() {
+        rollWindow();
+        AtomicReferenceArray<ResultModel> window;
+        while ((window = finishedWindows.poll()) != null) {
+            flush(window);
+        }
+    }
+
+    /**
+     * 方法入口调用
+     *
+     * @return true 如果这次调用需要被记录
+     */
+    boolean enter() {
+        DecisionStack stack = decisions.get();
+        int decision = stack.isEmpty() ? decide(stack) : stack.peek();
+        stack.push(decision);
+        return decision != DROPPED;
+    }
+
+    /**
+     * 方法出口调用，和 enter 成对
+     */
+    void exit() {
+        decisions.get().pop();
+    }
+
+    /**
+     * 当前线程正在执行的调用是否被记录
+     */
+    public boolean isSampled() {
+        DecisionStack stack = decisions.get();
+        return !stack.isEmpty() && stack.peek() != DROPPED;
+    }
+
+    /**
+     * 输出结果，蓄水池模式下先放到当前调用对应的槽里
+     */
+    public void appendResult(ResultModel model) {
+        if (reservoir == null) {
+            process.appendResult(model);
+            return;
+        }
+        DecisionStack stack = decisions.get();
+        int slot = stack.isEmpty() ? DROPPED : stack.peek();
+        if (slot >= 0) {
+            reservoir.get().set(slot, model);
+        }
+    }
+
+    /**
+     * 输出蓄水池里还没有输出的结果，包括当前的窗口，命令结束的时候调用
+     */
+    public void flush() {
+        if (reservoir == null) {
+            return;
+        }
+        AtomicReferenceArray<ResultModel> window;
+        while ((window = finishedWindows.poll()) != null) {
+            flush(window);
+        }
+        flush(reservoir.get());
+    }
+
+    private void flush(AtomicReferenceArray<ResultModel> window) {
+        for (int i = 0; i < window.length(); ++i) {
+            ResultModel model = window.getAndSet(i, null);
+            if (model != null) {
+                process.appendResult(model);
+            }
+        }
+    }
+
+    public boolean isReservoir() {
+        return reservoir != null;
+    }
+
+    public long getTotalCount() {
+        return total.sum();
+    }
+
+    public long getDroppedCount() {
+        return dropped.sum();
+    }
+
+    public long getSampledCount() {
+        return total.sum() - dropped.sum();
+    }
+
+    public String summary() {
+        long totalCount = getTotalCount();
+        long droppedCount = getDroppedCount();
+        return "Sampling summary: total invocations: " + totalCount + ", sampled: " + (totalCount - droppedCount)
+                + ", dropped: " + droppedCount + ".";
+    }
+
+    private int decide(DecisionStack stack) {
+        total.increment();
+        if (sampleRate < 1 && stack.nextDouble() >= sampleRate) {
+            dropped.increment();
+            return DROPPED;
+        }
+        if (maxPerSecond <= 0 && reservoirSize <= 0) {
+            return 0;
+        }
+
+        rollWindow();
+        long count = windowCount.incrementAndGet();
+        if (reservoirSize > 0) {
+            // Algorithm R: 第 count 个调用以 reservoirSize/count 的概率替换掉蓄水池里的一个
+            if (count <= reservoirSize) {
+                return (int) (count - 1);
+            }
+            long index = stack.nextLong(count);
+            if (index < reservoirSize) {
+                return (int) index;
+            }
+        } else if (count <= maxPerSecond) {
+            return 0;
+        }
+        dropped.increment();
+        return DROPPED;
+    }
+
+    private void rollWindow() {
+        long now = System.currentTimeMillis();
+        long start = windowStart.get();
+        if (now - start >= WINDOW_MILLIS && windowStart.compareAndSet(start, now)) {
+            // 业务线程上也会走到这里，只换下蓄水池，由定时器输出
+            if (reservoir != null) {
+                finishedWindows.offer(reservoir.getAndSet(new AtomicReferenceArray<ResultModel>(reservoirSize)));
+            }
+            windowCount.set(0);
+        }
+    }
+
+    /**
+     * 和 ThreadLocalWatch 里的 LongStack 一样是固定大小的，顺便保存每个线程的随机数种子
+     */
+    static class DecisionStack {
+        private final int[] array;
+        private int pos = 0;
+        private long seed;
+
+        DecisionStack(int maxSize) {
+            array = new int[maxSize];
+            seed = System.nanoTime() ^ Thread.currentThread().getId() * 0x9E3779B97F4A7C15L;
+            if (seed == 0) {
+                seed = 1;
+            }
+        }
+
+        boolean isEmpty() {
+            return pos == 0;
+        }
+
+        void push(int value) {
+            if (pos < array.length) {
+                array[pos++] = value;
+            } else {
+                // 栈满的时候不再记录，保持和外层一致
+                pos++;
+            }
+        }
+
+        int peek() {
+            return pos <= array.length ? array[pos - 1] : array[array.length - 1];
+        }
+
+        void pop() {
+            if (pos > 0) {
+                pos--;
+            }
+        }
+
+        /**
+         * xorshift64
+         */
+        long nextRandom() {
+            long x = seed;
+            x ^= x << 13;
+            x ^= x >>> 7;
+            x ^= x << 17;
+            seed = x;
+            return x;
+        }
+
+        double nextDouble() {
+            return (nextRandom() >>> 11) * 0x1.0p-53;
+        }
+
+        long nextLong(long bound) {
+            return (nextRandom() >>> 1) % bound;
+        }
+    }
+}
@@ -0,0 +1,460 @@
+package com.taobao.arthas.core.advisor;
+
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.List;
+import java.util.concurrent.ConcurrentHashMap;
+import java.util.concurrent.ConcurrentMap;
+import java.util.concurrent.TimeUnit;
+
+import com.alibaba.arthas.deps.org.slf4j.Logger;
+import com.alibaba.arthas.deps.org.slf4j.LoggerFactory;
+import com.taobao.arthas.core.GlobalOptions;
+import com.taobao.arthas.core.command.model.MessageModel;
+import com.taobao.arthas.core.server.ArthasBootstrap;
+import com.taobao.arthas.core.shell.command.CommandProcess;
+import com.taobao.arthas.core.util.metrics.StripedCounter;
+import com.taobao.arthas.core.util.metrics.SumRateCounter;
+import com.taobao.arthas.core.util.scheduler.ScheduledTask;
+import com.taobao.arthas.core.util.scheduler.TaskPriority;
+
+/**
+ * <pre>
+ * 统计 AdviceListener 自身的开销，并且按照 overhead-budget 自动降级。
+ *
+ * 1. 每次回调记录 listener 内部的耗时(self)，方法出口记录方法的耗时(wall，包含 listener 的耗时)
+ * 2. 每秒用 SumRateCounter 计算最近几秒 self/wall 的比例，也就是 listener 占用业务线程时间的比例
+ * 3. 超过 budget 时按比例降低采样率，采样率降到 1% 仍然超过时暂停 listener，并且通知用户
+ * 4. 低于 budget 的一半时，逐步恢复采样率；暂停之后修改 overhead-budget 会从 1% 重新开始
+ *
+ * 和 InvocationSampler 一样，嵌套的调用沿用最外层调用的结果，保证 before/after 成对。
+ * </pre>
+ */
+public class OverheadGovernor {
+    private static final Logger logger = LoggerFactory.getLogger(OverheadGovernor.class);
+
+    static final double MIN_SAMPLE_RATE = 0.01;
+    /**
+     * 降低采样率时留一些余量，避免在 budget 附近来回调整
+     */
+    private static final double HEADROOM = 0.8;
+    /**
+     * 调整采样率之后，至少统计这么多秒再做下一次调整
+     */
+    private static final int MIN_SAMPLES = 2;
+    private static final long TICK_MILLIS = 1000;
+    private static final int STRIPES = Math.min(8, Runtime.getRuntime().availableProcessors());
+    private static final int MAX_STACK_DEPTH = 1024;
+
+    private final CommandProcess process;
+
+    private final ConcurrentMap<Class<?>, ConcurrentMap<String, MethodOverhead>> methods = new ConcurrentHashMap<Class<?>, ConcurrentMap<String, MethodOverhead>>();
+    private final StripedCounter selfNanos = new StripedCounter(STRIPES);
+    /**
+     * 只统计最外层调用的耗时，递归调用不重复计算
+     */
+    private final StripedCounter wallNanos = new StripedCounter(STRIPES);
+
+    private final ThreadLocal<CallStack> callStacks = new ThreadLocal<CallStack>() {
+        @Override
+        protected CallStack initialValue() {
+            return new CallStack(MAX_STACK_DEPTH);
+        }
+    };
+
+    private volatile double sampleRate = 1;
+    private volatile boolean suspended;
+    private volatile double overhead;
+    private volatile boolean adjusted;
+
+    /**
+     * 下面的字段只在 tick 里访问
+     */
+    private SumRateCounter selfRate;
+    private SumRateCounter wallRate;
+    private double suspendedBudget;
+
+    private ScheduledTask task;
+
+    public OverheadGovernor(CommandProcess process) {
+        this.process = process;
+        resetRate();
+    }
+
+    /**
+     * 方法入口调用
+     *
+     * @return true 如果这次调用需要交给 listener 处理
+     */
+    boolean enter(Class<?> clazz, String methodName, long startNanos) {
+        CallStack stack = callStacks.get();
+        boolean admitted = stack.isEmpty() ? admit(stack) : stack.peekAdmitted();
+        stack.push(startNanos, admitted, methodOverhead(clazz, methodName));
+        return admitted;
+    }
+
+    /**
+     * 当前线程正在执行的调用是否交给 listener 处理
+     */
+    public boolean isAdmitted() {
+        CallStack stack = callStacks.get();
+        return !stack.isEmpty() && stack.peekAdmitted();
+    }
+
+    /**
+     * 记录从 startNanos 到现在 listener 的耗时，算在当前线程正在执行的方法上
+     */
+    public void addSelfTime(long startNanos) {
+        long self = System.nanoTime() - startNanos;
+        CallStack stack = callStacks.get();
+        if (!stack.isEmpty()) {
+            MethodOverhead method = stack.peekMethod();
+            if (method != null) {
+                method.selfNanos.add(self);
+            }
+        }
+        selfNanos.add(self);
+    }
+
+    /**
+     * 方法出口调用，和 enter 成对
+     */
+    void exit(long startNanos) {
+        long now = System.nanoTime();
+        long self = now - startNanos;
+        selfNanos.add(self);
+        CallStack stack = callStacks.get();
+        if (stack.isEmpty()) {
+            return;
+        }
+        // 栈满的时候没有记录这一帧
+        MethodOverhead method = stack.peekMethod();
+        long enterNanos = stack.pop();
+        if (method == null) {
+            return;
+        }
+        method.calls.increment();
+        method.selfNanos.add(self);
+        method.wallNanos.add(now - enterNanos);
+        if (stack.isEmpty()) {
+            wallNanos.add(now - enterNanos);
+        }
+    }
+
+    private boolean admit(CallStack stack) {
+        if (suspended) {
+            return false;
+        }
+        double rate = sampleRate;
+        return rate >= 1 || stack.nextDouble() < rate;
+    }
+
+    private MethodOverhead methodOverhead(Class<?> clazz, String methodName) {
+        ConcurrentMap<String, MethodOverhead> classMethods = methods.get(clazz);
+        if (classMethods == null) {
+            ConcurrentMap<String, MethodOverhead> newMethods = new ConcurrentHashMap<String, MethodOverhead>();
+            classMethods = methods.putIfAbsent(clazz, newMethods);
+            if (classMethods == null) {
+                classMethods = newMethods;
+            }
+        }
+        MethodOverhead method = classMethods.get(methodName);
+        if (method == null) {
+            MethodOverhead newMethod = new MethodOverhead(clazz.getName() + "." + methodName);
+            method = classMethods.putIfAbsent(methodName, newMethod);
+            if (method == null) {
+                method = newMethod;
+            }
+        }
+        return method;
+    }
+
+    public synchronized void start() {
+        if (task != null) {
+            return;
+        }
+        String sessionId = process == null ? null : process.session().getSessionId();
+        task = ArthasBootstrap.getInstance().getCommandScheduler().scheduleAtFixedRate(sessionId,
+                        TaskPriority.PERIODIC, new Runnable() {
+                            @Override
+                            public void run() {
+                                tick();
+                            }
+                        }, TICK_MILLIS, TICK_MILLIS, TimeUnit.MILLISECONDS);
+    }
+
+    public synchronized void stop() {
+        if (task != null) {
+            task.cancel();
+            task = null;
+        }
+    }
+
+    synchronized void tick() {
+        selfRate.update(selfNanos.sum());
+        wallRate.update(wallNanos.sum());
+        if (selfRate.size() < MIN_SAMPLES) {
+            return;
+        }
+        double wall = wallRate.rate();
+        if (wall <= 0) {
+            return;
+        }
+        overhead = selfRate.rate() / wall;
+        adjust(parseBudget(GlobalOptions.overheadBudget));
+    }
+
+    private void adjust(double budget) {
+        if (budget <= 0) {
+            if (suspended || sampleRate < 1) {
+                changeSampleRate(1, "overhead-budget is disabled, sampling restored to 100%.");
+            }
+            return;
+        }
+        if (suspended) {
+            if (budget != suspendedBudget) {
+                changeSampleRate(MIN_SAMPLE_RATE, "overhead-budget changed to " + percent(budget)
+                                + ", listener resumed with sample rate " + percent(MIN_SAMPLE_RATE) + ".");
+            }
+            return;
+        }
+        if (overhead > budget) {
+            String exceeded = "overhead-budget " + percent(budget) + " exceeded: listener takes " + percent(overhead)
+                            + " of the wall time of enhanced methods";
+            if (sampleRate <= MIN_SAMPLE_RATE) {
+                suspend(budget, exceeded + " even at " + percent(sampleRate)
+                                + " sampling, listener suspended. Raise overhead-budget to resume, or press Q or Ctrl+C to abort.");
+            } else {
+                double rate = Math.max(MIN_SAMPLE_RATE, sampleRate * budget / overhead * HEADROOM);
+                changeSampleRate(rate, exceeded + ", sample rate reduced to " + percent(rate) + ".");
+            }
+        } else if (sampleRate < 1 && overhead < budget / 2) {
+            double rate = Math.min(1, sampleRate * 2);
+            changeSampleRate(rate, "listener takes " + percent(overhead) + " of the wall time of enhanced methods, "
+                            + "sample rate increased to " + percent(rate) + ".");
+        }
+    }
+
+    private void changeSampleRate(double rate, String message) {
+        sampleRate = rate;
+        suspended = false;
+        onAdjusted(message);
+    }
+
+    private void suspend(double budget, String message) {
+        suspended = true;
+        suspendedBudget = budget;
+        onAdjusted(message);
+    }
+
+    private void onAdjusted(String message) {
+        adjusted = true;
+        resetRate();
+        logger.warn(message);
+        if (process != null) {
+            process.appendResult(new MessageModel(message));
+        }
+    }
+
+    /**
+     * 采样率变化之后，之前的统计就不准了，重新开始统计
+     */
+    private void resetRate() {
+        selfRate = new SumRateCounter();
+        wallRate = new SumRateCounter();
+        selfRate.update(selfNanos.sum());
+        wallRate.update(wallNanos.sum());
+    }
+
+    /**
+     * overhead-budget 为 0 时不创建 OverheadGovernor，listener 的回调不需要计时
+     */
+    public static boolean isEnabled(String budget) {
+        return parseBudget(budget) > 0;
+    }
+
+    /**
+     * @param budget 比如 2% 或者 2，表示 2%
+     * @return 0 到 1 之间的比例，0 表示不限制
+     */
+    static double parseBudget(String budget) {
+        if (budget == null) {
+            return 0;
+        }
+        String value = budget.trim();
+        if (value.endsWith("%")) {
+            value = value.substring(0, value.length() - 1).trim();
+        }
+        try {
+            double percent = Double.parseDouble(value);
+            return percent > 0 ? percent / 100 : 0;
+        } catch (NumberFormatException e) {
+            logger.warn("illegal overhead-budget: {}", budget);
+            return 0;
+        }
+    }
+
+    private static String percent(double ratio) {
+        return String.format("%.2f%%", ratio * 100);
+    }
+
+    public double getSampleRate() {
+        return sampleRate;
+    }
+
+    public boolean isSuspended() {
+        return suspended;
+    }
+
+    /**
+     * @return 最近几秒 listener 耗时占方法耗时的比例
+     */
+    public double getOverhead() {
+        return overhead;
+    }
+
+    /**
+     * @return 是否因为 overhead-budget 调整过采样率
+     */
+    public boolean isAdjusted() {
+        return adjusted;
+    }
+
+    public List<MethodOverhead> getMethodOverheads() {
+        List<MethodOverhead> list = new ArrayList<MethodOverhead>();
+        for (ConcurrentMap<String, MethodOverhead> classMethods : methods.values()) {
+            list.addAll(classMethods.values());
+        }
+        return list;
+    }
+
+    public String summary() {
+        StringBuilder sb = new StringBuilder("Overhead summary: sample rate: ").append(percent(sampleRate));
+        if (suspended) {
+            sb.append(" (suspended)");
+        }
+        sb.append(", recent overhead: ").append(percent(overhead)).append('.');
+        for (MethodOverhead method : getMethodOverheads()) {
+            sb.append("\n  ").append(method.getMethod()).append(" calls: ").append(method.getCalls())
+                            .append(", self: ").append(String.format("%.2f", method.getSelfNanosPerCall() / 1000))
+                            .append(" us/call, overhead: ").append(percent(method.getOverhead()));
+        }
+        return sb.toString();
+    }
+
+    public static class MethodOverhead {
+        private final String method;
+        private final StripedCounter calls = new StripedCounter(STRIPES);
+        private final StripedCounter selfNanos = new StripedCounter(STRIPES);
+        private final StripedCounter wallNanos = new StripedCounter(STRIPES);
+
+        MethodOverhead(String method) {
+            this.method = method;
+        }
+
+        public String getMethod() {
+            return method;
+        }
+
+        public long getCalls() {
+            return calls.sum();
+        }
+
+        public double getSelfNanosPerCall() {
+            long count = calls.sum();
+            return count == 0 ? 0 : selfNanos.sum() / (double) count;
+        }
+
+        /**
+         * @return listener 耗时占方法耗时的比例
+         */
+        public double getOverhead() {
+            long wall = wallNanos.sum();
+            return wall == 0 ? 0 : selfNanos.sum() / (double) wall;
+        }
+    }
+
+    /**
+     * 每一帧保存方法入口的时间，是否交给 listener 处理，以及方法的统计。
+     * 和 InvocationSampler.DecisionStack 一样最多保存 maxSize 帧，顺便保存每个线程的随机数种子。
+     * 大部分线程的调用深度都很小，数组按需扩容
+     */
+    static class CallStack {
+        private static final int INITIAL_SIZE = 16;
+
+        private final int maxSize;
+        private long[] starts;
+        private boolean[] admitted;
+        private MethodOverhead[] methods;
+        private int pos = 0;
+        private long seed;
+
+        CallStack(int maxSize) {
+            this.maxSize = maxSize;
+            int size = Math.min(INITIAL_SIZE, maxSize);
+            starts = new long[size];
+            admitted = new boolean[size];
+            methods = new MethodOverhead[size];
+            seed = System.nanoTime() ^ Thread.currentThread().getId() * 0x9E3779B97F4A7C15L;
+            if (seed == 0) {
+                seed = 1;
+            }
+        }
+
+        boolean isEmpty() {
+            return pos == 0;
+        }
+
+        void push(long start, boolean admit, MethodOverhead method) {
+            if (pos == starts.length && pos < maxSize) {
+                int size = Math.min(maxSize, starts.length * 2);
+                starts = Arrays.copyOf(starts, size);
+                admitted = Arrays.copyOf(admitted, size);
+                methods = Arrays.copyOf(methods, size);
+            }
+            if (pos < starts.length) {
+                starts[pos] = start;
+                admitted[pos] = admit;
+                methods[pos] = method;
+            }
+            // 栈满的时候不再记录，保持和外层一致
+            pos++;
+        }
+
+        boolean peekAdmitted() {
+            return admitted[Math.min(pos, admitted.length) - 1];
+        }
+
+        MethodOverhead peekMethod() {
+            return pos <= methods.length ? methods[pos - 1] : null;
+        }
+
+        /**
+         * @return 方法入口的时间，栈满时没有记录的帧返回 0
+         */
+        long pop() {
+            if (pos == 0) {
+                return 0;
+            }
+            pos--;
+            if (pos >= starts.length) {
+                return 0;
+            }
+            methods[pos] = null;
+            return starts[pos];
+        }
+
+        int capacity() {
+            return starts.length;
+        }
+
+        double nextDouble() {
+            long x = seed;
+            x ^= x << 13;
+            x ^= x >>> 7;
+            x ^= x << 17;
+            seed = x;
+            return (x >>> 11) * 0x1.0p-53;
+        }
+    }
+}
@@ -0,0 +1,70 @@
+package com.taobao.arthas.core.advisor;
+
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.List;
+
+/**
+ * <pre>
+ * 并发 retransform 时，给每个线程分配下一批类。
+ *
+ * 第一批固定 MIN_BATCH_SIZE 个类，之后按已完成批次里每个类的平均耗时，
+ * 让每批的耗时接近 TARGET_BATCH_NANOS。批次太大的话线程之间负载不均衡，太小的话 VM operation 太多。
+ * </pre>
+ */
+class RetransformBatcher {
+    static final int MIN_BATCH_SIZE = 32;
+    static final int MAX_BATCH_SIZE = 1024;
+    static final long TARGET_BATCH_NANOS = 200 * 1000 * 1000L;
+
+    private final Class<?>[] classes;
+    private int next = 0;
+    private int finished = 0;
+    private int batches = 0;
+
+    private long finishedNanos = 0;
+
+    RetransformBatcher(Class<?>[] classes) {
+        this.classes = classes;
+    }
+
+    /**
+     * @return 下一批类，没有了返回 null
+     */
+    synchronized List<Class<?>> nextBatch() {
+        if (next >= classes.length) {
+            return null;
+        }
+        int size = Math.min(batchSize(), classes.length - next);
+        List<Class<?>> batch = new ArrayList<Class<?>>(Arrays.asList(classes).subList(next, next + size));
+        next += size;
+        batches++;
+        return batch;
+    }
+
+    synchronized void finish(int count, long nanos) {
+        finished += count;
+        finishedNanos += nanos;
+    }
+
+    synchronized int batchSize() {
+        if (finished == 0 || finishedNanos <= 0) {
+            return MIN_BATCH_SIZE;
+        }
+        long nanosPerClass = Math.max(1, finishedNanos / finished);
+        long size = TARGET_BATCH_NANOS / nanosPerClass;
+        return (int) Math.max(MIN_BATCH_SIZE, Math.min(MAX_BATCH_SIZE, size));
+    }
+
+    synchronized int finished() {
+        return finished;
+    }
+
+    synchronized int batches() {
+        return batches;
+    }
+
+    int total() {
+        return classes.length;
+    }
+}
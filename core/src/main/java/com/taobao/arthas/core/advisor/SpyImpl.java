@@ -6,6 +6,7 @@ import java.util.regex.Pattern;
 
 import com.alibaba.arthas.deps.org.slf4j.Logger;
 import com.alibaba.arthas.deps.org.slf4j.LoggerFactory;
+import com.taobao.arthas.core.advisor.AdviceListenerManager.AdviceSite;
 import com.taobao.arthas.core.shell.system.ExecStatus;
 import com.taobao.arthas.core.shell.system.ProcessAware;
 
@@ -15,6 +16,9 @@ import com.taobao.arthas.core.shell.system.ProcessAware;
  * 当id少时，可以id自己来判断是否符合？
  * 
  * 如果是每个 className|methodDesc 为 key ，是否
+ * 
+ * 增强时打开 fast-dispatch 的话，插入的是 int 类型的 site id，直接从 AdviceListenerManager 的 site 数组里取 listener，
+ * 字符串 methodInfo/invokeInfo 的版本保留，用于兼容之前已经增强过的类。
  * </pre>
  * 
  * @author hengyunabc 2020-04-24
@@ -174,6 +178,135 @@ public class SpyImpl extends AbstractSpy {
         }
     }
 
+    @Override
+    public void atEnter(Class<?> clazz, int siteId, Object target, Object[] args) {
+        AdviceSite site = AdviceListenerManager.adviceSite(siteId);
+        if (site == null) {
+            return;
+        }
+        AdviceListener[] listeners = site.listeners;
+        for (int i = 0; i < listeners.length; ++i) {
+            AdviceListener adviceListener = listeners[i];
+            try {
+                if (skipAdviceListener(adviceListener)) {
+                    continue;
+                }
+                adviceListener.before(clazz, site.methodName, site.methodDesc, target, args);
+            } catch (Throwable e) {
+                logger.error("class: {}, method: {}{}", clazz.getName(), site.methodName, site.methodDesc, e);
+            }
+        }
+    }
+
+    @Override
+    public void atExit(Class<?> clazz, int siteId, Object target, Object[] args, Object returnObject) {
+        AdviceSite site = AdviceListenerManager.adviceSite(siteId);
+        if (site == null) {
+            return;
+        }
+        AdviceListener[] listeners = site.listeners;
+        for (int i = 0; i < listeners.length; ++i) {
+            AdviceListener adviceListener = listeners[i];
+            try {
+                if (skipAdviceListener(adviceListener)) {
+                    continue;
+                }
+                adviceListener.afterReturning(clazz, site.methodName, site.methodDesc, target, args, returnObject);
+            } catch (Throwable e) {
+                logger.error("class: {}, method: {}{}", clazz.getName(), site.methodName, site.methodDesc, e);
+            }
+        }
+    }
+
+    @Override
+    public void atExceptionExit(Class<?> clazz, int siteId, Object target, Object[] args, Throwable throwable) {
+        AdviceSite site = AdviceListenerManager.adviceSite(siteId);
+        if (site == null) {
+            return;
+        }
+        AdviceListener[] listeners = site.listeners;
+        for (int i = 0; i < listeners.length; ++i) {
+            AdviceListener adviceListener = listeners[i];
+            try {
+                if (skipAdviceListener(adviceListener)) {
+                    continue;
+                }
+                adviceListener.afterThrowing(clazz, site.methodName, site.methodDesc, target, args, throwable);
+            } catch (Throwable e) {
+                logger.error("class: {}, method: {}{}", clazz.getName(), site.methodName, site.methodDesc, e);
+            }
+        }
+    }
+
+    @Override
+    public void atBeforeInvoke(Class<?> clazz, int siteId, Object target) {
+        AdviceSite site = AdviceListenerManager.adviceSite(siteId);
+        if (site == null) {
+            return;
+        }
+        AdviceListener[] listeners = site.listeners;
+        for (int i = 0; i < listeners.length; ++i) {
+            AdviceListener adviceListener = listeners[i];
+            try {
+                if (skipAdviceListener(adviceListener)) {
+                    continue;
+                }
+                final InvokeTraceable listener = (InvokeTraceable) adviceListener;
+                listener.invokeBeforeTracing(clazz.getClassLoader(), site.owner, site.methodName, site.methodDesc,
+                        site.line);
+            } catch (Throwable e) {
+                logger.error("class: {}, invoke: {}.{}{}", clazz.getName(), site.owner, site.methodName,
+                        site.methodDesc, e);
+            }
+        }
+    }
+
+    @Override
+    public void atAfterInvoke(Class<?> clazz, int siteId, Object target) {
+        AdviceSite site = AdviceListenerManager.adviceSite(siteId);
+        if (site == null) {
+            return;
+        }
+        AdviceListener[] listeners = site.listeners;
+        for (int i = 0; i < listeners.length; ++i) {
+            AdviceListener adviceListener = listeners[i];
+            try {
+                if (skipAdviceListener(adviceListener)) {
+                    continue;
+                }
+                final InvokeTraceable listener = (InvokeTraceable) adviceListener;
+                listener.invokeAfterTracing(clazz.getClassLoader(), site.owner, site.methodName, site.methodDesc,
+                        site.line);
+            } catch (Throwable e) {
+                logger.error("class: {}, invoke: {}.{}{}", clazz.getName(), site.owner, site.methodName,
+                        site.methodDesc, e);
+            }
+        }
+    }
+
+    @Override
+    public void atInvokeException(Class<?> clazz, int siteId, Object target, Throwable throwable) {
+        AdviceSite site = AdviceListenerManager.adviceSite(siteId);
+        if (site == null) {
+            return;
+        }
+        AdviceListener[] listeners = site.listeners;
+        for (int i = 0; i < listeners.length; ++i) {
+            AdviceListener adviceListener = listeners[i];
+            try {
+                if (skipAdviceListener(adviceListener)) {
+                    continue;
+                }
+                final InvokeTraceable listener = (InvokeTraceable) adviceListener;
+                listener.invokeThrowTracing(clazz.getClassLoader(), site.owner, site.methodName, site.methodDesc,
+                        site.line);
+            } catch (Throwable e) {
+                logger.error("class: {}, invoke: {}.{}{}", clazz.getName(), site.owner, site.methodName,
+                        site.methodDesc, e);
+            }
+        }
+    }
+
     private String[] splitMethodInfo(String methodInfo) {
         return methodInfo.split(Pattern.quote("|"));
     }
@@ -111,4 +111,102 @@ public class SpyInterceptors {
         }
     }
 
+    /**
+     * 以下为 fast-dispatch 版本，插入的是增强时分配的 site id
+     */
+    public static class SpySiteInterceptor1 {
+
+        @AtEnter(inline = true)
+        public static void atEnter(@Binding.This Object target, @Binding.Class Class<?> clazz,
+                @Binding.SiteId int siteId, @Binding.Args Object[] args) {
+            SpyAPI.atEnter(clazz, siteId, target, args);
+        }
+    }
+
+    public static class SpySiteInterceptor2 {
+        @AtExit(inline = true)
+        public static void atExit(@Binding.This Object target, @Binding.Class Class<?> clazz,
+                @Binding.SiteId int siteId, @Binding.Args Object[] args, @Binding.Return Object returnObj) {
+            SpyAPI.atExit(clazz, siteId, target, args, returnObj);
+        }
+    }
+
+    public static class SpySiteInterceptor3 {
+        @AtExceptionExit(inline = true)
+        public static void atExceptionExit(@Binding.This Object target, @Binding.Class Class<?> clazz,
+                @Binding.SiteId int siteId, @Binding.Args Object[] args,
+                @Binding.Throwable Throwable throwable) {
+            SpyAPI.atExceptionExit(clazz, siteId, target, args, throwable);
+        }
+    }
+
+    public static class SpySiteTraceInterceptor1 {
+        @AtInvoke(name = "", inline = true, whenComplete = false, excludes = {"java.arthas.SpyAPI", "java.lang.Byte"
+                , "java.lang.Boolean"
+                , "java.lang.Short"
+                , "java.lang.Character"
+                , "java.lang.Integer"
+                , "java.lang.Float"
+                , "java.lang.Long"
+                , "java.lang.Double"})
+        public static void onInvoke(@Binding.This Object target, @Binding.Class Class<?> clazz,
+                @Binding.SiteId int siteId) {
+            SpyAPI.atBeforeInvoke(clazz, siteId, target);
+        }
+    }
+
+    public static class SpySiteTraceInterceptor2 {
+        @AtInvoke(name = "", inline = true, whenComplete = true, excludes = {"java.arthas.SpyAPI", "java.lang.Byte"
+                , "java.lang.Boolean"
+                , "java.lang.Short"
+                , "java.lang.Character"
+                , "java.lang.Integer"
+                , "java.lang.Float"
+                , "java.lang.Long"
+                , "java.lang.Double"})
+        public static void onInvokeAfter(@Binding.This Object target, @Binding.Class Class<?> clazz,
+                @Binding.SiteId int siteId) {
+            SpyAPI.atAfterInvoke(clazz, siteId, target);
+        }
+    }
+
+    public static class SpySiteTraceInterceptor3 {
+        @AtInvokeException(name = "", inline = true, excludes = {"java.arthas.SpyAPI", "java.lang.Byte"
+                , "java.lang.Boolean"
+                , "java.lang.Short"
+                , "java.lang.Character"
+                , "java.lang.Integer"
+                , "java.lang.Float"
+                , "java.lang.Long"
+                , "java.lang.Double"})
+        public static void onInvokeException(@Binding.This Object target, @Binding.Class Class<?> clazz,
+                @Binding.SiteId int siteId, @Binding.Throwable Throwable throwable) {
+            SpyAPI.atInvokeException(clazz, siteId, target, throwable);
+        }
+    }
+
+    public static class SpySiteTraceExcludeJDKInterceptor1 {
+        @AtInvoke(name = "", inline = true, whenComplete = false, excludes = "java.**")
+        public static void onInvoke(@Binding.This Object target, @Binding.Class Class<?> clazz,
+                @Binding.SiteId int siteId) {
+            SpyAPI.atBeforeInvoke(clazz, siteId, target);
+        }
+    }
+
+    public static class SpySiteTraceExcludeJDKInterceptor2 {
+        @AtInvoke(name = "", inline = true, whenComplete = true, excludes = "java.**")
+        public static void onInvokeAfter(@Binding.This Object target, @Binding.Class Class<?> clazz,
+                @Binding.SiteId int siteId) {
+            SpyAPI.atAfterInvoke(clazz, siteId, target);
+        }
+    }
+
+    public static class SpySiteTraceExcludeJDKInterceptor3 {
+        @AtInvokeException(name = "", inline = true, excludes = "java.**")
+        public static void onInvokeException(@Binding.This Object target, @Binding.Class Class<?> clazz,
+                @Binding.SiteId int siteId, @Binding.Throwable Throwable throwable) {
+            SpyAPI.atInvokeException(clazz, siteId, target, throwable);
+        }
+    }
+
 }
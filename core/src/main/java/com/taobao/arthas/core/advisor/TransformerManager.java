@@ -17,6 +17,10 @@ public class TransformerManager {
     private Instrumentation instrumentation;
     private List<ClassFileTransformer> watchTransformers = new CopyOnWriteArrayList<ClassFileTransformer>();
     private List<ClassFileTransformer> traceTransformers = new CopyOnWriteArrayList<ClassFileTransformer>();
+    /**
+     * 只在类第一次加载时回调，不修改字节码
+     */
+    private List<ClassFileTransformer> loadTransformers = new CopyOnWriteArrayList<ClassFileTransformer>();
 
     private ClassFileTransformer classFileTransformer;
 
@@ -28,6 +32,14 @@ public class TransformerManager {
             @Override
             public byte[] transform(ClassLoader loader, String className, Class<?> classBeingRedefined,
                     ProtectionDomain protectionDomain, byte[] classfileBuffer) throws IllegalClassFormatException {
+                if (classBeingRedefined != null) {
+                    ClassBytecodeCache.beginTransform(classBeingRedefined, classfileBuffer);
+                } else {
+                    for (ClassFileTransformer classFileTransformer : loadTransformers) {
+                        classFileTransformer.transform(loader, className, classBeingRedefined, protectionDomain,
+                                classfileBuffer);
+                    }
+                }
 
                 for (ClassFileTransformer classFileTransformer : watchTransformers) {
                     byte[] transformResult = classFileTransformer.transform(loader, className, classBeingRedefined,
@@ -45,6 +57,9 @@ public class TransformerManager {
                     }
                 }
 
+                if (classBeingRedefined != null) {
+                    ClassBytecodeCache.endTransform(classBeingRedefined);
+                }
                 return classfileBuffer;
             }
 
@@ -60,14 +75,27 @@ public class TransformerManager {
         }
     }
 
+    /**
+     * 注册只关心新加载的类的 transformer，返回值会被忽略
+     */
+    public void addLoadTransformer(ClassFileTransformer transformer) {
+        loadTransformers.add(transformer);
+    }
+
     public void removeTransformer(ClassFileTransformer transformer) {
         watchTransformers.remove(transformer);
         traceTransformers.remove(transformer);
+        loadTransformers.remove(transformer);
+    }
+
+    public boolean contains(ClassFileTransformer transformer) {
+        return watchTransformers.contains(transformer) || traceTransformers.contains(transformer);
     }
 
     public void destroy() {
         watchTransformers.clear();
         traceTransformers.clear();
+        loadTransformers.clear();
         instrumentation.removeTransformer(classFileTransformer);
     }
 
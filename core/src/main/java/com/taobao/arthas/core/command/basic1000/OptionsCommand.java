@@ -28,6 +28,7 @@ import org.slf4j.LoggerFactory;
 
 import java.lang.reflect.Field;
 import java.util.ArrayList;
+import java.util.Arrays;
 import java.util.Collection;
 import java.util.List;
 
@@ -150,7 +151,17 @@ public class OptionsCommand extends AnnotatedCommand {
             } else if (isIn(type, short.class, Short.class)) {
                 FieldUtils.writeStaticField(field, afterValue = Short.valueOf(optionValue));
             } else if (isIn(type, short.class, String.class)) {
-                FieldUtils.writeStaticField(field, afterValue = optionValue);
+                String[] values = optionAnnotation.values();
+                if (values.length > 0) {
+                    String value = findValue(values, optionValue);
+                    if (value == null) {
+                        return ExitStatus.failure(-1, format("Option value[%s] is invalid, options[%s] should be one of %s.",
+                                optionValue, optionName, Arrays.toString(values)));
+                    }
+                    FieldUtils.writeStaticField(field, afterValue = value);
+                } else {
+                    FieldUtils.writeStaticField(field, afterValue = optionValue);
+                }
             } else {
                 return ExitStatus.failure(-1, format("Options[%s] type[%s] was unsupported.", optionName, type.getSimpleName()));
             }
@@ -165,6 +176,19 @@ public class OptionsCommand extends AnnotatedCommand {
     }
 
 
+    /**
+     * 忽略大小写和两边的空白，返回 values 里对应的值
+     */
+    private static String findValue(String[] values, String optionValue) {
+        String value = optionValue.trim();
+        for (String candidate : values) {
+            if (candidate.equalsIgnoreCase(value)) {
+                return candidate;
+            }
+        }
+        return null;
+    }
+
     /**
      * 判断当前动作是否需要展示整个options
      */
@@ -41,6 +41,9 @@ public class SessionCommand extends AnnotatedCommand {
         String statUrl = UserStatUtil.getStatUrl();
         result.setStatUrl(statUrl);
 
+        //command scheduler queues
+        result.setScheduler(ArthasBootstrap.getInstance().getCommandScheduler().getLaneStats());
+
         process.appendResult(result);
         process.end();
     }
@@ -42,4 +42,7 @@ public class ClassLoaderClassResolver implements ClassResolver {
         return result;
     }
 
+    public ClassLoader getClassLoader() {
+        return classLoader;
+    }
 }
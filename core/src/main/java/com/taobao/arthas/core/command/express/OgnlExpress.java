@@ -6,7 +6,6 @@ import com.alibaba.arthas.deps.org.slf4j.LoggerFactory;
 import ognl.ClassResolver;
 import ognl.DefaultMemberAccess;
 import ognl.MemberAccess;
-import ognl.Ognl;
 import ognl.OgnlContext;
 
 /**
@@ -19,12 +18,14 @@ public class OgnlExpress implements Express {
 
     private Object bindObject;
     private final OgnlContext context;
+    private final ClassResolver classResolver;
 
     public OgnlExpress() {
         this(CustomClassResolver.customClassResolver);
     }
 
     public OgnlExpress(ClassResolver classResolver) {
+        this.classResolver = classResolver;
         context = new OgnlContext();
         context.setClassResolver(classResolver);
         // allow private field access
@@ -34,7 +35,7 @@ public class OgnlExpress implements Express {
     @Override
     public Object get(String express) throws ExpressException {
         try {
-            return Ognl.getValue(express, context, bindObject);
+            return OgnlExpressionCache.getValue(express, context, bindObject);
         } catch (Exception e) {
             logger.error("Error during evaluating the expression:", e);
             throw new ExpressException(express, e);
@@ -62,7 +63,7 @@ public class OgnlExpress implements Express {
     @Override
     public Express reset() {
         context.clear();
-        context.setClassResolver(CustomClassResolver.customClassResolver);
+        context.setClassResolver(classResolver);
         // allow private field access
         context.setMemberAccess(MEMBER_ACCESS);
         return this;
@@ -0,0 +1,229 @@
+package com.taobao.arthas.core.command.express;
+
+import java.lang.ref.WeakReference;
+import java.util.Arrays;
+import java.util.HashSet;
+import java.util.LinkedHashMap;
+import java.util.Map;
+import java.util.Set;
+
+import com.alibaba.arthas.deps.org.slf4j.Logger;
+import com.alibaba.arthas.deps.org.slf4j.LoggerFactory;
+import com.taobao.arthas.core.GlobalOptions;
+
+import ognl.ClassResolver;
+import ognl.DefaultMemberAccess;
+import ognl.Node;
+import ognl.Ognl;
+import ognl.OgnlContext;
+import ognl.OgnlException;
+
+/**
+ * <pre>
+ * 缓存 ognl 表达式解析之后的语法树，watch/trace/tt/monitor 等命令的表达式只需要解析一次。
+ * 缓存的 key 是 表达式 + ClassLoader，最多保留 MAX_SIZE 个最近用过的表达式。
+ *
+ * 打开 ognl-compile 选项之后，还会按 root 对象的类型把表达式编译成字节码。
+ * ognl 编译时会在 root 上执行表达式来推断类型，所以有副作用的表达式（赋值、方法调用、构造对象等）不编译，
+ * 避免在用户的数据上执行两次。
+ * 编译失败，或者编译后的代码执行出错（比如参数的实际类型变了），这个表达式就回退到解释执行。
+ * </pre>
+ */
+class OgnlExpressionCache {
+    private static final Logger logger = LoggerFactory.getLogger(OgnlExpressionCache.class);
+
+    static final int MAX_SIZE = 1024;
+
+    /**
+     * 语法树里有这些节点时不编译
+     */
+    private static final Set<String> SIDE_EFFECT_NODES = new HashSet<String>(
+            Arrays.asList("ASTAssign", "ASTMethod", "ASTStaticMethod", "ASTCtor", "ASTEval"));
+
+    private static final Map<Key, CachedExpression> cache = new LinkedHashMap<Key, CachedExpression>(64, 0.75f,
+            true) {
+        private static final long serialVersionUID = 1L;
+
+        @Override
+        protected boolean removeEldestEntry(Map.Entry<Key, CachedExpression> eldest) {
+            return size() > MAX_SIZE;
+        }
+    };
+
+    /**
+     * 没有 javassist 等情况下，不再尝试编译
+     */
+    private static volatile boolean compilerAvailable = true;
+
+    private OgnlExpressionCache() {
+    }
+
+    static Object getValue(String express, OgnlContext context, Object root) throws OgnlException {
+        CachedExpression expression = get(express, context.getClassResolver());
+
+        // 编译出来的类定义在和 ClassResolver 对应的 ClassLoader 里，只对共享的 CustomClassResolver 做编译，避免泄露
+        if (GlobalOptions.ognlCompile && compilerAvailable && root != null
+                && context.getClassResolver() == CustomClassResolver.customClassResolver) {
+            Node compiled = expression.compiled(context, root);
+            if (compiled != null) {
+                try {
+                    return Ognl.getValue(compiled, context, root);
+                } catch (Throwable e) {
+                    expression.compileFailed = true;
+                }
+            }
+        }
+        return Ognl.getValue(expression.tree, context, root);
+    }
+
+    static CachedExpression get(String express, ClassResolver classResolver) throws OgnlException {
+        Key key = new Key(express, scope(classResolver));
+        CachedExpression expression;
+        synchronized (cache) {
+            expression = cache.get(key);
+        }
+        if (expression == null) {
+            // 解析放在锁外面
+            CachedExpression parsed = new CachedExpression(express, Ognl.parseExpression(express));
+            synchronized (cache) {
+                expression = cache.get(key);
+                if (expression == null) {
+                    cache.put(key, parsed);
+                    expression = parsed;
+                }
+            }
+        }
+        return expression;
+    }
+
+    static int size() {
+        synchronized (cache) {
+            return cache.size();
+        }
+    }
+
+    /**
+     * ClassLoaderClassResolver 按 ClassLoader 区分，其它的 ClassResolver 按对象区分
+     */
+    private static Object scope(ClassResolver classResolver) {
+        if (classResolver instanceof ClassLoaderClassResolver) {
+            ClassLoader classLoader = ((ClassLoaderClassResolver) classResolver).getClassLoader();
+            if (classLoader != null) {
+                return classLoader;
+            }
+        }
+        return classResolver;
+    }
+
+    static boolean isSideEffectFree(Node node) {
+        if (SIDE_EFFECT_NODES.contains(node.getClass().getSimpleName())) {
+            return false;
+        }
+        for (int i = 0; i < node.jjtGetNumChildren(); ++i) {
+            if (!isSideEffectFree(node.jjtGetChild(i))) {
+                return false;
+            }
+        }
+        return true;
+    }
+
+    /**
+     * 弱引用 ClassLoader，ClassLoader 被回收之后这个 key 不会再被命中，之后按 LRU 淘汰
+     */
+    private static class Key {
+        private final String express;
+        private final WeakReference<Object> scope;
+        private final int hash;
+
+        Key(String express, Object scope) {
+            this.express = express;
+            this.scope = new WeakReference<Object>(scope);
+            this.hash = 31 * express.hashCode() + System.identityHashCode(scope);
+        }
+
+        @Override
+        public int hashCode() {
+            return hash;
+        }
+
+        @Override
+        public boolean equals(Object obj) {
+            if (this == obj) {
+                return true;
+            }
+            if (!(obj instanceof Key)) {
+                return false;
+            }
+            Key other = (Key) obj;
+            Object current = scope.get();
+            return hash == other.hash && current != null && current == other.scope.get()
+                    && express.equals(other.express);
+        }
+    }
+
+    static class CachedExpression {
+        final String express;
+        final Object tree;
+
+        private volatile CompiledExpression compiled;
+        volatile boolean compileFailed;
+
+        CachedExpression(String express, Object tree) {
+            this.express = express;
+            this.tree = tree;
+            this.compileFailed = !isSideEffectFree((Node) tree);
+        }
+
+        Node compiled(OgnlContext context, Object root) {
+            if (compileFailed) {
+                return null;
+            }
+            CompiledExpression current = compiled;
+            if (current == null) {
+                synchronized (this) {
+                    current = compiled;
+                    if (current == null && !compileFailed) {
+                        current = compile(context, root);
+                        compiled = current;
+                    }
+                }
+            }
+            // 只按第一次的 root 类型编译一次
+            if (current == null || current.rootClass != root.getClass()) {
+                return null;
+            }
+            return current.node;
+        }
+
+        private CompiledExpression compile(OgnlContext context, Object root) {
+            OgnlContext compileContext = new OgnlContext();
+            compileContext.setClassResolver(CustomClassResolver.customClassResolver);
+            compileContext.setMemberAccess(new DefaultMemberAccess(true));
+            // 带上绑定的变量，和真正执行时走同样的路径
+            compileContext.putAll(context.getValues());
+            try {
+                Node node = Ognl.compileExpression(compileContext, root, express);
+                if (node != null && node.getAccessor() != null) {
+                    return new CompiledExpression(root.getClass(), node);
+                }
+            } catch (LinkageError e) {
+                compilerAvailable = false;
+                logger.info("ognl compiler is not available, ognl expressions will be interpreted.", e);
+            } catch (Throwable e) {
+                logger.debug("can not compile ognl expression: {}", express, e);
+            }
+            compileFailed = true;
+            return null;
+        }
+    }
+
+    private static class CompiledExpression {
+        final Class<?> rootClass;
+        final Node node;
+
+        CompiledExpression(Class<?> rootClass, Node node) {
+            this.rootClass = rootClass;
+            this.node = node;
+        }
+    }
+}
@@ -14,6 +14,7 @@ import com.taobao.arthas.core.shell.command.CommandProcess;
 import com.taobao.arthas.core.shell.handlers.Handler;
 import com.taobao.arthas.core.util.ClassUtils;
 import com.taobao.arthas.core.util.ClassLoaderUtils;
+import com.taobao.arthas.core.util.LoadedClassIndex;
 import com.taobao.arthas.core.util.ResultUtils;
 import com.taobao.arthas.core.util.affect.RowAffect;
 import com.taobao.middleware.cli.annotations.Description;
@@ -427,12 +428,9 @@ public class ClassLoaderCommand extends AnnotatedCommand {
     private static Set<ClassLoader> getAllClassLoaders(Instrumentation inst, Filter... filters) {
         Set<ClassLoader> classLoaderSet = new HashSet<ClassLoader>();
 
-        for (Class<?> clazz : inst.getAllLoadedClasses()) {
-            ClassLoader classLoader = clazz.getClassLoader();
-            if (classLoader != null) {
-                if (shouldInclude(classLoader, filters)) {
-                    classLoaderSet.add(classLoader);
-                }
+        for (ClassLoader classLoader : LoadedClassIndex.getInstance(inst).getClassLoaders()) {
+            if (shouldInclude(classLoader, filters)) {
+                classLoaderSet.add(classLoader);
             }
         }
         return classLoaderSet;
@@ -0,0 +1,231 @@
+package com.taobao.arthas.core.command.klass100;
+
+import com.alibaba.arthas.deps.org.slf4j.Logger;
+import com.alibaba.arthas.deps.org.slf4j.LoggerFactory;
+import com.taobao.arthas.core.util.FileUtils;
+import com.taobao.arthas.core.util.IOUtils;
+import com.taobao.arthas.core.util.LogUtil;
+
+import java.io.File;
+import java.io.FileInputStream;
+import java.io.IOException;
+import java.io.InputStream;
+import java.nio.charset.Charset;
+import java.security.MessageDigest;
+import java.security.NoSuchAlgorithmException;
+import java.util.Arrays;
+import java.util.Comparator;
+import java.util.LinkedHashMap;
+import java.util.Map;
+import java.util.TreeMap;
+import java.util.WeakHashMap;
+
+/**
+ * <pre>
+ * jad 的缓存，分两层：
+ * 1. dump 缓存：Class -> dump 出来的 class 文件。arthas 没有再修改过类的字节码时
+ *    （见 InstrumentationUtils#getClassModifications），直接使用上次 dump 的文件，不需要再 retransform。
+ * 2. 源码缓存：class 字节码的 sha1 + 反编译参数 -> 反编译结果。内存里是 LRU，
+ *    同时保存到 arthas-cache/jad 目录下，按内容寻址，arthas 重新 attach 之后也能命中。
+ * </pre>
+ */
+class JadCache {
+    private static final Logger logger = LoggerFactory.getLogger(JadCache.class);
+
+    private static final int MAX_MEMORY_ENTRIES = 128;
+    private static final int MAX_DISK_ENTRIES = 1024;
+    private static final String CACHE_DIR = "jad";
+    private static final String SUFFIX = ".java";
+    /**
+     * 反编译结果的格式变化时（比如升级 cfr）修改这个版本，旧的缓存就不会再命中
+     */
+    private static final String CACHE_VERSION = "1";
+    private static final Charset UTF_8 = Charset.forName("UTF-8");
+
+    private static volatile JadCache instance;
+
+    private final File directory;
+    private final Map<Class<?>, DumpEntry> dumps = new WeakHashMap<Class<?>, DumpEntry>();
+    private final LinkedHashMap<String, String> sources = new LinkedHashMap<String, String>(16, 0.75f, true) {
+        private static final long serialVersionUID = 1L;
+
+        @Override
+        protected boolean removeEldestEntry(Map.Entry<String, String> eldest) {
+            return size() > MAX_MEMORY_ENTRIES;
+        }
+    };
+
+    JadCache(File directory) {
+        this.directory = directory;
+    }
+
+    static JadCache getInstance() {
+        if (instance == null) {
+            synchronized (JadCache.class) {
+                if (instance == null) {
+                    instance = new JadCache(new File(LogUtil.cacheDir(), CACHE_DIR));
+                }
+            }
+        }
+        return instance;
+    }
+
+    /**
+     * @param modifications 开始 dump 之前的 InstrumentationUtils#getClassModifications
+     * @return dump 之后字节码没有被修改过、文件也没有变化时返回上次 dump 的文件，否则返回 null
+     */
+    synchronized File getDump(Class<?> clazz, long modifications) {
+        DumpEntry entry = dumps.get(clazz);
+        if (entry == null) {
+            return null;
+        }
+        if (entry.modifications != modifications || entry.file.length() != entry.length
+                || entry.file.lastModified() != entry.lastModified) {
+            dumps.remove(clazz);
+            return null;
+        }
+        return entry.file;
+    }
+
+    synchronized void putDump(Class<?> clazz, File file, long modifications) {
+        dumps.put(clazz, new DumpEntry(file, modifications));
+    }
+
+    /**
+     * 用所有 dump 出来的 class 文件（外部类和内部类）的内容和反编译参数计算 key，cfr 反编译时会读取内部类
+     *
+     * @return 读取文件失败时返回 null，不使用缓存
+     */
+    static String sourceKey(Map<Class<?>, File> classFiles, String methodName, boolean hideUnicode) {
+        try {
+            MessageDigest digest = MessageDigest.getInstance("SHA-1");
+            // 按类名排序，保证同样的字节码得到同样的 key
+            Map<String, File> sorted = new TreeMap<String, File>();
+            for (Map.Entry<Class<?>, File> entry : classFiles.entrySet()) {
+                sorted.put(entry.getKey().getName(), entry.getValue());
+            }
+            for (Map.Entry<String, File> entry : sorted.entrySet()) {
+                digest.update(entry.getKey().getBytes(UTF_8));
+                digest.update((byte) 0);
+                digest.update(readFile(entry.getValue()));
+                digest.update((byte) 0);
+            }
+            digest.update((CACHE_VERSION + "\0" + (methodName == null ? "" : methodName) + "\0" + hideUnicode)
+                    .getBytes(UTF_8));
+            return toHex(digest.digest());
+        } catch (IOException e) {
+            logger.warn("read class file error, skip jad cache", e);
+            return null;
+        } catch (NoSuchAlgorithmException e) {
+            return null;
+        }
+    }
+
+    /**
+     * 先查内存，再查磁盘，磁盘命中时放回内存
+     */
+    String getSource(String key) {
+        synchronized (this) {
+            String source = sources.get(key);
+            if (source != null) {
+                return source;
+            }
+        }
+        File file = new File(directory, key + SUFFIX);
+        if (!file.isFile()) {
+            return null;
+        }
+        try {
+            String source = FileUtils.readFileToString(file, UTF_8);
+            // 淘汰磁盘缓存时按修改时间，命中时更新一下
+            file.setLastModified(System.currentTimeMillis());
+            synchronized (this) {
+                sources.put(key, source);
+            }
+            return source;
+        } catch (IOException e) {
+            logger.warn("read jad cache file error: {}", file, e);
+            return null;
+        }
+    }
+
+    void putSource(String key, String source) {
+        synchronized (this) {
+            sources.put(key, source);
+        }
+        if (!directory.mkdirs() && !directory.isDirectory()) {
+            logger.warn("create jad cache directory: {} failed.", directory);
+            return;
+        }
+        // 先写临时文件再改名，其它进程不会读到写了一半的文件
+        File tmp = new File(directory, key + SUFFIX + ".tmp");
+        File file = new File(directory, key + SUFFIX);
+        try {
+            FileUtils.writeByteArrayToFile(tmp, source.getBytes(UTF_8));
+            if (!tmp.renameTo(file)) {
+                file.delete();
+                if (!tmp.renameTo(file)) {
+                    tmp.delete();
+                    return;
+                }
+            }
+        } catch (IOException e) {
+            logger.warn("write jad cache file error: {}", file, e);
+            tmp.delete();
+            return;
+        }
+        evictDiskEntries();
+    }
+
+    /**
+     * 磁盘上的缓存超过 MAX_DISK_ENTRIES 时删除最旧的文件
+     */
+    private void evictDiskEntries() {
+        File[] files = directory.listFiles();
+        if (files == null || files.length <= MAX_DISK_ENTRIES) {
+            return;
+        }
+        Arrays.sort(files, new Comparator<File>() {
+            @Override
+            public int compare(File f1, File f2) {
+                long m1 = f1.lastModified();
+                long m2 = f2.lastModified();
+                return m1 < m2 ? -1 : (m1 == m2 ? 0 : 1);
+            }
+        });
+        for (int i = 0; i < files.length - MAX_DISK_ENTRIES; i++) {
+            files[i].delete();
+        }
+    }
+
+    private static byte[] readFile(File file) throws IOException {
+        InputStream in = new FileInputStream(file);
+        try {
+            return IOUtils.toByteArray(in);
+        } finally {
+            in.close();
+        }
+    }
+
+    private static String toHex(byte[] bytes) {
+        StringBuilder sb = new StringBuilder(bytes.length * 2);
+        for (byte b : bytes) {
+            sb.append(Character.forDigit((b >> 4) & 0xF, 16)).append(Character.forDigit(b & 0xF, 16));
+        }
+        return sb.toString();
+    }
+
+    private static class DumpEntry {
+        private final File file;
+        private final long length;
+        private final long lastModified;
+        private final long modifications;
+
+        DumpEntry(File file, long modifications) {
+            this.file = file;
+            this.length = file.length();
+            this.lastModified = file.lastModified();
+            this.modifications = modifications;
+        }
+    }
+}
@@ -28,6 +28,7 @@ import com.taobao.middleware.cli.annotations.Summary;
 
 import java.io.File;
 import java.lang.instrument.Instrumentation;
+import java.util.HashMap;
 import java.util.HashSet;
 import java.util.List;
 import java.util.Map;
@@ -58,6 +59,7 @@ public class JadCommand extends AnnotatedCommand {
     private String classLoaderClass;
     private boolean isRegEx = false;
     private boolean hideUnicode = false;
+    private boolean noCache = false;
 
     /**
      * jad output source code only
@@ -101,6 +103,12 @@ public class JadCommand extends AnnotatedCommand {
         this.hideUnicode = hideUnicode;
     }
 
+    @Option(longName = "no-cache", flag = true)
+    @Description("Always retransform and decompile the class, ignore the cached dump and source")
+    public void setNoCache(boolean noCache) {
+        this.noCache = noCache;
+    }
+
     @Option(longName = "source-only", flag = true)
     @Description("Output source code only")
     public void setSourceOnly(boolean sourceOnly) {
@@ -162,17 +170,22 @@ public class JadCommand extends AnnotatedCommand {
         allClasses.add(c);
 
         try {
-            ClassDumpTransformer transformer = new ClassDumpTransformer(allClasses);
-            InstrumentationUtils.retransformClasses(inst, transformer, allClasses);
-
-            Map<Class<?>, File> classFiles = transformer.getDumpResult();
+            Map<Class<?>, File> classFiles = dumpClasses(inst, allClasses);
             File classFile = classFiles.get(c);
 
-            String source = Decompiler.decompile(classFile.getAbsolutePath(), methodName, hideUnicode);
-            if (source != null) {
-                source = pattern.matcher(source).replaceAll("");
-            } else {
-                source = "unknown";
+            JadCache cache = JadCache.getInstance();
+            String cacheKey = noCache ? null : JadCache.sourceKey(classFiles, methodName, hideUnicode);
+            String source = cacheKey == null ? null : cache.getSource(cacheKey);
+            if (source == null) {
+                source = Decompiler.decompile(classFile.getAbsolutePath(), methodName, hideUnicode);
+                if (source != null) {
+                    source = pattern.matcher(source).replaceAll("");
+                    if (cacheKey != null) {
+                        cache.putSource(cacheKey, source);
+                    }
+                } else {
+                    source = "unknown";
+                }
             }
 
             JadModel jadModel = new JadModel();
@@ -191,6 +204,35 @@ public class JadCommand extends AnnotatedCommand {
         }
     }
 
+    /**
+     * arthas 没有再修改过字节码的类直接使用上次 dump 的文件，其它的类 retransform 一次 dump 出来
+     */
+    private Map<Class<?>, File> dumpClasses(Instrumentation inst, Set<Class<?>> allClasses) {
+        JadCache cache = JadCache.getInstance();
+        // 必须在 retransform 之前读取，dump 过程中类被修改时下次就不会命中
+        long modifications = InstrumentationUtils.getClassModifications();
+        Map<Class<?>, File> classFiles = new HashMap<Class<?>, File>();
+        Set<Class<?>> toDump = new HashSet<Class<?>>();
+        for (Class<?> clazz : allClasses) {
+            File file = noCache ? null : cache.getDump(clazz, modifications);
+            if (file != null) {
+                classFiles.put(clazz, file);
+            } else {
+                toDump.add(clazz);
+            }
+        }
+
+        if (!toDump.isEmpty()) {
+            ClassDumpTransformer transformer = new ClassDumpTransformer(toDump);
+            InstrumentationUtils.retransformClasses(inst, transformer, toDump);
+            for (Map.Entry<Class<?>, File> entry : transformer.getDumpResult().entrySet()) {
+                cache.putDump(entry.getKey(), entry.getValue(), modifications);
+                classFiles.put(entry.getKey(), entry.getValue());
+            }
+        }
+        return classFiles;
+    }
+
     private ExitStatus processMatches(CommandProcess process, Set<Class<?>> matchedClasses) {
 
         String usage = "jad -c <hashcode> " + classPattern;
@@ -4,6 +4,7 @@ import java.io.File;
 import java.lang.instrument.Instrumentation;
 import java.nio.charset.Charset;
 import java.util.ArrayList;
+import java.util.LinkedHashMap;
 import java.util.List;
 import java.util.Map;
 import java.util.Map.Entry;
@@ -20,6 +21,7 @@ import com.taobao.arthas.core.shell.cli.Completion;
 import com.taobao.arthas.core.shell.cli.CompletionUtils;
 import com.taobao.arthas.core.shell.command.AnnotatedCommand;
 import com.taobao.arthas.core.shell.command.CommandProcess;
+import com.taobao.arthas.core.shell.session.Session;
 import com.taobao.arthas.core.util.ClassLoaderUtils;
 import com.taobao.arthas.core.util.FileUtils;
 import com.taobao.arthas.core.util.ClassUtils;
@@ -38,13 +40,26 @@ import com.taobao.middleware.cli.annotations.Summary;
  */
 @Name("mc")
 @Summary("Memory compiler, compiles java files into bytecode and class files in memory.")
-@Description(Constants.EXAMPLE + "  mc /tmp/Test.java\n" + "  mc -c 327a647b /tmp/Test.java\n"
+@Description("Compiling the same source files with the same ClassLoader again in a session reuses the last result,\n"
+                + "if any of the files changed, all of them are compiled again.\n"
+                + Constants.EXAMPLE + "  mc /tmp/Test.java\n" + "  mc -c 327a647b /tmp/Test.java\n"
                 + "  mc -d /tmp/output /tmp/ClassA.java /tmp/ClassB.java\n" + Constants.WIKI + Constants.WIKI_HOME
                 + "mc")
 public class MemoryCompilerCommand extends AnnotatedCommand {
 
     private static final Logger logger = LoggerFactory.getLogger(MemoryCompilerCommand.class);
 
+    private static final int MAX_COMPILERS = 4;
+
+    /**
+     * <pre>
+     * 每个 session 里每个 ClassLoader 一个 DynamicCompiler，复用 package 索引和上次的编译结果，
+     * mc + redefine 反复修改同一个类时不需要每次重新扫描 ClassLoader。最多保留最近使用的 MAX_COMPILERS 个。
+     * DynamicCompiler 会强引用 ClassLoader，保存在 session 里，session 结束之后 ClassLoader 可以被回收。
+     * </pre>
+     */
+    private static final String SESSION_COMPILERS = "mc-compilers";
+
     private String directory;
     private String hashCode;
     private String classLoaderClass;
@@ -118,23 +133,31 @@ public class MemoryCompilerCommand extends AnnotatedCommand {
                 }
             }
 
-            DynamicCompiler dynamicCompiler = new DynamicCompiler(classloader);
+            DynamicCompiler dynamicCompiler = getCompiler(process.session(), classloader);
 
             Charset charset = Charset.defaultCharset();
             if (encoding != null) {
                 charset = Charset.forName(encoding);
             }
 
+            // 先读取所有的源文件，读取失败时不会在共享的 compiler 里留下一半的源文件
+            Map<String, String> sources = new LinkedHashMap<String, String>();
             for (String sourceFile : sourcefiles) {
                 String sourceCode = FileUtils.readFileToString(new File(sourceFile), charset);
                 String name = new File(sourceFile).getName();
                 if (name.endsWith(".java")) {
                     name = name.substring(0, name.length() - ".java".length());
                 }
-                dynamicCompiler.addSource(name, sourceCode);
+                sources.put(name, sourceCode);
             }
 
-            Map<String, byte[]> byteCodes = dynamicCompiler.buildByteCodes();
+            Map<String, byte[]> byteCodes;
+            synchronized (dynamicCompiler) {
+                for (Entry<String, String> source : sources.entrySet()) {
+                    dynamicCompiler.addSource(source.getKey(), source.getValue());
+                }
+                byteCodes = dynamicCompiler.buildByteCodes();
+            }
 
             File outputDir = null;
             if (this.directory != null) {
@@ -160,6 +183,32 @@ public class MemoryCompilerCommand extends AnnotatedCommand {
         }
     }
 
+    private static DynamicCompiler getCompiler(Session session, ClassLoader classLoader) {
+        Map<ClassLoader, DynamicCompiler> compilers;
+        synchronized (session) {
+            compilers = session.get(SESSION_COMPILERS);
+            if (compilers == null) {
+                compilers = new LinkedHashMap<ClassLoader, DynamicCompiler>(16, 0.75f, true) {
+                    private static final long serialVersionUID = 1L;
+
+                    @Override
+                    protected boolean removeEldestEntry(Map.Entry<ClassLoader, DynamicCompiler> eldest) {
+                        return size() > MAX_COMPILERS;
+                    }
+                };
+                session.put(SESSION_COMPILERS, compilers);
+            }
+        }
+        synchronized (compilers) {
+            DynamicCompiler compiler = compilers.get(classLoader);
+            if (compiler == null) {
+                compiler = new DynamicCompiler(classLoader);
+                compilers.put(classLoader, compiler);
+            }
+            return compiler;
+        }
+    }
+
     @Override
     public void complete(Completion completion) {
         if (!CompletionUtils.completeFilePath(completion)) {
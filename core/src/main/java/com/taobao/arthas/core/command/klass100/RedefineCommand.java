@@ -23,6 +23,7 @@ import com.taobao.arthas.core.shell.command.AnnotatedCommand;
 import com.taobao.arthas.core.shell.command.CommandProcess;
 import com.taobao.arthas.core.util.ClassUtils;
 import com.taobao.arthas.core.util.ClassLoaderUtils;
+import com.taobao.arthas.core.util.InstrumentationUtils;
 import com.taobao.middleware.cli.annotations.Argument;
 import com.taobao.middleware.cli.annotations.Description;
 import com.taobao.middleware.cli.annotations.Name;
@@ -157,7 +158,11 @@ public class RedefineCommand extends AnnotatedCommand {
                 process.end(-1, "These classes are not found in the JVM and may not be loaded: " + bytesMap.keySet());
                 return;
             }
-            inst.redefineClasses(definitions.toArray(new ClassDefinition[0]));
+            try {
+                inst.redefineClasses(definitions.toArray(new ClassDefinition[0]));
+            } finally {
+                InstrumentationUtils.markClassesModified();
+            }
             process.appendResult(redefineModel);
             process.end();
         } catch (Throwable e) {
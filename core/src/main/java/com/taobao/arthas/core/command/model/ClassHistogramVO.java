@@ -0,0 +1,43 @@
+package com.taobao.arthas.core.command.model;
+
+/**
+ * One row of the class histogram, used by 'heapdump --histo'
+ */
+public class ClassHistogramVO {
+    private String className;
+    private long instances;
+    private long bytes;
+
+    public ClassHistogramVO() {
+    }
+
+    public ClassHistogramVO(String className, long instances, long bytes) {
+        this.className = className;
+        this.instances = instances;
+        this.bytes = bytes;
+    }
+
+    public String getClassName() {
+        return className;
+    }
+
+    public void setClassName(String className) {
+        this.className = className;
+    }
+
+    public long getInstances() {
+        return instances;
+    }
+
+    public void setInstances(long instances) {
+        this.instances = instances;
+    }
+
+    public long getBytes() {
+        return bytes;
+    }
+
+    public void setBytes(long bytes) {
+        this.bytes = bytes;
+    }
+}
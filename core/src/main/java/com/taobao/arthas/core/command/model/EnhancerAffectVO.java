@@ -12,6 +12,7 @@ import java.util.List;
  * @author gongdewei 2020/6/22
  */
 public class EnhancerAffectVO {
+    private static final long SLOW_ENHANCE_MILLIS = 1000;
 
     private final long cost;
     private final int methodCount;
@@ -20,6 +21,7 @@ public class EnhancerAffectVO {
     private Throwable throwable;
     private List<String> classDumpFiles;
     private List<String> methods;
+    private EnhancerPhaseCost phaseCost;
 
     public EnhancerAffectVO(EnhancerAffect affect) {
         this.cost = affect.cost();
@@ -39,6 +41,11 @@ public class EnhancerAffectVO {
             methods = new ArrayList<String>();
             methods.addAll(affect.getMethods());
         }
+
+        // 增强比较慢的时候，输出各个阶段的耗时
+        if (GlobalOptions.verbose || cost >= SLOW_ENHANCE_MILLIS) {
+            phaseCost = new EnhancerPhaseCost(affect);
+        }
     }
 
     public EnhancerAffectVO(long cost, int methodCount, int classCount, long listenerId) {
@@ -80,6 +87,14 @@ public class EnhancerAffectVO {
         this.classDumpFiles = classDumpFiles;
     }
 
+    public EnhancerPhaseCost getPhaseCost() {
+        return phaseCost;
+    }
+
+    public void setPhaseCost(EnhancerPhaseCost phaseCost) {
+        this.phaseCost = phaseCost;
+    }
+
     public List<String> getMethods() {
         return methods;
     }
@@ -87,4 +102,55 @@ public class EnhancerAffectVO {
     public void setMethods(List<String> methods) {
         this.methods = methods;
     }
+
+    /**
+     * 增强各个阶段的耗时(ms)
+     */
+    public static class EnhancerPhaseCost {
+        private final long search;
+        private final long analyze;
+        private final long weave;
+        private final long retransform;
+        private final int batches;
+        private final int threads;
+        private final int attached;
+
+        public EnhancerPhaseCost(EnhancerAffect affect) {
+            this.search = affect.getSearchCost();
+            this.analyze = affect.getAnalyzeCost();
+            this.weave = affect.getWeaveCost();
+            this.retransform = affect.getRetransformCost();
+            this.batches = affect.getRetransformBatches();
+            this.threads = affect.getRetransformThreads();
+            this.attached = affect.getAttachedClasses();
+        }
+
+        public long getSearch() {
+            return search;
+        }
+
+        public long getAnalyze() {
+            return analyze;
+        }
+
+        public long getWeave() {
+            return weave;
+        }
+
+        public long getRetransform() {
+            return retransform;
+        }
+
+        public int getBatches() {
+            return batches;
+        }
+
+        public int getThreads() {
+            return threads;
+        }
+
+        public int getAttached() {
+            return attached;
+        }
+    }
 }
@@ -1,5 +1,7 @@
 package com.taobao.arthas.core.command.model;
 
+import java.util.List;
+
 /**
  * Model of `heapdump` command
  * @author gongdewei 2020/4/24
@@ -10,6 +12,24 @@ public class HeapDumpModel extends ResultModel {
 
     private boolean live;
 
+    /**
+     * gzip 压缩之后的文件，分片时有多个
+     */
+    private List<String> chunks;
+
+    private long compressedBytes;
+
+    /**
+     * heapdump --histo 的结果
+     */
+    private List<ClassHistogramVO> histogram;
+
+    private int classCount;
+
+    private long totalInstances;
+
+    private long totalBytes;
+
     public HeapDumpModel() {
     }
 
@@ -34,6 +54,54 @@ public class HeapDumpModel extends ResultModel {
         this.live = live;
     }
 
+    public List<String> getChunks() {
+        return chunks;
+    }
+
+    public void setChunks(List<String> chunks) {
+        this.chunks = chunks;
+    }
+
+    public long getCompressedBytes() {
+        return compressedBytes;
+    }
+
+    public void setCompressedBytes(long compressedBytes) {
+        this.compressedBytes = compressedBytes;
+    }
+
+    public List<ClassHistogramVO> getHistogram() {
+        return histogram;
+    }
+
+    public void setHistogram(List<ClassHistogramVO> histogram) {
+        this.histogram = histogram;
+    }
+
+    public int getClassCount() {
+        return classCount;
+    }
+
+    public void setClassCount(int classCount) {
+        this.classCount = classCount;
+    }
+
+    public long getTotalInstances() {
+        return totalInstances;
+    }
+
+    public void setTotalInstances(long totalInstances) {
+        this.totalInstances = totalInstances;
+    }
+
+    public long getTotalBytes() {
+        return totalBytes;
+    }
+
+    public void setTotalBytes(long totalBytes) {
+        this.totalBytes = totalBytes;
+    }
+
     @Override
     public String getType() {
         return "heapdump";
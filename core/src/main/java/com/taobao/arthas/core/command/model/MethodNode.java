@@ -34,6 +34,10 @@ public class MethodNode extends TraceNode {
     private long maxCost = Long.MIN_VALUE;
     private long totalCost = 0;
     private long times = 0;
+    /**
+     * trace --aggregate 时多次调用的 p99 耗时
+     */
+    private Long p99Cost;
 
 
     public MethodNode(String className, String methodName, int lineNumber, boolean isInvoking) {
@@ -66,6 +70,14 @@ public class MethodNode extends TraceNode {
         return endTimestamp - beginTimestamp;
     }
 
+    public void setBeginTimestamp(long beginTimestamp) {
+        this.beginTimestamp = beginTimestamp;
+    }
+
+    public void setEndTimestamp(long endTimestamp) {
+        this.endTimestamp = endTimestamp;
+    }
+
     public String getClassName() {
         return className;
     }
@@ -138,6 +150,14 @@ public class MethodNode extends TraceNode {
         this.times = times;
     }
 
+    public Long getP99Cost() {
+        return p99Cost;
+    }
+
+    public void setP99Cost(Long p99Cost) {
+        this.p99Cost = p99Cost;
+    }
+
     public boolean isInvoking() {
         return isInvoking;
     }
@@ -1,6 +1,7 @@
 package com.taobao.arthas.core.command.model;
 
 import java.util.Collection;
+import java.util.List;
 
 /**
  * Data model of ProfilerCommand
@@ -14,6 +15,7 @@ public class ProfilerModel extends ResultModel {
     private Collection<String> supportedActions;
     private String outputFile;
     private Long duration;
+    private List<ProfilerWindowVO> windows;
 
     public ProfilerModel() {
     }
@@ -74,4 +76,12 @@ public class ProfilerModel extends ResultModel {
     public void setDuration(Long duration) {
         this.duration = duration;
     }
+
+    public List<ProfilerWindowVO> getWindows() {
+        return windows;
+    }
+
+    public void setWindows(List<ProfilerWindowVO> windows) {
+        this.windows = windows;
+    }
 }
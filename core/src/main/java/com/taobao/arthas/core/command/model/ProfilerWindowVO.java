@@ -0,0 +1,75 @@
+package com.taobao.arthas.core.command.model;
+
+import java.util.Date;
+
+/**
+ * One window kept by continuous profiling, used by 'profiler history'
+ */
+public class ProfilerWindowVO {
+    private long id;
+    private Date startTime;
+    private Date endTime;
+    private String event;
+    private long samples;
+    private int compressedBytes;
+
+    public ProfilerWindowVO() {
+    }
+
+    public ProfilerWindowVO(long id, Date startTime, Date endTime, String event, long samples, int compressedBytes) {
+        this.id = id;
+        this.startTime = startTime;
+        this.endTime = endTime;
+        this.event = event;
+        this.samples = samples;
+        this.compressedBytes = compressedBytes;
+    }
+
+    public long getId() {
+        return id;
+    }
+
+    public void setId(long id) {
+        this.id = id;
+    }
+
+    public Date getStartTime() {
+        return startTime;
+    }
+
+    public void setStartTime(Date startTime) {
+        this.startTime = startTime;
+    }
+
+    public Date getEndTime() {
+        return endTime;
+    }
+
+    public void setEndTime(Date endTime) {
+        this.endTime = endTime;
+    }
+
+    public String getEvent() {
+        return event;
+    }
+
+    public void setEvent(String event) {
+        this.event = event;
+    }
+
+    public long getSamples() {
+        return samples;
+    }
+
+    public void setSamples(long samples) {
+        this.samples = samples;
+    }
+
+    public int getCompressedBytes() {
+        return compressedBytes;
+    }
+
+    public void setCompressedBytes(int compressedBytes) {
+        this.compressedBytes = compressedBytes;
+    }
+}
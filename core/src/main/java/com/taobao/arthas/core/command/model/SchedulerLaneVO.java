@@ -0,0 +1,115 @@
+package com.taobao.arthas.core.command.model;
+
+/**
+ * Queue stats of one priority lane of the command scheduler, used by 'session' command
+ */
+public class SchedulerLaneVO {
+    private String priority;
+    private int queueDepth;
+    private int sessions;
+    private long submitted;
+    private long completed;
+    private long rejected;
+    /**
+     * 排队等待耗时，单位是微秒
+     */
+    private long waitP50;
+    private long waitP99;
+    private long waitMax;
+    /**
+     * 执行耗时，单位是微秒
+     */
+    private long runP99;
+    private long runMax;
+
+    public SchedulerLaneVO() {
+    }
+
+    public String getPriority() {
+        return priority;
+    }
+
+    public void setPriority(String priority) {
+        this.priority = priority;
+    }
+
+    public int getQueueDepth() {
+        return queueDepth;
+    }
+
+    public void setQueueDepth(int queueDepth) {
+        this.queueDepth = queueDepth;
+    }
+
+    public int getSessions() {
+        return sessions;
+    }
+
+    public void setSessions(int sessions) {
+        this.sessions = sessions;
+    }
+
+    public long getSubmitted() {
+        return submitted;
+    }
+
+    public void setSubmitted(long submitted) {
+        this.submitted = submitted;
+    }
+
+    public long getCompleted() {
+        return completed;
+    }
+
+    public void setCompleted(long completed) {
+        this.completed = completed;
+    }
+
+    public long getRejected() {
+        return rejected;
+    }
+
+    public void setRejected(long rejected) {
+        this.rejected = rejected;
+    }
+
+    public long getWaitP50() {
+        return waitP50;
+    }
+
+    public void setWaitP50(long waitP50) {
+        this.waitP50 = waitP50;
+    }
+
+    public long getWaitP99() {
+        return waitP99;
+    }
+
+    public void setWaitP99(long waitP99) {
+        this.waitP99 = waitP99;
+    }
+
+    public long getWaitMax() {
+        return waitMax;
+    }
+
+    public void setWaitMax(long waitMax) {
+        this.waitMax = waitMax;
+    }
+
+    public long getRunP99() {
+        return runP99;
+    }
+
+    public void setRunP99(long runP99) {
+        this.runP99 = runP99;
+    }
+
+    public long getRunMax() {
+        return runMax;
+    }
+
+    public void setRunMax(long runMax) {
+        this.runMax = runMax;
+    }
+}
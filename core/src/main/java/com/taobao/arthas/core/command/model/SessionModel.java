@@ -1,5 +1,7 @@
 package com.taobao.arthas.core.command.model;
 
+import java.util.List;
+
 /**
  * Session command result model
  *
@@ -12,6 +14,7 @@ public class SessionModel extends ResultModel {
     private String agentId;
     private String tunnelServer;
     private String statUrl;
+    private List<SchedulerLaneVO> scheduler;
 
     @Override
     public String getType() {
@@ -57,4 +60,12 @@ public class SessionModel extends ResultModel {
     public void setStatUrl(String statUrl) {
         this.statUrl = statUrl;
     }
+
+    public List<SchedulerLaneVO> getScheduler() {
+        return scheduler;
+    }
+
+    public void setScheduler(List<SchedulerLaneVO> scheduler) {
+        this.scheduler = scheduler;
+    }
 }
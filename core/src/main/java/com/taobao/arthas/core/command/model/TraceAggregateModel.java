@@ -0,0 +1,70 @@
+package com.taobao.arthas.core.command.model;
+
+import java.util.Date;
+import java.util.List;
+
+/**
+ * Data model of TraceCommand with --aggregate, the merged call trees of one cycle
+ */
+public class TraceAggregateModel extends ResultModel {
+    private Date timestamp;
+    private int cycle;
+    private long invocations;
+    private List<TraceNode> nodes;
+    private String exportFile;
+
+    public TraceAggregateModel() {
+    }
+
+    public TraceAggregateModel(Date timestamp, int cycle, long invocations, List<TraceNode> nodes) {
+        this.timestamp = timestamp;
+        this.cycle = cycle;
+        this.invocations = invocations;
+        this.nodes = nodes;
+    }
+
+    @Override
+    public String getType() {
+        return "trace_aggregate";
+    }
+
+    public Date getTimestamp() {
+        return timestamp;
+    }
+
+    public void setTimestamp(Date timestamp) {
+        this.timestamp = timestamp;
+    }
+
+    public int getCycle() {
+        return cycle;
+    }
+
+    public void setCycle(int cycle) {
+        this.cycle = cycle;
+    }
+
+    public long getInvocations() {
+        return invocations;
+    }
+
+    public void setInvocations(long invocations) {
+        this.invocations = invocations;
+    }
+
+    public List<TraceNode> getNodes() {
+        return nodes;
+    }
+
+    public void setNodes(List<TraceNode> nodes) {
+        this.nodes = nodes;
+    }
+
+    public String getExportFile() {
+        return exportFile;
+    }
+
+    public void setExportFile(String exportFile) {
+        this.exportFile = exportFile;
+    }
+}
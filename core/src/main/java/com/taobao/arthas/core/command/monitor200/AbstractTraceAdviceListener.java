@@ -5,9 +5,17 @@ import com.alibaba.arthas.deps.org.slf4j.LoggerFactory;
 import com.taobao.arthas.core.advisor.Advice;
 import com.taobao.arthas.core.advisor.ArthasMethod;
 import com.taobao.arthas.core.advisor.AdviceListenerAdapter;
+import com.taobao.arthas.core.command.model.MessageModel;
+import com.taobao.arthas.core.command.model.TraceAggregateModel;
+import com.taobao.arthas.core.server.ArthasBootstrap;
 import com.taobao.arthas.core.shell.command.CommandProcess;
 import com.taobao.arthas.core.util.LogUtil;
 import com.taobao.arthas.core.util.ThreadLocalWatch;
+import com.taobao.arthas.core.util.scheduler.ScheduledTask;
+import com.taobao.arthas.core.util.scheduler.TaskPriority;
+
+import java.io.File;
+import java.util.concurrent.TimeUnit;
 
 /**
  * @author ralf0131 2017-01-06 16:02.
@@ -20,12 +28,21 @@ public class AbstractTraceAdviceListener extends AdviceListenerAdapter {
 
     protected final ThreadLocal<TraceEntity> threadBoundEntity = new ThreadLocal<TraceEntity>();
 
+    /**
+     * trace --aggregate 时合并所有调用的调用树，按周期输出
+     */
+    private TraceAggregator aggregator;
+    private ScheduledTask timer;
+
     /**
      * Constructor
      */
     public AbstractTraceAdviceListener(TraceCommand command, CommandProcess process) {
         this.command = command;
         this.process = process;
+        if (command.getAggregate() > 0) {
+            this.aggregator = new TraceAggregator();
+        }
     }
 
     protected TraceEntity threadLocalTraceEntity(ClassLoader loader) {
@@ -38,15 +55,36 @@ public class AbstractTraceAdviceListener extends AdviceListenerAdapter {
     }
 
     @Override
-    public void destroy() {
+    public synchronized void create() {
+        if (aggregator != null && timer == null) {
+            long cycle = command.getAggregate() * 1000L;
+            timer = ArthasBootstrap.getInstance().getCommandScheduler().scheduleAtFixedRate(
+                    process.session().getSessionId(), TaskPriority.PERIODIC, new AggregateTimer(), cycle, cycle,
+                    TimeUnit.MILLISECONDS);
+        }
+    }
+
+    @Override
+    public synchronized void destroy() {
         threadBoundEntity.remove();
+        cancelTimer();
+    }
+
+    private synchronized void cancelTimer() {
+        if (timer != null) {
+            timer.cancel();
+            timer = null;
+        }
     }
 
     @Override
     public void before(ClassLoader loader, Class<?> clazz, ArthasMethod method, Object target, Object[] args)
             throws Throwable {
         TraceEntity traceEntity = threadLocalTraceEntity(loader);
-        traceEntity.tree.begin(clazz.getName(), method.getName(), -1, false);
+        if (traceEntity.deep == 0) {
+            traceEntity.start(loader);
+        }
+        traceEntity.begin(clazz.getName(), method.getName(), -1, false);
         traceEntity.deep++;
         // 开始计算本次方法调用耗时
         threadLocalWatch.start();
@@ -55,7 +93,7 @@ public class AbstractTraceAdviceListener extends AdviceListenerAdapter {
     @Override
     public void afterReturning(ClassLoader loader, Class<?> clazz, ArthasMethod method, Object target, Object[] args,
                                Object returnObject) throws Throwable {
-        threadLocalTraceEntity(loader).tree.end();
+        threadLocalTraceEntity(loader).end();
         final Advice advice = Advice.newForAfterRetuning(loader, clazz, method, target, args, returnObject);
         finishing(loader, advice);
     }
@@ -63,8 +101,7 @@ public class AbstractTraceAdviceListener extends AdviceListenerAdapter {
     @Override
     public void afterThrowing(ClassLoader loader, Class<?> clazz, ArthasMethod method, Object target, Object[] args,
                               Throwable throwable) throws Throwable {
-        int lineNumber = throwable.getStackTrace()[0].getLineNumber();
-        threadLocalTraceEntity(loader).tree.end(throwable, lineNumber);
+        threadLocalTraceEntity(loader).end(throwable);
         final Advice advice = Advice.newForAfterThrowing(loader, clazz, method, target, args, throwable);
         finishing(loader, advice);
     }
@@ -83,11 +120,14 @@ public class AbstractTraceAdviceListener extends AdviceListenerAdapter {
                 if (this.isVerbose()) {
                     process.write("Condition express: " + command.getConditionExpress() + " , result: " + conditionResult + "\n");
                 }
-                if (conditionResult) {
+                if (conditionResult && aggregator != null) {
+                    // 合并到聚合调用树，按周期输出
+                    aggregator.merge(traceEntity);
+                } else if (conditionResult) {
                     // 满足输出条件
                     process.times().incrementAndGet();
                     // TODO: concurrency issues for process.write
-                    process.appendResult(traceEntity.getModel());
+                    appendResult(process, traceEntity.getModel());
 
                     // 是否到达数量限制
                     if (isLimitExceeded(command.getNumberOfLimit(), process.times().get())) {
@@ -100,8 +140,36 @@ public class AbstractTraceAdviceListener extends AdviceListenerAdapter {
                 process.end(1, "trace failed, condition is: " + command.getConditionExpress() + ", " + e.getMessage()
                               + ", visit " + LogUtil.loggingFile() + " for more details.");
             } finally {
-                threadBoundEntity.remove();
+                // 保留数组给这个线程的下一次调用复用
+                traceEntity.reset();
+            }
+        }
+    }
+
+    private class AggregateTimer implements Runnable {
+        @Override
+        public void run() {
+            TraceAggregateModel model = aggregator.snapshotAndReset(command.getAggregate());
+            if (model.getInvocations() == 0) {
+                return;
+            }
+            // 超过次数上限，则不再输出，命令终止
+            if (process.times().getAndIncrement() >= command.getNumberOfLimit()) {
+                cancelTimer();
+                abortProcess(process, command.getNumberOfLimit());
+                return;
+            }
+            if (command.getExportFile() != null) {
+                File file = new File(command.getExportFile());
+                try {
+                    TraceAggregator.exportCollapsed(model.getNodes(), file);
+                    model.setExportFile(file.getAbsolutePath());
+                } catch (Throwable e) {
+                    logger.warn("export collapsed stacks failed.", e);
+                    process.appendResult(new MessageModel("export collapsed stacks failed: " + e.getMessage()));
+                }
             }
+            process.appendResult(model);
         }
     }
 }
@@ -0,0 +1,263 @@
+package com.taobao.arthas.core.command.monitor200;
+
+import java.io.ByteArrayInputStream;
+import java.io.ByteArrayOutputStream;
+import java.io.IOException;
+import java.io.InputStream;
+import java.text.ParseException;
+import java.text.SimpleDateFormat;
+import java.util.ArrayList;
+import java.util.Calendar;
+import java.util.Date;
+import java.util.List;
+import java.util.concurrent.TimeUnit;
+import java.util.zip.GZIPInputStream;
+import java.util.zip.GZIPOutputStream;
+
+import com.alibaba.arthas.deps.org.slf4j.Logger;
+import com.alibaba.arthas.deps.org.slf4j.LoggerFactory;
+import com.taobao.arthas.core.server.ArthasBootstrap;
+import com.taobao.arthas.core.util.scheduler.ScheduledTask;
+import com.taobao.arthas.core.util.scheduler.TaskPriority;
+
+import one.profiler.AsyncProfiler;
+import one.profiler.Counter;
+
+/**
+ * <pre>
+ * 持续 profiling：async-profiler 按固定的时间窗口运行，每个窗口结束时 dump collapsed stacks，
+ * gzip 压缩之后放到内存里的环形队列，然后重新开始下一个窗口。
+ * 出现问题之后可以用 profiler history/diff 查看或者比较之前的窗口。
+ *
+ * 每个窗口只在切换的时候 dump 一次，开销和普通的 profiler start 一样是稳定的。
+ * </pre>
+ */
+class ContinuousProfiler {
+    private static final Logger logger = LoggerFactory.getLogger(ContinuousProfiler.class);
+
+    private final AsyncProfiler profiler;
+    private final String startArgs;
+    private final String event;
+    private final long windowSeconds;
+    private final ProfileWindow[] ring;
+
+    private int count;
+    private long nextId = 1;
+    private long lastId;
+    private long windowStart;
+    private boolean running;
+    private ScheduledTask task;
+
+    ContinuousProfiler(AsyncProfiler profiler, String startArgs, String event, long windowSeconds, int maxWindows) {
+        this.profiler = profiler;
+        this.startArgs = startArgs;
+        this.event = event;
+        this.windowSeconds = windowSeconds;
+        this.ring = new ProfileWindow[maxWindows];
+    }
+
+    synchronized String start() throws IOException {
+        String result = profiler.execute(startArgs);
+        windowStart = System.currentTimeMillis();
+        running = true;
+        task = ArthasBootstrap.getInstance().getCommandScheduler().scheduleAtFixedRate(null, TaskPriority.BACKGROUND,
+                new Runnable() {
+                    @Override
+                    public void run() {
+                        rotate();
+                    }
+                }, windowSeconds, windowSeconds, TimeUnit.SECONDS);
+        return result;
+    }
+
+    /**
+     * 停止 profiling，当前的窗口也会保存下来，之后仍然可以查看历史
+     */
+    synchronized void stop() {
+        if (!running) {
+            return;
+        }
+        running = false;
+        if (task != null) {
+            task.cancel();
+            task = null;
+        }
+        try {
+            saveWindow();
+        } finally {
+            profiler.stop();
+        }
+    }
+
+    synchronized boolean isRunning() {
+        return running;
+    }
+
+    synchronized void rotate() {
+        if (!running) {
+            return;
+        }
+        try {
+            saveWindow();
+            // stop 之后再 start 会清空之前的数据
+            profiler.stop();
+            profiler.execute(startArgs);
+        } catch (Throwable e) {
+            logger.error("continuous profiler rotate window error, stop continuous profiling", e);
+            running = false;
+            if (task != null) {
+                task.cancel();
+                task = null;
+            }
+        }
+    }
+
+    private void saveWindow() {
+        long now = System.currentTimeMillis();
+        String collapsed = profiler.dumpCollapsed(Counter.SAMPLES);
+        try {
+            add(new ProfileWindow(nextId++, windowStart, now, event, collapsed));
+        } catch (IOException e) {
+            logger.error("compress profiler window error", e);
+        }
+        windowStart = now;
+    }
+
+    synchronized void add(ProfileWindow window) {
+        ring[(int) ((window.getId() - 1) % ring.length)] = window;
+        count = Math.min(count + 1, ring.length);
+        lastId = window.getId();
+    }
+
+    /**
+     * @return 保存的窗口，按时间从早到晚排序
+     */
+    synchronized List<ProfileWindow> windows() {
+        List<ProfileWindow> list = new ArrayList<ProfileWindow>(count);
+        for (long id = lastId - count + 1; id <= lastId; ++id) {
+            list.add(ring[(int) ((id - 1) % ring.length)]);
+        }
+        return list;
+    }
+
+    /**
+     * @param ref 窗口的 id，或者时间 HH:mm / HH:mm:ss，表示包含这个时间点的窗口
+     */
+    synchronized ProfileWindow find(String ref) {
+        List<ProfileWindow> windows = windows();
+        if (ref.matches("\\d+")) {
+            long id = Long.parseLong(ref);
+            for (ProfileWindow window : windows) {
+                if (window.getId() == id) {
+                    return window;
+                }
+            }
+            return null;
+        }
+        long time = parseTime(ref, System.currentTimeMillis());
+        for (ProfileWindow window : windows) {
+            if (window.getStartTime() <= time && time < window.getEndTime()) {
+                return window;
+            }
+        }
+        return null;
+    }
+
+    /**
+     * 把 HH:mm[:ss] 转换为最近一次的这个时间点，比当前时间晚的话认为是昨天
+     */
+    static long parseTime(String time, long now) {
+        String pattern = time.length() > 5 ? "HH:mm:ss" : "HH:mm";
+        Date parsed;
+        try {
+            parsed = new SimpleDateFormat(pattern).parse(time);
+        } catch (ParseException e) {
+            throw new IllegalArgumentException("window should be an id or a time like HH:mm or HH:mm:ss: " + time);
+        }
+        Calendar source = Calendar.getInstance();
+        source.setTime(parsed);
+        Calendar calendar = Calendar.getInstance();
+        calendar.setTimeInMillis(now);
+        calendar.set(Calendar.HOUR_OF_DAY, source.get(Calendar.HOUR_OF_DAY));
+        calendar.set(Calendar.MINUTE, source.get(Calendar.MINUTE));
+        calendar.set(Calendar.SECOND, source.get(Calendar.SECOND));
+        calendar.set(Calendar.MILLISECOND, 0);
+        if (calendar.getTimeInMillis() > now) {
+            calendar.add(Calendar.DAY_OF_MONTH, -1);
+        }
+        return calendar.getTimeInMillis();
+    }
+
+    synchronized String status() {
+        long bytes = 0;
+        for (ProfileWindow window : windows()) {
+            bytes += window.getCompressedBytes();
+        }
+        return "continuous profiling " + (running ? "running" : "stopped") + ", event: " + event + ", window: "
+                + windowSeconds + "s, windows: " + count + "/" + ring.length + ", compressed bytes: " + bytes;
+    }
+
+    /**
+     * 一个时间窗口的 collapsed stacks，gzip 压缩之后保存
+     */
+    static class ProfileWindow {
+        private final long id;
+        private final long startTime;
+        private final long endTime;
+        private final String event;
+        private final long samples;
+        private final byte[] data;
+
+        ProfileWindow(long id, long startTime, long endTime, String event, String collapsed) throws IOException {
+            this.id = id;
+            this.startTime = startTime;
+            this.endTime = endTime;
+            this.event = event;
+            this.samples = FlameGraph.totalSamples(collapsed);
+            ByteArrayOutputStream out = new ByteArrayOutputStream(collapsed.length() / 8 + 64);
+            GZIPOutputStream gzip = new GZIPOutputStream(out);
+            gzip.write(collapsed.getBytes("UTF-8"));
+            gzip.close();
+            this.data = out.toByteArray();
+        }
+
+        String collapsed() throws IOException {
+            InputStream in = new GZIPInputStream(new ByteArrayInputStream(data));
+            try {
+                ByteArrayOutputStream out = new ByteArrayOutputStream(data.length * 8);
+                byte[] buffer = new byte[8192];
+                int n;
+                while ((n = in.read(buffer)) != -1) {
+                    out.write(buffer, 0, n);
+                }
+                return out.toString("UTF-8");
+            } finally {
+                in.close();
+            }
+        }
+
+        long getId() {
+            return id;
+        }
+
+        long getStartTime() {
+            return startTime;
+        }
+
+        long getEndTime() {
+            return endTime;
+        }
+
+        String getEvent() {
+            return event;
+        }
+
+        long getSamples() {
+            return samples;
+        }
+
+        int getCompressedBytes() {
+            return data.length;
+        }
+    }
+}
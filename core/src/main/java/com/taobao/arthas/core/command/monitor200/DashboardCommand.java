@@ -9,8 +9,8 @@ import com.taobao.arthas.core.command.model.DashboardModel;
 import com.taobao.arthas.core.command.model.GcInfoVO;
 import com.taobao.arthas.core.command.model.MemoryEntryVO;
 import com.taobao.arthas.core.command.model.RuntimeInfoVO;
-import com.taobao.arthas.core.command.model.ThreadVO;
 import com.taobao.arthas.core.command.model.TomcatInfoVO;
+import com.taobao.arthas.core.server.ArthasBootstrap;
 import com.taobao.arthas.core.shell.command.AnnotatedCommand;
 import com.taobao.arthas.core.shell.command.CommandProcess;
 import com.taobao.arthas.core.shell.handlers.Handler;
@@ -18,8 +18,9 @@ import com.taobao.arthas.core.shell.handlers.shell.QExitHandler;
 import com.taobao.arthas.core.shell.session.Session;
 import com.taobao.arthas.core.util.NetUtils;
 import com.taobao.arthas.core.util.NetUtils.Response;
-import com.taobao.arthas.core.util.ThreadUtil;
 import com.taobao.arthas.core.util.metrics.SumRateCounter;
+import com.taobao.arthas.core.util.scheduler.ScheduledTask;
+import com.taobao.arthas.core.util.scheduler.TaskPriority;
 import com.taobao.middleware.cli.annotations.Description;
 import com.taobao.middleware.cli.annotations.Name;
 import com.taobao.middleware.cli.annotations.Option;
@@ -35,8 +36,7 @@ import java.util.ArrayList;
 import java.util.LinkedHashMap;
 import java.util.List;
 import java.util.Map;
-import java.util.Timer;
-import java.util.TimerTask;
+import java.util.concurrent.TimeUnit;
 
 import static com.taobao.arthas.core.command.model.MemoryEntryVO.TYPE_BUFFER_POOL;
 import static com.taobao.arthas.core.command.model.MemoryEntryVO.TYPE_HEAP;
@@ -64,9 +64,13 @@ public class DashboardCommand extends AnnotatedCommand {
     private int numOfExecutions = Integer.MAX_VALUE;
 
     private long interval = 5000;
+    /**
+     * 后台采样还没有启动时，第一次采样等待的时间
+     */
+    private static final long DEFAULT_SAMPLE_INTERVAL = 200;
 
     private volatile long count = 0;
-    private volatile Timer timer;
+    private volatile ScheduledTask timer;
 
     @Option(shortName = "n", longName = "number-of-execution")
     @Description("The number of times this command will be executed.")
@@ -84,11 +88,8 @@ public class DashboardCommand extends AnnotatedCommand {
     @Override
     public void process(final CommandProcess process) {
 
-        Session session = process.session();
-        timer = new Timer("Timer-for-arthas-dashboard-" + session.getSessionId(), true);
-
         // ctrl-C support
-        process.interruptHandler(new DashboardInterruptHandler(process, timer));
+        process.interruptHandler(new DashboardInterruptHandler(process, this));
 
         /*
          * 通过handle回调，在suspend和end时停止timer，resume时重启timer
@@ -114,13 +115,12 @@ public class DashboardCommand extends AnnotatedCommand {
         process.stdinHandler(new QExitHandler(process));
 
         // start the timer
-        timer.scheduleAtFixedRate(new DashboardTimerTask(process), 0, getInterval());
+        restart(process);
     }
 
     public synchronized void stop() {
         if (timer != null) {
             timer.cancel();
-            timer.purge();
             timer = null;
         }
     }
@@ -128,8 +128,8 @@ public class DashboardCommand extends AnnotatedCommand {
     public synchronized void restart(CommandProcess process) {
         if (timer == null) {
             Session session = process.session();
-            timer = new Timer("Timer-for-arthas-dashboard-" + session.getSessionId(), true);
-            timer.scheduleAtFixedRate(new DashboardTimerTask(process), 0, getInterval());
+            timer = ArthasBootstrap.getInstance().getCommandScheduler().scheduleAtFixedRate(session.getSessionId(),
+                    TaskPriority.PERIODIC, new DashboardTimerTask(process), 0, getInterval(), TimeUnit.MILLISECONDS);
         }
     }
 
@@ -283,13 +283,11 @@ public class DashboardCommand extends AnnotatedCommand {
         }
     }
 
-    private class DashboardTimerTask extends TimerTask {
+    private class DashboardTimerTask implements Runnable {
         private CommandProcess process;
-        private ThreadSampler threadSampler;
 
         public DashboardTimerTask(CommandProcess process) {
             this.process = process;
-            this.threadSampler = new ThreadSampler();
         }
 
         @Override
@@ -297,8 +295,7 @@ public class DashboardCommand extends AnnotatedCommand {
             try {
                 if (count >= getNumOfExecutions()) {
                     // stop the timer
-                    timer.cancel();
-                    timer.purge();
+                    stop();
                     process.end(0, "Process ends after " + getNumOfExecutions() + " time(s).");
                     return;
                 }
@@ -306,8 +303,9 @@ public class DashboardCommand extends AnnotatedCommand {
                 DashboardModel dashboardModel = new DashboardModel();
 
                 //thread sample
-                Map<String, ThreadVO> threads = ThreadUtil.getThreads();
-                dashboardModel.setThreads(threadSampler.sample(threads.values()));
+                ThreadCpuSampler sampler = ThreadCpuSampler.getInstance();
+                dashboardModel.setThreads(sampler.sample(sampler.getThreads(), getInterval(), true,
+                        DEFAULT_SAMPLE_INTERVAL));
 
                 //memory
                 addMemoryInfo(dashboardModel);
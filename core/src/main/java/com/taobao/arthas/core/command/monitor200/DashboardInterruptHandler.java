@@ -3,23 +3,21 @@ package com.taobao.arthas.core.command.monitor200;
 import com.taobao.arthas.core.shell.command.CommandProcess;
 import com.taobao.arthas.core.shell.handlers.command.CommandInterruptHandler;
 
-import java.util.Timer;
-
 /**
  * @author ralf0131 2017-01-09 13:37.
  */
 public class DashboardInterruptHandler extends CommandInterruptHandler {
 
-    private volatile Timer timer;
+    private final DashboardCommand command;
 
-    public DashboardInterruptHandler(CommandProcess process, Timer timer) {
+    public DashboardInterruptHandler(CommandProcess process, DashboardCommand command) {
         super(process);
-        this.timer = timer;
+        this.command = command;
     }
 
     @Override
     public void handle(Void event) {
-        timer.cancel();
+        command.stop();
         super.handle(event);
     }
 }
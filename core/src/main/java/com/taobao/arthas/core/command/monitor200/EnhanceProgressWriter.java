@@ -0,0 +1,28 @@
+package com.taobao.arthas.core.command.monitor200;
+
+import com.taobao.arthas.core.advisor.Enhancer;
+import com.taobao.arthas.core.shell.command.CommandProcess;
+
+/**
+ * 增强的类比较多时，每完成 10% 输出一次进度
+ */
+class EnhanceProgressWriter implements Enhancer.ProgressListener {
+    private final CommandProcess process;
+    private int lastPercent = 0;
+
+    EnhanceProgressWriter(CommandProcess process) {
+        this.process = process;
+    }
+
+    @Override
+    public synchronized void progress(int finished, int total) {
+        if (total <= 0) {
+            return;
+        }
+        int percent = (int) (finished * 100L / total);
+        if (percent / 10 > lastPercent / 10) {
+            lastPercent = percent;
+            process.write("Enhancing classes: " + finished + "/" + total + " (" + percent + "%)\n");
+        }
+    }
+}
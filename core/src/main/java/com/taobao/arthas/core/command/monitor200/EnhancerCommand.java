@@ -7,15 +7,20 @@ import java.util.List;
 
 import com.alibaba.arthas.deps.org.slf4j.Logger;
 import com.alibaba.arthas.deps.org.slf4j.LoggerFactory;
+import com.taobao.arthas.core.GlobalOptions;
 import com.taobao.arthas.core.advisor.AdviceListener;
+import com.taobao.arthas.core.advisor.AdviceListenerAdapter;
 import com.taobao.arthas.core.advisor.AdviceWeaver;
 import com.taobao.arthas.core.advisor.Enhancer;
+import com.taobao.arthas.core.advisor.InvocationSampler;
 import com.taobao.arthas.core.advisor.InvokeTraceable;
+import com.taobao.arthas.core.advisor.OverheadGovernor;
 import com.taobao.arthas.core.command.model.EnhancerModel;
 import com.taobao.arthas.core.shell.cli.Completion;
 import com.taobao.arthas.core.shell.cli.CompletionUtils;
 import com.taobao.arthas.core.shell.command.AnnotatedCommand;
 import com.taobao.arthas.core.shell.command.CommandProcess;
+import com.taobao.arthas.core.shell.handlers.Handler;
 import com.taobao.arthas.core.shell.handlers.command.CommandInterruptHandler;
 import com.taobao.arthas.core.shell.handlers.shell.QExitHandler;
 import com.taobao.arthas.core.shell.session.Session;
@@ -43,6 +48,13 @@ public abstract class EnhancerCommand extends AnnotatedCommand {
 
     protected boolean verbose;
 
+    /**
+     * 采样参数，见 InvocationSampler
+     */
+    protected double sampleRate = 1;
+    protected int maxPerSecond = 0;
+    protected int reservoir = 0;
+
     @Option(longName = "listenerId")
     @Description("The special listenerId")
     public void setListenerId(long listenerId) {
@@ -55,6 +67,24 @@ public abstract class EnhancerCommand extends AnnotatedCommand {
         this.verbose = verbose;
     }
 
+    @Option(longName = "sample-rate")
+    @Description("Sample rate of invocations, between 0 and 1 (1 by default)")
+    public void setSampleRate(double sampleRate) {
+        this.sampleRate = sampleRate;
+    }
+
+    @Option(longName = "max-per-second")
+    @Description("Max number of invocations captured per second (unlimited by default)")
+    public void setMaxPerSecond(int maxPerSecond) {
+        this.maxPerSecond = maxPerSecond;
+    }
+
+    @Option(longName = "reservoir")
+    @Description("Capture N uniformly sampled invocations per second, output at the start of the next second")
+    public void setReservoir(int reservoir) {
+        this.reservoir = reservoir;
+    }
+
     /**
      * 类名匹配
      *
@@ -119,6 +149,12 @@ public abstract class EnhancerCommand extends AnnotatedCommand {
     }
 
     protected void enhance(CommandProcess process) {
+        try {
+            checkSamplingArguments();
+        } catch (IllegalArgumentException e) {
+            process.end(-1, e.getMessage());
+            return;
+        }
         Session session = process.session();
         if (!session.tryLock()) {
             String msg = "someone else is enhancing classes, pls. wait.";
@@ -143,7 +179,31 @@ public abstract class EnhancerCommand extends AnnotatedCommand {
                 skipJDKTrace = ((AbstractTraceAdviceListener) listener).getCommand().isSkipJDKTrace();
             }
 
+            if (listener instanceof AdviceListenerAdapter) {
+                AdviceListenerAdapter adapter = (AdviceListenerAdapter) listener;
+                if (InvocationSampler.isEnabled(sampleRate, maxPerSecond, reservoir) && adapter.getSampler() == null) {
+                    final InvocationSampler sampler = new InvocationSampler(process, sampleRate, maxPerSecond, reservoir);
+                    adapter.setSampler(sampler);
+                    // 蓄水池由定时器按秒输出，命令结束时停掉
+                    process.endHandler(new Handler<Void>() {
+                        @Override
+                        public void handle(Void event) {
+                            sampler.stop();
+                        }
+                    });
+                    sampler.start();
+                }
+                // overhead-budget 为 0 时不统计 listener 的开销，业务线程上没有额外的计时
+                if (OverheadGovernor.isEnabled(GlobalOptions.overheadBudget) && adapter.getGovernor() == null) {
+                    adapter.setGovernor(new OverheadGovernor(process));
+                }
+                // 退出时输出采样和 listener 开销的统计
+                process.interruptHandler(new SamplingInterruptHandler(process, adapter.getSampler(),
+                        adapter.getGovernor(), adapter.isVerbose()));
+            }
+
             Enhancer enhancer = new Enhancer(listener, listener instanceof InvokeTraceable, skipJDKTrace, getClassNameMatcher(), getMethodNameMatcher());
+            enhancer.setProgressListener(new EnhanceProgressWriter(process));
             // 注册通知监听器
             process.register(listener, enhancer);
             effect = enhancer.enhance(inst);
@@ -191,6 +251,15 @@ public abstract class EnhancerCommand extends AnnotatedCommand {
         }
     }
 
+    protected void checkSamplingArguments() {
+        if (sampleRate <= 0 || sampleRate > 1) {
+            throw new IllegalArgumentException("sample-rate should be in (0, 1]");
+        }
+        if (maxPerSecond < 0 || reservoir < 0) {
+            throw new IllegalArgumentException("max-per-second and reservoir should not be negative");
+        }
+    }
+
     protected void completeArgument3(Completion completion) {
         super.complete(completion);
     }
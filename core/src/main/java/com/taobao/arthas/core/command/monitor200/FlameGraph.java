@@ -0,0 +1,288 @@
+package com.taobao.arthas.core.command.monitor200;
+
+import java.util.Locale;
+import java.util.Map;
+import java.util.Map.Entry;
+import java.util.TreeMap;
+
+/**
+ * <pre>
+ * 把 collapsed stacks 渲染成 svg 火焰图，给 profiler history/diff 使用，不依赖 async-profiler 的 native 代码。
+ *
+ * 差分火焰图和 FlameGraph 的 difffolded.pl 一样：宽度是新的 profile，颜色是每个栈帧占总样本比例的变化，
+ * 红色表示变多了，蓝色表示变少了。只在旧的 profile 里出现的栈不会显示。
+ * </pre>
+ */
+class FlameGraph {
+    private static final int WIDTH = 1200;
+    private static final int FRAME_HEIGHT = 16;
+    private static final int PADDING = 10;
+    private static final int TITLE_HEIGHT = 30;
+    private static final double MIN_WIDTH = 0.1;
+    private static final double CHAR_WIDTH = 7;
+
+    /**
+     * @param collapsed 每一行是 frame1;frame2;frame3 count
+     * @return 每个栈的样本数，相同的栈会累加
+     */
+    static Map<String, Long> parseCollapsed(String collapsed) {
+        Map<String, Long> stacks = new TreeMap<String, Long>();
+        int start = 0;
+        int length = collapsed.length();
+        while (start < length) {
+            int end = collapsed.indexOf('\n', start);
+            if (end < 0) {
+                end = length;
+            }
+            String line = collapsed.substring(start, end).trim();
+            start = end + 1;
+            int space = line.lastIndexOf(' ');
+            if (space <= 0) {
+                continue;
+            }
+            long count;
+            try {
+                count = Long.parseLong(line.substring(space + 1));
+            } catch (NumberFormatException e) {
+                continue;
+            }
+            String stack = line.substring(0, space);
+            Long previous = stacks.get(stack);
+            stacks.put(stack, previous == null ? count : previous + count);
+        }
+        return stacks;
+    }
+
+    /**
+     * 不用解析每个栈，只累加每一行最后的样本数
+     */
+    static long totalSamples(String collapsed) {
+        long total = 0;
+        int end = collapsed.length();
+        while (end > 0) {
+            int start = collapsed.lastIndexOf('\n', end - 1);
+            int space = collapsed.lastIndexOf(' ', end - 1);
+            if (space > start) {
+                try {
+                    total += Long.parseLong(collapsed.substring(space + 1, end).trim());
+                } catch (NumberFormatException e) {
+                    // ignore
+                }
+            }
+            end = start;
+        }
+        return total;
+    }
+
+    static long totalSamples(Map<String, Long> stacks) {
+        long total = 0;
+        for (Long count : stacks.values()) {
+            total += count;
+        }
+        return total;
+    }
+
+    /**
+     * @param baseline 差分火焰图的旧 profile，为 null 时生成普通的火焰图
+     */
+    static String render(String title, Map<String, Long> stacks, Map<String, Long> baseline) {
+        Frame root = new Frame("all");
+        for (Entry<String, Long> entry : stacks.entrySet()) {
+            root.add(entry.getKey().split(";"), entry.getValue());
+        }
+        if (baseline != null) {
+            for (Entry<String, Long> entry : baseline.entrySet()) {
+                root.addBaseline(entry.getKey().split(";"), entry.getValue());
+            }
+        }
+
+        long total = Math.max(1, root.samples);
+        long baselineTotal = Math.max(1, root.baselineSamples);
+        int depth = root.depth();
+        int height = TITLE_HEIGHT + (depth + 1) * FRAME_HEIGHT + PADDING * 2;
+
+        StringBuilder sb = new StringBuilder();
+        sb.append("<?xml version=\"1.0\" standalone=\"no\"?>\n");
+        sb.append("<svg version=\"1.1\" width=\"").append(WIDTH).append("\" height=\"").append(height)
+                .append("\" xmlns=\"http://www.w3.org/2000/svg\">\n");
+        sb.append("<rect x=\"0\" y=\"0\" width=\"100%\" height=\"100%\" fill=\"#f8f8f8\"/>\n");
+        sb.append("<text x=\"").append(WIDTH / 2).append("\" y=\"").append(TITLE_HEIGHT - 10)
+                .append("\" text-anchor=\"middle\" font-size=\"17\" font-family=\"Verdana\">").append(escape(title))
+                .append("</text>\n");
+        sb.append("<g font-size=\"12\" font-family=\"Verdana\">\n");
+        double scale = (WIDTH - PADDING * 2) / (double) total;
+        Layout layout = new Layout(sb, scale, total, baseline == null ? -1 : baselineTotal, height);
+        layout.draw(root, PADDING, 0);
+        sb.append("</g>\n</svg>\n");
+        return sb.toString();
+    }
+
+    static String escape(String text) {
+        StringBuilder sb = new StringBuilder(text.length());
+        for (int i = 0; i < text.length(); ++i) {
+            char c = text.charAt(i);
+            switch (c) {
+            case '<':
+                sb.append("&lt;");
+                break;
+            case '>':
+                sb.append("&gt;");
+                break;
+            case '&':
+                sb.append("&amp;");
+                break;
+            case '"':
+                sb.append("&quot;");
+                break;
+            default:
+                sb.append(c);
+            }
+        }
+        return sb.toString();
+    }
+
+    private static class Layout {
+        private final StringBuilder sb;
+        private final double scale;
+        private final long total;
+        /**
+         * 小于 0 表示不是差分火焰图
+         */
+        private final long baselineTotal;
+        private final int height;
+
+        Layout(StringBuilder sb, double scale, long total, long baselineTotal, int height) {
+            this.sb = sb;
+            this.scale = scale;
+            this.total = total;
+            this.baselineTotal = baselineTotal;
+            this.height = height;
+        }
+
+        void draw(Frame frame, double x, int level) {
+            double width = frame.samples * scale;
+            if (width < MIN_WIDTH) {
+                return;
+            }
+            double y = height - PADDING - (level + 1) * FRAME_HEIGHT;
+            String info = frame.name + " (" + frame.samples + " samples, " + percent(frame.samples, total);
+            if (baselineTotal >= 0) {
+                info += ", " + signedPercent(delta(frame)) + " vs baseline";
+            }
+            sb.append("<g><title>").append(escape(info + ")")).append("</title>");
+            sb.append("<rect x=\"").append(format(x)).append("\" y=\"").append(format(y)).append("\" width=\"")
+                    .append(format(width)).append("\" height=\"").append(FRAME_HEIGHT - 1).append("\" fill=\"")
+                    .append(color(frame)).append("\" rx=\"2\" ry=\"2\"/>");
+            int chars = (int) ((width - 6) / CHAR_WIDTH);
+            if (chars >= 3) {
+                String text = frame.name.length() <= chars ? frame.name : frame.name.substring(0, chars - 2) + "..";
+                sb.append("<text x=\"").append(format(x + 3)).append("\" y=\"").append(format(y + FRAME_HEIGHT - 4))
+                        .append("\">").append(escape(text)).append("</text>");
+            }
+            sb.append("</g>\n");
+
+            double childX = x;
+            if (frame.children != null) {
+                for (Frame child : frame.children.values()) {
+                    draw(child, childX, level + 1);
+                    childX += child.samples * scale;
+                }
+            }
+        }
+
+        /**
+         * 占总样本比例的变化
+         */
+        private double delta(Frame frame) {
+            return frame.samples / (double) total - frame.baselineSamples / (double) baselineTotal;
+        }
+
+        private String color(Frame frame) {
+            if (baselineTotal >= 0) {
+                double delta = delta(frame);
+                // 变化 5% 以上就是最深的颜色
+                int intensity = (int) Math.min(200, Math.abs(delta) / 0.05 * 200);
+                if (delta > 0) {
+                    return rgb(255, 255 - intensity, 255 - intensity);
+                }
+                return rgb(255 - intensity, 255 - intensity, 255);
+            }
+            int hash = frame.name.hashCode();
+            return rgb(205 + (hash & 0x1f) + ((hash >>> 5) & 0x0f), 80 + ((hash >>> 9) & 0x7f),
+                    (hash >>> 16) & 0x37);
+        }
+
+        private static String rgb(int r, int g, int b) {
+            return "rgb(" + r + "," + g + "," + b + ")";
+        }
+
+        /**
+         * svg 的坐标，不用 String.format 避免受 locale 影响，百分比用 Locale.ROOT 格式化
+         */
+        private static String format(double value) {
+            return String.valueOf(Math.round(value * 10) / 10.0);
+        }
+
+        private static String percent(long samples, long total) {
+            return String.format(Locale.ROOT, "%.2f%%", samples * 100.0 / total);
+        }
+
+        private static String signedPercent(double ratio) {
+            return String.format(Locale.ROOT, "%+.2f%%", ratio * 100);
+        }
+    }
+
+    private static class Frame {
+        final String name;
+        long samples;
+        long baselineSamples;
+        TreeMap<String, Frame> children;
+
+        Frame(String name) {
+            this.name = name;
+        }
+
+        void add(String[] stack, long count) {
+            Frame frame = this;
+            frame.samples += count;
+            for (String name : stack) {
+                frame = frame.child(name, true);
+                frame.samples += count;
+            }
+        }
+
+        void addBaseline(String[] stack, long count) {
+            Frame frame = this;
+            frame.baselineSamples += count;
+            for (String name : stack) {
+                frame = frame.child(name, false);
+                if (frame == null) {
+                    return;
+                }
+                frame.baselineSamples += count;
+            }
+        }
+
+        private Frame child(String name, boolean create) {
+            Frame child = children == null ? null : children.get(name);
+            if (child == null && create) {
+                if (children == null) {
+                    children = new TreeMap<String, Frame>();
+                }
+                child = new Frame(name);
+                children.put(name, child);
+            }
+            return child;
+        }
+
+        int depth() {
+            int depth = 0;
+            if (children != null) {
+                for (Frame child : children.values()) {
+                    depth = Math.max(depth, child.depth() + 1);
+                }
+            }
+            return depth;
+        }
+    }
+}
@@ -4,16 +4,29 @@ import java.io.File;
 import java.io.IOException;
 import java.lang.management.ManagementFactory;
 import java.text.SimpleDateFormat;
+import java.util.ArrayList;
+import java.util.Collections;
 import java.util.Date;
+import java.util.List;
+import java.util.concurrent.TimeUnit;
+
+import javax.management.MBeanServer;
+import javax.management.ObjectName;
 
 import com.alibaba.arthas.deps.org.slf4j.Logger;
 import com.alibaba.arthas.deps.org.slf4j.LoggerFactory;
 import com.sun.management.HotSpotDiagnosticMXBean;
+import com.taobao.arthas.common.JavaVersionUtils;
 import com.taobao.arthas.core.command.Constants;
 import com.taobao.arthas.core.command.model.HeapDumpModel;
 import com.taobao.arthas.core.command.model.MessageModel;
+import com.taobao.arthas.core.server.ArthasBootstrap;
 import com.taobao.arthas.core.shell.command.AnnotatedCommand;
 import com.taobao.arthas.core.shell.command.CommandProcess;
+import com.taobao.arthas.core.shell.handlers.Handler;
+import com.taobao.arthas.core.shell.term.impl.http.DirectoryBrowser;
+import com.taobao.arthas.core.util.scheduler.ScheduledTask;
+import com.taobao.arthas.core.util.scheduler.TaskPriority;
 import com.taobao.middleware.cli.annotations.Argument;
 import com.taobao.middleware.cli.annotations.Description;
 import com.taobao.middleware.cli.annotations.Name;
@@ -22,20 +35,51 @@ import com.taobao.middleware.cli.annotations.Summary;
 
 /**
  * HeapDump command
- * 
+ * <pre>
+ * --gz 在 jdk 15 及以上并且没有指定 --chunk-size 时，用 DiagnosticCommand 的 GC.heap_dump -gz 让 jvm 直接写压缩文件，
+ * 磁盘上不会出现未压缩的 hprof。低版本的 jdk 或者需要分片时，先 dump 出 hprof 再压缩。
+ * </pre>
+ *
  * @author hengyunabc 2019-09-02
  *
  */
 @Name("heapdump")
 @Summary("Heap dump")
 @Description("\nExamples:\n" + "  heapdump\n" + "  heapdump --live\n" + "  heapdump --live /tmp/dump.hprof\n"
+                + "  heapdump --gz --chunk-size 256\n" + "  heapdump --gz --max-size 4096 /tmp/dump.hprof.gz\n"
+                + "  heapdump --histo --top 30\n"
                 + Constants.WIKI + Constants.WIKI_HOME + "heapdump")
 public class HeapDumpCommand extends AnnotatedCommand {
     private static final Logger logger = LoggerFactory.getLogger(HeapDumpCommand.class);
+
+    static final long MB = 1024 * 1024;
+
+    /**
+     * 压缩之后的大小按照 hprof 的 1/3 估算
+     */
+    private static final int COMPRESS_RATIO = 3;
+
+    /**
+     * GC.heap_dump -gz 的压缩级别，dump 期间应用线程是暂停的，使用最快的级别
+     */
+    private static final int NATIVE_GZIP_LEVEL = 1;
+
+    private static final long PROGRESS_INTERVAL_MILLIS = 2000;
+
     private String file;
 
     private boolean live;
 
+    private boolean gzip;
+
+    private long chunkSize = 0;
+
+    private long maxSize = 0;
+
+    private boolean histo;
+
+    private int top = 20;
+
     @Argument(argName = "file", index = 0, required = false)
     @Description("Output file")
     public void setFile(String file) {
@@ -48,23 +92,94 @@ public class HeapDumpCommand extends AnnotatedCommand {
         this.live = live;
     }
 
+    @Option(longName = "gz", flag = true)
+    @Description("Compress the heap dump with gzip, the default output file is under arthas-output and can be downloaded from the http server")
+    public void setGzip(boolean gzip) {
+        this.gzip = gzip;
+    }
+
+    @Option(longName = "chunk-size")
+    @Description("With --gz, split the compressed output into gzip chunks of every N MB of hprof, the chunks can be concatenated into one .gz file (0 means no split, by default)")
+    public void setChunkSize(long chunkSize) {
+        this.chunkSize = chunkSize;
+    }
+
+    @Option(longName = "max-size")
+    @Description("Max disk usage in MB of the heap dump, including the uncompressed hprof when --gz falls back to compressing after the dump (0 means no limit, by default)")
+    public void setMaxSize(long maxSize) {
+        this.maxSize = maxSize;
+    }
+
+    @Option(longName = "histo", flag = true)
+    @Description("Print the class histogram instead of dumping the whole heap")
+    public void setHisto(boolean histo) {
+        this.histo = histo;
+    }
+
+    @Option(longName = "top")
+    @Description("The number of classes to print with --histo, sorted by bytes (20 by default)")
+    public void setTop(int top) {
+        this.top = top;
+    }
+
     @Override
     public void process(CommandProcess process) {
         try {
+            if (histo) {
+                processHisto(process);
+                return;
+            }
+
             String dumpFile = file;
             if (dumpFile == null || dumpFile.isEmpty()) {
                 String date = new SimpleDateFormat("yyyy-MM-dd-HH-mm").format(new Date());
-                File file = File.createTempFile("heapdump" + date + (live ? "-live" : ""), ".hprof");
-                dumpFile = file.getAbsolutePath();
-                file.delete();
+                if (gzip) {
+                    // 放到 arthas-output 下面，可以通过 http 下载
+                    File outputDir = new File("arthas-output");
+                    outputDir.mkdirs();
+                    dumpFile = new File(outputDir, "heapdump" + date + (live ? "-live" : "") + ".hprof.gz")
+                            .getAbsolutePath();
+                } else {
+                    File file = File.createTempFile("heapdump" + date + (live ? "-live" : ""), ".hprof");
+                    dumpFile = file.getAbsolutePath();
+                    file.delete();
+                }
+            } else if (gzip && !dumpFile.endsWith(".gz")) {
+                dumpFile = dumpFile + ".gz";
+            }
+
+            if (gzip && isNativeGzip()) {
+                dumpCompressed(process, new File(dumpFile).getAbsoluteFile());
+                return;
             }
 
-            process.appendResult(new MessageModel("Dumping heap to " + dumpFile + " ..."));
+            // jdk 9 之后 dumpHeap 要求文件以 .hprof 结尾，压缩时先 dump 到去掉 .gz 的文件
+            File hprofFile = new File(gzip ? dumpFile.substring(0, dumpFile.length() - ".gz".length()) : dumpFile)
+                    .getAbsoluteFile();
+            if (hprofFile.exists()) {
+                process.end(-1, "heap dump file already exists: " + hprofFile);
+                return;
+            }
+            String error = checkDiskUsage(hprofFile, false);
+            if (error != null) {
+                process.end(-1, error);
+                return;
+            }
 
-            run(process, dumpFile, live);
+            process.appendResult(new MessageModel("Dumping heap to " + hprofFile + " ..."));
 
-            process.appendResult(new MessageModel("Heap dump file created"));
-            process.appendResult(new HeapDumpModel(dumpFile, live));
+            // dump 是在 safepoint 里完成的，期间 java 线程都停下来了，只能在结束之后统计吞吐
+            long start = System.nanoTime();
+            run(process, hprofFile.getPath(), live);
+            double seconds = Math.max(1, System.nanoTime() - start) / 1000000000.0;
+            long bytes = hprofFile.length();
+            process.appendResult(new MessageModel(String.format("Heap dump file created: %d MB in %.1f s (%.1f MB/s)",
+                    bytes / MB, seconds, bytes / (double) MB / seconds)));
+            if (gzip) {
+                compress(process, hprofFile, new File(dumpFile).getAbsoluteFile());
+            } else {
+                process.appendResult(new HeapDumpModel(dumpFile, live));
+            }
             process.end();
         } catch (Throwable t) {
             String errorMsg = "heap dump error: " + t.getMessage();
@@ -74,10 +189,200 @@ public class HeapDumpCommand extends AnnotatedCommand {
 
     }
 
+    private void processHisto(CommandProcess process) throws Exception {
+        HeapHistogram histogram = HeapHistogram.run(live);
+        HeapDumpModel model = new HeapDumpModel(null, histogram.isLive());
+        model.setHistogram(histogram.top(top));
+        model.setClassCount(histogram.getClassCount());
+        model.setTotalInstances(histogram.getTotalInstances());
+        model.setTotalBytes(histogram.getTotalBytes());
+        process.appendResult(model);
+        process.end();
+    }
+
+    /**
+     * jvm 是否可以直接写压缩的 heap dump，分片只能在 dump 之后压缩
+     */
+    private boolean isNativeGzip() {
+        return chunkSize <= 0 && JavaVersionUtils.javaVersion() >= 15.0f;
+    }
+
+    /**
+     * 用 GC.heap_dump -gz 直接输出压缩文件
+     */
+    private void dumpCompressed(CommandProcess process, File target) throws Exception {
+        if (target.exists()) {
+            process.end(-1, "heap dump file already exists: " + target);
+            return;
+        }
+        String error = checkDiskUsage(target, true);
+        if (error != null) {
+            process.end(-1, error);
+            return;
+        }
+
+        process.appendResult(new MessageModel("Dumping compressed heap to " + target + " ..."));
+        long start = System.nanoTime();
+        List<String> args = new ArrayList<String>();
+        args.add("-gz=" + NATIVE_GZIP_LEVEL);
+        if (!live) {
+            // GC.heap_dump 默认只 dump 存活的对象
+            args.add("-all");
+        }
+        args.add(target.getPath());
+        MBeanServer server = ManagementFactory.getPlatformMBeanServer();
+        String output = (String) server.invoke(new ObjectName("com.sun.management:type=DiagnosticCommand"),
+                "gcHeapDump", new Object[] { args.toArray(new String[0]) },
+                new String[] { String[].class.getName() });
+        if (!target.exists()) {
+            // 失败时 GC.heap_dump 把原因放在输出里，不会抛异常
+            throw new IOException("GC.heap_dump failed: " + (output == null ? "" : output.trim()));
+        }
+        double seconds = Math.max(1, System.nanoTime() - start) / 1000000000.0;
+        long bytes = target.length();
+        process.appendResult(new MessageModel(String.format(
+                "Compressed heap dump file created: %d MB in %.1f s (%.1f MB/s)", bytes / MB, seconds,
+                bytes / (double) MB / seconds)));
+        appendDownloadPath(process, target, false);
+
+        HeapDumpModel model = new HeapDumpModel(target.getPath(), live);
+        model.setChunks(Collections.singletonList(target.getPath()));
+        model.setCompressedBytes(bytes);
+        process.appendResult(model);
+        process.end();
+    }
+
+    /**
+     * dump 之前按照已经使用的堆大小估算需要的磁盘空间，超过 --max-size 或者磁盘剩余空间时不 dump
+     *
+     * @param compressedOnly jvm 直接写压缩文件，磁盘上没有未压缩的 hprof
+     */
+    private String checkDiskUsage(File hprofFile, boolean compressedOnly) {
+        long estimated = ManagementFactory.getMemoryMXBean().getHeapMemoryUsage().getUsed();
+        if (compressedOnly) {
+            estimated = estimated / COMPRESS_RATIO;
+        } else if (gzip) {
+            estimated += estimated / COMPRESS_RATIO;
+        }
+        if (maxSize > 0 && estimated > maxSize * MB) {
+            return "estimated disk usage " + estimated / MB + " MB exceeds the max size " + maxSize
+                    + " MB, try heapdump --live or heapdump --histo";
+        }
+        File dir = hprofFile.getParentFile();
+        if (dir != null && dir.exists()) {
+            long usable = dir.getUsableSpace();
+            if (usable > 0 && estimated > usable) {
+                return "estimated disk usage " + estimated / MB + " MB exceeds the usable space " + usable / MB
+                        + " MB of " + dir;
+            }
+        }
+        return null;
+    }
+
+    private void compress(CommandProcess process, File hprofFile, File target) throws IOException {
+        final HeapDumpStreamer streamer = new HeapDumpStreamer(hprofFile, target, chunkSize * MB, maxSize * MB);
+        process.interruptHandler(new Handler<Void>() {
+            @Override
+            public void handle(Void event) {
+                streamer.interrupt();
+            }
+        });
+        process.appendResult(new MessageModel("Compressing heap dump to " + target
+                + (chunkSize > 0 ? ".* (" + chunkSize + " MB of hprof per chunk)" : "") + " ..."));
+
+        long start = System.nanoTime();
+        ProgressReporter reporter = new ProgressReporter(process, hprofFile, streamer);
+        reporter.start();
+        List<File> files;
+        try {
+            files = streamer.compress();
+        } finally {
+            reporter.stop();
+            hprofFile.delete();
+        }
+        double seconds = Math.max(1, System.nanoTime() - start) / 1000000000.0;
+
+        List<String> chunks = new ArrayList<String>(files.size());
+        for (File chunk : files) {
+            chunks.add(chunk.getPath());
+        }
+        process.appendResult(new MessageModel(String.format(
+                "Heap dump compressed: %d file(s), %d MB -> %d MB in %.1f s (%.1f MB/s)", files.size(),
+                streamer.getReadBytes() / MB, streamer.getWrittenBytes() / MB, seconds,
+                streamer.getReadBytes() / (double) MB / seconds)));
+        if (chunkSize > 0) {
+            process.appendResult(new MessageModel(
+                    "Concatenate the chunks into one gzip file: cat " + target + ".* > " + target));
+        }
+        appendDownloadPath(process, target, chunkSize > 0);
+
+        HeapDumpModel model = new HeapDumpModel(target.getPath(), live);
+        model.setChunks(chunks);
+        model.setCompressedBytes(streamer.getWrittenBytes());
+        process.appendResult(model);
+    }
+
+    private static void appendDownloadPath(CommandProcess process, File target, boolean chunked) throws IOException {
+        File outputDir = new File("arthas-output");
+        if (outputDir.exists() && DirectoryBrowser.isSubFile(outputDir, target)) {
+            process.appendResult(new MessageModel("Download from the http server: /arthas-output/"
+                    + outputDir.getCanonicalFile().toURI().relativize(target.getCanonicalFile().toURI()).getPath()
+                    + (chunked ? ".*" : "")));
+        }
+    }
+
     private static void run(CommandProcess process, String file, boolean live) throws IOException {
         HotSpotDiagnosticMXBean hotSpotDiagnosticMXBean = ManagementFactory
                         .getPlatformMXBean(HotSpotDiagnosticMXBean.class);
         hotSpotDiagnosticMXBean.dumpHeap(file, live);
     }
 
+    /**
+     * 压缩的时候定时输出进度和吞吐
+     */
+    private static class ProgressReporter implements Runnable {
+        private final CommandProcess process;
+        private final File hprofFile;
+        private final HeapDumpStreamer streamer;
+        private long lastBytes;
+        private long lastNanos;
+        private ScheduledTask task;
+
+        ProgressReporter(CommandProcess process, File hprofFile, HeapDumpStreamer streamer) {
+            this.process = process;
+            this.hprofFile = hprofFile;
+            this.streamer = streamer;
+        }
+
+        synchronized void start() {
+            lastNanos = System.nanoTime();
+            task = ArthasBootstrap.getInstance().getCommandScheduler().scheduleAtFixedRate(
+                    process.session().getSessionId(), TaskPriority.PERIODIC, this, PROGRESS_INTERVAL_MILLIS,
+                    PROGRESS_INTERVAL_MILLIS, TimeUnit.MILLISECONDS);
+        }
+
+        synchronized void stop() {
+            if (task != null) {
+                task.cancel();
+                task = null;
+            }
+        }
+
+        @Override
+        public synchronized void run() {
+            if (task == null) {
+                return;
+            }
+            long now = System.nanoTime();
+            double seconds = Math.max(1, now - lastNanos) / 1000000000.0;
+            long bytes = streamer.getReadBytes();
+            long total = Math.max(1, hprofFile.length());
+            process.appendResult(new MessageModel(String.format(
+                    "compressing: %d/%d MB (%d%%), %.1f MB/s, compressed: %d MB, %d file(s)", bytes / MB,
+                    total / MB, bytes * 100 / total, (bytes - lastBytes) / (double) MB / seconds,
+                    streamer.getWrittenBytes() / MB, streamer.getChunkCount())));
+            lastBytes = bytes;
+            lastNanos = now;
+        }
+    }
 }
@@ -0,0 +1,158 @@
+package com.taobao.arthas.core.command.monitor200;
+
+import java.io.File;
+import java.io.FileInputStream;
+import java.io.FileOutputStream;
+import java.io.FilterOutputStream;
+import java.io.IOException;
+import java.io.InputStream;
+import java.io.InterruptedIOException;
+import java.io.OutputStream;
+import java.util.ArrayList;
+import java.util.List;
+import java.util.zip.GZIPOutputStream;
+
+/**
+ * <pre>
+ * 把 hprof 文件压缩成 gzip 分片。每个分片都是一个完整的 gzip member，按顺序拼接起来就是合法的 .gz 文件：
+ * cat heapdump.hprof.gz.* > heapdump.hprof.gz
+ *
+ * 分片先写到 .tmp 文件，写完之后再改名，所以通过 http 下载到的分片都是完整的，不用等整个文件压缩完。
+ * hotspot 在 dump 的过程中会回头修改已经写过的 segment 长度，所以只能在 dump 结束之后再压缩。
+ * </pre>
+ */
+class HeapDumpStreamer {
+    private static final int BUFFER_SIZE = 64 * 1024;
+
+    private final File source;
+    private final File target;
+    /**
+     * 每个分片压缩多少字节的 hprof，小于等于 0 表示不分片
+     */
+    private final long chunkBytes;
+    /**
+     * hprof 文件和压缩文件一共最多占用多少磁盘，小于等于 0 表示不限制
+     */
+    private final long maxBytes;
+
+    private final List<File> chunks = new ArrayList<File>();
+    private volatile long readBytes;
+    private volatile long writtenBytes;
+    private volatile boolean interrupted;
+
+    HeapDumpStreamer(File source, File target, long chunkBytes, long maxBytes) {
+        this.source = source;
+        this.target = target;
+        this.chunkBytes = chunkBytes;
+        this.maxBytes = maxBytes;
+    }
+
+    /**
+     * @return 压缩之后的文件，出错或者被中断时会删除已经生成的分片
+     */
+    List<File> compress() throws IOException {
+        File tmp = null;
+        InputStream in = new FileInputStream(source);
+        try {
+            byte[] buffer = new byte[BUFFER_SIZE];
+            long sourceBytes = source.length();
+            boolean eof = false;
+            while (!eof) {
+                File chunk = chunkBytes > 0 ? new File(chunkName(target.getPath(), chunks.size())) : target;
+                tmp = new File(chunk.getPath() + ".tmp");
+                long chunkRead = 0;
+                GZIPOutputStream gzip = new GZIPOutputStream(new CountingOutputStream(new FileOutputStream(tmp)),
+                        BUFFER_SIZE);
+                try {
+                    while (chunkBytes <= 0 || chunkRead < chunkBytes) {
+                        if (interrupted) {
+                            throw new InterruptedIOException("heap dump compression interrupted");
+                        }
+                        if (maxBytes > 0 && sourceBytes + writtenBytes > maxBytes) {
+                            throw new IOException("disk usage exceeds the max size " + maxBytes / HeapDumpCommand.MB
+                                    + " MB, hprof: " + sourceBytes / HeapDumpCommand.MB + " MB, compressed: "
+                                    + writtenBytes / HeapDumpCommand.MB + " MB");
+                        }
+                        int length = chunkBytes > 0 ? (int) Math.min(buffer.length, chunkBytes - chunkRead)
+                                : buffer.length;
+                        int n = in.read(buffer, 0, length);
+                        if (n < 0) {
+                            eof = true;
+                            break;
+                        }
+                        gzip.write(buffer, 0, n);
+                        chunkRead += n;
+                        readBytes += n;
+                    }
+                } finally {
+                    gzip.close();
+                }
+                // 文件大小正好是分片大小的整数倍时，最后会多出一个空的分片
+                if (chunkRead == 0 && !chunks.isEmpty()) {
+                    tmp.delete();
+                    break;
+                }
+                if (!tmp.renameTo(chunk)) {
+                    throw new IOException("can not rename " + tmp + " to " + chunk);
+                }
+                chunks.add(chunk);
+                tmp = null;
+            }
+            return chunks;
+        } catch (IOException e) {
+            if (tmp != null) {
+                tmp.delete();
+            }
+            for (File chunk : chunks) {
+                chunk.delete();
+            }
+            chunks.clear();
+            throw e;
+        } finally {
+            in.close();
+        }
+    }
+
+    void interrupt() {
+        interrupted = true;
+    }
+
+    static String chunkName(String target, int index) {
+        String suffix = String.valueOf(index);
+        while (suffix.length() < 4) {
+            suffix = "0" + suffix;
+        }
+        return target + "." + suffix;
+    }
+
+    long getReadBytes() {
+        return readBytes;
+    }
+
+    long getWrittenBytes() {
+        return writtenBytes;
+    }
+
+    int getChunkCount() {
+        return chunks.size();
+    }
+
+    private class CountingOutputStream extends FilterOutputStream {
+
+        CountingOutputStream(OutputStream out) {
+            super(out);
+        }
+
+        @Override
+        public void write(int b) throws IOException {
+            out.write(b);
+            writtenBytes++;
+        }
+
+        @Override
+        public void write(byte[] b, int off, int len) throws IOException {
+            out.write(b, off, len);
+            writtenBytes += len;
+        }
+    }
+}
@@ -0,0 +1,129 @@
+package com.taobao.arthas.core.command.monitor200;
+
+import java.lang.management.ManagementFactory;
+import java.util.ArrayList;
+import java.util.Collections;
+import java.util.Comparator;
+import java.util.List;
+import java.util.regex.Matcher;
+import java.util.regex.Pattern;
+
+import javax.management.MBeanServer;
+import javax.management.ObjectName;
+
+import com.alibaba.arthas.deps.org.slf4j.Logger;
+import com.alibaba.arthas.deps.org.slf4j.LoggerFactory;
+import com.taobao.arthas.core.command.model.ClassHistogramVO;
+
+/**
+ * <pre>
+ * 通过 DiagnosticCommand MBean 执行 GC.class_histogram，和 jmap -histo 一样，不需要 dump 整个堆。
+ *
+ * 输出的格式：
+ *  num     #instances         #bytes  class name (module)
+ * -------------------------------------------------------
+ *    1:          1234         567890  [B (java.base@11.0.2)
+ * Total         12345        6789012
+ * </pre>
+ */
+class HeapHistogram {
+    private static final Logger logger = LoggerFactory.getLogger(HeapHistogram.class);
+
+    private static final Pattern CLASS_LINE = Pattern.compile("^\\s*\\d+:\\s+(\\d+)\\s+(\\d+)\\s+(\\S+).*$");
+    private static final Pattern TOTAL_LINE = Pattern.compile("^\\s*Total\\s+(\\d+)\\s+(\\d+).*$");
+
+    private final List<ClassHistogramVO> classes;
+    private final long totalInstances;
+    private final long totalBytes;
+    private boolean live;
+
+    HeapHistogram(List<ClassHistogramVO> classes, long totalInstances, long totalBytes) {
+        this.classes = classes;
+        this.totalInstances = totalInstances;
+        this.totalBytes = totalBytes;
+    }
+
+    /**
+     * @param live 只统计存活的对象，会触发一次 full gc
+     */
+    static HeapHistogram run(boolean live) throws Exception {
+        MBeanServer server = ManagementFactory.getPlatformMBeanServer();
+        ObjectName name = new ObjectName("com.sun.management:type=DiagnosticCommand");
+        String[] signature = new String[] { String[].class.getName() };
+        String output;
+        if (live) {
+            output = (String) server.invoke(name, "gcClassHistogram", new Object[] { new String[0] }, signature);
+        } else {
+            try {
+                output = (String) server.invoke(name, "gcClassHistogram", new Object[] { new String[] { "-all" } },
+                        signature);
+            } catch (Exception e) {
+                // jdk 8 的 GC.class_histogram 没有 -all 参数，总是只统计存活的对象
+                logger.info("GC.class_histogram -all is not supported, fall back to live objects: {}", e.toString());
+                output = (String) server.invoke(name, "gcClassHistogram", new Object[] { new String[0] }, signature);
+                live = true;
+            }
+        }
+        HeapHistogram histogram = parse(output);
+        histogram.live = live;
+        return histogram;
+    }
+
+    static HeapHistogram parse(String output) {
+        List<ClassHistogramVO> classes = new ArrayList<ClassHistogramVO>();
+        long totalInstances = 0;
+        long totalBytes = 0;
+        boolean hasTotal = false;
+        for (String line : output.split("\n")) {
+            Matcher matcher = CLASS_LINE.matcher(line);
+            if (matcher.matches()) {
+                classes.add(new ClassHistogramVO(matcher.group(3), Long.parseLong(matcher.group(1)),
+                        Long.parseLong(matcher.group(2))));
+                continue;
+            }
+            matcher = TOTAL_LINE.matcher(line);
+            if (matcher.matches()) {
+                totalInstances = Long.parseLong(matcher.group(1));
+                totalBytes = Long.parseLong(matcher.group(2));
+                hasTotal = true;
+            }
+        }
+        if (!hasTotal) {
+            for (ClassHistogramVO vo : classes) {
+                totalInstances += vo.getInstances();
+                totalBytes += vo.getBytes();
+            }
+        }
+        return new HeapHistogram(classes, totalInstances, totalBytes);
+    }
+
+    /**
+     * @return 占用内存最多的 n 个类
+     */
+    List<ClassHistogramVO> top(int n) {
+        List<ClassHistogramVO> sorted = new ArrayList<ClassHistogramVO>(classes);
+        Collections.sort(sorted, new Comparator<ClassHistogramVO>() {
+            @Override
+            public int compare(ClassHistogramVO o1, ClassHistogramVO o2) {
+                return o1.getBytes() < o2.getBytes() ? 1 : (o1.getBytes() == o2.getBytes() ? 0 : -1);
+            }
+        });
+        return n > 0 && n < sorted.size() ? new ArrayList<ClassHistogramVO>(sorted.subList(0, n)) : sorted;
+    }
+
+    int getClassCount() {
+        return classes.size();
+    }
+
+    long getTotalInstances() {
+        return totalInstances;
+    }
+
+    long getTotalBytes() {
+        return totalBytes;
+    }
+
+    boolean isLive() {
+        return live;
+    }
+}
@@ -5,6 +5,7 @@ import com.alibaba.arthas.deps.org.slf4j.LoggerFactory;
 import com.taobao.arthas.core.command.Constants;
 import com.taobao.arthas.core.command.model.MBeanAttributeVO;
 import com.taobao.arthas.core.command.model.MBeanModel;
+import com.taobao.arthas.core.server.ArthasBootstrap;
 import com.taobao.arthas.core.shell.cli.CliToken;
 import com.taobao.arthas.core.shell.cli.Completion;
 import com.taobao.arthas.core.shell.cli.CompletionUtils;
@@ -19,6 +20,8 @@ import com.taobao.arthas.core.util.TokenUtils;
 import com.taobao.arthas.core.util.matcher.Matcher;
 import com.taobao.arthas.core.util.matcher.RegexMatcher;
 import com.taobao.arthas.core.util.matcher.WildcardMatcher;
+import com.taobao.arthas.core.util.scheduler.ScheduledTask;
+import com.taobao.arthas.core.util.scheduler.TaskPriority;
 import com.taobao.middleware.cli.annotations.Argument;
 import com.taobao.middleware.cli.annotations.Description;
 import com.taobao.middleware.cli.annotations.Name;
@@ -33,8 +36,7 @@ import java.util.LinkedHashMap;
 import java.util.List;
 import java.util.Map;
 import java.util.Set;
-import java.util.Timer;
-import java.util.TimerTask;
+import java.util.concurrent.TimeUnit;
 
 import javax.management.MBeanAttributeInfo;
 import javax.management.MBeanInfo;
@@ -72,7 +74,7 @@ public class MBeanCommand extends AnnotatedCommand {
     private long interval = 0;
     private boolean metaData;
     private int numOfExecutions = 100;
-    private Timer timer;
+    private ScheduledTask timer;
     private long count = 0;
 
     @Argument(argName = "name-pattern", index = 0, required = false)
@@ -159,11 +161,8 @@ public class MBeanCommand extends AnnotatedCommand {
     }
 
     private void listAttribute(final CommandProcess process) {
-        Session session = process.session();
-        timer = new Timer("Timer-for-arthas-mbean-" + session.getSessionId(), true);
-
         // ctrl-C support
-        process.interruptHandler(new MBeanInterruptHandler(process, timer));
+        process.interruptHandler(new MBeanInterruptHandler(process));
 
         // 通过handle回调，在suspend和end时停止timer，resume时重启timer
         Handler<Void> stopHandler = new Handler<Void>() {
@@ -187,9 +186,12 @@ public class MBeanCommand extends AnnotatedCommand {
 
         // start the timer
         if (getInterval() > 0) {
-            timer.scheduleAtFixedRate(new MBeanTimerTask(process), 0, getInterval());
+            restart(process);
         } else {
-            timer.schedule(new MBeanTimerTask(process), 0);
+            synchronized (this) {
+                timer = ArthasBootstrap.getInstance().getCommandScheduler().schedule(process.session().getSessionId(),
+                        TaskPriority.PERIODIC, new MBeanTimerTask(process), 0, TimeUnit.MILLISECONDS);
+            }
         }
 
         //异步执行，这里不能调用process.end()，在timer task中结束命令执行
@@ -198,7 +200,6 @@ public class MBeanCommand extends AnnotatedCommand {
     public synchronized void stop() {
         if (timer != null) {
             timer.cancel();
-            timer.purge();
             timer = null;
         }
     }
@@ -206,8 +207,8 @@ public class MBeanCommand extends AnnotatedCommand {
     public synchronized void restart(CommandProcess process) {
         if (timer == null) {
             Session session = process.session();
-            timer = new Timer("Timer-for-arthas-mbean-" + session.getSessionId(), true);
-            timer.scheduleAtFixedRate(new MBeanTimerTask(process), 0, getInterval());
+            timer = ArthasBootstrap.getInstance().getCommandScheduler().scheduleAtFixedRate(session.getSessionId(),
+                    TaskPriority.PERIODIC, new MBeanTimerTask(process), 0, getInterval(), TimeUnit.MILLISECONDS);
         }
     }
 
@@ -351,21 +352,18 @@ public class MBeanCommand extends AnnotatedCommand {
 
     public class MBeanInterruptHandler extends CommandInterruptHandler {
 
-        private volatile Timer timer;
-
-        public MBeanInterruptHandler(CommandProcess process, Timer timer) {
+        public MBeanInterruptHandler(CommandProcess process) {
             super(process);
-            this.timer = timer;
         }
 
         @Override
         public void handle(Void event) {
-            timer.cancel();
+            stop();
             super.handle(event);
         }
     }
 
-    private class MBeanTimerTask extends TimerTask {
+    private class MBeanTimerTask implements Runnable {
 
         private CommandProcess process;
 
@@ -377,8 +375,7 @@ public class MBeanCommand extends AnnotatedCommand {
         public void run() {
             if (count >= getNumOfExecutions()) {
                 // stop the timer
-                timer.cancel();
-                timer.purge();
+                stop();
                 process.end(-1, "Process ends after " + getNumOfExecutions() + " time(s).");
                 return;
             }
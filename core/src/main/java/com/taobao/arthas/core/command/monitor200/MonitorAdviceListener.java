@@ -6,20 +6,22 @@ import com.taobao.arthas.core.advisor.Advice;
 import com.taobao.arthas.core.advisor.AdviceListenerAdapter;
 import com.taobao.arthas.core.command.express.ExpressException;
 import com.taobao.arthas.core.command.model.MonitorModel;
+import com.taobao.arthas.core.server.ArthasBootstrap;
 import com.taobao.arthas.core.shell.command.CommandProcess;
 import com.taobao.arthas.core.advisor.ArthasMethod;
 import com.taobao.arthas.core.util.StringUtils;
 import com.taobao.arthas.core.util.ThreadLocalWatch;
 
+import com.taobao.arthas.core.util.metrics.LatencyHistogram;
+import com.taobao.arthas.core.util.metrics.StripedCounter;
+import com.taobao.arthas.core.util.scheduler.ScheduledTask;
+import com.taobao.arthas.core.util.scheduler.TaskPriority;
+
 import java.util.ArrayList;
 import java.util.List;
 import java.util.Map;
-import java.util.Timer;
-import java.util.TimerTask;
 import java.util.concurrent.ConcurrentHashMap;
-import java.util.concurrent.atomic.AtomicReference;
-
-import static com.taobao.arthas.core.util.ArthasCheckUtils.isEquals;
+import java.util.concurrent.TimeUnit;
 
 /**
  * 输出的内容格式为:<br/>
@@ -64,15 +66,17 @@ import static com.taobao.arthas.core.util.ArthasCheckUtils.isEquals;
  * <td>0%</td>
  * </tr>
  * </table>
+ * 每个函数的统计数据用分段计数器和固定大小的耗时直方图保存，记录时没有对象分配，
+ * 统计周期到了之后由 MonitorTimer 一次性读取并清零，同时输出 p50/p90/p99/max 耗时。
  *
  * @author beiwei30 on 28/11/2016.
  */
 class MonitorAdviceListener extends AdviceListenerAdapter {
     // 输出定时任务
-    private Timer timer;
+    private ScheduledTask timer;
     private static final Logger logger = LoggerFactory.getLogger(MonitorAdviceListener.class);
-    // 监控数据
-    private ConcurrentHashMap<Key, AtomicReference<MonitorData>> monitorData = new ConcurrentHashMap<Key, AtomicReference<MonitorData>>();
+    // 监控数据，className -> methodName -> 统计数据，两层 map 避免每次调用都创建 key 对象
+    private ConcurrentHashMap<String, ConcurrentHashMap<String, MethodStatistics>> monitorData = new ConcurrentHashMap<String, ConcurrentHashMap<String, MethodStatistics>>();
     private final ThreadLocalWatch threadLocalWatch = new ThreadLocalWatch();
     private final ThreadLocal<Boolean> conditionResult = new ThreadLocal<Boolean>() {
         @Override
@@ -92,9 +96,10 @@ class MonitorAdviceListener extends AdviceListenerAdapter {
     @Override
     public synchronized void create() {
         if (timer == null) {
-            timer = new Timer("Timer-for-arthas-monitor-" + process.session().getSessionId(), true);
-            timer.scheduleAtFixedRate(new MonitorTimer(monitorData, process, command.getNumberOfLimit()),
-                    0, command.getCycle() * 1000);
+            timer = ArthasBootstrap.getInstance().getCommandScheduler().scheduleAtFixedRate(
+                    process.session().getSessionId(), TaskPriority.PERIODIC,
+                    new MonitorTimer(monitorData, process, command.getNumberOfLimit()),
+                    0, command.getCycle() * 1000L, TimeUnit.MILLISECONDS);
         }
     }
 
@@ -122,26 +127,31 @@ class MonitorAdviceListener extends AdviceListenerAdapter {
     @Override
     public void afterReturning(ClassLoader loader, Class<?> clazz, ArthasMethod method, Object target,
                                Object[] args, Object returnObject) throws Throwable {
-        finishing(clazz, method, false, Advice.newForAfterRetuning(loader, clazz, method, target, args, returnObject));
+        finishing(loader, clazz, method, target, args, false, returnObject, null);
     }
 
     @Override
     public void afterThrowing(ClassLoader loader, Class<?> clazz, ArthasMethod method, Object target,
                               Object[] args, Throwable throwable) {
-        finishing(clazz, method, true, Advice.newForAfterThrowing(loader, clazz, method, target, args, throwable));
+        finishing(loader, clazz, method, target, args, true, null, throwable);
     }
 
-    private void finishing(Class<?> clazz, ArthasMethod method, boolean isThrowing, Advice advice) {
-        double cost = threadLocalWatch.costInMillis();
+    private void finishing(ClassLoader loader, Class<?> clazz, ArthasMethod method, Object target, Object[] args,
+                           boolean isThrowing, Object returnObject, Throwable throwable) {
+        long costInNanos = threadLocalWatch.cost();
 
         if (command.isBefore()) {
             if (!this.conditionResult.get()) {
                 return;
             }
-        } else {
+        } else if (!StringUtils.isEmpty(this.command.getConditionExpress())) {
+            // 只有在有 condition-express 时才创建 Advice
+            Advice advice = isThrowing
+                    ? Advice.newForAfterThrowing(loader, clazz, method, target, args, throwable)
+                    : Advice.newForAfterRetuning(loader, clazz, method, target, args, returnObject);
             try {
                 //不满足condition-express的不纳入统计
-                if (!isConditionMet(this.command.getConditionExpress(), advice, cost)) {
+                if (!isConditionMet(this.command.getConditionExpress(), advice, costInNanos / 1000000.0)) {
                     return;
                 }
             } catch (ExpressException e) {
@@ -151,41 +161,36 @@ class MonitorAdviceListener extends AdviceListenerAdapter {
             }
         }
 
-        final Key key = new Key(clazz.getName(), method.getName());
+        methodStatistics(clazz.getName(), method.getName()).record(costInNanos, isThrowing);
+    }
 
-        while (true) {
-            AtomicReference<MonitorData> value = monitorData.get(key);
-            if (null == value) {
-                monitorData.putIfAbsent(key, new AtomicReference<MonitorData>(new MonitorData()));
-                continue;
+    private MethodStatistics methodStatistics(String className, String methodName) {
+        ConcurrentHashMap<String, MethodStatistics> methods = monitorData.get(className);
+        if (methods == null) {
+            methods = new ConcurrentHashMap<String, MethodStatistics>();
+            ConcurrentHashMap<String, MethodStatistics> old = monitorData.putIfAbsent(className, methods);
+            if (old != null) {
+                methods = old;
             }
-
-            while (true) {
-                MonitorData oData = value.get();
-                MonitorData nData = new MonitorData();
-                nData.setCost(oData.getCost() + cost);
-                if (isThrowing) {
-                    nData.setFailed(oData.getFailed() + 1);
-                    nData.setSuccess(oData.getSuccess());
-                } else {
-                    nData.setFailed(oData.getFailed());
-                    nData.setSuccess(oData.getSuccess() + 1);
-                }
-                nData.setTotal(oData.getTotal() + 1);
-                if (value.compareAndSet(oData, nData)) {
-                    break;
-                }
+        }
+        MethodStatistics statistics = methods.get(methodName);
+        if (statistics == null) {
+            statistics = new MethodStatistics();
+            MethodStatistics old = methods.putIfAbsent(methodName, statistics);
+            if (old != null) {
+                statistics = old;
             }
-            break;
         }
+        return statistics;
     }
 
-    private class MonitorTimer extends TimerTask {
-        private Map<Key, AtomicReference<MonitorData>> monitorData;
+    private class MonitorTimer implements Runnable {
+        private Map<String, ConcurrentHashMap<String, MethodStatistics>> monitorData;
         private CommandProcess process;
         private int limit;
 
-        MonitorTimer(Map<Key, AtomicReference<MonitorData>> monitorData, CommandProcess process, int limit) {
+        MonitorTimer(Map<String, ConcurrentHashMap<String, MethodStatistics>> monitorData, CommandProcess process,
+                int limit) {
             this.monitorData = monitorData;
             this.process = process;
             this.limit = limit;
@@ -198,27 +203,17 @@ class MonitorAdviceListener extends AdviceListenerAdapter {
             }
             // 超过次数上限，则不再输出，命令终止
             if (process.times().getAndIncrement() >= limit) {
-                this.cancel();
+                destroy();
                 abortProcess(process, limit);
                 return;
             }
 
-            List<MonitorData> monitorDataList = new ArrayList<MonitorData>(monitorData.size());
-            for (Map.Entry<Key, AtomicReference<MonitorData>> entry : monitorData.entrySet()) {
-                final AtomicReference<MonitorData> value = entry.getValue();
-
-                MonitorData data;
-                while (true) {
-                    data = value.get();
-                    //swap monitor data to new instance
-                    if (value.compareAndSet(data, new MonitorData())) {
-                        break;
-                    }
-                }
-
-                if (null != data) {
-                    data.setClassName(entry.getKey().getClassName());
-                    data.setMethodName(entry.getKey().getMethodName());
+            List<MonitorData> monitorDataList = new ArrayList<MonitorData>();
+            for (Map.Entry<String, ConcurrentHashMap<String, MethodStatistics>> classEntry : monitorData.entrySet()) {
+                for (Map.Entry<String, MethodStatistics> methodEntry : classEntry.getValue().entrySet()) {
+                    MonitorData data = methodEntry.getValue().snapshotAndReset();
+                    data.setClassName(classEntry.getKey());
+                    data.setMethodName(methodEntry.getKey());
                     monitorDataList.add(data);
                 }
             }
@@ -228,42 +223,43 @@ class MonitorAdviceListener extends AdviceListenerAdapter {
     }
 
     /**
-     * 数据监控用的Key
-     *
-     * @author vlinux
+     * 单个函数的统计数据，记录时只做原子累加，没有对象分配
      */
-    private static class Key {
-        private final String className;
-        private final String methodName;
+    private static class MethodStatistics {
+        private final StripedCounter success = new StripedCounter();
+        private final StripedCounter failed = new StripedCounter();
+        private final StripedCounter costInNanos = new StripedCounter();
+        private final LatencyHistogram histogram = new LatencyHistogram();
 
-        Key(String className, String behaviorName) {
-            this.className = className;
-            this.methodName = behaviorName;
-        }
-
-        public String getClassName() {
-            return className;
-        }
-
-        public String getMethodName() {
-            return methodName;
+        void record(long cost, boolean isThrowing) {
+            if (isThrowing) {
+                failed.increment();
+            } else {
+                success.increment();
+            }
+            costInNanos.add(cost);
+            histogram.record(cost / 1000);
         }
 
-        @Override
-        public int hashCode() {
-            return className.hashCode() + methodName.hashCode();
-        }
+        /**
+         * 读取一个周期的数据并清零。各个计数器之间不是原子的，周期边界上的调用可能会被算到下一个周期。
+         */
+        MonitorData snapshotAndReset() {
+            MonitorData data = new MonitorData();
+            int successCount = (int) success.sumThenReset();
+            int failedCount = (int) failed.sumThenReset();
+            data.setSuccess(successCount);
+            data.setFailed(failedCount);
+            data.setTotal(successCount + failedCount);
+            data.setCost(costInNanos.sumThenReset() / 1000000.0);
 
-        @Override
-        public boolean equals(Object obj) {
-            if (null == obj
-                    || !(obj instanceof Key)) {
-                return false;
-            }
-            Key okey = (Key) obj;
-            return isEquals(okey.className, className) && isEquals(okey.methodName, methodName);
+            LatencyHistogram.Snapshot snapshot = histogram.snapshotAndReset();
+            data.setP50(snapshot.percentile(50) / 1000.0);
+            data.setP90(snapshot.percentile(90) / 1000.0);
+            data.setP99(snapshot.percentile(99) / 1000.0);
+            data.setMax(snapshot.getMax() / 1000.0);
+            return data;
         }
-
     }
 
 }
@@ -12,6 +12,13 @@ public class MonitorData {
     private int success;
     private int failed;
     private double cost;
+    /**
+     * 以下耗时的单位都是 ms
+     */
+    private double p50;
+    private double p90;
+    private double p99;
+    private double max;
 
     public String getClassName() {
         return className;
@@ -60,4 +67,36 @@ public class MonitorData {
     public void setCost(double cost) {
         this.cost = cost;
     }
+
+    public double getP50() {
+        return p50;
+    }
+
+    public void setP50(double p50) {
+        this.p50 = p50;
+    }
+
+    public double getP90() {
+        return p90;
+    }
+
+    public void setP90(double p90) {
+        this.p90 = p90;
+    }
+
+    public double getP99() {
+        return p99;
+    }
+
+    public void setP99(double p99) {
+        this.p99 = p99;
+    }
+
+    public double getMax() {
+        return max;
+    }
+
+    public void setMax(double max) {
+        this.max = max;
+    }
 }
@@ -9,7 +9,9 @@ import java.util.Arrays;
 import java.util.Date;
 import java.util.HashSet;
 import java.util.List;
+import java.util.Map;
 import java.util.Set;
+import java.util.TreeSet;
 import java.util.concurrent.TimeUnit;
 
 import com.alibaba.arthas.deps.org.slf4j.Logger;
@@ -17,12 +19,16 @@ import com.alibaba.arthas.deps.org.slf4j.LoggerFactory;
 import com.taobao.arthas.common.OSUtils;
 import com.taobao.arthas.core.command.Constants;
 import com.taobao.arthas.core.command.model.ProfilerModel;
+import com.taobao.arthas.core.command.model.ProfilerWindowVO;
+import com.taobao.arthas.core.command.monitor200.ContinuousProfiler.ProfileWindow;
 import com.taobao.arthas.core.server.ArthasBootstrap;
 import com.taobao.arthas.core.shell.cli.CliToken;
 import com.taobao.arthas.core.shell.cli.Completion;
 import com.taobao.arthas.core.shell.cli.CompletionUtils;
 import com.taobao.arthas.core.shell.command.AnnotatedCommand;
 import com.taobao.arthas.core.shell.command.CommandProcess;
+import com.taobao.arthas.core.util.FileUtils;
+import com.taobao.arthas.core.util.scheduler.TaskPriority;
 import com.taobao.middleware.cli.annotations.Argument;
 import com.taobao.middleware.cli.annotations.DefaultValue;
 import com.taobao.middleware.cli.annotations.Description;
@@ -59,6 +65,10 @@ import one.profiler.Counter;
         + "  profiler dumpTraces          # Dump collected stack traces\n"
         + "  profiler execute 'start,framebuf=5000000'      # Execute an agent-compatible profiling command\n"
         + "  profiler execute 'stop,file=/tmp/result.svg'   # Execute an agent-compatible profiling command\n"
+        + "  profiler continuous --window 60 --max-windows 30   # Keep profiling, keep the last 30 windows of 60s in memory\n"
+        + "  profiler history             # List the windows kept by continuous profiling\n"
+        + "  profiler history 12          # Render window 12 (or the window containing a time like 14:05) as flame graph\n"
+        + "  profiler diff 11 12          # Render the differential flame graph of window 12 against window 11\n"
         + Constants.WIKI + Constants.WIKI_HOME + "profiler")
 //@formatter:on
 public class ProfilerCommand extends AnnotatedCommand {
@@ -66,6 +76,7 @@ public class ProfilerCommand extends AnnotatedCommand {
 
     private String action;
     private String actionArg;
+    private String actionArg2;
 
     private String event;
 
@@ -115,8 +126,15 @@ public class ProfilerCommand extends AnnotatedCommand {
      */
     private List<String> excludes;
 
+    /**
+     * continuous profiling 每个窗口的秒数，以及保存的窗口个数
+     */
+    private long window;
+    private int maxWindows;
+
     private static String libPath;
     private static AsyncProfiler profiler = null;
+    private static volatile ContinuousProfiler continuousProfiler = null;
 
     static {
         String profierSoPath = null;
@@ -159,6 +177,12 @@ public class ProfilerCommand extends AnnotatedCommand {
         this.actionArg = actionArg;
     }
 
+    @Argument(argName = "actionArg2", index = 2, required = false)
+    @Description("The second argument, for example the window to compare of diff")
+    public void setActionArg2(String actionArg2) {
+        this.actionArg2 = actionArg2;
+    }
+
     @Option(shortName = "i", longName = "interval")
     @Description("sampling interval in ns (default: 10'000'000, i.e. 10 ms)")
     @DefaultValue("10000000")
@@ -180,7 +204,7 @@ public class ProfilerCommand extends AnnotatedCommand {
     }
 
     @Option(longName = "format")
-    @Description("dump output file format(svg, html, jfr), default valut is svg")
+    @Description("dump output file format(svg, html, jfr), history and diff also support collapsed, default valut is svg")
     @DefaultValue("svg")
     public void setFormat(String format) {
         this.format = format;
@@ -229,6 +253,20 @@ public class ProfilerCommand extends AnnotatedCommand {
         this.excludes = excludes;
     }
 
+    @Option(longName = "window")
+    @Description("the window (in seconds) of continuous profiling, default value is 60")
+    @DefaultValue("60")
+    public void setWindow(long window) {
+        this.window = window;
+    }
+
+    @Option(longName = "max-windows")
+    @Description("the number of windows kept in memory by continuous profiling, default value is 30")
+    @DefaultValue("30")
+    public void setMaxWindows(int maxWindows) {
+        this.maxWindows = maxWindows;
+    }
+
     private AsyncProfiler profilerInstance() {
         if (profiler != null) {
             return profiler;
@@ -262,6 +300,8 @@ public class ProfilerCommand extends AnnotatedCommand {
 
         dumpCollapsed, dumpFlat, dumpTraces, getSamples,
 
+        continuous, history, diff,
+
         actions
     }
 
@@ -328,6 +368,15 @@ public class ProfilerCommand extends AnnotatedCommand {
                 return;
             }
 
+            // 历史窗口已经保存在内存里，不需要加载 async-profiler
+            if (ProfilerAction.history.equals(profilerAction)) {
+                processHistory(process);
+                return;
+            } else if (ProfilerAction.diff.equals(profilerAction)) {
+                processDiff(process);
+                return;
+            }
+
             final AsyncProfiler asyncProfiler = this.profilerInstance();
 
             if (ProfilerAction.execute.equals(profilerAction)) {
@@ -352,7 +401,8 @@ public class ProfilerCommand extends AnnotatedCommand {
                     profilerModel.setDuration(duration);
 
                     // 延时执行stop
-                    ArthasBootstrap.getInstance().getScheduledExecutorService().schedule(new Runnable() {
+                    ArthasBootstrap.getInstance().getCommandScheduler().schedule(process.session().getSessionId(),
+                            TaskPriority.BACKGROUND, new Runnable() {
                         @Override
                         public void run() {
                             //在异步线程执行，profiler命令已经结束，不能输出到客户端
@@ -368,9 +418,19 @@ public class ProfilerCommand extends AnnotatedCommand {
                     }, this.duration, TimeUnit.SECONDS);
                 }
                 process.appendResult(profilerModel);
+            } else if (ProfilerAction.continuous.equals(profilerAction)) {
+                if (!processContinuous(process, asyncProfiler)) {
+                    return;
+                }
             } else if (ProfilerAction.stop.equals(profilerAction)) {
-                ProfilerModel profilerModel = processStop(asyncProfiler);
-                process.appendResult(profilerModel);
+                ContinuousProfiler continuous = continuousProfiler;
+                if (continuous != null && continuous.isRunning()) {
+                    continuous.stop();
+                    appendExecuteResult(process, continuous.status() + "\n");
+                } else {
+                    ProfilerModel profilerModel = processStop(asyncProfiler);
+                    process.appendResult(profilerModel);
+                }
             } else if (ProfilerAction.resume.equals(profilerAction)) {
                 String executeArgs = executeArgs(ProfilerAction.resume);
                 String result = execute(asyncProfiler, executeArgs);
@@ -383,6 +443,10 @@ public class ProfilerCommand extends AnnotatedCommand {
                 appendExecuteResult(process, result);
             } else if (ProfilerAction.status.equals(profilerAction)) {
                 String result = asyncProfiler.execute("status");
+                ContinuousProfiler continuous = continuousProfiler;
+                if (continuous != null) {
+                    result = (result.endsWith("\n") ? result : result + "\n") + continuous.status() + "\n";
+                }
                 appendExecuteResult(process, result);
             } else if (ProfilerAction.dumpCollapsed.equals(profilerAction)) {
                 if (actionArg == null) {
@@ -421,6 +485,141 @@ public class ProfilerCommand extends AnnotatedCommand {
         }
     }
 
+    /**
+     * @return false 如果命令已经出错结束
+     */
+    private boolean processContinuous(CommandProcess process, AsyncProfiler asyncProfiler) throws IOException {
+        ContinuousProfiler continuous = continuousProfiler;
+        if (continuous != null && continuous.isRunning()) {
+            process.end(1, "continuous profiling is already running, stop it with 'profiler stop'.");
+            return false;
+        }
+        if (window <= 0 || maxWindows <= 0) {
+            process.end(1, "window and max-windows should be positive.");
+            return false;
+        }
+        // 每个窗口的数据由 dumpCollapsed 取出，不需要输出文件
+        this.file = null;
+        continuous = new ContinuousProfiler(asyncProfiler, executeArgs(ProfilerAction.start), event, window,
+                maxWindows);
+        String result = continuous.start();
+        continuousProfiler = continuous;
+        if (!result.endsWith("\n")) {
+            result += "\n";
+        }
+        appendExecuteResult(process, result + continuous.status() + "\n");
+        return true;
+    }
+
+    private void processHistory(CommandProcess process) throws IOException {
+        ContinuousProfiler continuous = continuousProfiler;
+        if (continuous == null) {
+            process.end(1, "continuous profiling is not started, start it with 'profiler continuous'.");
+            return;
+        }
+        if (actionArg == null) {
+            List<ProfilerWindowVO> windows = new ArrayList<ProfilerWindowVO>();
+            for (ProfileWindow window : continuous.windows()) {
+                windows.add(new ProfilerWindowVO(window.getId(), new Date(window.getStartTime()),
+                        new Date(window.getEndTime()), window.getEvent(), window.getSamples(),
+                        window.getCompressedBytes()));
+            }
+            ProfilerModel profilerModel = createProfilerModel(continuous.status() + "\n");
+            profilerModel.setWindows(windows);
+            process.appendResult(profilerModel);
+            process.end();
+            return;
+        }
+        ProfileWindow window = findWindow(process, continuous, actionArg);
+        if (window == null) {
+            return;
+        }
+        String collapsed = window.collapsed();
+        String content;
+        if ("collapsed".equals(format)) {
+            content = collapsed;
+        } else {
+            content = FlameGraph.render(title(window), FlameGraph.parseCollapsed(collapsed), null);
+        }
+        writeWindowFile(process, "profiler-window-" + window.getId(), content);
+    }
+
+    private void processDiff(CommandProcess process) throws IOException {
+        ContinuousProfiler continuous = continuousProfiler;
+        if (continuous == null) {
+            process.end(1, "continuous profiling is not started, start it with 'profiler continuous'.");
+            return;
+        }
+        if (actionArg == null || actionArg2 == null) {
+            process.end(1, "diff needs two windows, for example: profiler diff 11 12");
+            return;
+        }
+        ProfileWindow baseline = findWindow(process, continuous, actionArg);
+        if (baseline == null) {
+            return;
+        }
+        ProfileWindow current = findWindow(process, continuous, actionArg2);
+        if (current == null) {
+            return;
+        }
+        Map<String, Long> baselineStacks = FlameGraph.parseCollapsed(baseline.collapsed());
+        Map<String, Long> currentStacks = FlameGraph.parseCollapsed(current.collapsed());
+        String content;
+        if ("collapsed".equals(format)) {
+            // 和 FlameGraph 的 difffolded.pl 输出一样：stack baselineCount currentCount
+            StringBuilder sb = new StringBuilder();
+            Set<String> stacks = new TreeSet<String>(baselineStacks.keySet());
+            stacks.addAll(currentStacks.keySet());
+            for (String stack : stacks) {
+                Long before = baselineStacks.get(stack);
+                Long after = currentStacks.get(stack);
+                sb.append(stack).append(' ').append(before == null ? 0 : before).append(' ')
+                        .append(after == null ? 0 : after).append('\n');
+            }
+            content = sb.toString();
+        } else {
+            content = FlameGraph.render(title(current) + " vs window " + baseline.getId(), currentStacks,
+                    baselineStacks);
+        }
+        writeWindowFile(process, "profiler-diff-" + baseline.getId() + "-" + current.getId(), content);
+    }
+
+    private ProfileWindow findWindow(CommandProcess process, ContinuousProfiler continuous, String ref) {
+        ProfileWindow window;
+        try {
+            window = continuous.find(ref);
+        } catch (IllegalArgumentException e) {
+            process.end(1, e.getMessage());
+            return null;
+        }
+        if (window == null) {
+            process.end(1, "can not find window: " + ref + ", list the windows with 'profiler history'.");
+        }
+        return window;
+    }
+
+    private static String title(ProfileWindow window) {
+        SimpleDateFormat format = new SimpleDateFormat("yyyy-MM-dd HH:mm:ss");
+        return "window " + window.getId() + " " + window.getEvent() + " " + format.format(new Date(window.getStartTime()))
+                + " - " + format.format(new Date(window.getEndTime()));
+    }
+
+    private void writeWindowFile(CommandProcess process, String name, String content) throws IOException {
+        if ("html".equals(format)) {
+            content = "<!DOCTYPE html>\n<html><body>\n" + content + "</body></html>\n";
+        } else if (!"svg".equals(format) && !"collapsed".equals(format)) {
+            process.end(1, "history and diff only support svg, html and collapsed format.");
+            return;
+        }
+        File outputFile = this.file != null ? new File(this.file)
+                : new File("arthas-output", name + ("collapsed".equals(format) ? ".txt" : "." + format));
+        FileUtils.writeByteArrayToFile(outputFile, content.getBytes("UTF-8"));
+        ProfilerModel profilerModel = createProfilerModel(null);
+        profilerModel.setOutputFile(outputFile.getAbsolutePath());
+        process.appendResult(profilerModel);
+        process.end();
+    }
+
     private ProfilerModel processStop(AsyncProfiler asyncProfiler) throws IOException {
         String outputFile = outputFile();
         String executeArgs = executeArgs(ProfilerAction.stop);
@@ -506,7 +705,7 @@ public class ProfilerCommand extends AnnotatedCommand {
                     CompletionUtils.complete(completion, events());
                     return;
                 } else if (token_2.equals("-f") || token_2.equals("--format")) {
-                    CompletionUtils.complete(completion, Arrays.asList("svg", "html", "jfr"));
+                    CompletionUtils.complete(completion, Arrays.asList("svg", "html", "jfr", "collapsed"));
                     return;
                 }
             }
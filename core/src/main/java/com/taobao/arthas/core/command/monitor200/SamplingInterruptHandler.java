@@ -0,0 +1,40 @@
+package com.taobao.arthas.core.command.monitor200;
+
+import com.taobao.arthas.core.advisor.InvocationSampler;
+import com.taobao.arthas.core.advisor.OverheadGovernor;
+import com.taobao.arthas.core.command.model.MessageModel;
+import com.taobao.arthas.core.shell.command.CommandProcess;
+import com.taobao.arthas.core.shell.handlers.Handler;
+
+/**
+ * Ctrl-C 退出时，先输出蓄水池里的结果和采样统计，
+ * 以及因为 overhead-budget 调整过采样率（或者 -v）时 listener 的开销统计
+ */
+class SamplingInterruptHandler implements Handler<Void> {
+
+    private final CommandProcess process;
+    private final InvocationSampler sampler;
+    private final OverheadGovernor governor;
+    private final boolean verbose;
+
+    SamplingInterruptHandler(CommandProcess process, InvocationSampler sampler, OverheadGovernor governor,
+            boolean verbose) {
+        this.process = process;
+        this.sampler = sampler;
+        this.governor = governor;
+        this.verbose = verbose;
+    }
+
+    @Override
+    public void handle(Void event) {
+        if (sampler != null) {
+            sampler.flush();
+            process.appendResult(new MessageModel(sampler.summary()));
+        }
+        if (governor != null && (governor.isAdjusted() || verbose)) {
+            process.appendResult(new MessageModel(governor.summary()));
+        }
+        process.end();
+        process.session().unLock();
+    }
+}
@@ -40,6 +40,7 @@ import java.util.Set;
         "  thread 51\n" +
         "  thread -n -1\n" +
         "  thread -n 5\n" +
+        "  thread -n 5 --window 5\n" +
         "  thread -b\n" +
         "  thread -i 2000\n" +
         "  thread --state BLOCKED\n" +
@@ -47,11 +48,19 @@ import java.util.Set;
 public class ThreadCommand extends AnnotatedCommand {
     private static Set<String> states = null;
     private static ThreadMXBean threadMXBean = ManagementFactory.getThreadMXBean();
+    /**
+     * 后台采样还没有启动时，第一次采样等待的时间
+     */
+    private static final int DEFAULT_SAMPLE_INTERVAL = 200;
 
     private long id = -1;
     private Integer topNBusy = null;
     private boolean findMostBlockingThread = false;
-    private int sampleInterval = 200;
+    /**
+     * 指定了采样间隔时单独采样，否则使用后台共享的采样结果
+     */
+    private Integer sampleInterval = null;
+    private Integer window = null;
     private String state;
 
     private boolean lockedMonitors = false;
@@ -90,11 +99,18 @@ public class ThreadCommand extends AnnotatedCommand {
     }
 
     @Option(shortName = "i", longName = "sample-interval")
-    @Description("Specify the sampling interval (in ms) when calculating cpu usage.")
+    @Description("Specify the sampling interval (in ms) when calculating cpu usage, "
+            + "the shared background sampler is used if not specified.")
     public void setSampleInterval(int sampleInterval) {
         this.sampleInterval = sampleInterval;
     }
 
+    @Option(longName = "window")
+    @Description("Calculate cpu usage over the last N minutes (1, 5 or 15) from the shared background sampler.")
+    public void setWindow(Integer window) {
+        this.window = window;
+    }
+
     @Option(longName = "state")
     @Description("Display the thead filter by the state. NEW, RUNNABLE, TIMED_WAITING, WAITING, BLOCKED, TERMINATED is optional.")
     public void setState(String state) {
@@ -116,7 +132,12 @@ public class ThreadCommand extends AnnotatedCommand {
     @Override
     public void process(CommandProcess process) {
         ExitStatus exitStatus;
-        if (id > 0) {
+        if (window != null && (window <= 0 || window * 60 * 1000L > ThreadCpuSampler.MAX_WINDOW_MILLIS)) {
+            exitStatus = ExitStatus.failure(1, "Illegal argument, window should be between 1 and "
+                    + ThreadCpuSampler.MAX_WINDOW_MILLIS / 60000 + " minutes");
+        } else if (window != null && sampleInterval != null) {
+            exitStatus = ExitStatus.failure(1, "Illegal argument, --window and --sample-interval can not be used together");
+        } else if (id > 0) {
             exitStatus = processThread(process);
         } else if (topNBusy != null) {
             exitStatus = processTopBusyThreads(process);
@@ -129,7 +150,7 @@ public class ThreadCommand extends AnnotatedCommand {
     }
 
     private ExitStatus processAllThreads(CommandProcess process) {
-        Map<String, ThreadVO> threads = ThreadUtil.getThreads();
+        List<ThreadVO> threads = ThreadCpuSampler.getInstance().getThreads();
 
         // 统计各种线程状态
         Map<State, Integer> stateCountMap = new LinkedHashMap<State, Integer>();
@@ -137,7 +158,7 @@ public class ThreadCommand extends AnnotatedCommand {
             stateCountMap.put(s, 0);
         }
 
-        for (ThreadVO thread : threads.values()) {
+        for (ThreadVO thread : threads) {
             State threadState = thread.getState();
             Integer count = stateCountMap.get(threadState);
             stateCountMap.put(threadState, count + 1);
@@ -149,7 +170,7 @@ public class ThreadCommand extends AnnotatedCommand {
             this.state = this.state.toUpperCase();
             if (states.contains(this.state)) {
                 includeInternalThreads = false;
-                for (ThreadVO thread : threads.values()) {
+                for (ThreadVO thread : threads) {
                     if (thread.getState() != null && state.equals(thread.getState().name())) {
                         resultThreads.add(thread);
                     }
@@ -158,15 +179,11 @@ public class ThreadCommand extends AnnotatedCommand {
                 return ExitStatus.failure(1, "Illegal argument, state should be one of " + states);
             }
         } else {
-            resultThreads = threads.values();
+            resultThreads = threads;
         }
 
         //thread stats
-        ThreadSampler threadSampler = new ThreadSampler();
-        threadSampler.setIncludeInternalThreads(includeInternalThreads);
-        threadSampler.sample(resultThreads);
-        threadSampler.pause(sampleInterval);
-        List<ThreadVO> threadStats = threadSampler.sample(resultThreads);
+        List<ThreadVO> threadStats = sample(resultThreads, includeInternalThreads);
 
         process.appendResult(new ThreadModel(threadStats, stateCountMap, all));
         return ExitStatus.success();
@@ -182,10 +199,7 @@ public class ThreadCommand extends AnnotatedCommand {
     }
 
     private ExitStatus processTopBusyThreads(CommandProcess process) {
-        ThreadSampler threadSampler = new ThreadSampler();
-        threadSampler.sample(ThreadUtil.getThreads().values());
-        threadSampler.pause(sampleInterval);
-        List<ThreadVO> threadStats = threadSampler.sample(ThreadUtil.getThreads().values());
+        List<ThreadVO> threadStats = sample(ThreadCpuSampler.getInstance().getThreads(), true);
 
         int limit = Math.min(threadStats.size(), topNBusy);
         List<ThreadVO> topNThreads = threadStats.subList(0, limit);
@@ -212,6 +226,19 @@ public class ThreadCommand extends AnnotatedCommand {
         return ExitStatus.success();
     }
 
+    private List<ThreadVO> sample(Collection<ThreadVO> threads, boolean includeInternalThreads) {
+        if (sampleInterval != null) {
+            ThreadSampler threadSampler = new ThreadSampler();
+            threadSampler.setIncludeInternalThreads(includeInternalThreads);
+            threadSampler.sample(threads);
+            threadSampler.pause(sampleInterval);
+            return threadSampler.sample(threads);
+        }
+        long windowMillis = window != null ? window * 60 * 1000L : 0;
+        return ThreadCpuSampler.getInstance().sample(threads, windowMillis, includeInternalThreads,
+                DEFAULT_SAMPLE_INTERVAL);
+    }
+
     private ThreadInfo findThreadInfoById(ThreadInfo[] threadInfos, long id) {
         for (int i = 0; i < threadInfos.length; i++) {
             ThreadInfo threadInfo = threadInfos[i];
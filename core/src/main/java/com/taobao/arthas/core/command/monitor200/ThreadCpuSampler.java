@@ -0,0 +1,419 @@
+package com.taobao.arthas.core.command.monitor200;
+
+import java.lang.management.ManagementFactory;
+import java.lang.management.ThreadMXBean;
+import java.lang.ref.WeakReference;
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.Collection;
+import java.util.Collections;
+import java.util.Comparator;
+import java.util.HashMap;
+import java.util.List;
+import java.util.Map;
+import java.util.concurrent.TimeUnit;
+
+import com.alibaba.arthas.deps.org.slf4j.Logger;
+import com.alibaba.arthas.deps.org.slf4j.LoggerFactory;
+import com.taobao.arthas.core.GlobalOptions;
+import com.taobao.arthas.core.command.model.ThreadVO;
+import com.taobao.arthas.core.server.ArthasBootstrap;
+import com.taobao.arthas.core.util.ThreadUtil;
+import com.taobao.arthas.core.util.scheduler.ScheduledTask;
+import com.taobao.arthas.core.util.scheduler.TaskPriority;
+
+import sun.management.HotspotThreadMBean;
+import sun.management.ManagementFactoryHelper;
+
+/**
+ * <pre>
+ * 后台持续采样所有线程的 cpu 时间，thread/dashboard 共享同一份采样历史，不需要每次命令都 采样-等待-再采样。
+ *
+ * 1. 按 GlobalOptions.threadSampleInterval 的间隔采样，线程 id 用 getAllThreadIds() 获取，不遍历 ThreadGroup；
+ *    支持的 JVM 上用 com.sun.management.ThreadMXBean.getThreadCpuTime(long[]) 一次读取所有线程的 cpu 时间
+ * 2. 最近 FINE_HISTORY 次采样保存在一个环形队列里，另外每 COARSE_STEP_MILLIS 保存一次到另一个环形队列，
+ *    可以保留 15 分钟的历史，每次采样只保存按 id 排序的 id/cpu 时间 两个数组
+ * 3. 查询时用最新的采样减去窗口开始时的采样，得到每个线程在窗口内的 cpu 时间
+ * 4. 第一次使用时才启动，超过 IDLE_TIMEOUT_MILLIS 没有人查询时自动停止并清空历史
+ * 5. thread/dashboard 需要的线程列表也由这里提供：线程 id 每次用 getAllThreadIds() 获取，
+ *    Thread 对象按 id 缓存，只有出现缓存里没有的 id 时才遍历一次 ThreadGroup
+ * </pre>
+ */
+public class ThreadCpuSampler {
+    private static final Logger logger = LoggerFactory.getLogger(ThreadCpuSampler.class);
+
+    static final int FINE_HISTORY = 16;
+    static final long COARSE_STEP_MILLIS = 15 * 1000;
+    static final long MAX_WINDOW_MILLIS = 15 * 60 * 1000;
+    private static final long IDLE_TIMEOUT_MILLIS = MAX_WINDOW_MILLIS;
+    private static final long MIN_INTERVAL_MILLIS = 100;
+
+    private static volatile ThreadCpuSampler instance;
+
+    private static ThreadMXBean threadMXBean = ManagementFactory.getThreadMXBean();
+    private static HotspotThreadMBean hotspotThreadMBean;
+    private static boolean hotspotThreadMBeanEnable = true;
+    private static boolean bulkCpuTimeEnable = true;
+
+    private final Snapshot[] fine = new Snapshot[FINE_HISTORY];
+    private int fineCount;
+    private final Snapshot[] coarse = new Snapshot[(int) (MAX_WINDOW_MILLIS / COARSE_STEP_MILLIS) + 1];
+    private int coarseCount;
+
+    /**
+     * 线程 id -> Thread，遍历 ThreadGroup 也找不到的 id 保存一个空的引用，不会反复遍历
+     */
+    private final Map<Long, WeakReference<Thread>> threadCache = new HashMap<Long, WeakReference<Thread>>();
+
+    private ScheduledTask task;
+    private long intervalMillis;
+    private volatile long lastAccessTime = System.currentTimeMillis();
+
+    ThreadCpuSampler() {
+    }
+
+    public static ThreadCpuSampler getInstance() {
+        ThreadCpuSampler sampler = instance;
+        if (sampler == null) {
+            synchronized (ThreadCpuSampler.class) {
+                sampler = instance;
+                if (sampler == null) {
+                    sampler = new ThreadCpuSampler();
+                    instance = sampler;
+                }
+            }
+        }
+        return sampler;
+    }
+
+    public static void destroy() {
+        synchronized (ThreadCpuSampler.class) {
+            if (instance != null) {
+                instance.stop();
+                instance = null;
+            }
+        }
+    }
+
+    /**
+     * <pre>
+     * 计算线程在窗口内的 cpu 使用率，结果按窗口内的 cpu 时间从大到小排序。
+     * windowMillis 小于等于 0 时使用最近两次采样的间隔。
+     * 还没有启动时会先启动后台采样，并等待 warmupMillis 做第二次采样。
+     * </pre>
+     *
+     * @param threads 需要计算的线程，不在采样结果里的线程 cpu 为 0
+     */
+    public List<ThreadVO> sample(Collection<ThreadVO> threads, long windowMillis, boolean includeInternalThreads,
+                    long warmupMillis) {
+        lastAccessTime = System.currentTimeMillis();
+        ensureStarted(warmupMillis);
+
+        Snapshot latest;
+        Snapshot baseline;
+        synchronized (this) {
+            latest = latestSnapshot();
+            baseline = latest == null ? null : windowMillis > 0 ? findBaseline(latest.timeNanos - TimeUnit.MILLISECONDS.toNanos(windowMillis))
+                            : previousSnapshot();
+        }
+        return compute(threads, latest, baseline, includeInternalThreads);
+    }
+
+    /**
+     * @return 当前所有的线程，按 id 排序
+     */
+    public List<ThreadVO> getThreads() {
+        long[] ids = threadMXBean.getAllThreadIds();
+        Arrays.sort(ids);
+        List<ThreadVO> threads = new ArrayList<ThreadVO>(ids.length);
+        synchronized (threadCache) {
+            for (long id : ids) {
+                if (!threadCache.containsKey(id)) {
+                    refreshThreadCache(ids);
+                    break;
+                }
+            }
+            for (long id : ids) {
+                WeakReference<Thread> reference = threadCache.get(id);
+                Thread thread = reference == null ? null : reference.get();
+                if (thread != null && thread.getState() != Thread.State.TERMINATED) {
+                    threads.add(ThreadUtil.createThreadVO(thread));
+                }
+            }
+        }
+        return threads;
+    }
+
+    /**
+     * 遍历一次 ThreadGroup 重建缓存，同时去掉已经结束的线程
+     */
+    private void refreshThreadCache(long[] ids) {
+        Map<Long, Thread> liveThreads = new HashMap<Long, Thread>(ids.length * 2);
+        for (Thread thread : ThreadUtil.getThreadList()) {
+            liveThreads.put(thread.getId(), thread);
+        }
+        threadCache.clear();
+        for (long id : ids) {
+            threadCache.put(id, new WeakReference<Thread>(liveThreads.get(id)));
+        }
+    }
+
+    /**
+     * 采样一次，由后台定时任务调用
+     */
+    void tick() {
+        if (System.currentTimeMillis() - lastAccessTime > IDLE_TIMEOUT_MILLIS) {
+            logger.info("no one uses the thread cpu sampler for {} ms, stop it.", IDLE_TIMEOUT_MILLIS);
+            stop();
+            return;
+        }
+        Snapshot snapshot = takeSnapshot();
+        synchronized (this) {
+            if (task == null) {
+                // 已经停止
+                return;
+            }
+            add(snapshot);
+            if (intervalMillis > 0 && intervalMillis != currentInterval()) {
+                // 采样间隔改变了，重新调度
+                cancelTask();
+                schedule();
+            }
+        }
+    }
+
+    synchronized void add(Snapshot snapshot) {
+        fine[fineCount % FINE_HISTORY] = snapshot;
+        fineCount++;
+        Snapshot lastCoarse = coarseCount == 0 ? null : coarse[(coarseCount - 1) % coarse.length];
+        if (lastCoarse == null
+                        || snapshot.timeNanos - lastCoarse.timeNanos >= TimeUnit.MILLISECONDS.toNanos(COARSE_STEP_MILLIS)) {
+            coarse[coarseCount % coarse.length] = snapshot;
+            coarseCount++;
+        }
+    }
+
+    private void ensureStarted(long warmupMillis) {
+        long firstSampleNanos = -1;
+        synchronized (this) {
+            if (task == null) {
+                schedule();
+            }
+            if (fineCount == 0) {
+                add(takeSnapshot());
+            }
+            if (fineCount == 1) {
+                firstSampleNanos = latestSnapshot().timeNanos;
+            }
+        }
+        if (firstSampleNanos >= 0) {
+            long waitMillis = warmupMillis - TimeUnit.NANOSECONDS.toMillis(System.nanoTime() - firstSampleNanos);
+            if (waitMillis > 0) {
+                try {
+                    Thread.sleep(waitMillis);
+                } catch (InterruptedException e) {
+                    Thread.currentThread().interrupt();
+                }
+            }
+            Snapshot snapshot = takeSnapshot();
+            synchronized (this) {
+                if (fineCount == 1) {
+                    add(snapshot);
+                }
+            }
+        }
+    }
+
+    private void schedule() {
+        intervalMillis = currentInterval();
+        task = ArthasBootstrap.getInstance().getCommandScheduler().scheduleAtFixedRate(null, TaskPriority.PERIODIC,
+                        new Runnable() {
+                            @Override
+                            public void run() {
+                                tick();
+                            }
+                        }, intervalMillis, intervalMillis, TimeUnit.MILLISECONDS);
+    }
+
+    private static long currentInterval() {
+        return Math.max(MIN_INTERVAL_MILLIS, GlobalOptions.threadSampleInterval);
+    }
+
+    private void cancelTask() {
+        if (task != null) {
+            task.cancel();
+            task = null;
+        }
+    }
+
+    synchronized void stop() {
+        cancelTask();
+        Arrays.fill(fine, null);
+        Arrays.fill(coarse, null);
+        fineCount = 0;
+        coarseCount = 0;
+    }
+
+    synchronized Snapshot latestSnapshot() {
+        return fineCount == 0 ? null : fine[(fineCount - 1) % FINE_HISTORY];
+    }
+
+    private Snapshot previousSnapshot() {
+        return fineCount < 2 ? null : fine[(fineCount - 2) % FINE_HISTORY];
+    }
+
+    /**
+     * @return 在 sinceNanos 之前（含）最新的一次采样，历史不够长时返回最早的一次采样
+     */
+    synchronized Snapshot findBaseline(long sinceNanos) {
+        Snapshot best = null;
+        Snapshot oldest = null;
+        int fineSize = Math.min(fineCount, FINE_HISTORY);
+        for (int i = 0; i < fineSize; i++) {
+            Snapshot s = fine[(fineCount - 1 - i) % FINE_HISTORY];
+            best = pick(best, s, sinceNanos);
+            oldest = s;
+        }
+        int coarseSize = Math.min(coarseCount, coarse.length);
+        for (int i = 0; i < coarseSize; i++) {
+            Snapshot s = coarse[(coarseCount - 1 - i) % coarse.length];
+            best = pick(best, s, sinceNanos);
+            if (oldest == null || s.timeNanos < oldest.timeNanos) {
+                oldest = s;
+            }
+        }
+        if (best != null) {
+            return best;
+        }
+        Snapshot latest = latestSnapshot();
+        // 只有一次采样时没有可以比较的基准
+        return oldest == latest ? null : oldest;
+    }
+
+    private static Snapshot pick(Snapshot best, Snapshot candidate, long sinceNanos) {
+        if (candidate.timeNanos <= sinceNanos && (best == null || candidate.timeNanos > best.timeNanos)) {
+            return candidate;
+        }
+        return best;
+    }
+
+    static List<ThreadVO> compute(Collection<ThreadVO> originThreads, Snapshot latest, Snapshot baseline,
+                    boolean includeInternalThreads) {
+        List<ThreadVO> threads = new ArrayList<ThreadVO>(originThreads);
+        if (includeInternalThreads && latest != null && latest.internalCpuTimes != null) {
+            for (Map.Entry<String, Long> entry : latest.internalCpuTimes.entrySet()) {
+                threads.add(createThreadVO(entry.getKey()));
+            }
+        }
+        long intervalNanos = baseline == null ? 0 : latest.timeNanos - baseline.timeNanos;
+        for (ThreadVO thread : threads) {
+            long cpu = latest == null ? -1 : latest.cpuTime(thread);
+            long delta = 0;
+            if (cpu >= 0 && baseline != null) {
+                long base = baseline.cpuTime(thread);
+                // 窗口开始之后才创建的线程，所有的 cpu 时间都在窗口内
+                delta = Math.max(0, cpu - Math.max(0, base));
+            }
+            thread.setTime(Math.max(0, cpu) / 1000000);
+            thread.setDeltaTime(delta / 1000000);
+            thread.setCpu(intervalNanos == 0 ? 0 : (delta * 10000 / intervalNanos / 100.0));
+        }
+
+        // Sort by CPU time : should be a rendering hint...
+        final boolean byTotal = baseline == null;
+        Collections.sort(threads, new Comparator<ThreadVO>() {
+            @Override
+            public int compare(ThreadVO o1, ThreadVO o2) {
+                long l1 = byTotal ? o1.getTime() : o1.getDeltaTime();
+                long l2 = byTotal ? o2.getTime() : o2.getDeltaTime();
+                if (l1 == l2 && !byTotal) {
+                    double c1 = o1.getCpu();
+                    double c2 = o2.getCpu();
+                    return c1 < c2 ? 1 : (c1 > c2 ? -1 : 0);
+                }
+                return l1 < l2 ? 1 : (l1 > l2 ? -1 : 0);
+            }
+        });
+        return threads;
+    }
+
+    static Snapshot takeSnapshot() {
+        long[] ids = threadMXBean.getAllThreadIds();
+        Arrays.sort(ids);
+        long[] cpuTimes = getThreadCpuTimes(ids);
+        return new Snapshot(System.nanoTime(), ids, cpuTimes, getInternalThreadCpuTimes());
+    }
+
+    private static long[] getThreadCpuTimes(long[] ids) {
+        if (bulkCpuTimeEnable && threadMXBean instanceof com.sun.management.ThreadMXBean) {
+            try {
+                return ((com.sun.management.ThreadMXBean) threadMXBean).getThreadCpuTime(ids);
+            } catch (Throwable e) {
+                // 老版本的 JVM 没有这个方法
+                bulkCpuTimeEnable = false;
+            }
+        }
+        long[] cpuTimes = new long[ids.length];
+        for (int i = 0; i < ids.length; i++) {
+            cpuTimes[i] = threadMXBean.getThreadCpuTime(ids[i]);
+        }
+        return cpuTimes;
+    }
+
+    private static Map<String, Long> getInternalThreadCpuTimes() {
+        if (hotspotThreadMBeanEnable) {
+            try {
+                if (hotspotThreadMBean == null) {
+                    hotspotThreadMBean = ManagementFactoryHelper.getHotspotThreadMBean();
+                }
+                return hotspotThreadMBean.getInternalThreadCpuTimes();
+            } catch (Throwable e) {
+                //ignore ex
+                hotspotThreadMBeanEnable = false;
+            }
+        }
+        return null;
+    }
+
+    private static ThreadVO createThreadVO(String name) {
+        ThreadVO threadVO = new ThreadVO();
+        threadVO.setId(-1);
+        threadVO.setName(name);
+        threadVO.setPriority(-1);
+        threadVO.setDaemon(true);
+        threadVO.setInterrupted(false);
+        return threadVO;
+    }
+
+    /**
+     * 一次采样，ids 是排好序的
+     */
+    static class Snapshot {
+        final long timeNanos;
+        final long[] ids;
+        final long[] cpuTimes;
+        final Map<String, Long> internalCpuTimes;
+
+        Snapshot(long timeNanos, long[] ids, long[] cpuTimes, Map<String, Long> internalCpuTimes) {
+            this.timeNanos = timeNanos;
+            this.ids = ids;
+            this.cpuTimes = cpuTimes;
+            this.internalCpuTimes = internalCpuTimes;
+        }
+
+        /**
+         * @return 没有采样到时返回 -1
+         */
+        long cpuTime(ThreadVO thread) {
+            if (thread.getId() > 0) {
+                int index = Arrays.binarySearch(ids, thread.getId());
+                return index >= 0 ? cpuTimes[index] : -1;
+            }
+            if (internalCpuTimes != null) {
+                Long cpu = internalCpuTimes.get(thread.getName());
+                return cpu == null ? -1 : cpu;
+            }
+            return -1;
+        }
+    }
+}
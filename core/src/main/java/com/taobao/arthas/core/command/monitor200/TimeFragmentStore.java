@@ -0,0 +1,536 @@
+package com.taobao.arthas.core.command.monitor200;
+
+import java.io.ByteArrayInputStream;
+import java.io.ByteArrayOutputStream;
+import java.io.File;
+import java.io.IOException;
+import java.io.InputStream;
+import java.io.ObjectInputStream;
+import java.io.ObjectOutputStream;
+import java.io.ObjectStreamClass;
+import java.io.OutputStream;
+import java.io.RandomAccessFile;
+import java.io.Serializable;
+import java.lang.ref.WeakReference;
+import java.nio.ByteBuffer;
+import java.nio.MappedByteBuffer;
+import java.nio.channels.FileChannel;
+import java.util.ArrayList;
+import java.util.Collections;
+import java.util.Date;
+import java.util.Iterator;
+import java.util.LinkedHashMap;
+import java.util.List;
+import java.util.Map;
+import java.util.TreeMap;
+import java.util.concurrent.Executor;
+
+import com.alibaba.arthas.deps.org.slf4j.Logger;
+import com.alibaba.arthas.deps.org.slf4j.LoggerFactory;
+import com.taobao.arthas.core.GlobalOptions;
+import com.taobao.arthas.core.advisor.Advice;
+import com.taobao.arthas.core.advisor.ArthasMethod;
+import com.taobao.arthas.core.command.model.TimeFragmentVO;
+import com.taobao.arthas.core.server.ArthasBootstrap;
+import com.taobao.arthas.core.util.ObjectSizeEstimator;
+import com.taobao.arthas.core.util.scheduler.TaskPriority;
+
+/**
+ * <pre>
+ * tt 记录的存储，分为两层：
+ *
+ * 1. 内存：保存完整的 TimeFragment，按 tt-max-records 和 tt-max-bytes 限制条数和估算的大小，
+ *    超出之后按 tt-eviction (fifo/lru) 淘汰。
+ * 2. 磁盘：打开 tt-spill 之后，被淘汰的记录把 params/returnObj/throwExp 序列化到 arthas output 目录下的
+ *    内存映射文件里，文件写满之后循环覆盖最旧的记录。target 只保留弱引用，不会被 tt 持有。
+ *    不能序列化的对象保存为 类名@identityHashCode 字符串。
+ *
+ * 业务线程的 put 只在锁里修改索引，估算大小和序列化都在锁外面：被淘汰的记录先放到 spilling 里，
+ * 由后台任务序列化之后写到文件，等待写入的记录太多时直接丢弃最旧的。
+ * 磁盘上的记录在内存里保留 时间、耗时、类、方法 等元数据，tt -l 不需要读取文件，tt -i/-s 才会反序列化。
+ * </pre>
+ */
+class TimeFragmentStore {
+    private static final Logger logger = LoggerFactory.getLogger(TimeFragmentStore.class);
+
+    private static final String SPILL_FILE = "tt" + File.separator + "tt-spill.dat";
+
+    /**
+     * 每条记录的固定开销，包括 TimeFragment/Advice/ArthasMethod 等对象
+     */
+    private static final long FRAGMENT_OVERHEAD = 256;
+
+    /**
+     * 最多有多少条被淘汰的记录等待写到磁盘
+     */
+    private static final int MAX_SPILLING = 1024;
+
+    private final Executor spillExecutor;
+    private File spillFilePath;
+
+    private boolean accessOrder = false;
+    private LinkedHashMap<Integer, HeapFragment> heap = new LinkedHashMap<Integer, HeapFragment>(16, 0.75f, false);
+    private long heapBytes = 0;
+
+    /**
+     * 被淘汰之后等待写到磁盘的记录
+     */
+    private final LinkedHashMap<Integer, TimeFragment> spilling = new LinkedHashMap<Integer, TimeFragment>();
+    private boolean spillScheduled = false;
+    private final Runnable spillTask = new Runnable() {
+        @Override
+        public void run() {
+            spillPending();
+        }
+    };
+
+    private final LinkedHashMap<Integer, SpilledFragment> spilled = new LinkedHashMap<Integer, SpilledFragment>();
+    private SpillFile spillFile;
+
+    /**
+     * 被直接丢弃的记录数
+     */
+    private long droppedCount = 0;
+
+    TimeFragmentStore() {
+        this(null, null);
+    }
+
+    /**
+     * @param spillFilePath 为 null 时使用 arthas output 目录下的 tt/tt-spill.dat
+     * @param spillExecutor 为 null 时在 CommandScheduler 里执行
+     */
+    TimeFragmentStore(File spillFilePath, Executor spillExecutor) {
+        this.spillFilePath = spillFilePath;
+        this.spillExecutor = spillExecutor;
+    }
+
+    void put(int index, TimeFragment timeFragment) {
+        // 估算大小会遍历参数，放在锁外面
+        long bytes = estimate(timeFragment.getAdvice());
+        boolean scheduleSpill = false;
+        synchronized (this) {
+            checkEvictionPolicy();
+
+            heap.put(index, new HeapFragment(timeFragment, bytes));
+            heapBytes += bytes;
+
+            int maxRecords = Math.max(1, GlobalOptions.ttMaxRecords);
+            long maxBytes = GlobalOptions.ttMaxBytes;
+            Iterator<Map.Entry<Integer, HeapFragment>> it = heap.entrySet().iterator();
+            // 至少保留刚刚放入的这一条
+            while (heap.size() > 1 && (heap.size() > maxRecords || heapBytes > maxBytes) && it.hasNext()) {
+                Map.Entry<Integer, HeapFragment> eldest = it.next();
+                it.remove();
+                heapBytes -= eldest.getValue().bytes;
+                evict(eldest.getKey(), eldest.getValue().timeFragment);
+            }
+            if (!spilling.isEmpty() && !spillScheduled) {
+                spillScheduled = true;
+                scheduleSpill = true;
+            }
+        }
+        if (scheduleSpill) {
+            scheduleSpill();
+        }
+    }
+
+    synchronized TimeFragment get(int index) {
+        HeapFragment heapFragment = heap.get(index);
+        if (heapFragment != null) {
+            return heapFragment.timeFragment;
+        }
+        TimeFragment timeFragment = spilling.get(index);
+        if (timeFragment != null) {
+            return timeFragment;
+        }
+        SpilledFragment spilledFragment = spilled.get(index);
+        if (spilledFragment != null) {
+            return restore(spilledFragment);
+        }
+        return null;
+    }
+
+    synchronized boolean remove(int index) {
+        HeapFragment heapFragment = heap.remove(index);
+        if (heapFragment != null) {
+            heapBytes -= heapFragment.bytes;
+            return true;
+        }
+        return spilling.remove(index) != null || spilled.remove(index) != null;
+    }
+
+    synchronized int size() {
+        return heap.size() + spilling.size() + spilled.size();
+    }
+
+    synchronized void clear() {
+        heap.clear();
+        heapBytes = 0;
+        spilling.clear();
+        spilled.clear();
+        droppedCount = 0;
+        if (spillFile != null) {
+            spillFile.reset();
+        }
+    }
+
+    /**
+     * 按 index 排序返回所有记录的 index
+     */
+    synchronized List<Integer> indexes() {
+        List<Integer> indexes = new ArrayList<Integer>(size());
+        indexes.addAll(spilled.keySet());
+        indexes.addAll(spilling.keySet());
+        indexes.addAll(heap.keySet());
+        Collections.sort(indexes);
+        return indexes;
+    }
+
+    /**
+     * 按 index 排序返回所有记录的列表，磁盘上的记录只用内存里的元数据，不包括 params/returnObj/throwExp
+     */
+    synchronized List<TimeFragmentVO> list() {
+        TreeMap<Integer, TimeFragmentVO> result = new TreeMap<Integer, TimeFragmentVO>();
+        for (Map.Entry<Integer, SpilledFragment> entry : spilled.entrySet()) {
+            result.put(entry.getKey(), entry.getValue().toVO(entry.getKey()));
+        }
+        for (Map.Entry<Integer, TimeFragment> entry : spilling.entrySet()) {
+            result.put(entry.getKey(), TimeTunnelCommand.createTimeFragmentVO(entry.getKey(), entry.getValue()));
+        }
+        for (Map.Entry<Integer, HeapFragment> entry : heap.entrySet()) {
+            result.put(entry.getKey(),
+                    TimeTunnelCommand.createTimeFragmentVO(entry.getKey(), entry.getValue().timeFragment));
+        }
+        return new ArrayList<TimeFragmentVO>(result.values());
+    }
+
+    private void checkEvictionPolicy() {
+        boolean lru = "lru".equalsIgnoreCase(GlobalOptions.ttEviction);
+        if (lru != accessOrder) {
+            LinkedHashMap<Integer, HeapFragment> newHeap = new LinkedHashMap<Integer, HeapFragment>(16, 0.75f, lru);
+            newHeap.putAll(heap);
+            heap = newHeap;
+            accessOrder = lru;
+        }
+    }
+
+    private void evict(int index, TimeFragment timeFragment) {
+        if (!GlobalOptions.ttSpill) {
+            droppedCount++;
+            return;
+        }
+        spilling.put(index, timeFragment);
+        // 后台来不及写入时丢弃最旧的
+        if (spilling.size() > MAX_SPILLING) {
+            Iterator<Integer> it = spilling.keySet().iterator();
+            it.next();
+            it.remove();
+            droppedCount++;
+        }
+    }
+
+    private void scheduleSpill() {
+        try {
+            if (spillExecutor != null) {
+                spillExecutor.execute(spillTask);
+            } else {
+                ArthasBootstrap.getInstance().getCommandScheduler().execute(null, TaskPriority.BACKGROUND, spillTask);
+            }
+        } catch (Throwable e) {
+            // 下一次 put 时再尝试
+            logger.warn("schedule tt spill task failed", e);
+            synchronized (this) {
+                spillScheduled = false;
+            }
+        }
+    }
+
+    /**
+     * 在后台线程里把 spilling 里的记录写到磁盘，序列化在锁外面
+     */
+    private void spillPending() {
+        try {
+            while (true) {
+                int index;
+                TimeFragment timeFragment;
+                synchronized (this) {
+                    if (spilling.isEmpty()) {
+                        spillScheduled = false;
+                        return;
+                    }
+                    Map.Entry<Integer, TimeFragment> eldest = spilling.entrySet().iterator().next();
+                    index = eldest.getKey();
+                    timeFragment = eldest.getValue();
+                }
+
+                byte[] data = null;
+                try {
+                    Advice advice = timeFragment.getAdvice();
+                    data = serialize(new Object[] { advice.getParams(), advice.getReturnObj(), advice.getThrowExp() });
+                } catch (Throwable e) {
+                    logger.warn("serialize time fragment failed, index: {}", index, e);
+                }
+
+                synchronized (this) {
+                    // 序列化期间被删除或者清空了
+                    if (spilling.get(index) != timeFragment) {
+                        continue;
+                    }
+                    spilling.remove(index);
+                    if (data == null || !spill(index, timeFragment, data)) {
+                        droppedCount++;
+                    }
+                }
+            }
+        } catch (Throwable e) {
+            logger.warn("spill time fragments failed", e);
+            synchronized (this) {
+                spillScheduled = false;
+            }
+        }
+    }
+
+    private boolean spill(int index, TimeFragment timeFragment, byte[] data) {
+        try {
+            if (spillFile == null) {
+                if (spillFilePath == null) {
+                    spillFilePath = new File(ArthasBootstrap.getInstance().getOutputPath(), SPILL_FILE);
+                }
+                spillFile = new SpillFile(spillFilePath,
+                        (int) Math.min(Integer.MAX_VALUE, GlobalOptions.ttSpillMaxBytes));
+            }
+
+            if (data.length > spillFile.capacity()) {
+                return false;
+            }
+
+            int offset = spillFile.prepare(data.length);
+            // 文件是循环写的，把会被覆盖的旧记录去掉
+            Iterator<SpilledFragment> it = spilled.values().iterator();
+            while (it.hasNext()) {
+                SpilledFragment eldest = it.next();
+                if (eldest.offset >= offset && eldest.offset < offset + data.length
+                        || spillFile.isWrapped(eldest.offset)) {
+                    it.remove();
+                    droppedCount++;
+                } else {
+                    break;
+                }
+            }
+            spillFile.write(offset, data);
+            spilled.put(index, new SpilledFragment(timeFragment, offset, data.length));
+            return true;
+        } catch (Throwable e) {
+            logger.warn("spill time fragment failed, index: {}", index, e);
+            return false;
+        }
+    }
+
+    private TimeFragment restore(SpilledFragment spilledFragment) {
+        try {
+            byte[] data = spillFile.read(spilledFragment.offset, spilledFragment.length);
+            Object[] values = (Object[]) deserialize(data, spilledFragment.loader);
+            Object[] params = (Object[]) values[0];
+            Object target = spilledFragment.target.get();
+            Advice advice = spilledFragment.isThrow
+                    ? Advice.newForAfterThrowing(spilledFragment.loader, spilledFragment.clazz,
+                            spilledFragment.method, target, params, (Throwable) values[2])
+                    : Advice.newForAfterRetuning(spilledFragment.loader, spilledFragment.clazz,
+                            spilledFragment.method, target, params, values[1]);
+            return new TimeFragment(advice, spilledFragment.gmtCreate, spilledFragment.cost);
+        } catch (Throwable e) {
+            logger.warn("restore spilled time fragment failed.", e);
+            return null;
+        }
+    }
+
+    private static long estimate(Advice advice) {
+        // target 是业务自己持有的对象，不计算在内
+        return FRAGMENT_OVERHEAD + ObjectSizeEstimator.estimate(advice.getParams())
+                + ObjectSizeEstimator.estimate(advice.getReturnObj())
+                + ObjectSizeEstimator.estimate(advice.getThrowExp());
+    }
+
+    static byte[] serialize(Object object) throws IOException {
+        ByteArrayOutputStream bytes = new ByteArrayOutputStream(256);
+        ObjectOutputStream out = new SnapshotObjectOutputStream(bytes);
+        try {
+            out.writeObject(object);
+            out.flush();
+        } finally {
+            out.close();
+        }
+        return bytes.toByteArray();
+    }
+
+    static Object deserialize(byte[] data, ClassLoader loader) throws IOException, ClassNotFoundException {
+        ObjectInputStream in = new SnapshotObjectInputStream(new ByteArrayInputStream(data), loader);
+        try {
+            return in.readObject();
+        } finally {
+            in.close();
+        }
+    }
+
+    /**
+     * 不能序列化的对象替换为 类名@identityHashCode 字符串
+     */
+    static class SnapshotObjectOutputStream extends ObjectOutputStream {
+        SnapshotObjectOutputStream(OutputStream out) throws IOException {
+            super(out);
+            enableReplaceObject(true);
+        }
+
+        @Override
+        protected Object replaceObject(Object obj) throws IOException {
+            if (obj == null || obj instanceof Serializable) {
+                return obj;
+            }
+            return obj.getClass().getName() + "@" + Integer.toHexString(System.identityHashCode(obj));
+        }
+    }
+
+    /**
+     * 优先用被增强类的 ClassLoader 加载类
+     */
+    static class SnapshotObjectInputStream extends ObjectInputStream {
+        private final ClassLoader loader;
+
+        SnapshotObjectInputStream(InputStream in, ClassLoader loader) throws IOException {
+            super(in);
+            this.loader = loader;
+        }
+
+        @Override
+        protected Class<?> resolveClass(ObjectStreamClass desc) throws IOException, ClassNotFoundException {
+            try {
+                return Class.forName(desc.getName(), false, loader);
+            } catch (ClassNotFoundException e) {
+                return super.resolveClass(desc);
+            }
+        }
+    }
+
+    private static class HeapFragment {
+        final TimeFragment timeFragment;
+        final long bytes;
+
+        HeapFragment(TimeFragment timeFragment, long bytes) {
+            this.timeFragment = timeFragment;
+            this.bytes = bytes;
+        }
+    }
+
+    /**
+     * 已经写到磁盘上的记录，只保留很小的元数据
+     */
+    private static class SpilledFragment {
+        final ClassLoader loader;
+        final Class<?> clazz;
+        final ArthasMethod method;
+        final WeakReference<Object> target;
+        /**
+         * 和 TimeTunnelCommand.createTimeFragmentVO 里的 object 一样，target 被回收之后也可以显示
+         */
+        final String object;
+        final boolean isThrow;
+        final Date gmtCreate;
+        final double cost;
+        final int offset;
+        final int length;
+
+        SpilledFragment(TimeFragment timeFragment, int offset, int length) {
+            Advice advice = timeFragment.getAdvice();
+            this.loader = advice.getLoader();
+            this.clazz = advice.getClazz();
+            this.method = advice.getMethod();
+            this.target = new WeakReference<Object>(advice.getTarget());
+            this.object = advice.getTarget() == null ? "NULL"
+                    : "0x" + Integer.toHexString(advice.getTarget().hashCode());
+            this.isThrow = advice.isAfterThrowing();
+            this.gmtCreate = timeFragment.getGmtCreate();
+            this.cost = timeFragment.getCost();
+            this.offset = offset;
+            this.length = length;
+        }
+
+        TimeFragmentVO toVO(int index) {
+            return new TimeFragmentVO()
+                    .setIndex(index)
+                    .setTimestamp(gmtCreate)
+                    .setCost(cost)
+                    .setReturn(!isThrow)
+                    .setThrow(isThrow)
+                    .setObject(object)
+                    .setClassName(clazz.getName())
+                    .setMethodName(method.getName());
+        }
+    }
+
+    /**
+     * 循环写的内存映射文件
+     */
+    private static class SpillFile {
+        private final MappedByteBuffer buffer;
+        private final int capacity;
+        private int writePosition = 0;
+        /**
+         * 上一次从文件末尾绕回开头时的位置，这个位置之后的旧记录都已经失效
+         */
+        private int wrapPosition = -1;
+
+        SpillFile(File file, int capacity) throws IOException {
+            file.getParentFile().mkdirs();
+            RandomAccessFile randomAccessFile = new RandomAccessFile(file, "rw");
+            try {
+                FileChannel channel = randomAccessFile.getChannel();
+                this.buffer = channel.map(FileChannel.MapMode.READ_WRITE, 0, capacity);
+            } finally {
+                // mapping 在 channel 关闭之后仍然有效
+                randomAccessFile.close();
+            }
+            this.capacity = capacity;
+        }
+
+        int capacity() {
+            return capacity;
+        }
+
+        /**
+         * 返回这次写入的位置，空间不够时从头开始
+         */
+        int prepare(int length) {
+            wrapPosition = -1;
+            if (writePosition + length > capacity) {
+                wrapPosition = writePosition;
+                writePosition = 0;
+            }
+            return writePosition;
+        }
+
+        boolean isWrapped(int offset) {
+            return wrapPosition >= 0 && offset >= wrapPosition;
+        }
+
+        void write(int offset, byte[] data) {
+            ByteBuffer view = buffer.duplicate();
+            view.position(offset);
+            view.put(data);
+            writePosition = offset + data.length;
+        }
+
+        byte[] read(int offset, int length) {
+            byte[] data = new byte[length];
+            ByteBuffer view = buffer.duplicate();
+            view.position(offset);
+            view.get(data);
+            return data;
+        }
+
+        void reset() {
+            writePosition = 0;
+            wrapPosition = -1;
+        }
+    }
+}
@@ -91,8 +91,8 @@ public class TimeTunnelAdviceListener extends AdviceListenerAdapter {
         TimeFragmentVO timeFragmentVO = TimeTunnelCommand.createTimeFragmentVO(index, timeTunnel);
         TimeTunnelModel timeTunnelModel = new TimeTunnelModel()
                 .setTimeFragmentList(Arrays.asList(timeFragmentVO))
-                .setFirst(isFirst);
-        process.appendResult(timeTunnelModel);
+                .setFirst(isFirst || getSampler() != null && getSampler().isReservoir());
+        appendResult(process, timeTunnelModel);
 
         if (isFirst) {
             isFirst = false;
@@ -48,6 +48,7 @@ import static java.lang.String.format;
 @Description(Constants.EXPRESS_DESCRIPTION + Constants.EXAMPLE +
         "  tt -t *StringUtils isEmpty\n" +
         "  tt -t *StringUtils isEmpty params[0].length==1\n" +
+        "  tt -t *StringUtils isEmpty --max-per-second 5\n" +
         "  tt -l\n" +
         "  tt -i 1000\n" +
         "  tt -i 1000 -w params[0]\n" +
@@ -58,8 +59,8 @@ import static java.lang.String.format;
         Constants.WIKI + Constants.WIKI_HOME + "tt")
 public class TimeTunnelCommand extends EnhancerCommand {
     // 时间隧道(时间碎片的集合)
-    // TODO 并非线程安全？
-    private static final Map<Integer, TimeFragment> timeFragmentMap = new LinkedHashMap<Integer, TimeFragment>();
+    // 按 tt-max-records/tt-max-bytes 限制大小，可以溢出到磁盘
+    private static final TimeFragmentStore timeFragmentStore = new TimeFragmentStore();
     // 时间碎片序列生成器
     private static final AtomicInteger sequence = new AtomicInteger(1000);
     // TimeTunnel the method call
@@ -262,7 +263,7 @@ public class TimeTunnelCommand extends EnhancerCommand {
      */
     int putTimeTunnel(TimeFragment tt) {
         int indexOfSeq = sequence.getAndIncrement();
-        timeFragmentMap.put(indexOfSeq, tt);
+        timeFragmentStore.put(indexOfSeq, tt);
         return indexOfSeq;
     }
 
@@ -322,7 +323,7 @@ public class TimeTunnelCommand extends EnhancerCommand {
     private void processShow(CommandProcess process) {
         RowAffect affect = new RowAffect();
         try {
-            TimeFragment tf = timeFragmentMap.get(index);
+            TimeFragment tf = timeFragmentStore.get(index);
             if (null == tf) {
                 process.end(1, format("Time fragment[%d] does not exist.", index));
                 return;
@@ -347,7 +348,7 @@ public class TimeTunnelCommand extends EnhancerCommand {
     private void processWatch(CommandProcess process) {
         RowAffect affect = new RowAffect();
         try {
-            final TimeFragment tf = timeFragmentMap.get(index);
+            final TimeFragment tf = timeFragmentStore.get(index);
             if (null == tf) {
                 process.end(1, format("Time fragment[%d] does not exist.", index));
                 return;
@@ -370,15 +371,18 @@ public class TimeTunnelCommand extends EnhancerCommand {
         }
     }
 
-    // do search timeFragmentMap
+    // do search timeFragmentStore
     private void processSearch(CommandProcess process) {
         RowAffect affect = new RowAffect();
         try {
             // 匹配的时间片段
             Map<Integer, TimeFragment> matchingTimeSegmentMap = new LinkedHashMap<Integer, TimeFragment>();
-            for (Map.Entry<Integer, TimeFragment> entry : timeFragmentMap.entrySet()) {
-                int index = entry.getKey();
-                TimeFragment tf = entry.getValue();
+            // 逐条读取，磁盘上的记录不会一次全部反序列化到内存里
+            for (Integer index : timeFragmentStore.indexes()) {
+                TimeFragment tf = timeFragmentStore.get(index);
+                if (tf == null) {
+                    continue;
+                }
                 Advice advice = tf.getAdvice();
 
                 // 搜索出匹配的时间片段
@@ -418,7 +422,7 @@ public class TimeTunnelCommand extends EnhancerCommand {
     // 删除指定记录
     private void processDelete(CommandProcess process) {
         RowAffect affect = new RowAffect();
-        if (timeFragmentMap.remove(index) != null) {
+        if (timeFragmentStore.remove(index)) {
             affect.rCnt(1);
         }
         process.appendResult(new MessageModel(format("Time fragment[%d] successfully deleted.", index)));
@@ -427,9 +431,9 @@ public class TimeTunnelCommand extends EnhancerCommand {
     }
 
     private void processDeleteAll(CommandProcess process) {
-        int count = timeFragmentMap.size();
+        int count = timeFragmentStore.size();
         RowAffect affect = new RowAffect(count);
-        timeFragmentMap.clear();
+        timeFragmentStore.clear();
         process.appendResult(new MessageModel("Time fragments are cleaned."));
         process.appendResult(new RowAffectModel(affect));
         process.end();
@@ -437,9 +441,9 @@ public class TimeTunnelCommand extends EnhancerCommand {
 
     private void processList(CommandProcess process) {
         RowAffect affect = new RowAffect();
-        List<TimeFragmentVO> timeFragmentList = createTimeTunnelVOList(timeFragmentMap);
+        List<TimeFragmentVO> timeFragmentList = timeFragmentStore.list();
         process.appendResult(new TimeTunnelModel().setTimeFragmentList(timeFragmentList).setFirst(true));
-        affect.rCnt(timeFragmentMap.size());
+        affect.rCnt(timeFragmentList.size());
         process.appendResult(new RowAffectModel(affect));
         process.end();
     }
@@ -476,7 +480,7 @@ public class TimeTunnelCommand extends EnhancerCommand {
      * 重放指定记录
      */
     private void processPlay(CommandProcess process) {
-        TimeFragment tf = timeFragmentMap.get(index);
+        TimeFragment tf = timeFragmentStore.get(index);
         if (null == tf) {
             process.end(1, format("Time fragment[%d] does not exist.", index));
             return;
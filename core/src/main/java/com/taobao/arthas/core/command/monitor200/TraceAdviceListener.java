@@ -22,20 +22,44 @@ public class TraceAdviceListener extends AbstractTraceAdviceListener implements
     @Override
     public void invokeBeforeTracing(ClassLoader classLoader, String tracingClassName, String tracingMethodName, String tracingMethodDesc, int tracingLineNumber)
             throws Throwable {
+        if (isSampledOut()) {
+            return;
+        }
+        boolean governed = isGoverned();
+        long start = governed ? System.nanoTime() : 0;
         // normalize className later
-        threadLocalTraceEntity(classLoader).tree.begin(tracingClassName, tracingMethodName, tracingLineNumber, true);
+        threadLocalTraceEntity(classLoader).begin(tracingClassName, tracingMethodName, tracingLineNumber, true);
+        if (governed) {
+            addSelfTime(start);
+        }
     }
 
     @Override
     public void invokeAfterTracing(ClassLoader classLoader, String tracingClassName, String tracingMethodName, String tracingMethodDesc, int tracingLineNumber)
             throws Throwable {
-        threadLocalTraceEntity(classLoader).tree.end();
+        if (isSampledOut()) {
+            return;
+        }
+        boolean governed = isGoverned();
+        long start = governed ? System.nanoTime() : 0;
+        threadLocalTraceEntity(classLoader).end();
+        if (governed) {
+            addSelfTime(start);
+        }
     }
 
     @Override
     public void invokeThrowTracing(ClassLoader classLoader, String tracingClassName, String tracingMethodName, String tracingMethodDesc, int tracingLineNumber)
             throws Throwable {
-        threadLocalTraceEntity(classLoader).tree.end(true);
+        if (isSampledOut()) {
+            return;
+        }
+        boolean governed = isGoverned();
+        long start = governed ? System.nanoTime() : 0;
+        threadLocalTraceEntity(classLoader).end(true);
+        if (governed) {
+            addSelfTime(start);
+        }
     }
 
 }
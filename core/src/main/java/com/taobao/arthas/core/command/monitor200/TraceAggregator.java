@@ -0,0 +1,235 @@
+package com.taobao.arthas.core.command.monitor200;
+
+import java.io.File;
+import java.io.IOException;
+import java.io.OutputStreamWriter;
+import java.io.Writer;
+import java.util.ArrayList;
+import java.util.Date;
+import java.util.List;
+import java.util.concurrent.atomic.AtomicLong;
+import java.util.concurrent.atomic.AtomicReference;
+
+import com.taobao.arthas.core.command.model.MethodNode;
+import com.taobao.arthas.core.command.model.TraceAggregateModel;
+import com.taobao.arthas.core.command.model.TraceNode;
+import com.taobao.arthas.core.util.FileUtils;
+import com.taobao.arthas.core.util.StringUtils;
+import com.taobao.arthas.core.util.metrics.LatencyHistogram;
+import com.taobao.arthas.core.util.metrics.StripedCounter;
+
+/**
+ * <pre>
+ * trace --aggregate 的聚合调用树。
+ *
+ * 每次调用结束后，把 TraceEntity 里的调用树按调用路径（类名，方法名，行号）合并进来，
+ * 每个结点统计 调用次数/总耗时/最小/最大耗时/异常次数 和耗时直方图（用来计算 p99）。
+ * 统计周期到了之后由定时任务取出整棵树并换一棵新的，周期边界上的调用可能会被算到下一个周期。
+ *
+ * 合并只在查找不到子结点时加锁，统计数据都是原子累加。
+ * </pre>
+ */
+class TraceAggregator {
+
+    private final AtomicReference<Node> root = new AtomicReference<Node>(new Node(null, null, -1, false));
+    private final StripedCounter invocations = new StripedCounter();
+
+    /**
+     * 合并一次调用的调用树
+     */
+    void merge(TraceEntity traceEntity) {
+        invocations.increment();
+        traceEntity.mergeTo(root.get());
+    }
+
+    /**
+     * 取出一个周期的数据并清零
+     */
+    TraceAggregateModel snapshotAndReset(int cycle) {
+        Node current = root.getAndSet(new Node(null, null, -1, false));
+        List<TraceNode> nodes = new ArrayList<TraceNode>();
+        for (Node child : current.children) {
+            nodes.add(child.toTraceNode());
+        }
+        return new TraceAggregateModel(new Date(), cycle, invocations.sumThenReset(), nodes);
+    }
+
+    /**
+     * <pre>
+     * 按 collapsed stacks 格式追加到文件里，和 profiler 的 dumpCollapsed 格式一样，可以直接用 FlameGraph 之类的工具生成火焰图。
+     * 每一行是 调用栈（用 ; 分隔）和这个结点的自身耗时（单位是微秒），多个周期写到同一个文件时工具会把相同的调用栈加起来。
+     * </pre>
+     */
+    static void exportCollapsed(List<TraceNode> nodes, File file) throws IOException {
+        Writer writer = new OutputStreamWriter(FileUtils.openOutputStream(file, true), "UTF-8");
+        try {
+            StringBuilder line = new StringBuilder(256);
+            for (TraceNode node : nodes) {
+                writeCollapsed(writer, line, node);
+            }
+        } finally {
+            writer.close();
+        }
+    }
+
+    private static void writeCollapsed(Writer writer, StringBuilder stack, TraceNode node) throws IOException {
+        if (!(node instanceof MethodNode)) {
+            return;
+        }
+        MethodNode methodNode = (MethodNode) node;
+        int length = stack.length();
+        if (length > 0) {
+            stack.append(';');
+        }
+        stack.append(methodNode.getClassName()).append('.').append(methodNode.getMethodName());
+
+        long selfCost = methodNode.getTotalCost();
+        List<TraceNode> children = node.getChildren();
+        if (children != null) {
+            for (TraceNode child : children) {
+                if (child instanceof MethodNode) {
+                    selfCost -= ((MethodNode) child).getTotalCost();
+                }
+            }
+        }
+        long selfMicros = selfCost / 1000;
+        if (selfMicros > 0) {
+            writer.write(stack.toString());
+            writer.write(' ');
+            writer.write(Long.toString(selfMicros));
+            writer.write('\n');
+        }
+        if (children != null) {
+            for (TraceNode child : children) {
+                writeCollapsed(writer, stack, child);
+            }
+        }
+        stack.setLength(length);
+    }
+
+    /**
+     * 聚合调用树的一个结点
+     */
+    static class Node {
+        private static final Node[] EMPTY = new Node[0];
+
+        private final String className;
+        private final String methodName;
+        private final int lineNumber;
+        private final boolean isInvoking;
+
+        /**
+         * copy on write，查找子结点时不需要加锁
+         */
+        private volatile Node[] children = EMPTY;
+
+        private final StripedCounter times = new StripedCounter();
+        private final StripedCounter totalCost = new StripedCounter();
+        private final AtomicLong minCost = new AtomicLong(Long.MAX_VALUE);
+        private final AtomicLong maxCost = new AtomicLong(Long.MIN_VALUE);
+        private final AtomicLong throwTimes = new AtomicLong();
+        private final LatencyHistogram histogram = new LatencyHistogram();
+
+        Node(String className, String methodName, int lineNumber, boolean isInvoking) {
+            this.className = className;
+            this.methodName = methodName;
+            this.lineNumber = lineNumber;
+            this.isInvoking = isInvoking;
+        }
+
+        Node child(String className, String methodName, int lineNumber, boolean isInvoking) {
+            Node child = findChild(children, className, methodName, lineNumber);
+            if (child != null) {
+                return child;
+            }
+            synchronized (this) {
+                Node[] current = children;
+                child = findChild(current, className, methodName, lineNumber);
+                if (child == null) {
+                    child = new Node(className, methodName, lineNumber, isInvoking);
+                    Node[] newChildren = new Node[current.length + 1];
+                    System.arraycopy(current, 0, newChildren, 0, current.length);
+                    newChildren[current.length] = child;
+                    children = newChildren;
+                }
+                return child;
+            }
+        }
+
+        /**
+         * 记录 TraceEntity 里的一个结点，同一次调用里循环调用的结点已经合并过，
+         * 直方图里 最小/最大 各记一次，其它的按平均耗时记录。
+         */
+        void record(long count, long total, long min, long max, boolean isThrow) {
+            if (count <= 0) {
+                return;
+            }
+            times.add(count);
+            totalCost.add(total);
+            updateMin(min);
+            updateMax(max);
+            if (isThrow) {
+                throwTimes.incrementAndGet();
+            }
+            if (count == 1) {
+                histogram.record(total / 1000);
+            } else {
+                histogram.record(min / 1000);
+                histogram.record(max / 1000);
+                if (count > 2) {
+                    histogram.record((total - min - max) / (count - 2) / 1000, count - 2);
+                }
+            }
+        }
+
+        private void updateMin(long cost) {
+            long current = minCost.get();
+            while (cost < current && !minCost.compareAndSet(current, cost)) {
+                current = minCost.get();
+            }
+        }
+
+        private void updateMax(long cost) {
+            long current = maxCost.get();
+            while (cost > current && !maxCost.compareAndSet(current, cost)) {
+                current = maxCost.get();
+            }
+        }
+
+        MethodNode toTraceNode() {
+            MethodNode methodNode = new MethodNode(StringUtils.normalizeClassName(className), methodName, lineNumber,
+                    isInvoking);
+            long total = totalCost.sum();
+            methodNode.setTimes(times.sum());
+            methodNode.setTotalCost(total);
+            // 只有一次调用时输出的是 getCost()
+            methodNode.setEndTimestamp(total);
+            methodNode.setMinCost(minCost.get());
+            methodNode.setMaxCost(maxCost.get());
+            methodNode.setP99Cost(histogram.snapshot().percentile(99) * 1000);
+            long throwCount = throwTimes.get();
+            if (throwCount > 0) {
+                methodNode.setThrow(true);
+                methodNode.setMark("throws Exception: " + throwCount);
+            }
+            for (Node child : children) {
+                methodNode.addChild(child.toTraceNode());
+            }
+            return methodNode;
+        }
+
+        private static Node findChild(Node[] children, String className, String methodName, int lineNumber) {
+            for (Node child : children) {
+                if (child.lineNumber == lineNumber && equals(child.className, className)
+                        && equals(child.methodName, methodName)) {
+                    return child;
+                }
+            }
+            return null;
+        }
+
+        private static boolean equals(String a, String b) {
+            return a == b || (a != null && a.equals(b));
+        }
+    }
+}
@@ -3,6 +3,7 @@ package com.taobao.arthas.core.command.monitor200;
 import com.taobao.arthas.core.GlobalOptions;
 import com.taobao.arthas.core.advisor.AdviceListener;
 import com.taobao.arthas.core.command.Constants;
+import com.taobao.arthas.core.shell.handlers.Handler;
 import com.taobao.arthas.core.shell.command.CommandProcess;
 import com.taobao.arthas.core.util.SearchUtils;
 import com.taobao.arthas.core.util.matcher.GroupMatcher;
@@ -37,7 +38,10 @@ import java.util.List;
         "  trace -E org\\\\.apache\\\\.commons\\\\.lang\\\\.StringUtils isBlank\n" +
         "  trace -E com.test.ClassA|org.test.ClassB method1|method2|method3\n" +
         "  trace demo.MathGame run -n 5\n" +
+        "  trace demo.MathGame run --reservoir 2\n" +
         "  trace demo.MathGame run --skipJDKMethod false\n" +
+        "  trace demo.MathGame run --aggregate 10\n" +
+        "  trace demo.MathGame run --aggregate 10 --export /tmp/trace.collapsed\n" +
         Constants.WIKI + Constants.WIKI_HOME + "trace")
 //@formatter:on
 public class TraceCommand extends EnhancerCommand {
@@ -49,6 +53,8 @@ public class TraceCommand extends EnhancerCommand {
     private int numberOfLimit = 100;
     private List<String> pathPatterns;
     private boolean skipJDKTrace;
+    private int aggregate = 0;
+    private String exportFile;
 
     @Argument(argName = "class-pattern", index = 0)
     @Description("Class name pattern, use either '.' or '/' as separator")
@@ -93,6 +99,18 @@ public class TraceCommand extends EnhancerCommand {
         this.skipJDKTrace = skipJDKTrace;
     }
 
+    @Option(longName = "aggregate")
+    @Description("Merge the call trees of all invocations and output once every N seconds, -n limits the number of outputs")
+    public void setAggregate(int aggregate) {
+        this.aggregate = aggregate;
+    }
+
+    @Option(longName = "export")
+    @Description("Append the aggregated call trees to the file in collapsed stacks format (self time in microseconds), used with --aggregate")
+    public void setExportFile(String exportFile) {
+        this.exportFile = exportFile;
+    }
+
     public String getClassPattern() {
         return classPattern;
     }
@@ -121,6 +139,27 @@ public class TraceCommand extends EnhancerCommand {
         return pathPatterns;
     }
 
+    public int getAggregate() {
+        return aggregate;
+    }
+
+    public String getExportFile() {
+        return exportFile;
+    }
+
+    @Override
+    protected void enhance(CommandProcess process) {
+        if (aggregate < 0) {
+            process.end(-1, "aggregate should not be negative");
+            return;
+        }
+        if (exportFile != null && aggregate == 0) {
+            process.end(-1, "--export should be used with --aggregate");
+            return;
+        }
+        super.enhance(process);
+    }
+
     @Override
     protected Matcher getClassNameMatcher() {
         if (classNameMatcher == null) {
@@ -147,11 +186,30 @@ public class TraceCommand extends EnhancerCommand {
 
     @Override
     protected AdviceListener getAdviceListener(CommandProcess process) {
+        final AdviceListener listener;
         if (pathPatterns == null || pathPatterns.isEmpty()) {
-            return new TraceAdviceListener(this, process, GlobalOptions.verbose || this.verbose);
+            listener = new TraceAdviceListener(this, process, GlobalOptions.verbose || this.verbose);
         } else {
-            return new PathTraceAdviceListener(this, process);
+            listener = new PathTraceAdviceListener(this, process);
+        }
+        if (aggregate > 0) {
+            /*
+             * 和 monitor 一样，在suspend时停止timer，resume时重启timer
+             */
+            process.suspendHandler(new Handler<Void>() {
+                @Override
+                public void handle(Void event) {
+                    listener.destroy();
+                }
+            });
+            process.resumeHandler(new Handler<Void>() {
+                @Override
+                public void handle(Void event) {
+                    listener.create();
+                }
+            });
         }
+        return listener;
     }
 
     /**
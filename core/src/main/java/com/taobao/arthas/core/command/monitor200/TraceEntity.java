@@ -1,21 +1,73 @@
 package com.taobao.arthas.core.command.monitor200;
 
+import java.util.Arrays;
+import java.util.Date;
+
+import com.taobao.arthas.core.command.model.MethodNode;
+import com.taobao.arthas.core.command.model.ThreadNode;
+import com.taobao.arthas.core.command.model.ThrowNode;
 import com.taobao.arthas.core.command.model.TraceModel;
-import com.taobao.arthas.core.command.model.TraceTree;
+import com.taobao.arthas.core.command.model.TraceNode;
+import com.taobao.arthas.core.util.StringUtils;
 import com.taobao.arthas.core.util.ThreadUtil;
 
 /**
- * 用于在ThreadLocal中传递的实体
+ * <pre>
+ * 用于在ThreadLocal中传递的实体，记录一次 trace 调用树。
+ *
+ * 调用树保存在一组数组里，每个结点是一个下标，下标 0 是线程结点。
+ * 同一个父结点下相同的调用（类名，方法名，行号都相同）会合并成一个结点，统计 最小/最大/总耗时。
+ * 数组在同一个线程的多次调用之间复用，只有需要输出结果的时候才转换成 TraceModel 。
+ * 异常的行号也是在输出的时候才从 Throwable 里取，避免每次抛异常都要生成 StackTraceElement 。
+ * </pre>
+ *
  * @author ralf0131 2017-01-05 14:05.
  */
 public class TraceEntity {
 
-    protected TraceTree tree;
+    private static final int ROOT = 0;
+    private static final int NONE = -1;
+    private static final int INITIAL_CAPACITY = 16;
+
+    private static final byte METHOD = 0;
+    private static final byte THROW = 1;
+
     protected int deep;
 
+    private ClassLoader loader;
+    private long timestamp;
+
+    private int size;
+    private int current;
+    private int nodeCount;
+
+    private byte[] kinds;
+    /**
+     * METHOD 结点是 className/methodName ， THROW 结点是 异常类名/异常信息
+     */
+    private String[] classNames;
+    private String[] methodNames;
+    private int[] lineNumbers;
+    private boolean[] invokings;
+    private boolean[] throwFlags;
+    private Throwable[] throwables;
+
+    private int[] parents;
+    private int[] firstChildren;
+    private int[] lastChildren;
+    private int[] nextSiblings;
+
+    private long[] beginNanos;
+    private long[] endNanos;
+    private long[] minCosts;
+    private long[] maxCosts;
+    private long[] totalCosts;
+    private long[] times;
+
     public TraceEntity(ClassLoader loader) {
-        this.tree = createTraceTree(loader);
-        this.deep = 0;
+        allocate(INITIAL_CAPACITY);
+        reset();
+        start(loader);
     }
 
     public int getDeep() {
@@ -26,12 +78,223 @@ public class TraceEntity {
         this.deep = deep;
     }
 
-    private TraceTree createTraceTree(ClassLoader loader) {
-        return new TraceTree(ThreadUtil.getThreadNode(loader, Thread.currentThread()));
+    /**
+     * 最外层的方法调用开始
+     */
+    public void start(ClassLoader loader) {
+        this.loader = loader;
+        this.timestamp = System.currentTimeMillis();
+    }
+
+    /**
+     * 清空调用树，准备记录同一个线程的下一次调用
+     */
+    public void reset() {
+        Arrays.fill(classNames, 0, size, null);
+        Arrays.fill(methodNames, 0, size, null);
+        Arrays.fill(throwables, 0, size, null);
+        this.loader = null;
+        this.deep = 0;
+        this.nodeCount = 0;
+        this.size = 0;
+        this.current = newNode(METHOD, null, null, NONE, false, NONE);
+    }
+
+    /**
+     * 开始一个方法调用
+     */
+    public void begin(String className, String methodName, int lineNumber, boolean isInvoking) {
+        int child = findChild(current, className, methodName, lineNumber);
+        if (child == NONE) {
+            child = newNode(METHOD, className, methodName, lineNumber, isInvoking, current);
+        }
+        beginNanos[child] = System.nanoTime();
+        current = child;
+        nodeCount += 1;
+    }
+
+    public void end() {
+        if (current == ROOT) {
+            return;
+        }
+        long now = System.nanoTime();
+        long cost = now - beginNanos[current];
+        endNanos[current] = now;
+        if (cost < minCosts[current]) {
+            minCosts[current] = cost;
+        }
+        if (cost > maxCosts[current]) {
+            maxCosts[current] = cost;
+        }
+        times[current]++;
+        totalCosts[current] += cost;
+        current = parents[current];
+    }
+
+    public void end(boolean isThrow) {
+        if (isThrow) {
+            throwFlags[current] = true;
+        }
+        end();
+    }
+
+    public void end(Throwable throwable) {
+        newNode(THROW, throwable.getClass().getName(), throwable.getMessage(), NONE, false, current);
+        throwables[size - 1] = throwable;
+        end(true);
     }
 
     public TraceModel getModel() {
-        tree.trim();
-        return new TraceModel(tree.getRoot(), tree.getNodeCount());
+        ThreadNode threadNode = ThreadUtil.getThreadNode(loader, Thread.currentThread());
+        threadNode.setTimestamp(new Date(timestamp));
+        if (throwFlags[ROOT]) {
+            threadNode.setMark("throws Exception");
+        }
+        addChildren(threadNode, ROOT);
+        return new TraceModel(threadNode, nodeCount);
+    }
+
+    /**
+     * 合并到 trace --aggregate 的聚合调用树里，不需要转换成 TraceModel
+     */
+    void mergeTo(TraceAggregator.Node root) {
+        mergeChildren(root, ROOT);
+    }
+
+    private void mergeChildren(TraceAggregator.Node node, int index) {
+        for (int child = firstChildren[index]; child != NONE; child = nextSiblings[child]) {
+            if (kinds[child] != METHOD) {
+                continue;
+            }
+            TraceAggregator.Node childNode = node.child(classNames[child], methodNames[child], lineNumbers[child],
+                    invokings[child]);
+            childNode.record(times[child], totalCosts[child], minCosts[child], maxCosts[child], throwFlags[child]);
+            mergeChildren(childNode, child);
+        }
+    }
+
+    private void addChildren(TraceNode node, int index) {
+        for (int child = firstChildren[index]; child != NONE; child = nextSiblings[child]) {
+            TraceNode childNode = toTraceNode(child);
+            node.addChild(childNode);
+            addChildren(childNode, child);
+        }
+    }
+
+    private TraceNode toTraceNode(int index) {
+        if (kinds[index] == THROW) {
+            ThrowNode throwNode = new ThrowNode();
+            throwNode.setException(classNames[index]);
+            throwNode.setMessage(methodNames[index]);
+            throwNode.setLineNumber(throwLineNumber(throwables[index]));
+            return throwNode;
+        }
+        // 转换标准类名，放在trace结束后统一转换，减少重复操作
+        MethodNode methodNode = new MethodNode(StringUtils.normalizeClassName(classNames[index]),
+                methodNames[index], lineNumbers[index], invokings[index]);
+        methodNode.setBeginTimestamp(beginNanos[index]);
+        methodNode.setEndTimestamp(endNanos[index]);
+        methodNode.setMinCost(minCosts[index]);
+        methodNode.setMaxCost(maxCosts[index]);
+        methodNode.setTotalCost(totalCosts[index]);
+        methodNode.setTimes(times[index]);
+        if (throwFlags[index]) {
+            methodNode.setMark("throws Exception");
+            methodNode.setThrow(true);
+        }
+        return methodNode;
+    }
+
+    private static int throwLineNumber(Throwable throwable) {
+        StackTraceElement[] stackTrace = throwable.getStackTrace();
+        return stackTrace.length > 0 ? stackTrace[0].getLineNumber() : -1;
+    }
+
+    private int findChild(int node, String className, String methodName, int lineNumber) {
+        for (int child = firstChildren[node]; child != NONE; child = nextSiblings[child]) {
+            if (kinds[child] == METHOD && lineNumbers[child] == lineNumber
+                    && equals(classNames[child], className)
+                    && equals(methodNames[child], methodName)) {
+                return child;
+            }
+        }
+        return NONE;
+    }
+
+    private static boolean equals(String a, String b) {
+        return a == b || (a != null && a.equals(b));
+    }
+
+    private int newNode(byte kind, String className, String methodName, int lineNumber, boolean isInvoking,
+            int parent) {
+        if (size == kinds.length) {
+            grow(size * 2);
+        }
+        int index = size++;
+        kinds[index] = kind;
+        classNames[index] = className;
+        methodNames[index] = methodName;
+        lineNumbers[index] = lineNumber;
+        invokings[index] = isInvoking;
+        throwFlags[index] = false;
+        parents[index] = parent;
+        firstChildren[index] = NONE;
+        lastChildren[index] = NONE;
+        nextSiblings[index] = NONE;
+        beginNanos[index] = 0;
+        endNanos[index] = 0;
+        minCosts[index] = Long.MAX_VALUE;
+        maxCosts[index] = Long.MIN_VALUE;
+        totalCosts[index] = 0;
+        times[index] = 0;
+        if (parent != NONE) {
+            if (firstChildren[parent] == NONE) {
+                firstChildren[parent] = index;
+            } else {
+                nextSiblings[lastChildren[parent]] = index;
+            }
+            lastChildren[parent] = index;
+        }
+        return index;
+    }
+
+    private void allocate(int capacity) {
+        kinds = new byte[capacity];
+        classNames = new String[capacity];
+        methodNames = new String[capacity];
+        lineNumbers = new int[capacity];
+        invokings = new boolean[capacity];
+        throwFlags = new boolean[capacity];
+        throwables = new Throwable[capacity];
+        parents = new int[capacity];
+        firstChildren = new int[capacity];
+        lastChildren = new int[capacity];
+        nextSiblings = new int[capacity];
+        beginNanos = new long[capacity];
+        endNanos = new long[capacity];
+        minCosts = new long[capacity];
+        maxCosts = new long[capacity];
+        totalCosts = new long[capacity];
+        times = new long[capacity];
+    }
+
+    private void grow(int capacity) {
+        kinds = Arrays.copyOf(kinds, capacity);
+        classNames = Arrays.copyOf(classNames, capacity);
+        methodNames = Arrays.copyOf(methodNames, capacity);
+        lineNumbers = Arrays.copyOf(lineNumbers, capacity);
+        invokings = Arrays.copyOf(invokings, capacity);
+        throwFlags = Arrays.copyOf(throwFlags, capacity);
+        throwables = Arrays.copyOf(throwables, capacity);
+        parents = Arrays.copyOf(parents, capacity);
+        firstChildren = Arrays.copyOf(firstChildren, capacity);
+        lastChildren = Arrays.copyOf(lastChildren, capacity);
+        nextSiblings = Arrays.copyOf(nextSiblings, capacity);
+        beginNanos = Arrays.copyOf(beginNanos, capacity);
+        endNanos = Arrays.copyOf(endNanos, capacity);
+        minCosts = Arrays.copyOf(minCosts, capacity);
+        maxCosts = Arrays.copyOf(maxCosts, capacity);
+        totalCosts = Arrays.copyOf(totalCosts, capacity);
+        times = Arrays.copyOf(times, capacity);
     }
 }
@@ -92,7 +92,7 @@ class WatchAdviceListener extends AdviceListenerAdapter {
                 model.setExpand(command.getExpand());
                 model.setSizeLimit(command.getSizeLimit());
 
-                process.appendResult(model);
+                appendResult(process, model);
                 process.times().incrementAndGet();
                 if (isLimitExceeded(command.getNumberOfLimit(), process.times().get())) {
                     abortProcess(process, command.getNumberOfLimit());
@@ -0,0 +1,28 @@
+package com.taobao.arthas.core.command.view;
+
+import com.taobao.arthas.core.command.model.ClassHistogramVO;
+import com.taobao.arthas.core.command.model.HeapDumpModel;
+import com.taobao.arthas.core.shell.command.CommandProcess;
+
+/**
+ * Term view for HeapDumpModel, the dump progress is written by MessageModel
+ */
+public class HeapDumpView extends ResultView<HeapDumpModel> {
+
+    @Override
+    public void draw(CommandProcess process, HeapDumpModel model) {
+        if (model.getHistogram() == null) {
+            return;
+        }
+        long totalBytes = Math.max(1, model.getTotalBytes());
+        process.write(String.format("%-6s %-14s %-14s %-8s %s%n", "NUM", "INSTANCES", "BYTES", "PERCENT",
+                "CLASS NAME"));
+        int num = 1;
+        for (ClassHistogramVO vo : model.getHistogram()) {
+            process.write(String.format("%-6d %-14d %-14d %-8s %s%n", num++, vo.getInstances(), vo.getBytes(),
+                    String.format("%.2f%%", vo.getBytes() * 100.0 / totalBytes), vo.getClassName()));
+        }
+        process.write(String.format("Total: %d classes, %d instances, %d bytes%s%n", model.getClassCount(),
+                model.getTotalInstances(), model.getTotalBytes(), model.isLive() ? " (live objects)" : ""));
+    }
+}
@@ -20,7 +20,7 @@ import static com.taobao.text.ui.Element.label;
 public class MonitorView extends ResultView<MonitorModel> {
     @Override
     public void draw(CommandProcess process, MonitorModel result) {
-        TableElement table = new TableElement(2, 3, 3, 1, 1, 1, 1, 1).leftCellPadding(1).rightCellPadding(1);
+        TableElement table = new TableElement(2, 3, 3, 1, 1, 1, 1, 1, 1, 1, 1, 1).leftCellPadding(1).rightCellPadding(1);
         table.row(true, label("timestamp").style(Decoration.bold.bold()),
                 label("class").style(Decoration.bold.bold()),
                 label("method").style(Decoration.bold.bold()),
@@ -28,6 +28,10 @@ public class MonitorView extends ResultView<MonitorModel> {
                 label("success").style(Decoration.bold.bold()),
                 label("fail").style(Decoration.bold.bold()),
                 label("avg-rt(ms)").style(Decoration.bold.bold()),
+                label("p50(ms)").style(Decoration.bold.bold()),
+                label("p90(ms)").style(Decoration.bold.bold()),
+                label("p99(ms)").style(Decoration.bold.bold()),
+                label("max(ms)").style(Decoration.bold.bold()),
                 label("fail-rate").style(Decoration.bold.bold()));
 
         final DecimalFormat df = new DecimalFormat("0.00");
@@ -41,6 +45,10 @@ public class MonitorView extends ResultView<MonitorModel> {
                     "" + data.getSuccess(),
                     "" + data.getFailed(),
                     df.format(div(data.getCost(), data.getTotal())),
+                    df.format(data.getP50()),
+                    df.format(data.getP90()),
+                    df.format(data.getP99()),
+                    df.format(data.getMax()),
                     df.format(100.0d * div(data.getFailed(), data.getTotal())) + "%"
             );
         }
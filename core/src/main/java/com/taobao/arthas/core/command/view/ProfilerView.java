@@ -1,6 +1,9 @@
 package com.taobao.arthas.core.command.view;
 
+import java.text.SimpleDateFormat;
+
 import com.taobao.arthas.core.command.model.ProfilerModel;
+import com.taobao.arthas.core.command.model.ProfilerWindowVO;
 import com.taobao.arthas.core.command.monitor200.ProfilerCommand.ProfilerAction;
 import com.taobao.arthas.core.shell.command.CommandProcess;
 
@@ -20,17 +23,34 @@ public class ProfilerView extends ResultView<ProfilerModel> {
 
         drawExecuteResult(process, model);
 
-        if (ProfilerAction.start.name().equals(model.getAction())) {
+        if (model.getWindows() != null) {
+            drawWindows(process, model);
+        } else if (ProfilerAction.history.name().equals(model.getAction())
+                || ProfilerAction.diff.name().equals(model.getAction())) {
+            process.write("profiler output file: " + model.getOutputFile() + "\n");
+        } else if (ProfilerAction.start.name().equals(model.getAction())) {
             if (model.getDuration() != null) {
                 process.write(String.format("profiler will silent stop after %d seconds.\n", model.getDuration().longValue()));
                 process.write("profiler output file will be: " + model.getOutputFile() + "\n");
             }
-        } else if (ProfilerAction.stop.name().equals(model.getAction())) {
+        } else if (ProfilerAction.stop.name().equals(model.getAction()) && model.getOutputFile() != null) {
+            // 停止持续 profiling 时没有输出文件
             process.write("profiler output file: " + model.getOutputFile() + "\n");
         }
 
     }
 
+    private void drawWindows(CommandProcess process, ProfilerModel model) {
+        SimpleDateFormat format = new SimpleDateFormat("yyyy-MM-dd HH:mm:ss");
+        process.write(String.format("%-8s %-20s %-20s %-8s %-10s %s%n", "ID", "START", "END", "EVENT", "SAMPLES",
+                "COMPRESSED-BYTES"));
+        for (ProfilerWindowVO window : model.getWindows()) {
+            process.write(String.format("%-8d %-20s %-20s %-8s %-10d %d%n", window.getId(),
+                    format.format(window.getStartTime()), format.format(window.getEndTime()), window.getEvent(),
+                    window.getSamples(), window.getCompressedBytes()));
+        }
+    }
+
     private void drawExecuteResult(CommandProcess process, ProfilerModel model) {
         if (model.getExecuteResult() != null) {
             process.write(model.getExecuteResult());
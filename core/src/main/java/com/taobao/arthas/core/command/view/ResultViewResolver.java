@@ -69,11 +69,13 @@ public class ResultViewResolver {
             registerView(PerfCounterView.class);
             registerView(ThreadView.class);
             registerView(ProfilerView.class);
+            registerView(HeapDumpView.class);
             registerView(EnhancerView.class);
             registerView(MonitorView.class);
             registerView(StackView.class);
             registerView(TimeTunnelView.class);
             registerView(TraceView.class);
+            registerView(TraceAggregateView.class);
             registerView(WatchView.class);
 
         } catch (Throwable e) {
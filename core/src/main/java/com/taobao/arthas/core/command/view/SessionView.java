@@ -1,5 +1,6 @@
 package com.taobao.arthas.core.command.view;
 
+import com.taobao.arthas.core.command.model.SchedulerLaneVO;
 import com.taobao.arthas.core.command.model.SessionModel;
 import com.taobao.arthas.core.shell.command.CommandProcess;
 import com.taobao.text.Decoration;
@@ -31,6 +32,33 @@ public class SessionView extends ResultView<SessionModel> {
             table.row("STAT_URL", result.getStatUrl());
         }
         process.write(RenderUtil.render(table, process.width()));
+
+        //命令调度队列
+        if (result.getScheduler() != null) {
+            TableElement lanes = new TableElement().leftCellPadding(1).rightCellPadding(1);
+            lanes.row(true, label("PRIORITY").style(Decoration.bold.bold()),
+                    label("QUEUED").style(Decoration.bold.bold()),
+                    label("SESSIONS").style(Decoration.bold.bold()),
+                    label("SUBMITTED").style(Decoration.bold.bold()),
+                    label("COMPLETED").style(Decoration.bold.bold()),
+                    label("REJECTED").style(Decoration.bold.bold()),
+                    label("WAIT-P50(ms)").style(Decoration.bold.bold()),
+                    label("WAIT-P99(ms)").style(Decoration.bold.bold()),
+                    label("WAIT-MAX(ms)").style(Decoration.bold.bold()),
+                    label("RUN-P99(ms)").style(Decoration.bold.bold()),
+                    label("RUN-MAX(ms)").style(Decoration.bold.bold()));
+            for (SchedulerLaneVO lane : result.getScheduler()) {
+                lanes.row(lane.getPriority(), "" + lane.getQueueDepth(), "" + lane.getSessions(),
+                        "" + lane.getSubmitted(), "" + lane.getCompleted(), "" + lane.getRejected(),
+                        millis(lane.getWaitP50()), millis(lane.getWaitP99()), millis(lane.getWaitMax()),
+                        millis(lane.getRunP99()), millis(lane.getRunMax()));
+            }
+            process.write("\n").write(RenderUtil.render(lanes, process.width()));
+        }
+    }
+
+    private static String millis(long micros) {
+        return String.format("%.2f", micros / 1000.0);
     }
 
 }
@@ -0,0 +1,31 @@
+package com.taobao.arthas.core.command.view;
+
+import com.taobao.arthas.core.command.model.TraceAggregateModel;
+import com.taobao.arthas.core.command.model.TraceNode;
+import com.taobao.arthas.core.shell.command.CommandProcess;
+import com.taobao.arthas.core.util.DateUtils;
+
+/**
+ * Term view for TraceAggregateModel
+ */
+public class TraceAggregateView extends ResultView<TraceAggregateModel> {
+
+    private final TraceView traceView = new TraceView();
+
+    @Override
+    public void draw(CommandProcess process, TraceAggregateModel result) {
+        StringBuilder sb = new StringBuilder(2048);
+        sb.append("ts=").append(DateUtils.formatDate(result.getTimestamp()))
+                .append(";cycle=").append(result.getCycle()).append("s")
+                .append(";invocations=").append(result.getInvocations()).append("\n");
+        if (result.getNodes() != null) {
+            for (TraceNode node : result.getNodes()) {
+                sb.append(traceView.drawTree(node));
+            }
+        }
+        if (result.getExportFile() != null) {
+            sb.append("collapsed stacks exported to: ").append(result.getExportFile()).append("\n");
+        }
+        process.write(sb.toString()).write("\n");
+    }
+}
@@ -122,7 +122,11 @@ public class TraceView extends ResultView<TraceModel> {
             sb.append("[min=").append(nanoToMillis(node.getMinCost())).append(TIME_UNIT).append(",max=")
                     .append(nanoToMillis(node.getMaxCost())).append(TIME_UNIT).append(",total=")
                     .append(nanoToMillis(node.getTotalCost())).append(TIME_UNIT).append(",count=")
-                    .append(node.getTimes()).append("] ");
+                    .append(node.getTimes());
+            if (node.getP99Cost() != null) {
+                sb.append(",p99=").append(nanoToMillis(node.getP99Cost())).append(TIME_UNIT);
+            }
+            sb.append("] ");
         }
         return sb.toString();
     }
@@ -96,6 +96,20 @@ public class ViewRenderUtil {
                 affectVO.getCost(),
                 affectVO.getListenerId()));
 
+        EnhancerAffectVO.EnhancerPhaseCost phaseCost = affectVO.getPhaseCost();
+        if (phaseCost != null) {
+            infoSB.append(format("\nPhase cost(ms): search: %d, analyze: %d, weave: %d, retransform: %d (%d batches, %d threads)",
+                    phaseCost.getSearch(),
+                    phaseCost.getAnalyze(),
+                    phaseCost.getWeave(),
+                    phaseCost.getRetransform(),
+                    phaseCost.getBatches(),
+                    phaseCost.getThreads()));
+            if (phaseCost.getAttached() > 0) {
+                infoSB.append(format(", %d classes attached without retransform", phaseCost.getAttached()));
+            }
+        }
+
         if (affectVO.getThrowable() != null) {
             infoSB.append("\nEnhance error! exception: " + affectVO.getThrowable());
         }
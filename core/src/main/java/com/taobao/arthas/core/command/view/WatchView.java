@@ -6,6 +6,8 @@ import com.taobao.arthas.core.util.DateUtils;
 import com.taobao.arthas.core.util.StringUtils;
 import com.taobao.arthas.core.view.ObjectView;
 
+import java.io.IOException;
+
 /**
  * Term view for WatchModel
  *
@@ -16,10 +18,20 @@ public class WatchView extends ResultView<WatchModel> {
     @Override
     public void draw(CommandProcess process, WatchModel model) {
         Object value = model.getValue();
-        String result = StringUtils.objectToString(
-                isNeedExpand(model) ? new ObjectView(value, model.getExpand(), model.getSizeLimit()).draw() : value);
-
-        process.write("ts=" + DateUtils.formatDate(model.getTs()) + "; [cost=" + model.getCost() + "ms] result=" + result + "\n");
+        StringBuilder buf = new StringBuilder();
+        buf.append("ts=").append(DateUtils.formatDate(model.getTs()))
+                .append("; [cost=").append(model.getCost()).append("ms] result=");
+        if (isNeedExpand(model)) {
+            try {
+                new ObjectView(value, model.getExpand(), model.getSizeLimit()).draw(buf);
+            } catch (IOException e) {
+                // StringBuilder 不会抛出 IOException
+            }
+        } else {
+            buf.append(StringUtils.objectToString(value));
+        }
+        buf.append("\n");
+        process.write(buf.toString());
     }
 
     private boolean isNeedExpand(WatchModel model) {
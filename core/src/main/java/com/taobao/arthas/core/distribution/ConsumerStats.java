@@ -0,0 +1,103 @@
+package com.taobao.arthas.core.distribution;
+
+/**
+ * ResultConsumer 的统计数据
+ */
+public class ConsumerStats {
+    private String consumerId;
+    private String dropPolicy;
+    /**
+     * 队列里还没有被取走的结果数量
+     */
+    private int lag;
+    /**
+     * 队列里最早的结果已经等待的时间
+     */
+    private long lagMillis;
+    private long received;
+    private long delivered;
+    private long dropped;
+    private long bytesSent;
+    private boolean polling;
+    private long lastAccessTime;
+
+    public String getConsumerId() {
+        return consumerId;
+    }
+
+    public void setConsumerId(String consumerId) {
+        this.consumerId = consumerId;
+    }
+
+    public String getDropPolicy() {
+        return dropPolicy;
+    }
+
+    public void setDropPolicy(String dropPolicy) {
+        this.dropPolicy = dropPolicy;
+    }
+
+    public int getLag() {
+        return lag;
+    }
+
+    public void setLag(int lag) {
+        this.lag = lag;
+    }
+
+    public long getLagMillis() {
+        return lagMillis;
+    }
+
+    public void setLagMillis(long lagMillis) {
+        this.lagMillis = lagMillis;
+    }
+
+    public long getReceived() {
+        return received;
+    }
+
+    public void setReceived(long received) {
+        this.received = received;
+    }
+
+    public long getDelivered() {
+        return delivered;
+    }
+
+    public void setDelivered(long delivered) {
+        this.delivered = delivered;
+    }
+
+    public long getDropped() {
+        return dropped;
+    }
+
+    public void setDropped(long dropped) {
+        this.dropped = dropped;
+    }
+
+    public long getBytesSent() {
+        return bytesSent;
+    }
+
+    public void setBytesSent(long bytesSent) {
+        this.bytesSent = bytesSent;
+    }
+
+    public boolean isPolling() {
+        return polling;
+    }
+
+    public void setPolling(boolean polling) {
+        this.polling = polling;
+    }
+
+    public long getLastAccessTime() {
+        return lastAccessTime;
+    }
+
+    public void setLastAccessTime(long lastAccessTime) {
+        this.lastAccessTime = lastAccessTime;
+    }
+}
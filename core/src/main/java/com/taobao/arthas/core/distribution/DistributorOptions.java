@@ -11,4 +11,9 @@ public class DistributorOptions {
      */
     public static int resultQueueSize = 50;
 
+    /**
+     * ResultConsumer的结果队列满了之后的处理策略，默认丢弃最早的结果
+     */
+    public static DropPolicy dropPolicy = DropPolicy.DROP_OLDEST;
+
 }
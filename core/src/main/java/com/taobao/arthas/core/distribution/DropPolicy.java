@@ -0,0 +1,36 @@
+package com.taobao.arthas.core.distribution;
+
+/**
+ * ResultConsumer 的结果队列满了之后的处理策略
+ */
+public enum DropPolicy {
+    /**
+     * 丢弃最早的结果
+     */
+    DROP_OLDEST,
+
+    /**
+     * 丢弃新的结果
+     */
+    DROP_NEWEST,
+
+    /**
+     * 丢弃队列里最早的一个同类型结果，比如 dashboard/monitor 这样周期输出的结果只保留最新的，
+     * 队列里没有同类型的结果时丢弃最早的结果
+     */
+    COALESCE;
+
+    /**
+     * 解析 drop-oldest/drop-newest/coalesce ，大小写不敏感，解析不了时返回 null
+     */
+    public static DropPolicy parse(String policy) {
+        if (policy == null) {
+            return null;
+        }
+        try {
+            return DropPolicy.valueOf(policy.trim().replace('-', '_').toUpperCase());
+        } catch (IllegalArgumentException e) {
+            return null;
+        }
+    }
+}
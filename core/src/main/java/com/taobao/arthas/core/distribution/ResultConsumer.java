@@ -40,4 +40,16 @@ public interface ResultConsumer {
      * @return
      */
     boolean isHealthy();
+
+    /**
+     * Record the bytes of results sent to the client
+     * @param bytes
+     */
+    void recordBytesSent(long bytes);
+
+    /**
+     * Retrieves the counters of the consumer: lag, drops and bytes sent
+     * @return
+     */
+    ConsumerStats getStats();
 }
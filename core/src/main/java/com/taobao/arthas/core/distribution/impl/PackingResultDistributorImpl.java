@@ -2,7 +2,6 @@ package com.taobao.arthas.core.distribution.impl;
 
 import com.alibaba.arthas.deps.org.slf4j.Logger;
 import com.alibaba.arthas.deps.org.slf4j.LoggerFactory;
-import com.alibaba.fastjson.JSON;
 import com.taobao.arthas.core.command.model.ResultModel;
 import com.taobao.arthas.core.distribution.PackingResultDistributor;
 import com.taobao.arthas.core.shell.session.Session;
@@ -11,12 +10,14 @@ import java.util.ArrayList;
 import java.util.List;
 import java.util.concurrent.ArrayBlockingQueue;
 import java.util.concurrent.BlockingQueue;
+import java.util.concurrent.atomic.AtomicLong;
 
 public class PackingResultDistributorImpl implements PackingResultDistributor {
     private static final Logger logger = LoggerFactory.getLogger(PackingResultDistributorImpl.class);
 
     private BlockingQueue<ResultModel> resultQueue = new ArrayBlockingQueue<ResultModel>(500);
     private final Session session;
+    private final AtomicLong discardCount = new AtomicLong();
 
     public PackingResultDistributorImpl(Session session) {
         this.session = session;
@@ -25,7 +26,12 @@ public class PackingResultDistributorImpl implements PackingResultDistributor {
     @Override
     public void appendResult(ResultModel result) {
         if (!resultQueue.offer(result)) {
-            logger.warn("result queue is full: {}, discard later result: {}", resultQueue.size(), JSON.toJSONString(result));
+            // 队列满的时候丢弃的结果会很多，不要序列化结果，只在第一次和之后每 1000 次输出一条日志
+            long discarded = discardCount.incrementAndGet();
+            if (discarded == 1 || discarded % 1000 == 0) {
+                logger.warn("result queue is full: {}, discard later result, type: {}, total discarded: {}",
+                        resultQueue.size(), result.getType(), discarded);
+            }
         }
     }
 
@@ -4,48 +4,97 @@ import com.alibaba.arthas.deps.org.slf4j.Logger;
 import com.alibaba.arthas.deps.org.slf4j.LoggerFactory;
 import com.alibaba.fastjson.JSON;
 import com.taobao.arthas.core.command.model.ResultModel;
+import com.taobao.arthas.core.distribution.ConsumerStats;
 import com.taobao.arthas.core.distribution.DistributorOptions;
+import com.taobao.arthas.core.distribution.DropPolicy;
 import com.taobao.arthas.core.distribution.ResultConsumer;
 import com.taobao.arthas.core.distribution.ResultConsumerHelper;
 
 import java.util.ArrayList;
 import java.util.Collections;
 import java.util.List;
-import java.util.concurrent.ArrayBlockingQueue;
-import java.util.concurrent.BlockingQueue;
 import java.util.concurrent.TimeUnit;
+import java.util.concurrent.atomic.AtomicLong;
+import java.util.concurrent.locks.Condition;
 import java.util.concurrent.locks.ReentrantLock;
 
 /**
+ * <pre>
+ * 结果保存在固定大小的环形队列里，appendResult 不会堵塞，队列满了之后按 DropPolicy 丢弃结果。
+ * pollResults 是长轮询，有新的结果时马上被唤醒，然后最多再等 SENDING_DELAY_MILLIS 攒一批一起发送。
+ * </pre>
+ *
  * @author gongdewei 2020/3/27
  */
 public class ResultConsumerImpl implements ResultConsumer {
     private static final Logger logger = LoggerFactory.getLogger(ResultConsumerImpl.class);
-    private BlockingQueue<ResultModel> resultQueue;
+    /**
+     * 取到第一个结果后，最多再等多久攒一批结果
+     */
+    private static final long SENDING_DELAY_MILLIS = 50;
+    private static final int SENDING_ITEM_COUNT_LIMIT = 100;
+
+    private final ResultModel[] resultQueue;
+    private final long[] appendTimes;
+    private int head;
+    private int count;
+    private final ReentrantLock queueLock = new ReentrantLock();
+    private final Condition notEmpty = queueLock.newCondition();
+
     private volatile long lastAccessTime;
     private volatile boolean polling;
     private ReentrantLock lock = new ReentrantLock();
     private int resultBatchSizeLimit = 20;
-    private int resultQueueSize = DistributorOptions.resultQueueSize;
     private long pollTimeLimit = 2 * 1000;
     private String consumerId;
-    private boolean closed;
-    private long sendingItemCount;
+    private volatile boolean closed;
+    private final DropPolicy dropPolicy;
+
+    private long received;
+    private long delivered;
+    private long dropped;
+    private final AtomicLong bytesSent = new AtomicLong();
 
     public ResultConsumerImpl() {
+        this(DistributorOptions.dropPolicy);
+    }
+
+    public ResultConsumerImpl(DropPolicy dropPolicy) {
+        this(DistributorOptions.resultQueueSize, dropPolicy);
+    }
+
+    public ResultConsumerImpl(int resultQueueSize, DropPolicy dropPolicy) {
         lastAccessTime = System.currentTimeMillis();
-        resultQueue = new ArrayBlockingQueue<ResultModel>(resultQueueSize);
+        this.resultQueue = new ResultModel[resultQueueSize];
+        this.appendTimes = new long[resultQueueSize];
+        this.dropPolicy = dropPolicy != null ? dropPolicy : DropPolicy.DROP_OLDEST;
     }
 
     @Override
     public boolean appendResult(ResultModel result) {
         //可能某些Consumer已经断开，不会再读取，这里不能堵塞！
-        boolean discard = false;
-        while (!resultQueue.offer(result)) {
-            ResultModel discardResult = resultQueue.poll();
-            discard = true;
+        queueLock.lock();
+        try {
+            received++;
+            boolean discard = false;
+            if (count == resultQueue.length) {
+                discard = true;
+                dropped++;
+                if (dropPolicy == DropPolicy.DROP_NEWEST) {
+                    return false;
+                }
+                int index = dropPolicy == DropPolicy.COALESCE ? indexOfType(result.getType()) : -1;
+                removeAt(index >= 0 ? index : 0);
+            }
+            int tail = (head + count) % resultQueue.length;
+            resultQueue[tail] = result;
+            appendTimes[tail] = System.currentTimeMillis();
+            count++;
+            notEmpty.signal();
+            return !discard;
+        } finally {
+            queueLock.unlock();
         }
-        return !discard;
     }
 
     @Override
@@ -55,40 +104,35 @@ public class ResultConsumerImpl implements ResultConsumer {
             long accessTime = lastAccessTime;
             if (lock.tryLock(500, TimeUnit.MILLISECONDS)) {
                 polling = true;
-                sendingItemCount = 0;
-                long firstResultTime = 0;
-                // sending delay: time elapsed after firstResultTime
-                long sendingDelay = 0;
-                // waiting time: time elapsed after access
-                long waitingTime = 0;
                 List<ResultModel> sendingResults = new ArrayList<ResultModel>(resultBatchSizeLimit);
-
-                while (!closed
-                        &&sendingResults.size() < resultBatchSizeLimit
-                        && sendingDelay < 100
-                        && waitingTime < pollTimeLimit) {
-                    ResultModel aResult = resultQueue.poll(100, TimeUnit.MILLISECONDS);
-                    if (aResult != null) {
-                        sendingResults.add(aResult);
-                        //是否为第一次获取到数据
-                        if (firstResultTime == 0) {
-                            firstResultTime = System.currentTimeMillis();
-                        }
-                        //判断是否需要立即发送出去
-                        if (shouldFlush(sendingResults, aResult)) {
+                queueLock.lock();
+                try {
+                    // 长轮询，等待第一个结果
+                    long waitingTime = pollTimeLimit - (System.currentTimeMillis() - accessTime);
+                    while (count == 0 && !closed && waitingTime > 0) {
+                        waitingTime = TimeUnit.NANOSECONDS.toMillis(
+                                notEmpty.awaitNanos(TimeUnit.MILLISECONDS.toNanos(waitingTime)));
+                    }
+                    // 攒一批结果，数量或者估算的 item 数量达到上限时立即发送
+                    long sendingItemCount = 0;
+                    long firstResultTime = System.currentTimeMillis();
+                    while (!closed) {
+                        sendingItemCount = drainTo(sendingResults, sendingItemCount);
+                        if (sendingResults.isEmpty() || sendingResults.size() >= resultBatchSizeLimit
+                                || sendingItemCount >= SENDING_ITEM_COUNT_LIMIT) {
                             break;
                         }
-                    } else {
-                        if (firstResultTime > 0) {
-                            //获取到部分数据后，队列已经取完，计算发送延时时间
-                            sendingDelay = System.currentTimeMillis() - firstResultTime;
+                        long sendingDelay = SENDING_DELAY_MILLIS - (System.currentTimeMillis() - firstResultTime);
+                        if (sendingDelay <= 0) {
+                            break;
                         }
-                        //计算总共等待时间，长轮询最大等待时间
-                        waitingTime = System.currentTimeMillis() - accessTime;
+                        notEmpty.await(sendingDelay, TimeUnit.MILLISECONDS);
                     }
+                    delivered += sendingResults.size();
+                } finally {
+                    queueLock.unlock();
                 }
 
-                //resultQueue.drainTo(sendingResults, resultSizeLimit-sendingResults.size());
                 if(logger.isDebugEnabled()) {
                     logger.debug("pollResults: {}, results: {}", sendingResults.size(), JSON.toJSONString(sendingResults));
                 }
@@ -107,25 +151,89 @@ public class ResultConsumerImpl implements ResultConsumer {
     }
 
     /**
-     * 估算对象数量及大小，判断是否需要立即发送出去
-     * @param sendingResults
-     * @param last
-     * @return
+     * 从队列头部取出结果，直到数量或者估算的 item 数量达到上限
+     */
+    private long drainTo(List<ResultModel> sendingResults, long sendingItemCount) {
+        while (count > 0 && sendingResults.size() < resultBatchSizeLimit
+                && sendingItemCount < SENDING_ITEM_COUNT_LIMIT) {
+            ResultModel result = resultQueue[head];
+            removeAt(0);
+            sendingResults.add(result);
+            //TODO 引入一个估算模型，每个model自统计对象数量
+            sendingItemCount += ResultConsumerHelper.getItemCount(result);
+        }
+        return sendingItemCount;
+    }
+
+    /**
+     * @return 队列里最早的同类型结果的位置（相对于队列头部），没有时返回 -1
      */
-    private boolean shouldFlush(List<ResultModel> sendingResults, ResultModel last) {
-        //TODO 引入一个估算模型，每个model自统计对象数量
-        sendingItemCount += ResultConsumerHelper.getItemCount(last);
-        return sendingItemCount >= 100;
+    private int indexOfType(String type) {
+        for (int i = 0; i < count; i++) {
+            ResultModel result = resultQueue[(head + i) % resultQueue.length];
+            if (type != null && type.equals(result.getType())) {
+                return i;
+            }
+        }
+        return -1;
+    }
+
+    /**
+     * 删除队列里的第 index 个结果，后面的结果往前移
+     */
+    private void removeAt(int index) {
+        int capacity = resultQueue.length;
+        for (int i = index; i > 0; i--) {
+            int to = (head + i) % capacity;
+            int from = (head + i - 1) % capacity;
+            resultQueue[to] = resultQueue[from];
+            appendTimes[to] = appendTimes[from];
+        }
+        resultQueue[head] = null;
+        head = (head + 1) % capacity;
+        count--;
     }
 
     @Override
     public boolean isHealthy() {
-
+        int size;
+        queueLock.lock();
+        try {
+            size = count;
+        } finally {
+            queueLock.unlock();
+        }
         return isPolling()
-                || resultQueue.size() < resultQueueSize
+                || size < resultQueue.length
                 || System.currentTimeMillis() - lastAccessTime < 1000;
     }
 
+    @Override
+    public void recordBytesSent(long bytes) {
+        bytesSent.addAndGet(bytes);
+    }
+
+    @Override
+    public ConsumerStats getStats() {
+        ConsumerStats stats = new ConsumerStats();
+        stats.setConsumerId(consumerId);
+        stats.setDropPolicy(dropPolicy.name());
+        stats.setPolling(polling);
+        stats.setLastAccessTime(lastAccessTime);
+        stats.setBytesSent(bytesSent.get());
+        queueLock.lock();
+        try {
+            stats.setLag(count);
+            stats.setLagMillis(count > 0 ? System.currentTimeMillis() - appendTimes[head] : 0);
+            stats.setReceived(received);
+            stats.setDelivered(delivered);
+            stats.setDropped(dropped);
+        } finally {
+            queueLock.unlock();
+        }
+        return stats;
+    }
+
     @Override
     public long getLastAccessTime() {
         return lastAccessTime;
@@ -134,6 +242,13 @@ public class ResultConsumerImpl implements ResultConsumer {
     @Override
     public void close(){
         this.closed = true;
+        // 唤醒正在等待的长轮询
+        queueLock.lock();
+        try {
+            notEmpty.signalAll();
+        } finally {
+            queueLock.unlock();
+        }
     }
 
     @Override
@@ -154,6 +269,10 @@ public class ResultConsumerImpl implements ResultConsumer {
         this.resultBatchSizeLimit = resultBatchSizeLimit;
     }
 
+    public DropPolicy getDropPolicy() {
+        return dropPolicy;
+    }
+
     @Override
     public String getConsumerId() {
         return consumerId;
@@ -5,6 +5,7 @@ import com.alibaba.arthas.deps.org.slf4j.LoggerFactory;
 import com.taobao.arthas.core.command.model.InputStatusModel;
 import com.taobao.arthas.core.command.model.MessageModel;
 import com.taobao.arthas.core.command.model.ResultModel;
+import com.taobao.arthas.core.distribution.ConsumerStats;
 import com.taobao.arthas.core.distribution.DistributorOptions;
 import com.taobao.arthas.core.distribution.ResultConsumer;
 import com.taobao.arthas.core.distribution.SharingResultDistributor;
@@ -216,5 +217,16 @@ public class SharingResultDistributorImpl implements SharingResultDistributor {
         public boolean isHealthy() {
             return true;
         }
+
+        @Override
+        public void recordBytesSent(long bytes) {
+        }
+
+        @Override
+        public ConsumerStats getStats() {
+            ConsumerStats stats = new ConsumerStats();
+            stats.setConsumerId(getConsumerId());
+            return stats;
+        }
     }
 }
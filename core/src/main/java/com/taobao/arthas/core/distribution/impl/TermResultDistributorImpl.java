@@ -1,21 +1,44 @@
 package com.taobao.arthas.core.distribution.impl;
 
+import com.taobao.arthas.core.GlobalOptions;
 import com.taobao.arthas.core.command.model.ResultModel;
+import com.taobao.arthas.core.command.model.WatchModel;
 import com.taobao.arthas.core.command.view.ResultView;
 import com.taobao.arthas.core.command.view.ResultViewResolver;
 import com.taobao.arthas.core.distribution.ResultDistributor;
+import com.taobao.arthas.core.server.ArthasBootstrap;
 import com.taobao.arthas.core.shell.command.CommandProcess;
+import com.taobao.arthas.core.util.scheduler.TaskPriority;
+import com.taobao.arthas.core.view.ObjectView;
+
+import java.util.Queue;
+import java.util.concurrent.ConcurrentLinkedQueue;
+import java.util.concurrent.RejectedExecutionException;
+import java.util.concurrent.atomic.AtomicBoolean;
+import java.util.concurrent.atomic.AtomicInteger;
 
 /**
  * Term/Tty Result Distributor
+ * <pre>
+ * 打开 defer-render 时，watch 的结果在应用线程里只拷贝展开的部分，放到队列里由 command scheduler 渲染。
+ * 其它结果在调用线程里渲染，渲染前先把队列里的结果渲染完，保证输出顺序不变。
+ * 没有打开 defer-render 并且队列是空的时候直接渲染，不需要加锁。
+ * 队列满了之后在调用线程里渲染，相当于给应用线程加上背压。
+ * </pre>
  *
  * @author gongdewei 2020-03-26
  */
 public class TermResultDistributorImpl implements ResultDistributor {
+    private static final int MAX_PENDING_RESULTS = 1024;
 
     private final CommandProcess commandProcess;
     private final ResultViewResolver resultViewResolver;
 
+    private final Queue<ResultModel> pendingResults = new ConcurrentLinkedQueue<ResultModel>();
+    private final AtomicInteger pendingCount = new AtomicInteger();
+    private final AtomicBoolean drainScheduled = new AtomicBoolean();
+    private final Object drawLock = new Object();
+
     public TermResultDistributorImpl(CommandProcess commandProcess, ResultViewResolver resultViewResolver) {
         this.commandProcess = commandProcess;
         this.resultViewResolver = resultViewResolver;
@@ -23,6 +46,67 @@ public class TermResultDistributorImpl implements ResultDistributor {
 
     @Override
     public void appendResult(ResultModel model) {
+        if (isDeferrable(model) && pendingCount.get() < MAX_PENDING_RESULTS) {
+            WatchModel watchModel = (WatchModel) model;
+            Integer expand = watchModel.getExpand();
+            if (expand != null && expand >= 0) {
+                watchModel.setValue(ObjectView.snapshot(watchModel.getValue(), expand));
+            }
+            pendingCount.incrementAndGet();
+            pendingResults.offer(model);
+            scheduleDrain();
+            return;
+        }
+        // 队列里的结果渲染完之后才减少计数，为 0 时不会有后台线程在渲染
+        if (!GlobalOptions.deferRender && pendingCount.get() == 0) {
+            draw(model);
+            return;
+        }
+        synchronized (drawLock) {
+            drainPendingResults();
+            draw(model);
+        }
+    }
+
+    private boolean isDeferrable(ResultModel model) {
+        return GlobalOptions.deferRender && !GlobalOptions.isUsingJson && model instanceof WatchModel;
+    }
+
+    private void scheduleDrain() {
+        if (!drainScheduled.compareAndSet(false, true)) {
+            return;
+        }
+        try {
+            ArthasBootstrap.getInstance().getCommandScheduler().execute(commandProcess.session().getSessionId(),
+                    TaskPriority.PERIODIC, new Runnable() {
+                        @Override
+                        public void run() {
+                            drainScheduled.set(false);
+                            synchronized (drawLock) {
+                                drainPendingResults();
+                            }
+                        }
+                    });
+        } catch (RejectedExecutionException e) {
+            drainScheduled.set(false);
+            synchronized (drawLock) {
+                drainPendingResults();
+            }
+        }
+    }
+
+    private void drainPendingResults() {
+        ResultModel model;
+        while ((model = pendingResults.poll()) != null) {
+            try {
+                draw(model);
+            } finally {
+                pendingCount.decrementAndGet();
+            }
+        }
+    }
+
+    private void draw(ResultModel model) {
         ResultView resultView = resultViewResolver.getResultView(model);
         if (resultView != null) {
             resultView.draw(commandProcess, model);
@@ -31,6 +115,9 @@ public class TermResultDistributorImpl implements ResultDistributor {
 
     @Override
     public void close() {
+        synchronized (drawLock) {
+            drainPendingResults();
+        }
     }
 
 }
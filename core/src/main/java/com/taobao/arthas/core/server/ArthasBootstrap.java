@@ -13,10 +13,6 @@ import java.util.List;
 import java.util.Map;
 import java.util.Map.Entry;
 import java.util.Properties;
-import java.util.Timer;
-import java.util.concurrent.Executors;
-import java.util.concurrent.ScheduledExecutorService;
-import java.util.concurrent.ThreadFactory;
 import java.util.concurrent.TimeUnit;
 import java.util.concurrent.atomic.AtomicBoolean;
 import java.util.jar.JarFile;
@@ -31,6 +27,8 @@ import com.taobao.arthas.common.SocketUtils;
 import com.taobao.arthas.core.advisor.Enhancer;
 import com.taobao.arthas.core.advisor.TransformerManager;
 import com.taobao.arthas.core.command.BuiltinCommandPack;
+import com.taobao.arthas.core.command.express.ExpressFactory;
+import com.taobao.arthas.core.command.monitor200.ThreadCpuSampler;
 import com.taobao.arthas.core.command.view.ResultViewResolver;
 import com.taobao.arthas.core.config.BinderUtils;
 import com.taobao.arthas.core.config.Configure;
@@ -41,6 +39,7 @@ import com.taobao.arthas.core.env.PropertiesPropertySource;
 import com.taobao.arthas.core.env.PropertySource;
 import com.taobao.arthas.core.shell.ShellServer;
 import com.taobao.arthas.core.shell.ShellServerOptions;
+import com.taobao.arthas.core.shell.command.Command;
 import com.taobao.arthas.core.shell.command.CommandResolver;
 import com.taobao.arthas.core.shell.handlers.BindHandler;
 import com.taobao.arthas.core.shell.history.HistoryManager;
@@ -53,10 +52,13 @@ import com.taobao.arthas.core.shell.term.impl.http.api.HttpApiHandler;
 import com.taobao.arthas.core.shell.term.impl.httptelnet.HttpTelnetTermServer;
 import com.taobao.arthas.core.util.ArthasBanner;
 import com.taobao.arthas.core.util.FileUtils;
+import com.taobao.arthas.core.util.LoadedClassIndex;
 import com.taobao.arthas.core.util.LogUtil;
 import com.taobao.arthas.core.util.UserStatUtil;
 import com.taobao.arthas.core.util.affect.EnhancerAffect;
 import com.taobao.arthas.core.util.matcher.WildcardMatcher;
+import com.taobao.arthas.core.util.scheduler.CommandScheduler;
+import com.taobao.arthas.core.util.scheduler.TaskPriority;
 
 import io.netty.channel.ChannelFuture;
 import io.netty.channel.nio.NioEventLoopGroup;
@@ -70,6 +72,10 @@ import io.netty.util.concurrent.EventExecutorGroup;
  */
 public class ArthasBootstrap {
     private static final String ARTHAS_SPY_JAR = "arthas-spy.jar";
+    /**
+     * 每个优先级最多排队的命令数
+     */
+    private static final int COMMAND_QUEUE_CAPACITY = 1024;
     public static final String ARTHAS_HOME_PROPERTY = "arthas.home";
     private static String ARTHAS_HOME = null;
 
@@ -86,7 +92,7 @@ public class ArthasBootstrap {
     private Instrumentation instrumentation;
     private Thread shutdown;
     private ShellServer shellServer;
-    private ScheduledExecutorService executorService;
+    private CommandScheduler commandScheduler;
     private SessionManager sessionManager;
     private TunnelClient tunnelClient;
 
@@ -95,11 +101,11 @@ public class ArthasBootstrap {
     private static LoggerContext loggerContext;
     private EventExecutorGroup workerGroup;
 
-    private Timer timer = new Timer("arthas-timer", true);
-
     private TransformerManager transformerManager;
 
-    private ResultViewResolver resultViewResolver;
+    private volatile ResultViewResolver resultViewResolver;
+
+    private final StringBuilder startupTrace = new StringBuilder();
 
     private HistoryManager historyManager;
 
@@ -112,27 +118,36 @@ public class ArthasBootstrap {
         arthasOutputDir = new File(outputPath);
         arthasOutputDir.mkdirs();
 
+        /**
+         * <pre>
+         * 分阶段启动，只有第一个命令必须的部分在 attach 时同步初始化：
+         * 1. spy，environment，logger，调度线程池，telnet/http server
+         * 2. tunnel client 在后台连接
+         * 3. 命令的 cli 定义，term 的 ResultView，ognl 在第一次使用时加载，并在后台预热
+         * 各阶段的耗时见日志里的 startup trace
+         * </pre>
+         */
+        long phaseStart = System.nanoTime();
         // 1. initSpy()
         initSpy(instrumentation);
+        phaseStart = traceStartupPhase("spy", phaseStart);
         // 2. ArthasEnvironment
         initArthasEnvironment(args);
+        phaseStart = traceStartupPhase("environment", phaseStart);
         // 3. init logger
         loggerContext = LogUtil.initLooger(arthasEnvironment);
+        phaseStart = traceStartupPhase("logger", phaseStart);
 
         // 4. init beans
         initBeans();
 
+        int commandThreads = Math.max(2, Math.min(4, Runtime.getRuntime().availableProcessors()));
+        commandScheduler = new CommandScheduler(commandThreads, COMMAND_QUEUE_CAPACITY);
+        phaseStart = traceStartupPhase("beans", phaseStart);
+
         // 5. start agent server
         bind(configure);
-
-        executorService = Executors.newScheduledThreadPool(1, new ThreadFactory() {
-            @Override
-            public Thread newThread(Runnable r) {
-                final Thread t = new Thread(r, "arthas-command-execute");
-                t.setDaemon(true);
-                return t;
-            }
-        });
+        phaseStart = traceStartupPhase("bind", phaseStart);
 
         shutdown = new Thread("as-shutdown-hooker") {
 
@@ -144,14 +159,81 @@ public class ArthasBootstrap {
 
         transformerManager = new TransformerManager(instrumentation);
         Runtime.getRuntime().addShutdownHook(shutdown);
+        traceStartupPhase("transformer", phaseStart);
+        logger().info("as-server startup trace: {}", startupTrace);
+
+        // 6. 后台连接 tunnel server，预热第一次使用时才加载的部分
+        startTunnelClient();
+        warmUp();
     }
 
     private void initBeans() {
-        this.resultViewResolver = new ResultViewResolver();
-
         this.historyManager = new HistoryManagerImpl();
     }
 
+    private long traceStartupPhase(String phase, long phaseStart) {
+        long now = System.nanoTime();
+        if (startupTrace.length() > 0) {
+            startupTrace.append(", ");
+        }
+        startupTrace.append(phase).append('=').append(TimeUnit.NANOSECONDS.toMillis(now - phaseStart)).append("ms");
+        return now;
+    }
+
+    /**
+     * tunnel client 连接成功之后才知道 agent id，之后新建的 session 的欢迎信息里会带上
+     */
+    private void startTunnelClient() {
+        if (configure.getTunnelServer() == null) {
+            return;
+        }
+        tunnelClient = new TunnelClient();
+        tunnelClient.setId(configure.getAgentId());
+        tunnelClient.setTunnelServerUrl(configure.getTunnelServer());
+        commandScheduler.execute(null, TaskPriority.BACKGROUND, new Runnable() {
+            @Override
+            public void run() {
+                long start = System.nanoTime();
+                try {
+                    ChannelFuture channelFuture = tunnelClient.start();
+                    channelFuture.await(10, TimeUnit.SECONDS);
+                    if (channelFuture.isSuccess() && shellServer instanceof ShellServerImpl) {
+                        Map<String, String> welcomeInfos = new HashMap<String, String>();
+                        welcomeInfos.put("id", tunnelClient.getId());
+                        ((ShellServerImpl) shellServer).setWelcomeMessage(ArthasBanner.welcome(welcomeInfos));
+                    }
+                    logger().info("tunnel client started in {} ms",
+                            TimeUnit.NANOSECONDS.toMillis(System.nanoTime() - start));
+                } catch (Throwable t) {
+                    logger().error("start tunnel client error", t);
+                }
+            }
+        });
+    }
+
+    /**
+     * 在后台加载命令的 cli 定义，term 的 ResultView 和 ognl，第一次执行 watch/ognl 等命令时不用再等待
+     */
+    private void warmUp() {
+        commandScheduler.execute(null, TaskPriority.BACKGROUND, new Runnable() {
+            @Override
+            public void run() {
+                long start = System.nanoTime();
+                for (Command command : new BuiltinCommandPack().commands()) {
+                    command.cli();
+                }
+                getResultViewResolver();
+                try {
+                    ExpressFactory.unpooledExpress(ArthasBootstrap.class.getClassLoader()).is("true");
+                } catch (Throwable e) {
+                    // ignore
+                }
+                logger().info("as-server warm up completed in {} ms",
+                        TimeUnit.NANOSECONDS.toMillis(System.nanoTime() - start));
+            }
+        });
+    }
+
     private static void initSpy(Instrumentation instrumentation) throws Throwable {
         // TODO init SpyImpl ?
 
@@ -292,34 +374,12 @@ public class ArthasBootstrap {
             logger().info("generate random http port: " + newHttpPort);
         }
 
-        String agentId = null;
-        try {
-            if (configure.getTunnelServer() != null) {
-                tunnelClient = new TunnelClient();
-                tunnelClient.setId(configure.getAgentId());
-                tunnelClient.setTunnelServerUrl(configure.getTunnelServer());
-                ChannelFuture channelFuture = tunnelClient.start();
-                channelFuture.await(10, TimeUnit.SECONDS);
-                if(channelFuture.isSuccess()) {
-                    agentId = tunnelClient.getId();
-                }
-            }
-        } catch (Throwable t) {
-            logger().error("start tunnel client error", t);
-        }
-
         try {
             ShellServerOptions options = new ShellServerOptions()
                             .setInstrumentation(instrumentation)
                             .setPid(PidUtils.currentLongPid())
                             .setSessionTimeout(configure.getSessionTimeout() * 1000);
 
-            if (agentId != null) {
-                Map<String, String> welcomeInfos = new HashMap<String, String>();
-                welcomeInfos.put("id", agentId);
-                options.setWelcomeMessage(ArthasBanner.welcome(welcomeInfos));
-            }
-
             shellServer = new ShellServerImpl(options);
             BuiltinCommandPack builtinCommands = new BuiltinCommandPack();
             List<CommandResolver> resolvers = new ArrayList<CommandResolver>();
@@ -417,9 +477,6 @@ public class ArthasBootstrap {
             sessionManager.close();
             sessionManager = null;
         }
-        if (timer != null) {
-            timer.cancel();
-        }
         if (this.tunnelClient != null) {
             try {
                 tunnelClient.stop();
@@ -427,12 +484,14 @@ public class ArthasBootstrap {
                 logger().error("stop tunnel client error", e);
             }
         }
-        if (executorService != null) {
-            executorService.shutdownNow();
+        ThreadCpuSampler.destroy();
+        if (commandScheduler != null) {
+            commandScheduler.shutdown();
         }
         if (transformerManager != null) {
             transformerManager.destroy();
         }
+        LoadedClassIndex.destroy();
         // clear the reference in Spy class.
         cleanUpSpyReference();
         shutdownWorkGroup();
@@ -496,7 +555,11 @@ public class ArthasBootstrap {
     }
 
     public void execute(Runnable command) {
-        executorService.execute(command);
+        commandScheduler.execute(command);
+    }
+
+    public void execute(String sessionId, TaskPriority priority, Runnable command) {
+        commandScheduler.execute(sessionId, priority, command);
     }
 
     /**
@@ -531,18 +594,18 @@ public class ArthasBootstrap {
         return sessionManager;
     }
 
-    public Timer getTimer() {
-        return this.timer;
-    }
-
-    public ScheduledExecutorService getScheduledExecutorService() {
-        return this.executorService;
+    public CommandScheduler getCommandScheduler() {
+        return this.commandScheduler;
     }
 
     public Instrumentation getInstrumentation() {
         return this.instrumentation;
     }
 
+    public File getOutputPath() {
+        return this.arthasOutputDir;
+    }
+
     public TransformerManager getTransformerManager() {
         return this.transformerManager;
     }
@@ -551,8 +614,21 @@ public class ArthasBootstrap {
         return LoggerFactory.getLogger(this.getClass());
     }
 
+    /**
+     * 只有 term 输出需要，http api 不会用到，第一次使用时再创建
+     */
     public ResultViewResolver getResultViewResolver() {
-        return resultViewResolver;
+        ResultViewResolver resolver = resultViewResolver;
+        if (resolver == null) {
+            synchronized (this) {
+                resolver = resultViewResolver;
+                if (resolver == null) {
+                    resolver = new ResultViewResolver();
+                    resultViewResolver = resolver;
+                }
+            }
+        }
+        return resolver;
     }
 
     public HistoryManager getHistoryManager() {
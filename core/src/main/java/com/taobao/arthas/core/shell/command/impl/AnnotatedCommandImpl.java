@@ -9,6 +9,7 @@ import com.taobao.arthas.core.util.UserStatUtil;
 import com.taobao.middleware.cli.CLI;
 import com.taobao.middleware.cli.Option;
 import com.taobao.middleware.cli.annotations.CLIConfigurator;
+import com.taobao.middleware.cli.annotations.Name;
 
 import java.util.Collections;
 
@@ -17,15 +18,31 @@ import java.util.Collections;
  */
 public class AnnotatedCommandImpl extends Command {
 
-    private CLI cli;
+    /**
+     * 解析 cli 注解比较耗时，第一次使用时再解析，attach 时不需要为所有命令付出这个开销
+     */
+    private volatile CLI cli;
     private Class<? extends AnnotatedCommand> clazz;
     private Handler<CommandProcess> processHandler = new ProcessHandler();
 
     public AnnotatedCommandImpl(Class<? extends AnnotatedCommand> clazz) {
         this.clazz = clazz;
-        cli = CLIConfigurator.define(clazz, true);
-        cli.addOption(new Option().setArgName("help").setFlag(true).setShortName("h").setLongName("help")
-                .setDescription("this help").setHelp(true));
+    }
+
+    private CLI definedCli() {
+        CLI result = cli;
+        if (result == null) {
+            synchronized (this) {
+                result = cli;
+                if (result == null) {
+                    result = CLIConfigurator.define(clazz, true);
+                    result.addOption(new Option().setArgName("help").setFlag(true).setShortName("h")
+                            .setLongName("help").setDescription("this help").setHelp(true));
+                    cli = result;
+                }
+            }
+        }
+        return result;
     }
 
     private boolean shouldOverridesName(Class<? extends AnnotatedCommand> clazz) {
@@ -55,7 +72,11 @@ public class AnnotatedCommandImpl extends Command {
                 // Use cli.getName() instead
             }
         }
-        return cli.getName();
+        Name name = clazz.getAnnotation(Name.class);
+        if (name != null) {
+            return name.value();
+        }
+        return definedCli().getName();
     }
 
     @Override
@@ -67,7 +88,7 @@ public class AnnotatedCommandImpl extends Command {
                 // Use cli instead
             }
         }
-        return cli;
+        return definedCli();
     }
 
     private void process(CommandProcess process) {
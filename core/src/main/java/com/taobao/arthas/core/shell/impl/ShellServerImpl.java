@@ -47,7 +47,7 @@ public class ShellServerImpl extends ShellServer {
     private final List<TermServer> termServers;
     private final long timeoutMillis;
     private final long reaperInterval;
-    private String welcomeMessage;
+    private volatile String welcomeMessage;
     private Instrumentation instrumentation;
     private long pid;
     private boolean closed = true;
@@ -71,6 +71,13 @@ public class ShellServerImpl extends ShellServer {
         resolvers.add(new BuiltinCommandResolver());
     }
 
+    /**
+     * 只影响之后新建的 session，比如 tunnel client 在后台连接成功之后更新 agent id
+     */
+    public void setWelcomeMessage(String welcomeMessage) {
+        this.welcomeMessage = welcomeMessage;
+    }
+
     @Override
     public synchronized ShellServer registerCommandResolver(CommandResolver resolver) {
         resolvers.add(0, resolver);
@@ -17,6 +17,7 @@ import com.taobao.arthas.core.shell.session.Session;
 import com.taobao.arthas.core.shell.system.Job;
 import com.taobao.arthas.core.shell.system.JobListener;
 import com.taobao.arthas.core.shell.term.Term;
+import com.taobao.arthas.core.util.scheduler.TaskPriority;
 
 
 /**
@@ -62,7 +63,8 @@ public class GlobalJobControllerImpl extends JobControllerImpl {
         JobTimeoutTask jobTimeoutTask = new JobTimeoutTask(job);
         long jobTimeoutInSecond = getJobTimeoutInSecond();
         Date timeoutDate = new Date(System.currentTimeMillis() + (jobTimeoutInSecond * 1000));
-        ArthasBootstrap.getInstance().getScheduledExecutorService().schedule(jobTimeoutTask, jobTimeoutInSecond, TimeUnit.SECONDS);
+        ArthasBootstrap.getInstance().getCommandScheduler().schedule(session.getSessionId(), TaskPriority.BACKGROUND,
+                jobTimeoutTask, jobTimeoutInSecond, TimeUnit.SECONDS);
         jobTimeoutTaskMap.put(job.id(), jobTimeoutTask);
         job.setTimeoutDate(timeoutDate);
 
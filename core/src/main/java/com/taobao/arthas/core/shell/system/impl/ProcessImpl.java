@@ -21,6 +21,7 @@ import com.taobao.arthas.core.shell.system.ExecStatus;
 import com.taobao.arthas.core.shell.system.Process;
 import com.taobao.arthas.core.shell.system.ProcessAware;
 import com.taobao.arthas.core.shell.term.Tty;
+import com.taobao.arthas.core.util.scheduler.TaskPriority;
 import com.taobao.middleware.cli.CLIException;
 import com.taobao.middleware.cli.CommandLine;
 import io.termd.core.function.Function;
@@ -29,6 +30,7 @@ import java.lang.instrument.ClassFileTransformer;
 import java.util.Date;
 import java.util.LinkedList;
 import java.util.List;
+import java.util.concurrent.RejectedExecutionException;
 import java.util.concurrent.atomic.AtomicInteger;
 
 /**
@@ -368,7 +370,13 @@ public class ProcessImpl implements Process {
             process.echoTips("cache location  : " + cacheLocation() + "\n");
         }
         Runnable task = new CommandProcessTask(process);
-        ArthasBootstrap.getInstance().execute(task);
+        // 后台执行的 job 不能影响交互命令的响应
+        TaskPriority priority = fg ? TaskPriority.INTERACTIVE : TaskPriority.BACKGROUND;
+        try {
+            ArthasBootstrap.getInstance().execute(session != null ? session.getSessionId() : null, priority, task);
+        } catch (RejectedExecutionException e) {
+            terminate(1, null, "Too many commands are waiting to be executed, please try again later.");
+        }
     }
 
     private class CommandProcessTask implements Runnable {
@@ -72,8 +72,10 @@ public class HttpRequestHandler extends SimpleChannelInboundHandler<FullHttpRequ
             try {
                 //handle http restful api
                 if ("/api".equals(path)) {
-                    response = httpApiHandler.handle(request);
+                    //api response is streamed by HttpApiHandler itself
                     isHttpApiResponse = true;
+                    httpApiHandler.handle(ctx, request);
+                    return;
                 }
 
                 //handle webui requests
@@ -102,23 +104,14 @@ public class HttpRequestHandler extends SimpleChannelInboundHandler<FullHttpRequ
                 logger.error("arthas process http request error: " + request.uri(), e);
             } finally {
                 //If it is null, an error may occur
-                if (response == null){
+                if (response == null && !isHttpApiResponse){
                     response = createResponse(request, HttpResponseStatus.INTERNAL_SERVER_ERROR, "Server error");
                 }
-                ctx.write(response);
+                if (response != null) {
+                    ctx.write(response);
+                }
                 ChannelFuture future = ctx.writeAndFlush(LastHttpContent.EMPTY_LAST_CONTENT);
                 future.addListener(ChannelFutureListener.CLOSE);
-
-                //reuse http api response buf
-                if (isHttpApiResponse && response instanceof DefaultFullHttpResponse) {
-                    final HttpResponse finalResponse = response;
-                    future.addListener(new ChannelFutureListener() {
-                        @Override
-                        public void operationComplete(ChannelFuture future) throws Exception {
-                            httpApiHandler.onCompleted((DefaultFullHttpResponse) finalResponse);
-                        }
-                    });
-                }
             }
         }
     }
@@ -14,6 +14,7 @@ public class ApiRequest {
     private String sessionId;
     private String consumerId;
     private Integer execTimeout;
+    private String dropPolicy;
 
     @Override
     public String toString() {
@@ -24,6 +25,7 @@ public class ApiRequest {
                 ", sessionId='" + sessionId + '\'' +
                 ", consumerId='" + consumerId + '\'' +
                 ", execTimeout=" + execTimeout +
+                ", dropPolicy='" + dropPolicy + '\'' +
                 '}';
     }
 
@@ -74,4 +76,12 @@ public class ApiRequest {
     public void setExecTimeout(Integer execTimeout) {
         this.execTimeout = execTimeout;
     }
+
+    public String getDropPolicy() {
+        return dropPolicy;
+    }
+
+    public void setDropPolicy(String dropPolicy) {
+        this.dropPolicy = dropPolicy;
+    }
 }
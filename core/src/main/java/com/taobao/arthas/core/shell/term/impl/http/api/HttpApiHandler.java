@@ -5,6 +5,9 @@ import com.alibaba.arthas.deps.org.slf4j.LoggerFactory;
 import com.alibaba.fastjson.JSON;
 import com.taobao.arthas.common.PidUtils;
 import com.taobao.arthas.core.command.model.*;
+import com.taobao.arthas.core.distribution.ConsumerStats;
+import com.taobao.arthas.core.distribution.DistributorOptions;
+import com.taobao.arthas.core.distribution.DropPolicy;
 import com.taobao.arthas.core.distribution.PackingResultDistributor;
 import com.taobao.arthas.core.distribution.ResultConsumer;
 import com.taobao.arthas.core.distribution.ResultDistributor;
@@ -30,19 +33,21 @@ import com.taobao.arthas.core.util.DateUtils;
 import com.taobao.arthas.core.util.JsonUtils;
 import com.taobao.arthas.core.util.StringUtils;
 import io.netty.buffer.ByteBuf;
-import io.netty.buffer.ByteBufOutputStream;
-import io.netty.buffer.Unpooled;
+import io.netty.channel.ChannelHandlerContext;
 import io.netty.handler.codec.http.*;
 import io.netty.util.CharsetUtil;
 import io.termd.core.function.Function;
 
 import java.io.IOException;
+import java.io.OutputStream;
+import java.io.OutputStreamWriter;
+import java.io.Writer;
+import java.util.ArrayList;
 import java.util.List;
 import java.util.Map;
 import java.util.TreeMap;
-import java.util.concurrent.ArrayBlockingQueue;
-import java.util.concurrent.TimeUnit;
 import java.util.concurrent.atomic.AtomicInteger;
+import java.util.zip.GZIPOutputStream;
 
 
 /**
@@ -60,11 +65,16 @@ public class HttpApiHandler {
     private final JobController jobController;
     private final HistoryManager historyManager;
 
+    /**
+     * 所有响应在途字节数的上限
+     */
+    private static final long INFLIGHT_BYTES_LIMIT = 1024 * 1024 * 4;
+    private static final long BUDGET_TIMEOUT_MILLIS = 30000;
+    private static final int GZIP_BUFFER_SIZE = 1024 * 8;
+
     private int jsonBufferSize = 1024 * 256;
-    private int poolSize = 8;
-    private ArrayBlockingQueue<ByteBuf> byteBufPool = new ArrayBlockingQueue<ByteBuf>(poolSize);
-    private ArrayBlockingQueue<char[]> charsBufPool = new ArrayBlockingQueue<char[]>(poolSize);
-    private ArrayBlockingQueue<byte[]> bytesPool = new ArrayBlockingQueue<byte[]>(poolSize);
+    private int chunkSize = 1024 * 64;
+    private final InflightBytesBudget inflightBytesBudget = new InflightBytesBudget(INFLIGHT_BYTES_LIMIT);
 
     public HttpApiHandler(HistoryManager historyManager, SessionManager sessionManager) {
         this.historyManager = historyManager;
@@ -72,25 +82,27 @@ public class HttpApiHandler {
         commandManager = this.sessionManager.getCommandManager();
         jobController = this.sessionManager.getJobController();
 
-        //init buf pool
+        //json 分段写出，线程缓存的 SerializeWriter buffer 不需要超过这个大小
         JsonUtils.setSerializeWriterBufferThreshold(jsonBufferSize);
-        for (int i = 0; i < poolSize; i++) {
-            byteBufPool.offer(Unpooled.buffer(jsonBufferSize));
-            charsBufPool.offer(new char[jsonBufferSize]);
-            bytesPool.offer(new byte[jsonBufferSize]);
-        }
     }
 
-    public HttpResponse handle(FullHttpRequest request) throws Exception {
+    /**
+     * <pre>
+     * 处理请求并把结果直接写到 channel 里：响应头之后按 chunk 流式输出 json，客户端支持时使用 gzip 压缩。
+     * 响应头写出之后出错时无法再返回错误信息，只能关闭连接。LastHttpContent 由调用者写出。
+     * </pre>
+     */
+    public void handle(ChannelHandlerContext ctx, FullHttpRequest request) {
 
         ApiResponse result;
         String requestBody = null;
         String requestId = null;
+        ApiRequest apiRequest = null;
         try {
             HttpMethod method = request.method();
             if (HttpMethod.POST.equals(method)) {
                 requestBody = getBody(request);
-                ApiRequest apiRequest = parseRequest(requestBody);
+                apiRequest = parseRequest(requestBody);
                 requestId = apiRequest.getRequestId();
                 result = processRequest(apiRequest);
             } else {
@@ -105,77 +117,72 @@ public class HttpApiHandler {
         }
         result.setRequestId(requestId);
 
+        //create http response
+        boolean gzip = acceptGzip(request);
+        DefaultHttpResponse response = new DefaultHttpResponse(request.protocolVersion(), HttpResponseStatus.OK);
+        response.headers().set(HttpHeaderNames.CONTENT_TYPE, "application/json; charset=utf-8");
+        if (gzip) {
+            response.headers().set(HttpHeaderNames.CONTENT_ENCODING, HttpHeaderValues.GZIP);
+        }
+        HttpUtil.setTransferEncodingChunked(response, true);
+        ctx.write(response);
 
-        //http response content
-        ByteBuf content = null;
-        //fastjson buf
-        char[] charsBuf = null;
-        byte[] bytesBuf = null;
-
+        HttpChunkedOutputStream out = new HttpChunkedOutputStream(ctx, inflightBytesBudget, chunkSize,
+                BUDGET_TIMEOUT_MILLIS);
         try {
-            //apply response content buf first
-            content = byteBufPool.poll(2000, TimeUnit.MILLISECONDS);
-            if (content == null) {
-                throw new ApiException("get response content buf failure");
-            }
+            writeResult(out, gzip, result);
+            recordBytesSent(apiRequest, out.getBytesWritten());
+        } catch (Throwable e) {
+            out.abort();
+            logger.error("write http api response failed, request body: " + requestBody, e);
+            ctx.close();
+        }
+    }
 
-            //apply fastjson buf from pool
-            charsBuf = charsBufPool.poll();
-            bytesBuf = bytesPool.poll();
-            if (charsBuf == null || bytesBuf == null) {
-                throw new ApiException("get json buf failure");
-            }
-            JsonUtils.setSerializeWriterBufThreadLocal(charsBuf, bytesBuf);
+    private static boolean acceptGzip(FullHttpRequest request) {
+        String acceptEncoding = request.headers().get(HttpHeaderNames.ACCEPT_ENCODING);
+        return acceptEncoding != null && acceptEncoding.toLowerCase().contains(HttpHeaderValues.GZIP.toString());
+    }
 
-            //create http response
-            DefaultFullHttpResponse response = new DefaultFullHttpResponse(request.protocolVersion(),
-                    HttpResponseStatus.OK, content.retain());
-            response.headers().set(HttpHeaderNames.CONTENT_TYPE, "application/json; charset=utf-8");
-            writeResult(response, result);
-            return response;
-        } catch (Exception e) {
-            //response is discarded
-            if (content != null) {
-                content.release();
-                byteBufPool.offer(content);
-            }
-            throw e;
-        } finally {
-            //give back json buf to pool
-            JsonUtils.setSerializeWriterBufThreadLocal(null, null);
-            if (charsBuf != null) {
-                charsBufPool.offer(charsBuf);
-            }
-            if (bytesBuf != null) {
-                bytesPool.offer(bytesBuf);
-            }
+    /**
+     * 统计 pull_results 发送给每个 consumer 的字节数
+     */
+    private void recordBytesSent(ApiRequest apiRequest, long bytes) {
+        if (apiRequest == null || apiRequest.getAction() == null
+                || !ApiAction.PULL_RESULTS.name().equalsIgnoreCase(apiRequest.getAction().trim())
+                || StringUtils.isBlank(apiRequest.getSessionId()) || StringUtils.isBlank(apiRequest.getConsumerId())) {
+            return;
+        }
+        Session session = sessionManager.getSession(apiRequest.getSessionId());
+        if (session == null || session.getResultDistributor() == null) {
+            return;
+        }
+        ResultConsumer consumer = session.getResultDistributor().getConsumer(apiRequest.getConsumerId());
+        if (consumer != null) {
+            consumer.recordBytesSent(bytes);
         }
     }
 
-    public void onCompleted(DefaultFullHttpResponse httpResponse) {
-        ByteBuf content = httpResponse.content();
-        content.clear();
-        if (content.capacity() == jsonBufferSize) {
-            if (!byteBufPool.offer(content)) {
-                content.release();
-            }
-        } else {
-            //replace content ByteBuf
-            content.release();
-            if (byteBufPool.remainingCapacity() > 0) {
-                byteBufPool.offer(Unpooled.buffer(jsonBufferSize));
-            }
+    private DropPolicy parseDropPolicy(ApiRequest apiRequest) throws ApiException {
+        String dropPolicy = apiRequest.getDropPolicy();
+        if (StringUtils.isBlank(dropPolicy)) {
+            return DistributorOptions.dropPolicy;
+        }
+        DropPolicy policy = DropPolicy.parse(dropPolicy);
+        if (policy == null) {
+            throw new ApiException("unknown drop policy: " + dropPolicy + ", should be drop-oldest, drop-newest or coalesce");
         }
+        return policy;
     }
 
-    private void writeResult(DefaultFullHttpResponse response, Object result) throws IOException {
-        ByteBufOutputStream out = new ByteBufOutputStream(response.content());
-        try {
-            JSON.writeJSONString(out, result);
-        } catch (IOException e) {
-            logger.error("write json to response failed", e);
-            throw e;
-        }
+    /**
+     * fastjson 的 SerializeWriter 在 Writer 模式下缓冲区满了就写出，不会把整个 json 放在内存里
+     */
+    private void writeResult(OutputStream out, boolean gzip, Object result) throws IOException {
+        OutputStream target = gzip ? new GZIPOutputStream(out, GZIP_BUFFER_SIZE) : out;
+        Writer writer = new OutputStreamWriter(target, CharsetUtil.UTF_8);
+        JSON.writeJSONString(writer, result);
+        writer.close();
     }
 
     private ApiRequest parseRequest(String requestBody) throws ApiException {
@@ -267,6 +274,7 @@ public class HttpApiHandler {
 
     private ApiResponse processInitSessionRequest(ApiRequest apiRequest) throws ApiException {
         ApiResponse response = new ApiResponse();
+        DropPolicy dropPolicy = parseDropPolicy(apiRequest);
 
         //create session
         Session session = sessionManager.createSession();
@@ -275,7 +283,7 @@ public class HttpApiHandler {
             //Result Distributor
             SharingResultDistributorImpl resultDistributor = new SharingResultDistributorImpl(session);
             //create consumer
-            ResultConsumer resultConsumer = new ResultConsumerImpl();
+            ResultConsumer resultConsumer = new ResultConsumerImpl(dropPolicy);
             resultDistributor.addConsumer(resultConsumer);
             session.setResultDistributor(resultDistributor);
 
@@ -315,10 +323,10 @@ public class HttpApiHandler {
         }
     }
 
-    private ApiResponse processJoinSessionRequest(ApiRequest apiRequest, Session session) {
+    private ApiResponse processJoinSessionRequest(ApiRequest apiRequest, Session session) throws ApiException {
 
         //create consumer
-        ResultConsumer resultConsumer = new ResultConsumerImpl();
+        ResultConsumer resultConsumer = new ResultConsumerImpl(parseDropPolicy(apiRequest));
         //disable input and interrupt
         resultConsumer.appendResult(new InputStatusModel(InputStatus.DISABLED));
         session.getResultDistributor().addConsumer(resultConsumer);
@@ -337,6 +345,16 @@ public class HttpApiHandler {
         body.put("createTime", session.getCreateTime());
         body.put("lastAccessTime", session.getLastAccessTime());
 
+        //lag, drops and bytes sent of every consumer
+        SharingResultDistributor resultDistributor = session.getResultDistributor();
+        if (resultDistributor != null) {
+            List<ConsumerStats> consumers = new ArrayList<ConsumerStats>();
+            for (ResultConsumer consumer : resultDistributor.getConsumers()) {
+                consumers.add(consumer.getStats());
+            }
+            body.put("consumers", consumers);
+        }
+
         response.setState(ApiState.SUCCEEDED)
                 .setSessionId(session.getSessionId())
                 //.setConsumerId(consumerId)
@@ -0,0 +1,141 @@
+package com.taobao.arthas.core.shell.term.impl.http.api;
+
+import io.netty.buffer.ByteBuf;
+import io.netty.channel.ChannelFuture;
+import io.netty.channel.ChannelFutureListener;
+import io.netty.channel.ChannelHandlerContext;
+import io.netty.handler.codec.http.DefaultHttpContent;
+
+import java.io.IOException;
+import java.io.OutputStream;
+
+/**
+ * <pre>
+ * 把数据按固定大小切成 http chunk 写到 channel 里，每个 chunk 使用 allocator 分配的 direct buffer，
+ * 发送完成后由 netty 释放，不需要自己维护 buffer 池。
+ * 分配 chunk 前先从 InflightBytesBudget 申请额度，chunk 发送完成（或者失败）后归还。
+ * close() 只写出最后一个未满的 chunk，LastHttpContent 由调用者负责写。
+ * </pre>
+ */
+public class HttpChunkedOutputStream extends OutputStream {
+
+    private final ChannelHandlerContext ctx;
+    private final InflightBytesBudget budget;
+    private final int chunkSize;
+    private final long budgetTimeoutMillis;
+
+    private ByteBuf chunk;
+    private long bytesWritten;
+    private boolean closed;
+
+    public HttpChunkedOutputStream(ChannelHandlerContext ctx, InflightBytesBudget budget, int chunkSize,
+                    long budgetTimeoutMillis) {
+        this.ctx = ctx;
+        this.budget = budget;
+        this.chunkSize = chunkSize;
+        this.budgetTimeoutMillis = budgetTimeoutMillis;
+    }
+
+    @Override
+    public void write(int b) throws IOException {
+        ensureChunk();
+        chunk.writeByte(b);
+        bytesWritten++;
+        if (!chunk.isWritable()) {
+            writeChunk();
+        }
+    }
+
+    @Override
+    public void write(byte[] b, int off, int len) throws IOException {
+        while (len > 0) {
+            ensureChunk();
+            int n = Math.min(len, chunk.writableBytes());
+            chunk.writeBytes(b, off, n);
+            bytesWritten += n;
+            off += n;
+            len -= n;
+            if (!chunk.isWritable()) {
+                writeChunk();
+            }
+        }
+    }
+
+    /**
+     * 未满的 chunk 留到后面继续写，只把已经写出的 chunk 刷到网络
+     */
+    @Override
+    public void flush() throws IOException {
+        ctx.flush();
+    }
+
+    @Override
+    public void close() throws IOException {
+        if (closed) {
+            return;
+        }
+        writeChunk();
+        closed = true;
+    }
+
+    /**
+     * 放弃还没有写出的数据，出错时使用
+     */
+    public void abort() {
+        if (chunk != null) {
+            chunk.release();
+            chunk = null;
+            budget.release(chunkSize);
+        }
+        closed = true;
+    }
+
+    public long getBytesWritten() {
+        return bytesWritten;
+    }
+
+    private void ensureChunk() throws IOException {
+        if (closed) {
+            throw new IOException("stream is closed");
+        }
+        if (chunk != null) {
+            return;
+        }
+        if (!ctx.channel().isActive()) {
+            throw new IOException("channel is closed");
+        }
+        boolean acquired;
+        try {
+            // 等待之前先把已经写出的 chunk 刷出去，否则它们永远不会发送完成
+            ctx.flush();
+            acquired = budget.acquire(chunkSize, budgetTimeoutMillis);
+        } catch (InterruptedException e) {
+            Thread.currentThread().interrupt();
+            throw new IOException("interrupted while waiting for in-flight bytes budget");
+        }
+        if (!acquired) {
+            throw new IOException("wait for in-flight bytes budget timeout, in-flight bytes: "
+                            + budget.getInflightBytes());
+        }
+        chunk = ctx.alloc().directBuffer(chunkSize, chunkSize);
+    }
+
+    private void writeChunk() {
+        if (chunk == null) {
+            return;
+        }
+        ByteBuf content = chunk;
+        chunk = null;
+        if (!content.isReadable()) {
+            content.release();
+            budget.release(chunkSize);
+            return;
+        }
+        ctx.writeAndFlush(new DefaultHttpContent(content)).addListener(new ChannelFutureListener() {
+            @Override
+            public void operationComplete(ChannelFuture future) throws Exception {
+                budget.release(chunkSize);
+            }
+        });
+    }
+}
@@ -0,0 +1,53 @@
+package com.taobao.arthas.core.shell.term.impl.http.api;
+
+/**
+ * <pre>
+ * 限制所有 http api 响应已经写出但还没有发送完成的字节数。
+ * 客户端读得慢时，写响应的线程会在这里等待，而不是把整个响应都堆积在 netty 的发送缓冲里。
+ * 没有任何数据在途时总是允许申请，避免单个大于预算的 chunk 永远申请不到。
+ * </pre>
+ */
+public class InflightBytesBudget {
+
+    private final long maxBytes;
+    private long inflightBytes;
+
+    public InflightBytesBudget(long maxBytes) {
+        if (maxBytes <= 0) {
+            throw new IllegalArgumentException("maxBytes must be positive: " + maxBytes);
+        }
+        this.maxBytes = maxBytes;
+    }
+
+    /**
+     * @return 超时时返回 false
+     */
+    public synchronized boolean acquire(long bytes, long timeoutMillis) throws InterruptedException {
+        long deadline = System.currentTimeMillis() + timeoutMillis;
+        while (inflightBytes > 0 && inflightBytes + bytes > maxBytes) {
+            long waitingTime = deadline - System.currentTimeMillis();
+            if (waitingTime <= 0) {
+                return false;
+            }
+            this.wait(waitingTime);
+        }
+        inflightBytes += bytes;
+        return true;
+    }
+
+    public synchronized void release(long bytes) {
+        inflightBytes -= bytes;
+        if (inflightBytes < 0) {
+            inflightBytes = 0;
+        }
+        this.notifyAll();
+    }
+
+    public synchronized long getInflightBytes() {
+        return inflightBytes;
+    }
+
+    public long getMaxBytes() {
+        return maxBytes;
+    }
+}
@@ -3,6 +3,7 @@ package com.taobao.arthas.core.util;
 import java.lang.instrument.ClassFileTransformer;
 import java.lang.instrument.Instrumentation;
 import java.util.Set;
+import java.util.concurrent.atomic.AtomicLong;
 
 import com.alibaba.arthas.deps.org.slf4j.Logger;
 import com.alibaba.arthas.deps.org.slf4j.LoggerFactory;
@@ -15,6 +16,19 @@ import com.alibaba.arthas.deps.org.slf4j.LoggerFactory;
 public class InstrumentationUtils {
     private static final Logger logger = LoggerFactory.getLogger(InstrumentationUtils.class);
 
+    /**
+     * arthas 修改类字节码（增强/重置/redefine）的次数，jad 等缓存用它判断 dump 出来的字节码是否还有效
+     */
+    private static final AtomicLong classModifications = new AtomicLong();
+
+    public static void markClassesModified() {
+        classModifications.incrementAndGet();
+    }
+
+    public static long getClassModifications() {
+        return classModifications.get();
+    }
+
     public static void retransformClasses(Instrumentation inst, ClassFileTransformer transformer,
             Set<Class<?>> classes) {
         try {
@@ -0,0 +1,397 @@
+package com.taobao.arthas.core.util;
+
+import java.lang.instrument.ClassFileTransformer;
+import java.lang.instrument.IllegalClassFormatException;
+import java.lang.instrument.Instrumentation;
+import java.lang.ref.WeakReference;
+import java.security.ProtectionDomain;
+import java.util.ArrayList;
+import java.util.Collection;
+import java.util.HashSet;
+import java.util.LinkedList;
+import java.util.List;
+import java.util.Map;
+import java.util.Queue;
+import java.util.Set;
+import java.util.TreeMap;
+import java.util.WeakHashMap;
+import java.util.concurrent.ConcurrentLinkedQueue;
+import java.util.concurrent.atomic.AtomicInteger;
+
+import com.taobao.arthas.core.advisor.TransformerManager;
+import com.taobao.arthas.core.server.ArthasBootstrap;
+import com.taobao.arthas.core.util.matcher.EqualsMatcher;
+import com.taobao.arthas.core.util.matcher.Matcher;
+import com.taobao.arthas.core.util.matcher.WildcardMatcher;
+
+/**
+ * <pre>
+ * 已加载类的增量索引，避免每次 sc/sm/watch/trace 都扫描 inst.getAllLoadedClasses() 。
+ *
+ * 1. 按类名排序，精确的类名和 com.example.* 这样有固定前缀的通配符直接按前缀查找
+ * 2. 记录 父类/接口 到子类的边，查找子类时从父类开始遍历，不需要对所有类做 isAssignableFrom
+ * 3. 所有的类都是弱引用，类被卸载之后自动清理
+ *
+ * 第一次查询时扫描一次 inst.getAllLoadedClasses() 建立索引，之后通过 TransformerManager 注册的 transformer
+ * 记录新加载的类的 (ClassLoader, 类名)，查询时只解析这些类加到索引里，不再扫描所有的类。
+ *
+ * 只有下面的情况会再扫描一次所有的类：
+ * 1. 查询之间加载的类超过 MAX_PENDING 个，队列不再增长，下次查询时重新扫描
+ * 2. 没有 TransformerManager（比如没有启动 arthas server 的单元测试），每次查询都扫描
+ *
+ * lambda 之类的 VM anonymous class 不会回调 transformer，建立索引之后新生成的不会被索引到。
+ * </pre>
+ */
+public class LoadedClassIndex implements ClassFileTransformer {
+
+    /**
+     * 两次查询之间最多记录多少个新加载的类，超过之后下次查询时扫描所有的类
+     */
+    private static final int MAX_PENDING = 10000;
+
+    private static volatile LoadedClassIndex instance;
+
+    private final Instrumentation inst;
+    private final TransformerManager transformerManager;
+
+    /**
+     * 新加载的类，查询时再解析成 Class
+     */
+    private final Queue<PendingClass> pending = new ConcurrentLinkedQueue<PendingClass>();
+    private final AtomicInteger pendingCount = new AtomicInteger();
+    private volatile boolean fullScan = true;
+
+    /**
+     * 已经加到索引里的类
+     */
+    private final Map<Class<?>, ClassEntry> known = new WeakHashMap<Class<?>, ClassEntry>();
+    /**
+     * 类名 -> 类，不同 ClassLoader 加载的同名类用 next 串起来
+     */
+    private final TreeMap<String, ClassEntry> byName = new TreeMap<String, ClassEntry>();
+    /**
+     * 父类/接口 -> 直接子类
+     */
+    private final Map<Class<?>, List<ClassEntry>> subTypes = new WeakHashMap<Class<?>, List<ClassEntry>>();
+
+    /**
+     * 加载过类的 ClassLoader
+     */
+    private final Map<ClassLoader, Boolean> classLoaders = new WeakHashMap<ClassLoader, Boolean>();
+
+    private int indexedCount = 0;
+
+    LoadedClassIndex(Instrumentation inst, TransformerManager transformerManager) {
+        this.inst = inst;
+        this.transformerManager = transformerManager;
+    }
+
+    public static LoadedClassIndex getInstance(Instrumentation inst) {
+        LoadedClassIndex index = instance;
+        if (index != null && index.inst == inst) {
+            return index;
+        }
+        synchronized (LoadedClassIndex.class) {
+            index = instance;
+            if (index == null || index.inst != inst) {
+                if (index != null) {
+                    index.unregister();
+                }
+                ArthasBootstrap bootstrap = ArthasBootstrap.getInstance();
+                index = new LoadedClassIndex(inst, bootstrap == null ? null : bootstrap.getTransformerManager());
+                if (index.transformerManager != null) {
+                    index.transformerManager.addLoadTransformer(index);
+                }
+                instance = index;
+            }
+            return index;
+        }
+    }
+
+    public static void destroy() {
+        synchronized (LoadedClassIndex.class) {
+            if (instance != null) {
+                instance.unregister();
+                instance = null;
+            }
+        }
+    }
+
+    private void unregister() {
+        if (transformerManager != null) {
+            transformerManager.removeTransformer(this);
+        }
+    }
+
+    /**
+     * 在业务线程加载类的时候回调，只记录类名，不做其它的事情
+     */
+    @Override
+    public byte[] transform(ClassLoader loader, String className, Class<?> classBeingRedefined,
+            ProtectionDomain protectionDomain, byte[] classfileBuffer) throws IllegalClassFormatException {
+        if (classBeingRedefined != null || className == null || fullScan) {
+            return null;
+        }
+        if (pendingCount.incrementAndGet() > MAX_PENDING) {
+            fullScan = true;
+        } else {
+            pending.add(new PendingClass(loader, className));
+        }
+        return null;
+    }
+
+    /**
+     * 按类名搜索
+     */
+    public Set<Class<?>> search(Matcher<String> classNameMatcher, int limit) {
+        refresh();
+        Set<Class<?>> matches = new HashSet<Class<?>>();
+        synchronized (this) {
+            String exactName = null;
+            String prefix = "";
+            String suffix = "";
+            if (classNameMatcher instanceof EqualsMatcher) {
+                Object pattern = ((EqualsMatcher<?>) classNameMatcher).getPattern();
+                exactName = pattern instanceof String ? (String) pattern : null;
+            } else if (classNameMatcher instanceof WildcardMatcher) {
+                String pattern = ((WildcardMatcher) classNameMatcher).getPattern();
+                if (pattern != null) {
+                    prefix = literalPrefix(pattern);
+                    if (prefix.length() == pattern.length()) {
+                        exactName = pattern;
+                    } else {
+                        suffix = literalSuffix(pattern);
+                    }
+                }
+            }
+
+            if (exactName != null) {
+                collect(byName.get(exactName), classNameMatcher, matches, limit);
+                return matches;
+            }
+
+            Collection<Map.Entry<String, ClassEntry>> candidates = prefix.isEmpty() ? byName.entrySet()
+                    : byName.subMap(prefix, prefix + Character.MAX_VALUE).entrySet();
+            for (Map.Entry<String, ClassEntry> entry : candidates) {
+                if (matches.size() >= limit) {
+                    break;
+                }
+                // 先用固定的后缀过滤，避免通配符匹配的递归
+                if (!suffix.isEmpty() && !entry.getKey().endsWith(suffix)) {
+                    continue;
+                }
+                collect(entry.getValue(), classNameMatcher, matches, limit);
+            }
+        }
+        return matches;
+    }
+
+    /**
+     * 按类名前缀搜索
+     */
+    public Set<Class<?>> searchByPrefix(String prefix) {
+        refresh();
+        Set<Class<?>> matches = new HashSet<Class<?>>();
+        synchronized (this) {
+            for (ClassEntry entry : byName.subMap(prefix, prefix + Character.MAX_VALUE).values()) {
+                collect(entry, null, matches, Integer.MAX_VALUE);
+            }
+        }
+        return matches;
+    }
+
+    /**
+     * 搜索类本身以及所有的子类/实现类，和对所有类做 isAssignableFrom 的结果一样
+     */
+    public Set<Class<?>> searchSubClass(Set<Class<?>> classSet) {
+        refresh();
+        Set<Class<?>> matches = new HashSet<Class<?>>();
+        synchronized (this) {
+            LinkedList<Class<?>> queue = new LinkedList<Class<?>>();
+            for (Class<?> clazz : classSet) {
+                if (clazz != null && matches.add(clazz)) {
+                    queue.add(clazz);
+                }
+            }
+            while (!queue.isEmpty()) {
+                List<ClassEntry> children = subTypes.get(queue.removeFirst());
+                if (children == null) {
+                    continue;
+                }
+                for (ClassEntry child : children) {
+                    Class<?> clazz = child.get();
+                    if (clazz != null && matches.add(clazz)) {
+                        queue.add(clazz);
+                    }
+                }
+            }
+        }
+        return matches;
+    }
+
+    /**
+     * 所有加载过类的 ClassLoader，不包括 BootstrapClassLoader
+     */
+    public Set<ClassLoader> getClassLoaders() {
+        refresh();
+        synchronized (this) {
+            return new HashSet<ClassLoader>(classLoaders.keySet());
+        }
+    }
+
+    /**
+     * 把新加载的类加到索引里
+     */
+    void refresh() {
+        if (fullScan || transformerManager == null) {
+            scanAll();
+            return;
+        }
+        if (pending.isEmpty()) {
+            return;
+        }
+        // 在锁外面解析，ClassLoader.loadClass 可能会执行应用的代码
+        List<Class<?>> classes = new ArrayList<Class<?>>();
+        PendingClass pendingClass;
+        while ((pendingClass = pending.poll()) != null) {
+            pendingCount.decrementAndGet();
+            Class<?> clazz = pendingClass.resolve();
+            if (clazz != null) {
+                classes.add(clazz);
+            }
+        }
+        addAll(classes.toArray(new Class<?>[classes.size()]));
+    }
+
+    private void scanAll() {
+        // 先清空队列再扫描，扫描期间新加载的类会重新进入队列
+        fullScan = false;
+        pending.clear();
+        pendingCount.set(0);
+        addAll(inst.getAllLoadedClasses());
+    }
+
+    private synchronized void addAll(Class<?>[] classes) {
+        // 卸载的类比较多时，重建索引
+        if (indexedCount > 1024 && known.size() < indexedCount / 2) {
+            rebuild();
+        }
+        for (Class<?> clazz : classes) {
+            if (!known.containsKey(clazz)) {
+                add(clazz);
+            }
+        }
+    }
+
+    private void add(Class<?> clazz) {
+        ClassEntry entry = new ClassEntry(clazz);
+        known.put(clazz, entry);
+        indexedCount++;
+
+        ClassLoader classLoader = clazz.getClassLoader();
+        if (classLoader != null) {
+            classLoaders.put(classLoader, Boolean.TRUE);
+        }
+
+        String name = clazz.getName();
+        entry.next = byName.get(name);
+        byName.put(name, entry);
+
+        Class<?> superClass = clazz.getSuperclass();
+        if (superClass != null) {
+            addSubType(superClass, entry);
+        }
+        for (Class<?> interfaceClass : clazz.getInterfaces()) {
+            addSubType(interfaceClass, entry);
+        }
+    }
+
+    private void addSubType(Class<?> superType, ClassEntry entry) {
+        List<ClassEntry> children = subTypes.get(superType);
+        if (children == null) {
+            children = new ArrayList<ClassEntry>(2);
+            subTypes.put(superType, children);
+        }
+        children.add(entry);
+    }
+
+    private void rebuild() {
+        List<Class<?>> alive = new ArrayList<Class<?>>(known.keySet());
+        known.clear();
+        classLoaders.clear();
+        byName.clear();
+        subTypes.clear();
+        indexedCount = 0;
+        for (Class<?> clazz : alive) {
+            add(clazz);
+        }
+    }
+
+    private static void collect(ClassEntry entry, Matcher<String> matcher, Set<Class<?>> matches, int limit) {
+        for (; entry != null && matches.size() < limit; entry = entry.next) {
+            Class<?> clazz = entry.get();
+            if (clazz != null && (matcher == null || matcher.matching(clazz.getName()))) {
+                matches.add(clazz);
+            }
+        }
+    }
+
+    static String literalPrefix(String pattern) {
+        for (int i = 0; i < pattern.length(); ++i) {
+            char c = pattern.charAt(i);
+            if (c == '*' || c == '?' || c == '\\') {
+                return pattern.substring(0, i);
+            }
+        }
+        return pattern;
+    }
+
+    static String literalSuffix(String pattern) {
+        for (int i = pattern.length() - 1; i >= 0; --i) {
+            char c = pattern.charAt(i);
+            if (c == '*' || c == '?' || c == '\\') {
+                return pattern.substring(i + 1);
+            }
+        }
+        return pattern;
+    }
+
+    /**
+     * transformer 回调时类还没有定义完成，先记录 ClassLoader 和类名，查询时再解析
+     */
+    private static class PendingClass {
+        private final WeakReference<ClassLoader> loader;
+        private final String className;
+
+        PendingClass(ClassLoader loader, String className) {
+            this.loader = loader == null ? null : new WeakReference<ClassLoader>(loader);
+            this.className = className;
+        }
+
+        Class<?> resolve() {
+            ClassLoader classLoader = null;
+            if (loader != null) {
+                classLoader = loader.get();
+                if (classLoader == null) {
+                    return null;
+                }
+            }
+            try {
+                // 类已经定义完成时直接返回 findLoadedClass 的结果，不会初始化
+                Class<?> clazz = Class.forName(className.replace('/', '.'), false, classLoader);
+                return clazz.getClassLoader() == classLoader ? clazz : null;
+            } catch (Throwable e) {
+                // 定义失败的类，或者 hidden class 这样不能按名字查找的类
+                return null;
+            }
+        }
+    }
+
+    private static class ClassEntry extends WeakReference<Class<?>> {
+        ClassEntry next;
+
+        ClassEntry(Class<?> clazz) {
+            super(clazz);
+        }
+    }
+}
@@ -0,0 +1,108 @@
+package com.taobao.arthas.core.util;
+
+import java.lang.instrument.Instrumentation;
+import java.util.Collection;
+import java.util.Iterator;
+import java.util.Map;
+
+import com.taobao.arthas.core.server.ArthasBootstrap;
+
+/**
+ * <pre>
+ * 粗略估算对象占用的内存，用于给 tt 等会保存对象引用的命令做内存预算。
+ * 
+ * 只展开 String、数组、Collection、Map 这几种最常见的大对象，元素只抽样前面的一部分再按比例放大，
+ * 其它对象只计算 shallow size，这样估算的开销是常数级别的，可以在业务线程里执行。
+ * </pre>
+ */
+public class ObjectSizeEstimator {
+    private static final int SAMPLE_SIZE = 16;
+    private static final int MAX_DEPTH = 2;
+    private static final long DEFAULT_SHALLOW_SIZE = 16;
+
+    private ObjectSizeEstimator() {
+    }
+
+    public static long estimate(Object object) {
+        return estimate(object, 0);
+    }
+
+    private static long estimate(Object object, int depth) {
+        if (object == null) {
+            return 0;
+        }
+        if (object instanceof String) {
+            return 40 + 2L * ((String) object).length();
+        }
+        long size = shallowSize(object);
+        if (depth >= MAX_DEPTH) {
+            return size;
+        }
+        if (object instanceof Object[]) {
+            Object[] array = (Object[]) object;
+            size += sample(array.length, arrayIterator(array), depth);
+        } else if (object instanceof Collection) {
+            Collection<?> collection = (Collection<?>) object;
+            // 每个元素至少还有一个 node/entry 的开销
+            size += 32L * collection.size() + sample(collection.size(), collection.iterator(), depth);
+        } else if (object instanceof Map) {
+            Map<?, ?> map = (Map<?, ?>) object;
+            size += 32L * map.size() + sample(map.size(), map.keySet().iterator(), depth)
+                    + sample(map.size(), map.values().iterator(), depth);
+        }
+        return size;
+    }
+
+    private static long sample(int total, Iterator<?> iterator, int depth) {
+        if (total == 0) {
+            return 0;
+        }
+        long sampled = 0;
+        int count = 0;
+        try {
+            while (count < SAMPLE_SIZE && iterator.hasNext()) {
+                sampled += estimate(iterator.next(), depth + 1);
+                count++;
+            }
+        } catch (Throwable e) {
+            // 并发修改之类的异常，按已经抽样的计算
+        }
+        if (count == 0) {
+            return 0;
+        }
+        return sampled * total / count;
+    }
+
+    private static Iterator<Object> arrayIterator(final Object[] array) {
+        return new Iterator<Object>() {
+            int index = 0;
+
+            @Override
+            public boolean hasNext() {
+                return index < array.length;
+            }
+
+            @Override
+            public Object next() {
+                return array[index++];
+            }
+
+            @Override
+            public void remove() {
+                throw new UnsupportedOperationException();
+            }
+        };
+    }
+
+    private static long shallowSize(Object object) {
+        try {
+            Instrumentation instrumentation = ArthasBootstrap.getInstance().getInstrumentation();
+            if (instrumentation != null) {
+                return instrumentation.getObjectSize(object);
+            }
+        } catch (Throwable e) {
+            // ArthasBootstrap 还没有初始化，比如在单元测试里
+        }
+        return DEFAULT_SHALLOW_SIZE;
+    }
+}
@@ -29,16 +29,7 @@ public class SearchUtils {
         if (classNameMatcher == null) {
             return Collections.emptySet();
         }
-        final Set<Class<?>> matches = new HashSet<Class<?>>();
-        for (Class<?> clazz : inst.getAllLoadedClasses()) {
-            if (classNameMatcher.matching(clazz.getName())) {
-                matches.add(clazz);
-            }
-            if (matches.size() >= limit) {
-                break;
-            }
-        }
-        return matches;
+        return LoadedClassIndex.getInstance(inst).search(classNameMatcher, limit);
     }
 
     public static Set<Class<?>> searchClass(Instrumentation inst, Matcher<String> classNameMatcher) {
@@ -105,16 +96,7 @@ public class SearchUtils {
      * @return 匹配的子类集合
      */
     public static Set<Class<?>> searchSubClass(Instrumentation inst, Set<Class<?>> classSet) {
-        final Set<Class<?>> matches = new HashSet<Class<?>>();
-        for (Class<?> clazz : inst.getAllLoadedClasses()) {
-            for (Class<?> superClass : classSet) {
-                if (superClass.isAssignableFrom(clazz)) {
-                    matches.add(clazz);
-                    break;
-                }
-            }
-        }
-        return matches;
+        return LoadedClassIndex.getInstance(inst).searchSubClass(classSet);
     }
 
 
@@ -127,7 +109,7 @@ public class SearchUtils {
      */
     public static Set<Class<?>> searchInnerClass(Instrumentation inst, Class<?> c) {
         final Set<Class<?>> matches = new HashSet<Class<?>>();
-        for (Class<?> clazz : inst.getInitiatedClasses(c.getClassLoader())) {
+        for (Class<?> clazz : LoadedClassIndex.getInstance(inst).searchByPrefix(c.getName())) {
             if (c.getClassLoader() != null && clazz.getClassLoader() != null && c.getClassLoader().equals(clazz.getClassLoader())) {
                 if (clazz.getName().startsWith(c.getName())) {
                     matches.add(clazz);
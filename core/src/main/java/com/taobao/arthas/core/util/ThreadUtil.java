@@ -61,7 +61,7 @@ abstract public class ThreadUtil {
         return map;
     }
 
-    private static ThreadVO createThreadVO(Thread thread) {
+    public static ThreadVO createThreadVO(Thread thread) {
         ThreadGroup group = thread.getThreadGroup();
         ThreadVO threadVO = new ThreadVO();
         threadVO.setId(thread.getId());
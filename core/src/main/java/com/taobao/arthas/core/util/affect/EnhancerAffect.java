@@ -7,8 +7,11 @@ import java.io.File;
 import java.lang.instrument.ClassFileTransformer;
 import java.util.ArrayList;
 import java.util.Collection;
+import java.util.Collections;
 import java.util.List;
+import java.util.concurrent.TimeUnit;
 import java.util.concurrent.atomic.AtomicInteger;
+import java.util.concurrent.atomic.AtomicLong;
 
 import static java.lang.String.format;
 
@@ -25,14 +28,28 @@ public final class EnhancerAffect extends Affect {
     private ClassFileTransformer transformer;
     private long listenerId;
 
-    private Throwable throwable;
+    private volatile Throwable throwable;
 
     /**
-     * dumpClass的文件存放集合
+     * dumpClass的文件存放集合，retransform 可能在多个线程里并发执行
      */
-    private final Collection<File> classDumpFiles = new ArrayList<File>();
+    private final Collection<File> classDumpFiles = Collections.synchronizedList(new ArrayList<File>());
 
-    private final List<String> methods = new ArrayList<String>();
+    private final List<String> methods = Collections.synchronizedList(new ArrayList<String>());
+
+    /**
+     * 各个阶段的耗时(ns)，analyze/weave 是所有线程的累加值
+     */
+    private final AtomicLong searchCost = new AtomicLong();
+    private final AtomicLong analyzeCost = new AtomicLong();
+    private final AtomicLong weaveCost = new AtomicLong();
+    private final AtomicLong retransformCost = new AtomicLong();
+    private volatile int retransformBatches;
+    private volatile int retransformThreads;
+    /**
+     * 方法已经织入过，只注册了 listener，没有 retransform 的类
+     */
+    private final AtomicInteger attachedClasses = new AtomicInteger();
 
     public EnhancerAffect() {
     }
@@ -105,12 +122,71 @@ public final class EnhancerAffect extends Affect {
         this.listenerId = listenerId;
     }
 
+    public void addSearchCost(long nanos) {
+        searchCost.addAndGet(nanos);
+    }
+
+    public void addAnalyzeCost(long nanos) {
+        analyzeCost.addAndGet(nanos);
+    }
+
+    public void addWeaveCost(long nanos) {
+        weaveCost.addAndGet(nanos);
+    }
+
+    public void addRetransformCost(long nanos) {
+        retransformCost.addAndGet(nanos);
+    }
+
+    public long getSearchCost() {
+        return TimeUnit.NANOSECONDS.toMillis(searchCost.get());
+    }
+
+    public long getAnalyzeCost() {
+        return TimeUnit.NANOSECONDS.toMillis(analyzeCost.get());
+    }
+
+    public long getWeaveCost() {
+        return TimeUnit.NANOSECONDS.toMillis(weaveCost.get());
+    }
+
+    public long getRetransformCost() {
+        return TimeUnit.NANOSECONDS.toMillis(retransformCost.get());
+    }
+
+    public int getRetransformBatches() {
+        return retransformBatches;
+    }
+
+    public void setRetransformBatches(int retransformBatches) {
+        this.retransformBatches = retransformBatches;
+    }
+
+    public int getRetransformThreads() {
+        return retransformThreads;
+    }
+
+    public void setRetransformThreads(int retransformThreads) {
+        this.retransformThreads = retransformThreads;
+    }
+
+    public void addAttachedClass() {
+        attachedClasses.incrementAndGet();
+    }
+
+    public int getAttachedClasses() {
+        return attachedClasses.get();
+    }
+
     public Throwable getThrowable() {
         return throwable;
     }
 
     public void setThrowable(Throwable throwable) {
-        this.throwable = throwable;
+        // 并发 retransform 时保留第一个异常
+        if (this.throwable == null) {
+            this.throwable = throwable;
+        }
     }
 
     public Collection<File> getClassDumpFiles() {
@@ -18,4 +18,8 @@ public class EqualsMatcher<T> implements Matcher<T> {
     public boolean matching(T target) {
         return ArthasCheckUtils.isEquals(target, pattern);
     }
+
+    public T getPattern() {
+        return pattern;
+    }
 }
@@ -24,6 +24,10 @@ public class WildcardMatcher implements Matcher<String> {
         return match(target, pattern, 0, 0);
     }
 
+    public String getPattern() {
+        return pattern;
+    }
+
     /**
      * Internal matching recursive function.
      */
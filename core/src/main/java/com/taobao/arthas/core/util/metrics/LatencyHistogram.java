@@ -0,0 +1,205 @@
+package com.taobao.arthas.core.util.metrics;
+
+import java.util.concurrent.atomic.AtomicLong;
+import java.util.concurrent.atomic.AtomicLongArray;
+import java.util.concurrent.atomic.AtomicReferenceArray;
+
+/**
+ * <pre>
+ * 固定 bucket 的耗时直方图，单位是微秒，内存大小固定，记录时不分配对象。
+ * 
+ * 小于 16 的值每个值一个 bucket，之后每个 2 的幂区间再平均分为 16 个 bucket，所以相对误差不超过 1/16 。
+ * 超过 2^36 微秒（约19小时）的值都记在最后一个 bucket 里。
+ * 
+ * 和 StripedCounter 一样按 thread id 分段，每段有自己的 bucket 和 max，多线程同时记录时没有竞争。
+ * 分段在第一次被用到的时候才创建，只有一个线程记录时只占一段的内存。读的时候把所有分段合并起来。
+ * 
+ * 多个 Snapshot 之间可以 merge，比如合并多个周期，或者多个 jvm 的数据。
+ * </pre>
+ */
+public class LatencyHistogram {
+    private static final int SUB_BITS = 4;
+    private static final int SUB_COUNT = 1 << SUB_BITS;
+    private static final int MAX_BITS = 36;
+    private static final long MAX_VALUE = (1L << MAX_BITS) - 1;
+    /**
+     * 每段大约 4KB，段数比 StripedCounter 少一些
+     */
+    private static final int MAX_STRIPES = 16;
+
+    static final int BUCKET_COUNT = SUB_COUNT + (MAX_BITS - SUB_BITS) * SUB_COUNT;
+
+    private final AtomicReferenceArray<Stripe> stripes;
+    private final int mask;
+
+    public LatencyHistogram() {
+        this(Runtime.getRuntime().availableProcessors());
+    }
+
+    public LatencyHistogram(int stripes) {
+        int size = 1;
+        while (size < stripes && size < MAX_STRIPES) {
+            size <<= 1;
+        }
+        this.mask = size - 1;
+        this.stripes = new AtomicReferenceArray<Stripe>(size);
+    }
+
+    /**
+     * @param micros 耗时，单位是微秒，小于0的会当作0
+     */
+    public void record(long micros) {
+        record(micros, 1);
+    }
+
+    /**
+     * 记录 count 次相同的耗时
+     *
+     * @param micros 耗时，单位是微秒，小于0的会当作0
+     */
+    public void record(long micros, long count) {
+        if (count <= 0) {
+            return;
+        }
+        if (micros < 0) {
+            micros = 0;
+        }
+        Stripe stripe = stripe(StripedCounter.threadHash() & mask);
+        stripe.buckets.addAndGet(bucketIndex(micros), count);
+        AtomicLong max = stripe.max;
+        long currentMax = max.get();
+        while (micros > currentMax) {
+            if (max.compareAndSet(currentMax, micros)) {
+                break;
+            }
+            currentMax = max.get();
+        }
+    }
+
+    /**
+     * 取出当前的数据，并且清零
+     */
+    public Snapshot snapshotAndReset() {
+        return snapshot(true);
+    }
+
+    public Snapshot snapshot() {
+        return snapshot(false);
+    }
+
+    /**
+     * 合并所有分段，和并发的 record 之间不是原子的，只保证每次 record 只会被统计一次
+     */
+    private Snapshot snapshot(boolean reset) {
+        long[] counts = new long[BUCKET_COUNT];
+        long count = 0;
+        long max = 0;
+        for (int s = 0; s < stripes.length(); ++s) {
+            Stripe stripe = stripes.get(s);
+            if (stripe == null) {
+                continue;
+            }
+            for (int i = 0; i < BUCKET_COUNT; ++i) {
+                long value = reset ? stripe.buckets.getAndSet(i, 0) : stripe.buckets.get(i);
+                counts[i] += value;
+                count += value;
+            }
+            max = Math.max(max, reset ? stripe.max.getAndSet(0) : stripe.max.get());
+        }
+        return new Snapshot(counts, count, max);
+    }
+
+    private Stripe stripe(int index) {
+        Stripe stripe = stripes.get(index);
+        if (stripe == null) {
+            stripes.compareAndSet(index, null, new Stripe());
+            stripe = stripes.get(index);
+        }
+        return stripe;
+    }
+
+    static int bucketIndex(long value) {
+        if (value > MAX_VALUE) {
+            value = MAX_VALUE;
+        }
+        if (value < SUB_COUNT) {
+            return (int) value;
+        }
+        int msb = 63 - Long.numberOfLeadingZeros(value);
+        int shift = msb - SUB_BITS;
+        int sub = (int) (value >>> shift) - SUB_COUNT;
+        return SUB_COUNT + shift * SUB_COUNT + sub;
+    }
+
+    /**
+     * bucket 能表示的最大值
+     */
+    static long bucketUpperBound(int index) {
+        if (index < SUB_COUNT) {
+            return index;
+        }
+        int shift = (index - SUB_COUNT) / SUB_COUNT;
+        int sub = (index - SUB_COUNT) % SUB_COUNT;
+        return ((long) (SUB_COUNT + sub + 1) << shift) - 1;
+    }
+
+    private static class Stripe {
+        private final AtomicLongArray buckets = new AtomicLongArray(BUCKET_COUNT);
+        private final AtomicLong max = new AtomicLong();
+    }
+
+    public static class Snapshot {
+        private final long[] counts;
+        private long count;
+        private long max;
+
+        public Snapshot() {
+            this(new long[BUCKET_COUNT], 0, 0);
+        }
+
+        Snapshot(long[] counts, long count, long max) {
+            this.counts = counts;
+            this.count = count;
+            this.max = max;
+        }
+
+        public long getCount() {
+            return count;
+        }
+
+        public long getMax() {
+            return max;
+        }
+
+        /**
+         * @param percentile 0 到 100 之间，比如 99 表示 p99
+         * @return 对应的耗时，单位是微秒，没有数据时返回 0
+         */
+        public long percentile(double percentile) {
+            if (count == 0) {
+                return 0;
+            }
+            long rank = (long) Math.ceil(count * percentile / 100.0);
+            if (rank < 1) {
+                rank = 1;
+            }
+            long seen = 0;
+            for (int i = 0; i < counts.length; ++i) {
+                seen += counts[i];
+                if (seen >= rank) {
+                    return Math.min(bucketUpperBound(i), max);
+                }
+            }
+            return max;
+        }
+
+        public Snapshot merge(Snapshot other) {
+            for (int i = 0; i < counts.length; ++i) {
+                counts[i] += other.counts[i];
+            }
+            count += other.count;
+            max = Math.max(max, other.max);
+            return this;
+        }
+    }
+}
@@ -0,0 +1,77 @@
+package com.taobao.arthas.core.util.metrics;
+
+import java.util.concurrent.atomic.AtomicLongArray;
+
+/**
+ * <pre>
+ * 分段累加的计数器，思路和 jdk8 的 LongAdder 一样，不过为了兼容 jdk6 用 AtomicLongArray 实现。
+ * 每个线程按 thread id 落到不同的 cell 上，cell 之间用 padding 隔开，避免 false sharing。
+ * 多线程同时累加时几乎没有竞争，读的时候把所有 cell 加起来。
+ * </pre>
+ */
+public class StripedCounter {
+    /**
+     * 8 个 long 是 64 字节，一个 cache line
+     */
+    private static final int PADDING = 8;
+    private static final int MAX_STRIPES = 64;
+
+    private final AtomicLongArray cells;
+    private final int mask;
+
+    public StripedCounter() {
+        this(Runtime.getRuntime().availableProcessors());
+    }
+
+    public StripedCounter(int stripes) {
+        int size = 1;
+        while (size < stripes && size < MAX_STRIPES) {
+            size <<= 1;
+        }
+        this.mask = size - 1;
+        this.cells = new AtomicLongArray(size * PADDING);
+    }
+
+    public void increment() {
+        add(1);
+    }
+
+    public void add(long value) {
+        cells.getAndAdd(cellIndex(), value);
+    }
+
+    public long sum() {
+        long sum = 0;
+        for (int i = 0; i < cells.length(); i += PADDING) {
+            sum += cells.get(i);
+        }
+        return sum;
+    }
+
+    /**
+     * 读取并清零，和并发的 add 之间不是原子的，只保证每次 add 只会被统计一次
+     */
+    public long sumThenReset() {
+        long sum = 0;
+        for (int i = 0; i < cells.length(); i += PADDING) {
+            sum += cells.getAndSet(i, 0);
+        }
+        return sum;
+    }
+
+    private int cellIndex() {
+        return (threadHash() & mask) * PADDING;
+    }
+
+    /**
+     * 当前线程的 hash，决定落到哪个分段上，LatencyHistogram 也用它
+     */
+    static int threadHash() {
+        long id = Thread.currentThread().getId();
+        int h = (int) (id ^ (id >>> 32));
+        h ^= (h >>> 16);
+        h *= 0x45d9f3b;
+        h ^= (h >>> 16);
+        return h;
+    }
+}
@@ -0,0 +1,328 @@
+package com.taobao.arthas.core.util.scheduler;
+
+import java.util.ArrayDeque;
+import java.util.ArrayList;
+import java.util.Iterator;
+import java.util.LinkedHashMap;
+import java.util.List;
+import java.util.Map;
+import java.util.concurrent.RejectedExecutionException;
+import java.util.concurrent.TimeUnit;
+import java.util.concurrent.locks.Condition;
+import java.util.concurrent.locks.ReentrantLock;
+
+import com.alibaba.arthas.deps.org.slf4j.Logger;
+import com.alibaba.arthas.deps.org.slf4j.LoggerFactory;
+import com.taobao.arthas.core.command.model.SchedulerLaneVO;
+import com.taobao.arthas.core.util.metrics.LatencyHistogram;
+
+import io.netty.util.HashedWheelTimer;
+import io.netty.util.Timeout;
+import io.netty.util.concurrent.DefaultThreadFactory;
+
+/**
+ * <pre>
+ * 命令执行的调度器：固定数量的工作线程 + 按优先级分开的队列 + 一个共享的时间轮。
+ *
+ * 1. 每个优先级（TaskPriority）一个队列，队列里再按 session 分开，session 之间轮流取任务，
+ *    一个 session 提交了很多任务时不会让其它 session 一直等待。
+ * 2. 工作线程按 PICK_ORDER 的权重轮流服务各个优先级，优先服务交互命令，低优先级也不会饿死。
+ * 3. 定时任务都挂在同一个 HashedWheelTimer 上，到期后再提交到队列里，不再每个命令创建一个 Timer 线程。
+ * 4. 每个队列统计 排队深度/提交/完成/拒绝 次数和 排队/执行 耗时分布。
+ * </pre>
+ */
+public class CommandScheduler {
+    private static final Logger logger = LoggerFactory.getLogger(CommandScheduler.class);
+
+    private static final String DEFAULT_SESSION = "";
+
+    /**
+     * 工作线程取任务时各个优先级的权重，当前优先级的队列为空时再按优先级顺序查找
+     */
+    private static final TaskPriority[] PICK_ORDER = { TaskPriority.INTERACTIVE, TaskPriority.INTERACTIVE,
+                    TaskPriority.INTERACTIVE, TaskPriority.INTERACTIVE, TaskPriority.PERIODIC, TaskPriority.PERIODIC,
+                    TaskPriority.BACKGROUND };
+
+    private final ReentrantLock lock = new ReentrantLock();
+    private final Condition notEmpty = lock.newCondition();
+    private final Lane[] lanes;
+    private final int queueCapacity;
+    private int pickIndex;
+    private int queued;
+    private volatile boolean shutdown;
+
+    private final List<Thread> workers = new ArrayList<Thread>();
+    private final HashedWheelTimer timer;
+
+    public CommandScheduler(int threads, int queueCapacity) {
+        if (threads <= 0) {
+            throw new IllegalArgumentException("threads must be positive: " + threads);
+        }
+        this.queueCapacity = queueCapacity;
+        TaskPriority[] priorities = TaskPriority.values();
+        lanes = new Lane[priorities.length];
+        for (TaskPriority priority : priorities) {
+            lanes[priority.ordinal()] = new Lane(priority);
+        }
+
+        timer = new HashedWheelTimer(new DefaultThreadFactory("arthas-timer-wheel", true), 10,
+                        TimeUnit.MILLISECONDS, 512);
+        for (int i = 0; i < threads; ++i) {
+            Thread worker = new Thread(new Worker(), "arthas-command-execute-" + i);
+            worker.setDaemon(true);
+            workers.add(worker);
+            worker.start();
+        }
+    }
+
+    public void execute(Runnable task) {
+        execute(null, TaskPriority.INTERACTIVE, task);
+    }
+
+    /**
+     * @throws RejectedExecutionException 队列满了或者已经关闭
+     */
+    public void execute(String sessionId, TaskPriority priority, Runnable task) {
+        if (!submit(sessionId, priority, task)) {
+            throw new RejectedExecutionException(
+                            "command scheduler rejected task, priority: " + priority + ", session: " + sessionId);
+        }
+    }
+
+    public ScheduledTask schedule(String sessionId, TaskPriority priority, Runnable task, long delay,
+                    TimeUnit unit) {
+        ScheduledTask scheduledTask = new ScheduledTask(this, sessionId, priority, task, 0);
+        scheduledTask.start(unit.toNanos(delay));
+        return scheduledTask;
+    }
+
+    public ScheduledTask scheduleAtFixedRate(String sessionId, TaskPriority priority, Runnable task,
+                    long initialDelay, long period, TimeUnit unit) {
+        if (period <= 0) {
+            throw new IllegalArgumentException("period must be positive: " + period);
+        }
+        ScheduledTask scheduledTask = new ScheduledTask(this, sessionId, priority, task, unit.toNanos(period));
+        scheduledTask.start(unit.toNanos(initialDelay));
+        return scheduledTask;
+    }
+
+    public ScheduledTask scheduleWithFixedDelay(String sessionId, TaskPriority priority, Runnable task,
+                    long initialDelay, long delay, TimeUnit unit) {
+        if (delay <= 0) {
+            throw new IllegalArgumentException("delay must be positive: " + delay);
+        }
+        ScheduledTask scheduledTask = new ScheduledTask(this, sessionId, priority, task, -unit.toNanos(delay));
+        scheduledTask.start(unit.toNanos(initialDelay));
+        return scheduledTask;
+    }
+
+    Timeout newTimeout(ScheduledTask task, long delayNanos) {
+        if (shutdown) {
+            return null;
+        }
+        try {
+            return timer.newTimeout(task, delayNanos, TimeUnit.NANOSECONDS);
+        } catch (IllegalStateException e) {
+            // timer 已经停止
+            return null;
+        }
+    }
+
+    /**
+     * @return 队列满了或者已经关闭时返回 false
+     */
+    boolean submit(String sessionId, TaskPriority priority, Runnable runnable) {
+        Lane lane = lanes[priority.ordinal()];
+        lock.lock();
+        try {
+            if (shutdown || lane.size >= queueCapacity) {
+                lane.rejected++;
+                return false;
+            }
+            lane.offer(sessionId == null ? DEFAULT_SESSION : sessionId, new Task(runnable));
+            queued++;
+            notEmpty.signal();
+            return true;
+        } finally {
+            lock.unlock();
+        }
+    }
+
+    private Task take() throws InterruptedException {
+        lock.lock();
+        try {
+            while (queued == 0) {
+                if (shutdown) {
+                    return null;
+                }
+                notEmpty.await();
+            }
+            TaskPriority preferred = PICK_ORDER[pickIndex];
+            pickIndex = (pickIndex + 1) % PICK_ORDER.length;
+            Lane lane = lanes[preferred.ordinal()];
+            if (lane.size == 0) {
+                for (Lane candidate : lanes) {
+                    if (candidate.size > 0) {
+                        lane = candidate;
+                        break;
+                    }
+                }
+            }
+            queued--;
+            return lane.poll();
+        } finally {
+            lock.unlock();
+        }
+    }
+
+    public List<SchedulerLaneVO> getLaneStats() {
+        List<SchedulerLaneVO> stats = new ArrayList<SchedulerLaneVO>(lanes.length);
+        for (Lane lane : lanes) {
+            SchedulerLaneVO vo = new SchedulerLaneVO();
+            vo.setPriority(lane.priority.name());
+            lock.lock();
+            try {
+                vo.setQueueDepth(lane.size);
+                vo.setSessions(lane.queues.size());
+                vo.setSubmitted(lane.submitted);
+                vo.setRejected(lane.rejected);
+            } finally {
+                lock.unlock();
+            }
+            LatencyHistogram.Snapshot wait = lane.waitLatency.snapshot();
+            LatencyHistogram.Snapshot run = lane.runLatency.snapshot();
+            vo.setCompleted(run.getCount());
+            vo.setWaitP50(wait.percentile(50));
+            vo.setWaitP99(wait.percentile(99));
+            vo.setWaitMax(wait.getMax());
+            vo.setRunP99(run.percentile(99));
+            vo.setRunMax(run.getMax());
+            stats.add(vo);
+        }
+        return stats;
+    }
+
+    public int getThreads() {
+        return workers.size();
+    }
+
+    public boolean isShutdown() {
+        return shutdown;
+    }
+
+    /**
+     * 停止时间轮和工作线程，队列里还没有执行的任务直接丢弃
+     */
+    public void shutdown() {
+        lock.lock();
+        try {
+            shutdown = true;
+            for (Lane lane : lanes) {
+                lane.queues.clear();
+                lane.size = 0;
+            }
+            queued = 0;
+            notEmpty.signalAll();
+        } finally {
+            lock.unlock();
+        }
+        timer.stop();
+        for (Thread worker : workers) {
+            worker.interrupt();
+        }
+    }
+
+    private class Worker implements Runnable {
+        @Override
+        public void run() {
+            while (!shutdown) {
+                Task task;
+                try {
+                    task = take();
+                } catch (InterruptedException e) {
+                    if (shutdown) {
+                        return;
+                    }
+                    continue;
+                }
+                if (task == null) {
+                    return;
+                }
+                task.run();
+            }
+        }
+    }
+
+    private static class Task {
+        private final Runnable runnable;
+        private final long enqueueNanos = System.nanoTime();
+        private Lane lane;
+
+        Task(Runnable runnable) {
+            this.runnable = runnable;
+        }
+
+        void run() {
+            long startNanos = System.nanoTime();
+            lane.waitLatency.record(TimeUnit.NANOSECONDS.toMicros(startNanos - enqueueNanos));
+            try {
+                runnable.run();
+            } catch (Throwable e) {
+                logger.error("command scheduler task error", e);
+            } finally {
+                lane.runLatency.record(TimeUnit.NANOSECONDS.toMicros(System.nanoTime() - startNanos));
+                // 任务里可能设置了中断状态，不能影响下一个任务
+                Thread.interrupted();
+            }
+        }
+    }
+
+    /**
+     * 一个优先级的队列，按 session 分开，session 之间轮流出队。所有字段都由 lock 保护。
+     */
+    private static class Lane {
+        private final TaskPriority priority;
+        private final LinkedHashMap<String, ArrayDeque<Task>> queues = new LinkedHashMap<String, ArrayDeque<Task>>();
+        private int size;
+        private long submitted;
+        private long rejected;
+        private final LatencyHistogram waitLatency = new LatencyHistogram();
+        private final LatencyHistogram runLatency = new LatencyHistogram();
+
+        Lane(TaskPriority priority) {
+            this.priority = priority;
+        }
+
+        void offer(String sessionId, Task task) {
+            ArrayDeque<Task> queue = queues.get(sessionId);
+            if (queue == null) {
+                queue = new ArrayDeque<Task>();
+                queues.put(sessionId, queue);
+            }
+            task.lane = this;
+            queue.offer(task);
+            size++;
+            submitted++;
+        }
+
+        /**
+         * 从排在最前面的 session 取一个任务，这个 session 还有任务时排到最后
+         */
+        Task poll() {
+            Iterator<Map.Entry<String, ArrayDeque<Task>>> iterator = queues.entrySet().iterator();
+            if (!iterator.hasNext()) {
+                return null;
+            }
+            Map.Entry<String, ArrayDeque<Task>> entry = iterator.next();
+            String sessionId = entry.getKey();
+            ArrayDeque<Task> queue = entry.getValue();
+            Task task = queue.poll();
+            iterator.remove();
+            if (!queue.isEmpty()) {
+                queues.put(sessionId, queue);
+            }
+            size--;
+            return task;
+        }
+    }
+}
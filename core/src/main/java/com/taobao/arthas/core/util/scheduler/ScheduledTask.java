@@ -0,0 +1,139 @@
+package com.taobao.arthas.core.util.scheduler;
+
+import java.util.concurrent.TimeUnit;
+import java.util.concurrent.atomic.AtomicBoolean;
+
+import com.alibaba.arthas.deps.org.slf4j.Logger;
+import com.alibaba.arthas.deps.org.slf4j.LoggerFactory;
+
+import io.netty.util.Timeout;
+import io.netty.util.TimerTask;
+
+/**
+ * <pre>
+ * 挂在时间轮上的定时任务，到期后提交到 CommandScheduler 的队列里执行，时间轮线程本身不执行任务。
+ *
+ * 固定频率的任务如果上一次还在排队或者执行中，这一次直接跳过，不会在队列里堆积。
+ * 固定延迟的任务在执行结束之后才会开始下一次计时。
+ * 队列满了提交失败时，固定延迟的任务重新开始计时，只执行一次的任务稍后重试，不会因为一次拒绝就丢失。
+ * </pre>
+ */
+public class ScheduledTask implements TimerTask {
+    private static final Logger logger = LoggerFactory.getLogger(ScheduledTask.class);
+
+    /**
+     * 只执行一次的任务被拒绝后的重试间隔
+     */
+    private static final long REJECTED_RETRY_NANOS = TimeUnit.MILLISECONDS.toNanos(100);
+
+    private final CommandScheduler scheduler;
+    private final String sessionId;
+    private final TaskPriority priority;
+    private final Runnable runnable;
+    /**
+     * 0: 只执行一次，大于 0: 固定频率，小于 0: 固定延迟
+     */
+    private final long periodNanos;
+    private long nextFireNanos;
+
+    private final AtomicBoolean pending = new AtomicBoolean();
+    private volatile Timeout timeout;
+    private volatile boolean cancelled;
+    private volatile long skipped;
+
+    ScheduledTask(CommandScheduler scheduler, String sessionId, TaskPriority priority, Runnable runnable,
+                    long periodNanos) {
+        this.scheduler = scheduler;
+        this.sessionId = sessionId;
+        this.priority = priority;
+        this.runnable = runnable;
+        this.periodNanos = periodNanos;
+    }
+
+    void start(long delayNanos) {
+        nextFireNanos = System.nanoTime() + delayNanos;
+        timeout = scheduler.newTimeout(this, delayNanos);
+    }
+
+    @Override
+    public void run(Timeout timeout) {
+        if (cancelled) {
+            return;
+        }
+        if (periodNanos > 0) {
+            // 按计划时间计算下一次，不受执行耗时影响
+            nextFireNanos += periodNanos;
+            this.timeout = scheduler.newTimeout(this, Math.max(0, nextFireNanos - System.nanoTime()));
+        }
+        if (!pending.compareAndSet(false, true)) {
+            skipped++;
+            return;
+        }
+        if (!scheduler.submit(sessionId, priority, new Runnable() {
+            @Override
+            public void run() {
+                runOnce();
+            }
+        })) {
+            pending.set(false);
+            rejected();
+        }
+    }
+
+    /**
+     * 固定频率的任务在 run 里已经安排了下一次，这里只需要处理固定延迟和只执行一次的任务
+     */
+    private void rejected() {
+        if (cancelled || scheduler.isShutdown()) {
+            return;
+        }
+        logger.warn("scheduled task rejected because the queue is full, priority: {}, session: {}", priority,
+                        sessionId);
+        if (periodNanos < 0) {
+            this.timeout = scheduler.newTimeout(this, -periodNanos);
+        } else if (periodNanos == 0) {
+            this.timeout = scheduler.newTimeout(this, REJECTED_RETRY_NANOS);
+        }
+    }
+
+    private void runOnce() {
+        try {
+            if (!cancelled) {
+                runnable.run();
+            }
+        } catch (Throwable e) {
+            logger.error("scheduled task error", e);
+        } finally {
+            pending.set(false);
+            if (periodNanos < 0 && !cancelled) {
+                this.timeout = scheduler.newTimeout(this, -periodNanos);
+            }
+        }
+    }
+
+    /**
+     * 取消之后不会再执行，已经在执行中的这一次不受影响
+     */
+    public void cancel() {
+        cancelled = true;
+        Timeout current = timeout;
+        if (current != null) {
+            current.cancel();
+        }
+    }
+
+    public boolean isCancelled() {
+        return cancelled;
+    }
+
+    /**
+     * @return 因为上一次还没有执行完而跳过的次数
+     */
+    public long getSkipped() {
+        return skipped;
+    }
+
+    public long getPeriod(TimeUnit unit) {
+        return unit.convert(Math.abs(periodNanos), TimeUnit.NANOSECONDS);
+    }
+}
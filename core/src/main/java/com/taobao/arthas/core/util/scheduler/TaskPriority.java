@@ -0,0 +1,19 @@
+package com.taobao.arthas.core.util.scheduler;
+
+/**
+ * CommandScheduler 的优先级队列
+ */
+public enum TaskPriority {
+    /**
+     * 用户输入的命令，需要尽快响应
+     */
+    INTERACTIVE,
+    /**
+     * 定时输出，比如 dashboard/monitor 的周期渲染
+     */
+    PERIODIC,
+    /**
+     * 后台任务，比如清理，超时检查，后台执行的 job
+     */
+    BACKGROUND
+}
@@ -4,8 +4,10 @@ import com.alibaba.fastjson.JSON;
 import com.alibaba.fastjson.serializer.SerializerFeature;
 import com.taobao.arthas.core.GlobalOptions;
 
+import java.io.IOException;
 import java.io.PrintWriter;
 import java.io.StringWriter;
+import java.lang.reflect.Array;
 import java.lang.reflect.Field;
 import java.text.SimpleDateFormat;
 import java.util.*;
@@ -15,6 +17,14 @@ import static java.lang.String.format;
 /**
  * 对象控件<br/>
  * 能展示出一个对象的内部结构
+ * <pre>
+ * 渲染有三个预算，都在展开下一层之前检查：
+ * 1. maxObjectLength：输出的字符数
+ * 2. maxNodes：渲染的节点数，超过后不再展开
+ * 3. maxElements：每个集合/Map/数组最多展示的元素个数，其余的显示为 ...(N more)
+ * 当前路径上已经展开的对象按 identity 记录，再次遇到时只输出 cyclic reference。
+ * 结果直接写到 Appendable 里，不需要先拼成一个完整的字符串。
+ * </pre>
  * Created by vlinux on 15/5/20.
  */
 public class ObjectView implements View {
@@ -24,15 +34,23 @@ public class ObjectView implements View {
     private final Object object;
     private final int deep;
     private final int maxObjectLength;
+    private final int maxNodes;
+    private final int maxElements;
 
     public ObjectView(Object object, int deep) {
         this(object, deep, MAX_OBJECT_LENGTH);
     }
 
     public ObjectView(Object object, int deep, int maxObjectLength) {
+        this(object, deep, maxObjectLength, GlobalOptions.renderMaxNodes, GlobalOptions.renderMaxElements);
+    }
+
+    public ObjectView(Object object, int deep, int maxObjectLength, int maxNodes, int maxElements) {
         this.object = object;
         this.deep = deep > 4 ? 4 : deep;
         this.maxObjectLength = maxObjectLength;
+        this.maxNodes = maxNodes;
+        this.maxElements = maxElements;
     }
 
     @Override
@@ -42,18 +60,74 @@ public class ObjectView implements View {
             if (GlobalOptions.isUsingJson) {
                 return JSON.toJSONString(object, SerializerFeature.IgnoreErrorGetter);
             }
-            renderObject(object, 0, deep, buf);
+            render(buf);
             return buf.toString();
         } catch (ObjectTooLargeException e) {
-            buf.append(" Object size exceeds size limit: ")
-                    .append(maxObjectLength)
-                    .append(", try to specify -M size_limit in your command, check the help command for more.");
+            buf.append(e.getMessage());
             return buf.toString();
         } catch (Throwable t) {
             return "ERROR DATA!!! exception message: " + t.getMessage();
         }
     }
 
+    /**
+     * 把结果直接写到 out 里。超过预算或者出错时，已经写出的部分会保留，后面追加提示信息。
+     */
+    public void draw(Appendable out) throws IOException {
+        try {
+            if (GlobalOptions.isUsingJson) {
+                out.append(JSON.toJSONString(object, SerializerFeature.IgnoreErrorGetter));
+                return;
+            }
+            render(out);
+        } catch (ObjectTooLargeException e) {
+            out.append(e.getMessage());
+        } catch (IOException e) {
+            throw e;
+        } catch (Throwable t) {
+            out.append("ERROR DATA!!! exception message: ").append(t.getMessage());
+        }
+    }
+
+    private void render(Appendable out) throws ObjectTooLargeException, IOException {
+        RenderContext ctx = new RenderContext(out);
+        try {
+            renderObject(object, 0, deep, ctx);
+        } catch (ObjectTooLargeException e) {
+            // 集合/Map/数组里超过节点数时异常直接抛到这里，和超过大小时一样在截断处输出 ...
+            if (ctx.nodes > maxNodes && !ctx.truncated) {
+                ctx.appendUnchecked("...");
+            }
+            throw e;
+        }
+        if (ctx.nodes > maxNodes) {
+            // 普通对象的 field 超过节点数时已经输出了 ... 并正常结束，这里补上提示信息
+            ctx.appendUnchecked("\n...");
+            throw new ObjectTooLargeException(nodesExceededMessage());
+        }
+    }
+
+    /**
+     * <pre>
+     * 在应用线程里对 obj 做拷贝：集合/Map/数组复制最多 render-max-elements 个元素，普通对象复制各个 field 的值，
+     * 会展开的 expand 层都会拷贝，总共最多拷贝 render-max-nodes 个对象，超过之后剩下的仍然是引用。
+     * 返回的对象交给 ObjectView 渲染时和原对象的输出一样，只是展开的内容固定在拷贝的时刻，
+     * 没有展开的最后一层（toString、size）在渲染时才读取。expand 小于 1 时不展开，直接返回原对象。
+     * </pre>
+     */
+    public static Object snapshot(Object obj, int expand) {
+        if (obj == null || expand < 1 || obj instanceof Snapshot) {
+            return obj;
+        }
+        try {
+            return new Snapshotter(expand, GlobalOptions.renderMaxElements, GlobalOptions.renderMaxNodes)
+                    .snapshot(obj, 0);
+        } catch (Throwable e) {
+            // 拷贝失败时（比如并发修改）退回到渲染原对象
+            return obj;
+        }
+    }
+
     private final static String TAB = "    ";
 
     private final static Map<Byte, String> ASCII_MAP = new HashMap<Byte, String>();
@@ -94,10 +168,18 @@ public class ObjectView implements View {
         ASCII_MAP.put((byte) 127, "DEL");
     }
 
-    private void renderObject(Object obj, int deep, int expand, final StringBuilder buf) throws ObjectTooLargeException {
+    private void renderObject(Object obj, int deep, int expand, RenderContext ctx)
+            throws ObjectTooLargeException, IOException {
+
+        // 先检查节点数，超过之后不再往下展开
+        if (++ctx.nodes > maxNodes) {
+            throw new ObjectTooLargeException(nodesExceededMessage());
+        }
 
         if (null == obj) {
-            appendStringBuilder(buf,"null");
+            ctx.append("null");
+        } else if (obj instanceof Snapshot) {
+            renderSnapshot((Snapshot) obj, deep, expand, ctx);
         } else {
 
             final Class<?> clazz = obj.getClass();
@@ -112,7 +194,7 @@ public class ObjectView implements View {
                 || Short.class.isInstance(obj)
                 || Byte.class.isInstance(obj)
                 || Boolean.class.isInstance(obj)) {
-                appendStringBuilder(buf, format("@%s[%s]", className, obj));
+                ctx.append(format("@%s[%s]", className, obj));
             }
 
             // Char要特殊处理,因为有不可见字符的因素
@@ -123,39 +205,41 @@ public class ObjectView implements View {
                 // ASCII的可见字符
                 if (c >= 32
                     && c <= 126) {
-                    appendStringBuilder(buf, format("@%s[%s]", className, c));
+                    ctx.append(format("@%s[%s]", className, c));
                 }
 
                 // ASCII的控制字符
                 else if (ASCII_MAP.containsKey((byte) c.charValue())) {
-                    appendStringBuilder(buf, format("@%s[%s]", className, ASCII_MAP.get((byte) c.charValue())));
+                    ctx.append(format("@%s[%s]", className, ASCII_MAP.get((byte) c.charValue())));
                 }
 
                 // 超过ASCII的编码范围
                 else {
-                    appendStringBuilder(buf, format("@%s[%s]", className, c));
+                    ctx.append(format("@%s[%s]", className, c));
                 }
 
             }
 
             // 字符串类型单独处理
             else if (String.class.isInstance(obj)) {
-                appendStringBuilder(buf, "@");
-                appendStringBuilder(buf, className);
-                appendStringBuilder(buf, "[");
-                for (Character c : ((String) obj).toCharArray()) {
+                ctx.append("@");
+                ctx.append(className);
+                ctx.append("[");
+                final String str = (String) obj;
+                for (int i = 0; i < str.length(); i++) {
+                    final char c = str.charAt(i);
                     switch (c) {
                         case '\n':
-                            appendStringBuilder(buf, "\\n");
+                            ctx.append("\\n");
                             break;
                         case '\r':
-                            appendStringBuilder(buf, "\\r");
+                            ctx.append("\\r");
                             break;
                         default:
-                            appendStringBuilder(buf, c.toString());
+                            ctx.append(c);
                     }//switch
                 }//for
-                appendStringBuilder(buf, "]");
+                ctx.append("]");
             }
 
             // 集合类输出
@@ -167,28 +251,31 @@ public class ObjectView implements View {
                 if (!isExpand(deep, expand)
                     || collection.isEmpty()) {
 
-                    appendStringBuilder(buf, format("@%s[isEmpty=%s;size=%d]",
+                    ctx.append(format("@%s[isEmpty=%s;size=%d]",
                                       className,
                                       collection.isEmpty(),
                                       collection.size()));
                 }
 
                 // 展开展示
-                else {
-                    appendStringBuilder(buf, format("@%s[", className));
-                    for (Object e : collection) {
-                        appendStringBuilder(buf, "\n");
-                        for (int i = 0; i < deep+1; i++) {
-                            appendStringBuilder(buf, TAB);
+                else if (ctx.enter(obj)) {
+                    try {
+                        ctx.append(format("@%s[", className));
+                        int count = 0;
+                        for (Object e : collection) {
+                            if (count >= maxElements) {
+                                break;
+                            }
+                            renderElement(e, deep, expand, ctx);
+                            count++;
                         }
-                        renderObject(e, deep + 1, expand, buf);
-                        appendStringBuilder(buf, ",");
-                    }
-                    appendStringBuilder(buf, "\n");
-                    for (int i = 0; i < deep; i++) {
-                        appendStringBuilder(buf, TAB);
+                        renderMore(collection.size() - count, deep, ctx);
+                        renderEnd(deep, ctx);
+                    } finally {
+                        ctx.exit(obj);
                     }
-                    appendStringBuilder(buf, "]");
+                } else {
+                    renderCyclic(className, ctx);
                 }
 
             }
@@ -202,349 +289,63 @@ public class ObjectView implements View {
                 if (!isExpand(deep, expand)
                     || map.isEmpty()) {
 
-                    appendStringBuilder(buf, format("@%s[isEmpty=%s;size=%d]",
+                    ctx.append(format("@%s[isEmpty=%s;size=%d]",
                                       className,
                                       map.isEmpty(),
                                       map.size()));
 
-                } else {
-                    appendStringBuilder(buf, format("@%s[", className));
-                    for (Map.Entry<Object, Object> entry : map.entrySet()) {
-                        appendStringBuilder(buf, "\n");
-                        for (int i = 0; i < deep+1; i++) {
-                            appendStringBuilder(buf, TAB);
-                        }
-                        renderObject(entry.getKey(), deep + 1, expand, buf);
-                        appendStringBuilder(buf, ":");
-                        renderObject(entry.getValue(), deep + 1, expand, buf);
-                        appendStringBuilder(buf, ",");
-                    }
-                    appendStringBuilder(buf, "\n");
-                    for (int i = 0; i < deep; i++) {
-                        appendStringBuilder(buf, TAB);
-                    }
-                    appendStringBuilder(buf, "]");
-                }
-            }
-
-
-            // 数组类输出
-            else if (obj.getClass().isArray()) {
-
-
-                final String typeName = obj.getClass().getSimpleName();
-
-                // int[]
-                if (typeName.equals("int[]")) {
-
-                    final int[] arrays = (int[]) obj;
-                    // 非根节点或空集合只展示摘要信息
-                    if (!isExpand(deep, expand)
-                        || arrays.length == 0) {
-
-                        appendStringBuilder(buf, format("@%s[isEmpty=%s;size=%d]",
-                                          typeName,
-                                          arrays.length == 0,
-                                          arrays.length));
-
-                    }
-
-                    // 展开展示
-                    else {
-                        appendStringBuilder(buf, format("@%s[", className));
-                        for (int e : arrays) {
-                            appendStringBuilder(buf, "\n");
-                            for (int i = 0; i < deep+1; i++) {
-                                appendStringBuilder(buf, TAB);
-                            }
-                            renderObject(e, deep + 1, expand, buf);
-                            appendStringBuilder(buf, ",");
-                        }
-                        appendStringBuilder(buf, "\n");
-                        for (int i = 0; i < deep; i++) {
-                            appendStringBuilder(buf, TAB);
-                        }
-                        appendStringBuilder(buf, "]");
-                    }
-
-                }
-
-                // long[]
-                else if (typeName.equals("long[]")) {
-
-                    final long[] arrays = (long[]) obj;
-                    // 非根节点或空集合只展示摘要信息
-                    if (!isExpand(deep, expand)
-                        || arrays.length == 0) {
-
-                        appendStringBuilder(buf, format("@%s[isEmpty=%s;size=%d]",
-                                          typeName,
-                                          arrays.length == 0,
-                                          arrays.length));
-
-                    }
-
-                    // 展开展示
-                    else {
-                        appendStringBuilder(buf, format("@%s[", className));
-                        for (long e : arrays) {
-                            appendStringBuilder(buf, "\n");
-                            for (int i = 0; i < deep+1; i++) {
-                                appendStringBuilder(buf, TAB);
-                            }
-                            renderObject(e, deep + 1, expand, buf);
-                            appendStringBuilder(buf, ",");
-                        }
-                        appendStringBuilder(buf, "\n");
-                        for (int i = 0; i < deep; i++) {
-                            appendStringBuilder(buf, TAB);
-                        }
-                        appendStringBuilder(buf, "]");
-                    }
-
-                }
-
-                // short[]
-                else if (typeName.equals("short[]")) {
-
-                    final short[] arrays = (short[]) obj;
-                    // 非根节点或空集合只展示摘要信息
-                    if (!isExpand(deep, expand)
-                        || arrays.length == 0) {
-
-                        appendStringBuilder(buf, format("@%s[isEmpty=%s;size=%d]",
-                                          typeName,
-                                          arrays.length == 0,
-                                          arrays.length));
-
-                    }
-
-                    // 展开展示
-                    else {
-                        appendStringBuilder(buf, format("@%s[", className));
-                        for (short e : arrays) {
-                            appendStringBuilder(buf, "\n");
-                            for (int i = 0; i < deep+1; i++) {
-                                appendStringBuilder(buf, TAB);
-                            }
-                            renderObject(e, deep + 1, expand, buf);
-                            appendStringBuilder(buf, ",");
-                        }
-                        appendStringBuilder(buf, "\n");
-                        for (int i = 0; i < deep; i++) {
-                            appendStringBuilder(buf, TAB);
-                        }
-                        appendStringBuilder(buf, "]");
-                    }
-
-                }
-
-                // float[]
-                else if (typeName.equals("float[]")) {
-
-                    final float[] arrays = (float[]) obj;
-                    // 非根节点或空集合只展示摘要信息
-                    if (!isExpand(deep, expand)
-                        || arrays.length == 0) {
-
-                        appendStringBuilder(buf, format("@%s[isEmpty=%s;size=%d]",
-                                          typeName,
-                                          arrays.length == 0,
-                                          arrays.length));
-
-                    }
-
-                    // 展开展示
-                    else {
-                        appendStringBuilder(buf, format("@%s[", className));
-                        for (float e : arrays) {
-                            appendStringBuilder(buf, "\n");
-                            for (int i = 0; i < deep+1; i++) {
-                                appendStringBuilder(buf, TAB);
-                            }
-                            renderObject(e, deep + 1, expand, buf);
-                            appendStringBuilder(buf, ",");
-                        }
-                        appendStringBuilder(buf, "\n");
-                        for (int i = 0; i < deep; i++) {
-                            appendStringBuilder(buf, TAB);
-                        }
-                        appendStringBuilder(buf, "]");
-                    }
-
-                }
-
-                // double[]
-                else if (typeName.equals("double[]")) {
-
-                    final double[] arrays = (double[]) obj;
-                    // 非根节点或空集合只展示摘要信息
-                    if (!isExpand(deep, expand)
-                        || arrays.length == 0) {
-
-                        appendStringBuilder(buf, format("@%s[isEmpty=%s;size=%d]",
-                                          typeName,
-                                          arrays.length == 0,
-                                          arrays.length));
-
-                    }
-
-                    // 展开展示
-                    else {
-                        appendStringBuilder(buf, format("@%s[", className));
-                        for (double e : arrays) {
-                            appendStringBuilder(buf, "\n");
-                            for (int i = 0; i < deep+1; i++) {
-                                appendStringBuilder(buf, TAB);
-                            }
-                            renderObject(e, deep + 1, expand, buf);
-                            appendStringBuilder(buf, ",");
-                        }
-                        appendStringBuilder(buf, "\n");
-                        for (int i = 0; i < deep; i++) {
-                            appendStringBuilder(buf, TAB);
-                        }
-                        appendStringBuilder(buf, "]");
-                    }
-
-                }
-
-                // boolean[]
-                else if (typeName.equals("boolean[]")) {
-
-                    final boolean[] arrays = (boolean[]) obj;
-                    // 非根节点或空集合只展示摘要信息
-                    if (!isExpand(deep, expand)
-                        || arrays.length == 0) {
-
-                        appendStringBuilder(buf, format("@%s[isEmpty=%s;size=%d]",
-                                          typeName,
-                                          arrays.length == 0,
-                                          arrays.length));
-
-                    }
-
-                    // 展开展示
-                    else {
-                        appendStringBuilder(buf, format("@%s[", className));
-                        for (boolean e : arrays) {
-                            appendStringBuilder(buf, "\n");
-                            for (int i = 0; i < deep+1; i++) {
-                                appendStringBuilder(buf, TAB);
-                            }
-                            renderObject(e, deep + 1, expand, buf);
-                            appendStringBuilder(buf, ",");
-                        }
-                        appendStringBuilder(buf, "\n");
-                        for (int i = 0; i < deep; i++) {
-                            appendStringBuilder(buf, TAB);
-                        }
-                        appendStringBuilder(buf, "]");
-                    }
-
-                }
-
-                // char[]
-                else if (typeName.equals("char[]")) {
-
-                    final char[] arrays = (char[]) obj;
-                    // 非根节点或空集合只展示摘要信息
-                    if (!isExpand(deep, expand)
-                        || arrays.length == 0) {
-
-                        appendStringBuilder(buf, format("@%s[isEmpty=%s;size=%d]",
-                                          typeName,
-                                          arrays.length == 0,
-                                          arrays.length));
-
-                    }
-
-                    // 展开展示
-                    else {
-                        appendStringBuilder(buf, format("@%s[", className));
-                        for (char e : arrays) {
-                            appendStringBuilder(buf, "\n");
-                            for (int i = 0; i < deep+1; i++) {
-                                appendStringBuilder(buf, TAB);
+                } else if (ctx.enter(obj)) {
+                    try {
+                        ctx.append(format("@%s[", className));
+                        int count = 0;
+                        for (Map.Entry<Object, Object> entry : map.entrySet()) {
+                            if (count >= maxElements) {
+                                break;
                             }
-                            renderObject(e, deep + 1, expand, buf);
-                            appendStringBuilder(buf, ",");
+                            renderEntry(entry.getKey(), entry.getValue(), deep, expand, ctx);
+                            count++;
                         }
-                        appendStringBuilder(buf, "\n");
-                        for (int i = 0; i < deep; i++) {
-                            appendStringBuilder(buf, TAB);
-                        }
-                        appendStringBuilder(buf, "]");
+                        renderMore(map.size() - count, deep, ctx);
+                        renderEnd(deep, ctx);
+                    } finally {
+                        ctx.exit(obj);
                     }
-
+                } else {
+                    renderCyclic(className, ctx);
                 }
+            }
 
-                // byte[]
-                else if (typeName.equals("byte[]")) {
-
-                    final byte[] arrays = (byte[]) obj;
-                    // 非根节点或空集合只展示摘要信息
-                    if (!isExpand(deep, expand)
-                        || arrays.length == 0) {
 
-                        appendStringBuilder(buf, format("@%s[isEmpty=%s;size=%d]",
-                                          typeName,
-                                          arrays.length == 0,
-                                          arrays.length));
+            // 数组类输出，基础类型的元素装箱后按基础类型输出
+            else if (clazz.isArray()) {
 
-                    }
+                final int length = Array.getLength(obj);
+                // 非根节点或空集合只展示摘要信息
+                if (!isExpand(deep, expand)
+                    || length == 0) {
 
-                    // 展开展示
-                    else {
-                        appendStringBuilder(buf, format("@%s[", className));
-                        for (byte e : arrays) {
-                            appendStringBuilder(buf, "\n");
-                            for (int i = 0; i < deep+1; i++) {
-                                appendStringBuilder(buf, TAB);
-                            }
-                            renderObject(e, deep + 1, expand, buf);
-                            appendStringBuilder(buf, ",");
-                        }
-                        appendStringBuilder(buf, "\n");
-                        for (int i = 0; i < deep; i++) {
-                            appendStringBuilder(buf, TAB);
-                        }
-                        appendStringBuilder(buf, "]");
-                    }
+                    ctx.append(format("@%s[isEmpty=%s;size=%d]",
+                                      className,
+                                      length == 0,
+                                      length));
 
                 }
 
-                // Object[]
-                else {
-                    final Object[] arrays = (Object[]) obj;
-                    // 非根节点或空集合只展示摘要信息
-                    if (!isExpand(deep, expand)
-                        || arrays.length == 0) {
-
-                        appendStringBuilder(buf, format("@%s[isEmpty=%s;size=%d]",
-                                          typeName,
-                                          arrays.length == 0,
-                                          arrays.length));
-
-                    }
-
-                    // 展开展示
-                    else {
-                        appendStringBuilder(buf, format("@%s[", className));
-                        for (Object e : arrays) {
-                            appendStringBuilder(buf, "\n");
-                            for (int i = 0; i < deep+1; i++) {
-                                appendStringBuilder(buf, TAB);
-                            }
-                            renderObject(e, deep + 1, expand, buf);
-                            appendStringBuilder(buf, ",");
-                        }
-                        appendStringBuilder(buf, "\n");
-                        for (int i = 0; i < deep; i++) {
-                            appendStringBuilder(buf, TAB);
+                // 展开展示
+                else if (ctx.enter(obj)) {
+                    try {
+                        ctx.append(format("@%s[", className));
+                        final int count = Math.min(length, maxElements);
+                        for (int index = 0; index < count; index++) {
+                            renderElement(Array.get(obj, index), deep, expand, ctx);
                         }
-                        appendStringBuilder(buf, "]");
+                        renderMore(length - count, deep, ctx);
+                        renderEnd(deep, ctx);
+                    } finally {
+                        ctx.exit(obj);
                     }
+                } else {
+                    renderCyclic(className, ctx);
                 }
 
             }
@@ -554,85 +355,196 @@ public class ObjectView implements View {
             else if (Throwable.class.isInstance(obj)) {
 
                 if (!isExpand(deep, expand)) {
-                    appendStringBuilder(buf, format("@%s[%s]", className, obj));
+                    ctx.append(format("@%s[%s]", className, obj));
                 } else {
 
                     final Throwable throwable = (Throwable) obj;
                     final StringWriter sw = new StringWriter();
                     final PrintWriter pw = new PrintWriter(sw);
                     throwable.printStackTrace(pw);
-                    appendStringBuilder(buf, sw.toString());
+                    ctx.append(sw.toString());
                 }
 
             }
 
             // Date输出
             else if (Date.class.isInstance(obj)) {
-                appendStringBuilder(buf, format("@%s[%s]", className, new SimpleDateFormat("yyyy-MM-dd HH:mm:ss,SSS").format(obj)));
+                ctx.append(format("@%s[%s]", className, new SimpleDateFormat("yyyy-MM-dd HH:mm:ss,SSS").format(obj)));
             }
 
             else if (object instanceof Enum<?>) {
-                appendStringBuilder(buf, format("@%s[%s]", className, obj));
+                ctx.append(format("@%s[%s]", className, obj));
             }
 
             // 普通Object输出
             else {
 
                 if (!isExpand(deep, expand)) {
-                    appendStringBuilder(buf, format("@%s[%s]", className, obj));
-                } else {
-                    appendStringBuilder(buf, format("@%s[", className));
-                    List<Field> fields = new ArrayList<Field>();
-                    Class objClass = obj.getClass();
-                    if (GlobalOptions.printParentFields) {
-                        // 当父类为null的时候说明到达了最上层的父类(Object类).
-                        while (objClass != null) {
-                            for (Field field : objClass.getDeclaredFields()) {
-                                fields.add(field);
-                            }
-                            objClass = objClass.getSuperclass();
-                        }
-                    } else {
-                        for (Field field : objClass.getDeclaredFields()) {
-                            fields.add(field);
-                        }
-                    }
-
-                    if (null != fields) {
-                        for (Field field : fields) {
+                    ctx.append(format("@%s[%s]", className, obj));
+                } else if (ctx.enter(obj)) {
+                    try {
+                        ctx.append(format("@%s[", className));
+                        for (Field field : getFields(clazz)) {
 
                             field.setAccessible(true);
 
                             try {
 
                                 final Object value = field.get(obj);
-
-                                appendStringBuilder(buf, "\n");
-                                for (int i = 0; i < deep+1; i++) {
-                                    appendStringBuilder(buf, TAB);
-                                }
-                                appendStringBuilder(buf, field.getName());
-                                appendStringBuilder(buf, "=");
-                                renderObject(value, deep + 1, expand, buf);
-                                appendStringBuilder(buf, ",");
+                                renderField(field.getName(), value, deep, expand, ctx);
 
                             } catch (ObjectTooLargeException t) {
-                                buf.append("...");
+                                ctx.appendUnchecked("...");
                                 break;
+                            } catch (IOException e) {
+                                throw e;
                             } catch (Throwable t) {
                                 // ignore
                             }
                         }//for
-                        appendStringBuilder(buf, "\n");
-                    }//if
-                    for (int i = 0; i < deep; i++) {
-                        appendStringBuilder(buf, TAB);
+                        renderEnd(deep, ctx);
+                    } finally {
+                        ctx.exit(obj);
+                    }
+                } else {
+                    renderCyclic(className, ctx);
+                }
+
+            }
+        }
+    }
+
+    /**
+     * 拷贝的内容按原对象的格式输出，集合/Map/数组的 size 是拷贝时的 size
+     */
+    private void renderSnapshot(Snapshot snapshot, int deep, int expand, RenderContext ctx)
+            throws ObjectTooLargeException, IOException {
+        final String className = snapshot.className;
+
+        if (snapshot.fieldNames != null) {
+            if (!isExpand(deep, expand)) {
+                ctx.append(format("@%s[%s]", className, snapshot.source));
+            } else if (ctx.enter(snapshot.source)) {
+                try {
+                    ctx.append(format("@%s[", className));
+                    for (int i = 0; i < snapshot.fieldNames.length; i++) {
+                        try {
+                            renderField(snapshot.fieldNames[i], snapshot.values[i], deep, expand, ctx);
+                        } catch (ObjectTooLargeException t) {
+                            ctx.appendUnchecked("...");
+                            break;
+                        }
+                    }
+                    renderEnd(deep, ctx);
+                } finally {
+                    ctx.exit(snapshot.source);
+                }
+            } else {
+                renderCyclic(className, ctx);
+            }
+            return;
+        }
+
+        if (!isExpand(deep, expand) || snapshot.size == 0) {
+            ctx.append(format("@%s[isEmpty=%s;size=%d]", className, snapshot.size == 0, snapshot.size));
+        } else if (ctx.enter(snapshot.source)) {
+            try {
+                ctx.append(format("@%s[", className));
+                final int count = Math.min(snapshot.values.length, maxElements);
+                for (int i = 0; i < count; i++) {
+                    if (snapshot.keys != null) {
+                        renderEntry(snapshot.keys[i], snapshot.values[i], deep, expand, ctx);
+                    } else {
+                        renderElement(snapshot.values[i], deep, expand, ctx);
                     }
-                    appendStringBuilder(buf, "]");
                 }
+                renderMore(snapshot.size - count, deep, ctx);
+                renderEnd(deep, ctx);
+            } finally {
+                ctx.exit(snapshot.source);
+            }
+        } else {
+            renderCyclic(className, ctx);
+        }
+    }
+
+    private void renderElement(Object e, int deep, int expand, RenderContext ctx)
+            throws ObjectTooLargeException, IOException {
+        renderIndent(deep + 1, ctx);
+        renderObject(e, deep + 1, expand, ctx);
+        ctx.append(",");
+    }
+
+    private void renderEntry(Object key, Object value, int deep, int expand, RenderContext ctx)
+            throws ObjectTooLargeException, IOException {
+        renderIndent(deep + 1, ctx);
+        renderObject(key, deep + 1, expand, ctx);
+        ctx.append(":");
+        renderObject(value, deep + 1, expand, ctx);
+        ctx.append(",");
+    }
+
+    private void renderField(String name, Object value, int deep, int expand, RenderContext ctx)
+            throws ObjectTooLargeException, IOException {
+        renderIndent(deep + 1, ctx);
+        ctx.append(name);
+        ctx.append("=");
+        renderObject(value, deep + 1, expand, ctx);
+        ctx.append(",");
+    }
 
+    /**
+     * 超过 maxElements 的元素不再渲染，只输出剩余的个数
+     */
+    private void renderMore(int more, int deep, RenderContext ctx) throws ObjectTooLargeException, IOException {
+        if (more > 0) {
+            renderIndent(deep + 1, ctx);
+            ctx.append(format("...(%d more)", more));
+        }
+    }
+
+    private void renderEnd(int deep, RenderContext ctx) throws ObjectTooLargeException, IOException {
+        ctx.append("\n");
+        for (int i = 0; i < deep; i++) {
+            ctx.append(TAB);
+        }
+        ctx.append("]");
+    }
+
+    private void renderIndent(int deep, RenderContext ctx) throws ObjectTooLargeException, IOException {
+        ctx.append("\n");
+        for (int i = 0; i < deep; i++) {
+            ctx.append(TAB);
+        }
+    }
+
+    private void renderCyclic(String className, RenderContext ctx) throws ObjectTooLargeException, IOException {
+        ctx.append(format("@%s[<cyclic reference>]", className));
+    }
+
+    private String nodesExceededMessage() {
+        return " Object node count exceeds node limit: " + maxNodes
+                + ", try to specify a smaller -x expand level or change the render-max-nodes option,"
+                + " check the help command for more.";
+    }
+
+    private static List<Field> getFields(Class<?> clazz) {
+        List<Field> fields = new ArrayList<Field>();
+        Class<?> objClass = clazz;
+        if (GlobalOptions.printParentFields) {
+            // 当父类为null的时候说明到达了最上层的父类(Object类).
+            while (objClass != null) {
+                for (Field field : objClass.getDeclaredFields()) {
+                    fields.add(field);
+                }
+                objClass = objClass.getSuperclass();
+            }
+        } else {
+            for (Field field : objClass.getDeclaredFields()) {
+                fields.add(field);
             }
         }
+        return fields;
     }
 
     /**
@@ -647,16 +559,193 @@ public class ObjectView implements View {
     }
 
     /**
-     * append string to a string builder, with upper limit check
-     * @param buf the StringBuilder buffer
-     * @param data the data to be appended
-     * @throws ObjectTooLargeException if the size has exceeded the upper limit
+     * 一次渲染的状态：输出、已经输出的字符数、已经渲染的节点数，以及当前路径上正在展开的对象
+     */
+    private class RenderContext {
+        private final Appendable out;
+        private long length;
+        private int nodes;
+        /**
+         * 最后输出的是不是截断时的省略号
+         */
+        private boolean truncated;
+        private final IdentityHashMap<Object, Boolean> path = new IdentityHashMap<Object, Boolean>();
+
+        RenderContext(Appendable out) {
+            this.out = out;
+        }
+
+        /**
+         * append data to the output, with upper limit check
+         * @throws ObjectTooLargeException if the size has exceeded the upper limit
+         */
+        void append(String data) throws ObjectTooLargeException, IOException {
+            if (length + data.length() > maxObjectLength) {
+                throw new ObjectTooLargeException(" Object size exceeds size limit: " + maxObjectLength
+                        + ", try to specify -M size_limit in your command, check the help command for more.");
+            }
+            out.append(data);
+            length += data.length();
+            truncated = false;
+        }
+
+        void append(char c) throws ObjectTooLargeException, IOException {
+            if (length + 1 > maxObjectLength) {
+                throw new ObjectTooLargeException(" Object size exceeds size limit: " + maxObjectLength
+                        + ", try to specify -M size_limit in your command, check the help command for more.");
+            }
+            out.append(c);
+            length++;
+            truncated = false;
+        }
+
+        /**
+         * 超过大小限制之后用来输出省略号，不再检查
+         */
+        void appendUnchecked(String data) throws IOException {
+            out.append(data);
+            length += data.length();
+            truncated = true;
+        }
+
+        /**
+         * @return 对象已经在当前路径上（循环引用）时返回 false
+         */
+        boolean enter(Object obj) {
+            return path.put(obj, Boolean.TRUE) == null;
+        }
+
+        void exit(Object obj) {
+            path.remove(obj);
+        }
+    }
+
+    /**
+     * 一次拷贝的状态：展开层数、剩余可以拷贝的对象数，以及当前路径上正在拷贝的对象
+     */
+    private static class Snapshotter {
+        private final int expand;
+        private final int maxElements;
+        private int remainingNodes;
+        private final IdentityHashMap<Object, Boolean> path = new IdentityHashMap<Object, Boolean>();
+
+        Snapshotter(int expand, int maxElements, int maxNodes) {
+            this.expand = expand;
+            this.maxElements = maxElements;
+            this.remainingNodes = maxNodes;
+        }
+
+        /**
+         * @param deep 和渲染时的深度一样，只拷贝会展开的层
+         */
+        Object snapshot(Object obj, int deep) {
+            if (obj == null || !isExpand(deep, expand) || remainingNodes <= 0) {
+                return obj;
+            }
+            // 循环引用保留原对象，渲染时会输出 cyclic reference
+            if (path.put(obj, Boolean.TRUE) != null) {
+                return obj;
+            }
+            try {
+                return Snapshot.of(obj, deep, this);
+            } finally {
+                path.remove(obj);
+            }
+        }
+    }
+
+    /**
+     * 对象展开部分的拷贝，见 {@link ObjectView#snapshot(Object, int)}
      */
-    private void appendStringBuilder(StringBuilder buf, String data) throws ObjectTooLargeException {
-        if (buf.length() + data.length() > maxObjectLength) {
-            throw new ObjectTooLargeException("Object size exceeds size limit: " + maxObjectLength);
+    private static class Snapshot {
+        private final Object source;
+        private final String className;
+        private int size;
+        private Object[] keys;
+        private Object[] values;
+        private String[] fieldNames;
+
+        private Snapshot(Object source) {
+            this.source = source;
+            this.className = source.getClass().getSimpleName();
+        }
+
+        static Object of(Object obj, int deep, Snapshotter snapshotter) {
+            final Class<?> clazz = obj.getClass();
+            final int maxElements = snapshotter.maxElements;
+            // 和 renderObject 一样，这些类型不会展开，不需要拷贝
+            if (obj instanceof Integer || obj instanceof Long || obj instanceof Float || obj instanceof Double
+                    || obj instanceof Short || obj instanceof Byte || obj instanceof Boolean
+                    || obj instanceof Character || obj instanceof String || obj instanceof Throwable
+                    || obj instanceof Date || obj instanceof Enum<?>) {
+                return obj;
+            }
+
+            snapshotter.remainingNodes--;
+            final Snapshot snapshot = new Snapshot(obj);
+            if (obj instanceof Collection) {
+                final Collection<?> collection = (Collection<?>) obj;
+                final List<Object> values = new ArrayList<Object>(Math.min(collection.size(), maxElements));
+                for (Object e : collection) {
+                    if (values.size() >= maxElements) {
+                        break;
+                    }
+                    values.add(snapshotter.snapshot(e, deep + 1));
+                }
+                snapshot.size = collection.size();
+                snapshot.values = values.toArray();
+            } else if (obj instanceof Map) {
+                final Map<?, ?> map = (Map<?, ?>) obj;
+                final int count = Math.min(map.size(), maxElements);
+                final List<Object> keys = new ArrayList<Object>(count);
+                final List<Object> values = new ArrayList<Object>(count);
+                for (Map.Entry<?, ?> entry : map.entrySet()) {
+                    if (keys.size() >= maxElements) {
+                        break;
+                    }
+                    keys.add(snapshotter.snapshot(entry.getKey(), deep + 1));
+                    values.add(snapshotter.snapshot(entry.getValue(), deep + 1));
+                }
+                snapshot.size = map.size();
+                snapshot.keys = keys.toArray();
+                snapshot.values = values.toArray();
+            } else if (clazz.isArray()) {
+                final int length = Array.getLength(obj);
+                final int count = Math.min(length, maxElements);
+                snapshot.size = length;
+                snapshot.values = new Object[count];
+                for (int i = 0; i < count; i++) {
+                    snapshot.values[i] = snapshotter.snapshot(Array.get(obj, i), deep + 1);
+                }
+            } else {
+                final List<Field> fields = getFields(clazz);
+                final List<String> names = new ArrayList<String>(fields.size());
+                final List<Object> values = new ArrayList<Object>(fields.size());
+                for (Field field : fields) {
+                    field.setAccessible(true);
+                    final Object value;
+                    try {
+                        value = field.get(obj);
+                    } catch (Throwable t) {
+                        // ignore，和渲染时一样跳过读取失败的 field
+                        continue;
+                    }
+                    values.add(snapshotter.snapshot(value, deep + 1));
+                    names.add(field.getName());
+                }
+                snapshot.fieldNames = names.toArray(new String[names.size()]);
+                snapshot.values = values.toArray();
+            }
+            return snapshot;
+        }
+
+        /**
+         * 没有展开时输出原对象的 toString，和直接渲染原对象保持一致
+         */
+        @Override
+        public String toString() {
+            return String.valueOf(source);
         }
-        buf.append(data);
     }
 
     private static class ObjectTooLargeException extends Exception {
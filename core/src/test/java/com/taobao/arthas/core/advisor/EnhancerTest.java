@@ -1,9 +1,15 @@
 package com.taobao.arthas.core.advisor;
 
 import java.arthas.SpyAPI;
+import java.lang.instrument.ClassFileTransformer;
 import java.lang.instrument.Instrumentation;
+import java.lang.reflect.Method;
+import java.net.URL;
+import java.net.URLClassLoader;
+import java.security.ProtectionDomain;
 import java.util.HashSet;
 import java.util.Set;
+import java.util.concurrent.atomic.AtomicInteger;
 import java.util.jar.JarFile;
 
 import org.assertj.core.api.Assertions;
@@ -97,4 +103,153 @@ public class EnhancerTest {
         System.err.println(string);
     }
 
+    @Test
+    public void testSpySupportsSiteId() {
+        // 测试里的 spy jar 和 core 是同一个版本
+        Assertions.assertThat(Enhancer.spySupportsSiteId()).isTrue();
+    }
+
+    @Test
+    public void testWeaveCache() throws Throwable {
+        Instrumentation instrumentation = ByteBuddyAgent.install();
+
+        TestHelper.appendSpyJar(instrumentation);
+
+        ArthasBootstrap arthasBootstrap = ArthasBootstrap.getInstance(instrumentation, "ip=127.0.0.1");
+
+        AdviceListener listener = Mockito.mock(AdviceListener.class);
+
+        Enhancer enhancer = new Enhancer(listener, true, false, new EqualsMatcher<String>(MathGame.class.getName()),
+                new EqualsMatcher<String>("print"));
+
+        ClassLoader inClassLoader = MathGame.class.getClassLoader();
+        String className = MathGame.class.getName();
+        byte[] classfileBuffer = AsmUtils.toBytes(AsmUtils.loadClass(MathGame.class));
+
+        byte[] result = enhancer.transform(inClassLoader, className, MathGame.class, null, classfileBuffer);
+        // 同样的字节码直接返回之前织入的结果
+        byte[] cached = enhancer.transform(inClassLoader, className, MathGame.class, null, classfileBuffer.clone());
+        Assertions.assertThat(cached).isSameAs(result);
+
+        ClassBytecodeCache.ClassState classState = ClassBytecodeCache.get(MathGame.class);
+        Assertions.assertThat(classState.isEnhanced()).isTrue();
+        for (ClassBytecodeCache.MethodInfo methodInfo : classState.methods()) {
+            if ("print".equals(methodInfo.name)) {
+                Assertions.assertThat(methodInfo.woven).isTrue();
+                Assertions.assertThat(methodInfo.traced).isTrue();
+            } else if ("main".equals(methodInfo.name)) {
+                Assertions.assertThat(methodInfo.woven).isFalse();
+            }
+        }
+
+        TransformerManager transformerManager = arthasBootstrap.getTransformerManager();
+        Assertions.assertThat(classState.isAllContributorsActive(transformerManager)).isFalse();
+        transformerManager.addTransformer(enhancer, true);
+        try {
+            Assertions.assertThat(classState.isAllContributorsActive(transformerManager)).isTrue();
+        } finally {
+            transformerManager.removeTransformer(enhancer);
+        }
+
+        // transform 的时候没有 Enhancer 织入，类恢复成原始的字节码，不再缓存
+        ClassBytecodeCache.beginTransform(MathGame.class, classfileBuffer);
+        Assertions.assertThat(classState.methods()).isEmpty();
+        ClassBytecodeCache.endTransform(MathGame.class);
+        Assertions.assertThat(ClassBytecodeCache.get(MathGame.class)).isNull();
+    }
+
+    @Test
+    public void testAttachWithoutRetransform() throws Throwable {
+        Instrumentation instrumentation = ByteBuddyAgent.install();
+
+        TestHelper.appendSpyJar(instrumentation);
+
+        ArthasBootstrap arthasBootstrap = ArthasBootstrap.getInstance(instrumentation, "ip=127.0.0.1");
+        TransformerManager transformerManager = arthasBootstrap.getTransformerManager();
+
+        // Enhancer 不会增强和 arthas 同一个 ClassLoader 加载的类，MathGame 用单独的 ClassLoader 加载
+        URL demo = MathGame.class.getProtectionDomain().getCodeSource().getLocation();
+        final Class<?> gameClass = new URLClassLoader(new URL[] { demo }, null).loadClass(MathGame.class.getName());
+        Object game = gameClass.newInstance();
+        Method run = gameClass.getMethod("run");
+
+        final AtomicInteger retransformCount = new AtomicInteger();
+        ClassFileTransformer counter = new ClassFileTransformer() {
+            @Override
+            public byte[] transform(ClassLoader loader, String className, Class<?> classBeingRedefined,
+                    ProtectionDomain protectionDomain, byte[] classfileBuffer) {
+                if (classBeingRedefined == gameClass) {
+                    retransformCount.incrementAndGet();
+                }
+                return null;
+            }
+        };
+        instrumentation.addTransformer(counter, true);
+
+        EqualsMatcher<String> classNameMatcher = new EqualsMatcher<String>(MathGame.class.getName());
+        EqualsMatcher<String> methodNameMatcher = new EqualsMatcher<String>("run");
+
+        AdviceListener watch1 = Mockito.mock(AdviceListener.class);
+        AdviceListener watch2 = Mockito.mock(AdviceListener.class);
+        AdviceListener trace1 = Mockito.mock(AdviceListener.class,
+                Mockito.withSettings().extraInterfaces(InvokeTraceable.class));
+        AdviceListener trace2 = Mockito.mock(AdviceListener.class,
+                Mockito.withSettings().extraInterfaces(InvokeTraceable.class));
+        Enhancer watchEnhancer1 = new Enhancer(watch1, false, false, classNameMatcher, methodNameMatcher);
+        Enhancer watchEnhancer2 = new Enhancer(watch2, false, false, classNameMatcher, methodNameMatcher);
+        Enhancer traceEnhancer1 = new Enhancer(trace1, true, false, classNameMatcher, methodNameMatcher);
+        Enhancer traceEnhancer2 = new Enhancer(trace2, true, false, classNameMatcher, methodNameMatcher);
+
+        try {
+            EnhancerAffect affect = watchEnhancer1.enhance(instrumentation);
+            Assertions.assertThat(affect.getThrowable()).isNull();
+            Assertions.assertThat(affect.cCnt()).isEqualTo(1);
+            Assertions.assertThat(affect.getAttachedClasses()).isEqualTo(0);
+            Assertions.assertThat(retransformCount.get()).isEqualTo(1);
+
+            // run 已经织入过，第二个 watch 只注册 listener
+            affect = watchEnhancer2.enhance(instrumentation);
+            Assertions.assertThat(affect.cCnt()).isEqualTo(1);
+            Assertions.assertThat(affect.getAttachedClasses()).isEqualTo(1);
+            Assertions.assertThat(retransformCount.get()).isEqualTo(1);
+
+            // 没有插入 atBeforeInvoke，trace 需要 retransform
+            affect = traceEnhancer1.enhance(instrumentation);
+            Assertions.assertThat(affect.getAttachedClasses()).isEqualTo(0);
+            Assertions.assertThat(retransformCount.get()).isEqualTo(2);
+
+            affect = traceEnhancer2.enhance(instrumentation);
+            Assertions.assertThat(affect.getAttachedClasses()).isEqualTo(1);
+            Assertions.assertThat(retransformCount.get()).isEqualTo(2);
+
+            run.invoke(game);
+
+            for (AdviceListener listener : new AdviceListener[] { watch1, watch2, trace1, trace2 }) {
+                Mockito.verify(listener).before(Mockito.same(gameClass), Mockito.eq("run"), Mockito.eq("()V"),
+                        Mockito.same(game), Mockito.any(Object[].class));
+            }
+            for (AdviceListener listener : new AdviceListener[] { trace1, trace2 }) {
+                Mockito.verify((InvokeTraceable) listener, Mockito.atLeastOnce()).invokeBeforeTracing(
+                        Mockito.any(ClassLoader.class), Mockito.eq("demo/MathGame"), Mockito.eq("primeFactors"),
+                        Mockito.anyString(), Mockito.anyInt());
+            }
+
+            // 织入当前字节码的 Enhancer 都还有效，reset 跳过这个类
+            Enhancer.reset(instrumentation, classNameMatcher);
+            Assertions.assertThat(retransformCount.get()).isEqualTo(2);
+            Assertions.assertThat(ClassBytecodeCache.get(gameClass)).isNotNull();
+        } finally {
+            transformerManager.removeTransformer(watchEnhancer1);
+            transformerManager.removeTransformer(watchEnhancer2);
+            transformerManager.removeTransformer(traceEnhancer1);
+            transformerManager.removeTransformer(traceEnhancer2);
+        }
+
+        // 命令结束之后 reset 恢复原始的字节码
+        Enhancer.reset(instrumentation, classNameMatcher);
+        Assertions.assertThat(retransformCount.get()).isEqualTo(3);
+        Assertions.assertThat(ClassBytecodeCache.get(gameClass)).isNull();
+
+        instrumentation.removeTransformer(counter);
+    }
 }
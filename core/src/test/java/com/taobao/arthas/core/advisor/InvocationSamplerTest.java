@@ -0,0 +1,116 @@
+package com.taobao.arthas.core.advisor;
+
+import org.assertj.core.api.Assertions;
+import org.junit.Test;
+import org.mockito.Mockito;
+
+import com.taobao.arthas.core.command.model.MessageModel;
+import com.taobao.arthas.core.command.model.ResultModel;
+import com.taobao.arthas.core.shell.command.CommandProcess;
+
+/**
+ *
+ * @see InvocationSampler
+ */
+public class InvocationSamplerTest {
+
+    @Test
+    public void testMaxPerSecond() {
+        InvocationSampler sampler = new InvocationSampler(null, 1, 5, 0);
+        int sampled = 0;
+        for (int i = 0; i < 100; ++i) {
+            if (sampler.enter()) {
+                sampled++;
+            }
+            sampler.exit();
+        }
+        // 测试在一秒内执行完
+        Assertions.assertThat(sampled).isBetween(5, 10);
+        Assertions.assertThat(sampler.getTotalCount()).isEqualTo(100);
+        Assertions.assertThat(sampler.getSampledCount()).isEqualTo(sampled);
+        Assertions.assertThat(sampler.getDroppedCount()).isEqualTo(100 - sampled);
+    }
+
+    @Test
+    public void testSampleRate() {
+        InvocationSampler sampler = new InvocationSampler(null, 0.1, 0, 0);
+        for (int i = 0; i < 10000; ++i) {
+            sampler.enter();
+            sampler.exit();
+        }
+        Assertions.assertThat(sampler.getSampledCount()).isBetween(700L, 1300L);
+    }
+
+    @Test
+    public void testNestedInvocation() {
+        InvocationSampler sampler = new InvocationSampler(null, 1, 1, 0);
+        Assertions.assertThat(sampler.enter()).isTrue();
+        // 嵌套的调用沿用外层的结果
+        Assertions.assertThat(sampler.enter()).isTrue();
+        sampler.exit();
+        Assertions.assertThat(sampler.isSampled()).isTrue();
+        sampler.exit();
+        Assertions.assertThat(sampler.isSampled()).isFalse();
+
+        Assertions.assertThat(sampler.enter()).isFalse();
+        Assertions.assertThat(sampler.enter()).isFalse();
+        sampler.exit();
+        sampler.exit();
+        Assertions.assertThat(sampler.getTotalCount()).isEqualTo(2);
+    }
+
+    @Test
+    public void testReservoir() {
+        CommandProcess process = Mockito.mock(CommandProcess.class);
+        InvocationSampler sampler = new InvocationSampler(process, 1, 0, 3);
+        for (int i = 0; i < 100; ++i) {
+            if (sampler.enter()) {
+                sampler.appendResult(new MessageModel(String.valueOf(i)));
+            }
+            sampler.exit();
+        }
+        Mockito.verify(process, Mockito.never()).appendResult(Mockito.any(ResultModel.class));
+        sampler.flush();
+        Mockito.verify(process, Mockito.times(3)).appendResult(Mockito.any(ResultModel.class));
+    }
+
+    @Test
+    public void testReservoirFlushedOnTick() throws InterruptedException {
+        CommandProcess process = Mockito.mock(CommandProcess.class);
+        InvocationSampler sampler = new InvocationSampler(process, 1, 0, 3);
+        for (int i = 0; i < 2; ++i) {
+            if (sampler.enter()) {
+                sampler.appendResult(new MessageModel(String.valueOf(i)));
+            }
+            sampler.exit();
+        }
+        sampler.tick();
+        Mockito.verify(process, Mockito.never()).appendResult(Mockito.any(ResultModel.class));
+
+        // 之后没有新的调用，窗口结束时由定时器输出
+        Thread.sleep(1100);
+        sampler.tick();
+        Mockito.verify(process, Mockito.times(2)).appendResult(Mockito.any(ResultModel.class));
+    }
+
+    @Test
+    public void testReservoirNotFlushedOnBusinessThread() throws InterruptedException {
+        CommandProcess process = Mockito.mock(CommandProcess.class);
+        InvocationSampler sampler = new InvocationSampler(process, 1, 0, 3);
+        Assertions.assertThat(sampler.enter()).isTrue();
+        sampler.appendResult(new MessageModel("first"));
+        sampler.exit();
+
+        // 跨过一秒的调用只换下蓄水池，不输出
+        Thread.sleep(1100);
+        Assertions.assertThat(sampler.enter()).isTrue();
+        sampler.appendResult(new MessageModel("second"));
+        sampler.exit();
+        Mockito.verify(process, Mockito.never()).appendResult(Mockito.any(ResultModel.class));
+
+        sampler.tick();
+        Mockito.verify(process, Mockito.times(1)).appendResult(Mockito.any(ResultModel.class));
+        sampler.flush();
+        Mockito.verify(process, Mockito.times(2)).appendResult(Mockito.any(ResultModel.class));
+    }
+}
@@ -0,0 +1,129 @@
+package com.taobao.arthas.core.advisor;
+
+import java.util.List;
+
+import org.assertj.core.api.Assertions;
+import org.junit.After;
+import org.junit.Test;
+
+import com.taobao.arthas.core.GlobalOptions;
+import com.taobao.arthas.core.advisor.OverheadGovernor.MethodOverhead;
+
+/**
+ *
+ * @see OverheadGovernor
+ */
+public class OverheadGovernorTest {
+
+    private final String overheadBudget = GlobalOptions.overheadBudget;
+
+    @After
+    public void tearDown() {
+        GlobalOptions.overheadBudget = overheadBudget;
+    }
+
+    /**
+     * 模拟 count 次调用，每次方法耗时 wallNanos，其中 listener 耗时 selfNanos，没有交给 listener 处理的调用没有开销
+     */
+    private static void invoke(OverheadGovernor governor, int count, long wallNanos, long selfNanos) {
+        for (int i = 0; i < count; ++i) {
+            boolean admitted = governor.enter(OverheadGovernorTest.class, "invoke", System.nanoTime() - wallNanos);
+            governor.exit(admitted ? System.nanoTime() - selfNanos : System.nanoTime());
+        }
+    }
+
+    @Test
+    public void testParseBudget() {
+        Assertions.assertThat(OverheadGovernor.parseBudget("2%")).isEqualTo(0.02, Assertions.offset(0.0001));
+        Assertions.assertThat(OverheadGovernor.parseBudget(" 0.5 % ")).isEqualTo(0.005, Assertions.offset(0.0001));
+        Assertions.assertThat(OverheadGovernor.parseBudget("3")).isEqualTo(0.03, Assertions.offset(0.0001));
+        Assertions.assertThat(OverheadGovernor.parseBudget("0")).isEqualTo(0);
+        Assertions.assertThat(OverheadGovernor.parseBudget("-1%")).isEqualTo(0);
+        Assertions.assertThat(OverheadGovernor.parseBudget("abc")).isEqualTo(0);
+        Assertions.assertThat(OverheadGovernor.isEnabled("0")).isFalse();
+        Assertions.assertThat(OverheadGovernor.isEnabled("2%")).isTrue();
+    }
+
+    @Test
+    public void testCallStackGrowth() {
+        OverheadGovernor.CallStack stack = new OverheadGovernor.CallStack(40);
+        Assertions.assertThat(stack.capacity()).isEqualTo(16);
+        for (int i = 0; i < 50; ++i) {
+            stack.push(i + 1, true, null);
+        }
+        Assertions.assertThat(stack.capacity()).isEqualTo(40);
+        // 超过 maxSize 的帧没有记录
+        for (int i = 50; i > 40; --i) {
+            Assertions.assertThat(stack.pop()).isEqualTo(0);
+        }
+        for (int i = 40; i > 0; --i) {
+            Assertions.assertThat(stack.pop()).isEqualTo(i);
+        }
+        Assertions.assertThat(stack.isEmpty()).isTrue();
+    }
+
+    @Test
+    public void testMethodOverhead() {
+        OverheadGovernor governor = new OverheadGovernor(null);
+        long start = System.nanoTime();
+        Assertions.assertThat(governor.enter(OverheadGovernorTest.class, "outer", start - 4000000)).isTrue();
+        // 递归调用沿用外层的结果
+        Assertions.assertThat(governor.enter(OverheadGovernorTest.class, "inner", start - 2000000)).isTrue();
+        governor.exit(System.nanoTime() - 1000000);
+        Assertions.assertThat(governor.isAdmitted()).isTrue();
+        governor.exit(System.nanoTime() - 1000000);
+        Assertions.assertThat(governor.isAdmitted()).isFalse();
+
+        List<MethodOverhead> methods = governor.getMethodOverheads();
+        Assertions.assertThat(methods).hasSize(2);
+        for (MethodOverhead method : methods) {
+            Assertions.assertThat(method.getCalls()).isEqualTo(1);
+            Assertions.assertThat(method.getSelfNanosPerCall()).isGreaterThanOrEqualTo(1000000);
+            if (method.getMethod().endsWith(".inner")) {
+                Assertions.assertThat(method.getOverhead()).isBetween(0.3, 0.51);
+            } else {
+                Assertions.assertThat(method.getMethod()).isEqualTo(OverheadGovernorTest.class.getName() + ".outer");
+                Assertions.assertThat(method.getOverhead()).isBetween(0.2, 0.26);
+            }
+        }
+    }
+
+    @Test
+    public void testReduceSampleRate() {
+        GlobalOptions.overheadBudget = "2%";
+        OverheadGovernor governor = new OverheadGovernor(null);
+        invoke(governor, 100, 1000000, 500000);
+        governor.tick();
+        invoke(governor, 100, 1000000, 500000);
+        governor.tick();
+
+        Assertions.assertThat(governor.getOverhead()).isBetween(0.45, 0.55);
+        Assertions.assertThat(governor.isAdjusted()).isTrue();
+        Assertions.assertThat(governor.isSuspended()).isFalse();
+        // 1 * 2% / 50% * 0.8
+        Assertions.assertThat(governor.getSampleRate()).isBetween(0.029, 0.036);
+    }
+
+    @Test
+    public void testSuspendAndRestore() {
+        GlobalOptions.overheadBudget = "0.5%";
+        OverheadGovernor governor = new OverheadGovernor(null);
+        for (int i = 0; i < 10 && !governor.isSuspended(); ++i) {
+            invoke(governor, 5000, 1000000, 1000000);
+            governor.tick();
+        }
+        Assertions.assertThat(governor.isSuspended()).isTrue();
+        Assertions.assertThat(governor.getSampleRate()).isEqualTo(OverheadGovernor.MIN_SAMPLE_RATE);
+        Assertions.assertThat(governor.enter(OverheadGovernorTest.class, "invoke", System.nanoTime())).isFalse();
+        governor.exit(System.nanoTime());
+        Assertions.assertThat(governor.summary()).contains("(suspended)");
+
+        GlobalOptions.overheadBudget = "0";
+        for (int i = 0; i < 3 && governor.isSuspended(); ++i) {
+            invoke(governor, 100, 1000000, 0);
+            governor.tick();
+        }
+        Assertions.assertThat(governor.isSuspended()).isFalse();
+        Assertions.assertThat(governor.getSampleRate()).isEqualTo(1);
+    }
+}
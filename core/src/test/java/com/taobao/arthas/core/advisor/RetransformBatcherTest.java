@@ -0,0 +1,40 @@
+package com.taobao.arthas.core.advisor;
+
+import java.util.List;
+
+import org.assertj.core.api.Assertions;
+import org.junit.Test;
+
+/**
+ *
+ * @see RetransformBatcher
+ */
+public class RetransformBatcherTest {
+
+    @Test
+    public void testAdaptiveBatchSize() {
+        Class<?>[] classes = new Class<?>[5000];
+        for (int i = 0; i < classes.length; ++i) {
+            classes[i] = Object.class;
+        }
+        RetransformBatcher batcher = new RetransformBatcher(classes);
+
+        List<Class<?>> batch = batcher.nextBatch();
+        Assertions.assertThat(batch).hasSize(RetransformBatcher.MIN_BATCH_SIZE);
+
+        // 每个类 1ms，每批 200 个类
+        batcher.finish(batch.size(), batch.size() * 1000 * 1000L);
+        Assertions.assertThat(batcher.nextBatch()).hasSize(200);
+
+        // 每个类很快时不超过上限
+        batcher.finish(200, 200L);
+        Assertions.assertThat(batcher.batchSize()).isEqualTo(RetransformBatcher.MAX_BATCH_SIZE);
+
+        int total = RetransformBatcher.MIN_BATCH_SIZE + 200;
+        while ((batch = batcher.nextBatch()) != null) {
+            total += batch.size();
+        }
+        Assertions.assertThat(total).isEqualTo(classes.length);
+        Assertions.assertThat(batcher.total()).isEqualTo(classes.length);
+    }
+}
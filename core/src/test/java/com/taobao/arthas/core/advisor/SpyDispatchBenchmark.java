@@ -0,0 +1,166 @@
+package com.taobao.arthas.core.advisor;
+
+import java.lang.instrument.Instrumentation;
+import java.util.concurrent.TimeUnit;
+
+import org.openjdk.jmh.annotations.Benchmark;
+import org.openjdk.jmh.annotations.BenchmarkMode;
+import org.openjdk.jmh.annotations.Fork;
+import org.openjdk.jmh.annotations.Measurement;
+import org.openjdk.jmh.annotations.Mode;
+import org.openjdk.jmh.annotations.OutputTimeUnit;
+import org.openjdk.jmh.annotations.Scope;
+import org.openjdk.jmh.annotations.Setup;
+import org.openjdk.jmh.annotations.State;
+import org.openjdk.jmh.annotations.Warmup;
+import org.openjdk.jmh.runner.Runner;
+import org.openjdk.jmh.runner.RunnerException;
+import org.openjdk.jmh.runner.options.Options;
+import org.openjdk.jmh.runner.options.OptionsBuilder;
+
+import com.taobao.arthas.core.bytecode.TestHelper;
+import com.taobao.arthas.core.server.ArthasBootstrap;
+
+import demo.MathGame;
+import net.bytebuddy.agent.ByteBuddyAgent;
+
+/**
+ * 对比 SpyImpl 按字符串 methodInfo/invokeInfo 分发和按 site id 分发的开销。
+ * 
+ * <pre>
+ * 运行： mvn -pl core test-compile exec:java -Dexec.classpathScope=test \
+ *      -Dexec.mainClass=com.taobao.arthas.core.advisor.SpyDispatchBenchmark
+ * </pre>
+ */
+@State(Scope.Benchmark)
+@BenchmarkMode(Mode.AverageTime)
+@OutputTimeUnit(TimeUnit.NANOSECONDS)
+@Warmup(iterations = 3, time = 1)
+@Measurement(iterations = 5, time = 1)
+@Fork(1)
+public class SpyDispatchBenchmark {
+
+    private static final String METHOD_NAME = "primeFactors";
+    private static final String METHOD_DESC = "(I)Ljava/util/List;";
+    private static final String METHOD_INFO = METHOD_NAME + "|" + METHOD_DESC;
+
+    private static final String INVOKE_OWNER = "java/util/List";
+    private static final String INVOKE_NAME = "add";
+    private static final String INVOKE_DESC = "(Ljava/lang/Object;)Z";
+    private static final int INVOKE_LINE = 42;
+    private static final String INVOKE_INFO = INVOKE_OWNER + "|" + INVOKE_NAME + "|" + INVOKE_DESC + "|"
+            + INVOKE_LINE;
+
+    private SpyImpl spy;
+    private Class<?> clazz;
+    private Object target;
+    private Object[] args;
+    private int methodSiteId;
+    private int invokeSiteId;
+
+    @Setup
+    public void setup() throws Exception {
+        Instrumentation instrumentation = ByteBuddyAgent.install();
+        TestHelper.appendSpyJar(instrumentation);
+        ArthasBootstrap.getInstance(instrumentation, "ip=127.0.0.1");
+
+        spy = new SpyImpl();
+        clazz = MathGame.class;
+        target = new MathGame();
+        args = new Object[] { 42 };
+
+        ClassLoader classLoader = clazz.getClassLoader();
+        String className = clazz.getName();
+        NopAdviceListener listener = new NopAdviceListener();
+
+        AdviceListenerManager.registerAdviceListener(classLoader, className, METHOD_NAME, METHOD_DESC, listener);
+        AdviceListenerManager.registerTraceAdviceListener(classLoader, className, INVOKE_OWNER, INVOKE_NAME,
+                INVOKE_DESC, listener);
+
+        methodSiteId = AdviceListenerManager.registerAdviceSite(classLoader, className, METHOD_NAME, METHOD_DESC);
+        invokeSiteId = AdviceListenerManager.registerTraceAdviceSite(classLoader, className, INVOKE_OWNER,
+                INVOKE_NAME, INVOKE_DESC, INVOKE_LINE);
+    }
+
+    @Benchmark
+    public void enterExitByMethodInfo() {
+        spy.atEnter(clazz, METHOD_INFO, target, args);
+        spy.atExit(clazz, METHOD_INFO, target, args, null);
+    }
+
+    @Benchmark
+    public void enterExitBySiteId() {
+        spy.atEnter(clazz, methodSiteId, target, args);
+        spy.atExit(clazz, methodSiteId, target, args, null);
+    }
+
+    @Benchmark
+    public void invokeByInvokeInfo() {
+        spy.atBeforeInvoke(clazz, INVOKE_INFO, target);
+        spy.atAfterInvoke(clazz, INVOKE_INFO, target);
+    }
+
+    @Benchmark
+    public void invokeBySiteId() {
+        spy.atBeforeInvoke(clazz, invokeSiteId, target);
+        spy.atAfterInvoke(clazz, invokeSiteId, target);
+    }
+
+    static class NopAdviceListener implements AdviceListener, InvokeTraceable {
+        private long count;
+
+        @Override
+        public long id() {
+            return 0;
+        }
+
+        @Override
+        public void create() {
+        }
+
+        @Override
+        public void destroy() {
+        }
+
+        @Override
+        public void before(Class<?> clazz, String methodName, String methodDesc, Object target, Object[] args)
+                throws Throwable {
+            count++;
+        }
+
+        @Override
+        public void afterReturning(Class<?> clazz, String methodName, String methodDesc, Object target,
+                Object[] args, Object returnObject) throws Throwable {
+            count++;
+        }
+
+        @Override
+        public void afterThrowing(Class<?> clazz, String methodName, String methodDesc, Object target,
+                Object[] args, Throwable throwable) throws Throwable {
+            count++;
+        }
+
+        @Override
+        public void invokeBeforeTracing(ClassLoader classLoader, String tracingClassName, String tracingMethodName,
+                String tracingMethodDesc, int tracingLineNumber) throws Throwable {
+            count += tracingLineNumber;
+        }
+
+        @Override
+        public void invokeThrowTracing(ClassLoader classLoader, String tracingClassName, String tracingMethodName,
+                String tracingMethodDesc, int tracingLineNumber) throws Throwable {
+            count += tracingLineNumber;
+        }
+
+        @Override
+        public void invokeAfterTracing(ClassLoader classLoader, String tracingClassName, String tracingMethodName,
+                String tracingMethodDesc, int tracingLineNumber) throws Throwable {
+            count += tracingLineNumber;
+        }
+    }
+
+    public static void main(String[] args) throws RunnerException {
+        Options options = new OptionsBuilder().include(SpyDispatchBenchmark.class.getSimpleName()).build();
+        new Runner(options).run();
+    }
+}
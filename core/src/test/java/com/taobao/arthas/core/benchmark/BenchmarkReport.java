@@ -0,0 +1,283 @@
+package com.taobao.arthas.core.benchmark;
+
+import java.util.ArrayList;
+import java.util.List;
+
+/**
+ * OverheadBenchmark 的结果，用 fastjson 保存成 json，可以用 --compare 和其它版本的结果对比
+ */
+public class BenchmarkReport {
+    private String arthasVersion;
+    private String javaVersion;
+    private String vmName;
+    private int cpus;
+    private long timestamp;
+    private int warmupSeconds;
+    private int durationSeconds;
+    private List<Result> results = new ArrayList<Result>();
+
+    public String getArthasVersion() {
+        return arthasVersion;
+    }
+
+    public void setArthasVersion(String arthasVersion) {
+        this.arthasVersion = arthasVersion;
+    }
+
+    public String getJavaVersion() {
+        return javaVersion;
+    }
+
+    public void setJavaVersion(String javaVersion) {
+        this.javaVersion = javaVersion;
+    }
+
+    public String getVmName() {
+        return vmName;
+    }
+
+    public void setVmName(String vmName) {
+        this.vmName = vmName;
+    }
+
+    public int getCpus() {
+        return cpus;
+    }
+
+    public void setCpus(int cpus) {
+        this.cpus = cpus;
+    }
+
+    public long getTimestamp() {
+        return timestamp;
+    }
+
+    public void setTimestamp(long timestamp) {
+        this.timestamp = timestamp;
+    }
+
+    public int getWarmupSeconds() {
+        return warmupSeconds;
+    }
+
+    public void setWarmupSeconds(int warmupSeconds) {
+        this.warmupSeconds = warmupSeconds;
+    }
+
+    public int getDurationSeconds() {
+        return durationSeconds;
+    }
+
+    public void setDurationSeconds(int durationSeconds) {
+        this.durationSeconds = durationSeconds;
+    }
+
+    public List<Result> getResults() {
+        return results;
+    }
+
+    public void setResults(List<Result> results) {
+        this.results = results;
+    }
+
+    public static class Result {
+        private String workload;
+        private String command;
+        private String commandLine;
+        private int threads;
+        private long operations;
+        private long durationMillis;
+        /**
+         * 每秒执行的次数
+         */
+        private double throughput;
+        /**
+         * 耗时的百分位，单位是纳秒
+         */
+        private long p50;
+        private long p90;
+        private long p99;
+        private long p999;
+        private long max;
+        /**
+         * 工作线程每次调用分配的字节数，-1 表示 jvm 不支持统计
+         */
+        private double allocatedBytesPerOp;
+        /**
+         * 整个 jvm 每秒分配的内存，包括 arthas 渲染和发送结果的线程
+         */
+        private double jvmAllocatedMBPerSecond;
+        private long gcCount;
+        private long gcTimeMillis;
+        /**
+         * 命令输出到终端的字节数
+         */
+        private long outputBytes;
+        /**
+         * 相对 baseline 的比例，和机器关系不大，适合跨版本对比
+         */
+        private double throughputRatio;
+        private double p99Ratio;
+        private double allocationRatio;
+
+        public String getWorkload() {
+            return workload;
+        }
+
+        public void setWorkload(String workload) {
+            this.workload = workload;
+        }
+
+        public String getCommand() {
+            return command;
+        }
+
+        public void setCommand(String command) {
+            this.command = command;
+        }
+
+        public String getCommandLine() {
+            return commandLine;
+        }
+
+        public void setCommandLine(String commandLine) {
+            this.commandLine = commandLine;
+        }
+
+        public int getThreads() {
+            return threads;
+        }
+
+        public void setThreads(int threads) {
+            this.threads = threads;
+        }
+
+        public long getOperations() {
+            return operations;
+        }
+
+        public void setOperations(long operations) {
+            this.operations = operations;
+        }
+
+        public long getDurationMillis() {
+            return durationMillis;
+        }
+
+        public void setDurationMillis(long durationMillis) {
+            this.durationMillis = durationMillis;
+        }
+
+        public double getThroughput() {
+            return throughput;
+        }
+
+        public void setThroughput(double throughput) {
+            this.throughput = throughput;
+        }
+
+        public long getP50() {
+            return p50;
+        }
+
+        public void setP50(long p50) {
+            this.p50 = p50;
+        }
+
+        public long getP90() {
+            return p90;
+        }
+
+        public void setP90(long p90) {
+            this.p90 = p90;
+        }
+
+        public long getP99() {
+            return p99;
+        }
+
+        public void setP99(long p99) {
+            this.p99 = p99;
+        }
+
+        public long getP999() {
+            return p999;
+        }
+
+        public void setP999(long p999) {
+            this.p999 = p999;
+        }
+
+        public long getMax() {
+            return max;
+        }
+
+        public void setMax(long max) {
+            this.max = max;
+        }
+
+        public double getAllocatedBytesPerOp() {
+            return allocatedBytesPerOp;
+        }
+
+        public void setAllocatedBytesPerOp(double allocatedBytesPerOp) {
+            this.allocatedBytesPerOp = allocatedBytesPerOp;
+        }
+
+        public double getJvmAllocatedMBPerSecond() {
+            return jvmAllocatedMBPerSecond;
+        }
+
+        public void setJvmAllocatedMBPerSecond(double jvmAllocatedMBPerSecond) {
+            this.jvmAllocatedMBPerSecond = jvmAllocatedMBPerSecond;
+        }
+
+        public long getGcCount() {
+            return gcCount;
+        }
+
+        public void setGcCount(long gcCount) {
+            this.gcCount = gcCount;
+        }
+
+        public long getGcTimeMillis() {
+            return gcTimeMillis;
+        }
+
+        public void setGcTimeMillis(long gcTimeMillis) {
+            this.gcTimeMillis = gcTimeMillis;
+        }
+
+        public long getOutputBytes() {
+            return outputBytes;
+        }
+
+        public void setOutputBytes(long outputBytes) {
+            this.outputBytes = outputBytes;
+        }
+
+        public double getThroughputRatio() {
+            return throughputRatio;
+        }
+
+        public void setThroughputRatio(double throughputRatio) {
+            this.throughputRatio = throughputRatio;
+        }
+
+        public double getP99Ratio() {
+            return p99Ratio;
+        }
+
+        public void setP99Ratio(double p99Ratio) {
+            this.p99Ratio = p99Ratio;
+        }
+
+        public double getAllocationRatio() {
+            return allocationRatio;
+        }
+
+        public void setAllocationRatio(double allocationRatio) {
+            this.allocationRatio = allocationRatio;
+        }
+    }
+}
@@ -0,0 +1,510 @@
+package com.taobao.arthas.core.benchmark;
+
+import java.io.File;
+import java.io.FileInputStream;
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.io.OutputStream;
+import java.lang.instrument.Instrumentation;
+import java.lang.management.GarbageCollectorMXBean;
+import java.lang.management.ManagementFactory;
+import java.lang.management.ThreadMXBean;
+import java.net.URL;
+import java.net.URLClassLoader;
+import java.util.ArrayList;
+import java.util.HashMap;
+import java.util.LinkedHashMap;
+import java.util.List;
+import java.util.Map;
+import java.util.concurrent.Callable;
+import java.util.concurrent.CountDownLatch;
+import java.util.concurrent.TimeUnit;
+
+import com.alibaba.fastjson.JSON;
+import com.alibaba.fastjson.serializer.SerializerFeature;
+import com.taobao.arthas.common.IOUtils;
+import com.taobao.arthas.common.SocketUtils;
+import com.taobao.arthas.core.benchmark.BenchmarkReport.Result;
+import com.taobao.arthas.core.benchmark.workload.MathGameWorkload;
+import com.taobao.arthas.core.bytecode.TestHelper;
+import com.taobao.arthas.core.server.ArthasBootstrap;
+import com.taobao.arthas.core.util.ArthasBanner;
+import com.taobao.arthas.core.util.metrics.LatencyHistogram;
+
+import demo.MathGame;
+import net.bytebuddy.agent.ByteBuddyAgent;
+
+/**
+ * <pre>
+ * 端到端测量 watch/trace/tt/monitor/stack 对应用的开销。
+ *
+ * 在当前进程里启动 arthas，通过 telnet 执行命令，和用户实际使用时一样经过 SpyImpl、Enhancer、表达式、ObjectView、
+ * view 渲染和 term 输出。每个 workload 先不执行任何命令跑一遍 baseline，再依次执行每个命令，
+ * 统计吞吐量、耗时的百分位、内存分配和 gc，以及相对 baseline 的比例。
+ *
+ * workload 的类放在单独的 ClassLoader 里加载（Enhancer 不会增强和 arthas 同一个 ClassLoader 加载的类）：
+ *   mathgame    demo 的 MathGame.primeFactors
+ *   deepcall    6 层调用树，每次 63 个方法调用，增强 level*
+ *   largearg    参数是 200 个订单的对象图
+ *   concurrent  cpu 数 * 4 个线程同时调用一个很短的方法
+ *
+ * 运行： mvn -pl core test-compile exec:java -Dexec.classpathScope=test \
+ *      -Dexec.mainClass=com.taobao.arthas.core.benchmark.OverheadBenchmark \
+ *      -Dexec.args="--workloads mathgame,deepcall --commands baseline,watch,trace --compare old.json"
+ *
+ * 参数：
+ *   --workloads  逗号分隔，默认全部
+ *   --commands   逗号分隔，默认 baseline,watch,trace,tt,monitor,stack
+ *   --warmup     每个命令预热的秒数，默认 5
+ *   --duration   每个命令测量的秒数，默认 10
+ *   --threads    工作线程数，默认 1，concurrent 默认是 cpu 数 * 4
+ *   --output     结果保存的 json 文件，默认 target/arthas-overhead-benchmark.json
+ *   --compare    和之前保存的 json 对比
+ * </pre>
+ */
+public class OverheadBenchmark {
+
+    private static final String BASELINE = "baseline";
+    private static final long COMMAND_TIMEOUT_SECONDS = 60;
+
+    private static final Map<String, Workload> WORKLOADS = new LinkedHashMap<String, Workload>();
+    private static final Map<String, String> COMMANDS = new LinkedHashMap<String, String>();
+
+    static {
+        int cpus = Runtime.getRuntime().availableProcessors();
+        addWorkload(new Workload("mathgame", "MathGameWorkload", MathGame.class.getName(), "primeFactors", 0));
+        addWorkload(new Workload("deepcall", "DeepCallWorkload", null, "level*", 0));
+        addWorkload(new Workload("largearg", "LargeArgumentWorkload", null, "handle", 0));
+        addWorkload(new Workload("concurrent", "ConcurrentWorkload", null, "handle", cpus * 4));
+
+        // 默认的 -n 100 会让命令很快结束，这里一直执行到 ctrl+c
+        COMMANDS.put(BASELINE, null);
+        COMMANDS.put("watch", "watch {class} {method} '{params,returnObj,throwExp}' -x 2 -n 2147483647");
+        COMMANDS.put("trace", "trace {class} {method} -n 2147483647");
+        COMMANDS.put("tt", "tt -t {class} {method} -n 2147483647");
+        COMMANDS.put("monitor", "monitor -c 5 {class} {method} -n 2147483647");
+        COMMANDS.put("stack", "stack {class} {method} -n 2147483647");
+    }
+
+    private static void addWorkload(Workload workload) {
+        WORKLOADS.put(workload.name, workload);
+    }
+
+    private final List<String> workloads;
+    private final List<String> commands;
+    private final int warmupSeconds;
+    private final int durationSeconds;
+    private final int threads;
+
+    private final com.sun.management.ThreadMXBean allocationMXBean;
+
+    OverheadBenchmark(List<String> workloads, List<String> commands, int warmupSeconds, int durationSeconds,
+            int threads) {
+        this.workloads = workloads;
+        this.commands = commands;
+        this.warmupSeconds = warmupSeconds;
+        this.durationSeconds = durationSeconds;
+        this.threads = threads;
+
+        ThreadMXBean threadMXBean = ManagementFactory.getThreadMXBean();
+        if (threadMXBean instanceof com.sun.management.ThreadMXBean
+                && ((com.sun.management.ThreadMXBean) threadMXBean).isThreadAllocatedMemorySupported()) {
+            allocationMXBean = (com.sun.management.ThreadMXBean) threadMXBean;
+            allocationMXBean.setThreadAllocatedMemoryEnabled(true);
+        } else {
+            allocationMXBean = null;
+        }
+    }
+
+    public static void main(String[] args) throws Throwable {
+        Map<String, String> options = parseOptions(args);
+        List<String> workloads = split(options, "workloads", join(WORKLOADS.keySet()));
+        List<String> commands = split(options, "commands", join(COMMANDS.keySet()));
+        for (String workload : workloads) {
+            if (!WORKLOADS.containsKey(workload)) {
+                throw new IllegalArgumentException("unknown workload: " + workload + ", available: " + WORKLOADS.keySet());
+            }
+        }
+        for (String command : commands) {
+            if (!COMMANDS.containsKey(command)) {
+                throw new IllegalArgumentException("unknown command: " + command + ", available: " + COMMANDS.keySet());
+            }
+        }
+        // 比例都是相对 baseline 计算的
+        if (!commands.contains(BASELINE)) {
+            commands.add(0, BASELINE);
+        }
+
+        OverheadBenchmark benchmark = new OverheadBenchmark(workloads, commands,
+                Integer.parseInt(option(options, "warmup", "5")), Integer.parseInt(option(options, "duration", "10")),
+                Integer.parseInt(option(options, "threads", "0")));
+
+        int telnetPort = SocketUtils.findAvailableTcpPort();
+        Instrumentation instrumentation = ByteBuddyAgent.install();
+        TestHelper.appendSpyJar(instrumentation);
+        ArthasBootstrap bootstrap = ArthasBootstrap.getInstance(instrumentation,
+                "ip=127.0.0.1;telnetPort=" + telnetPort + ";httpPort=-1");
+
+        BenchmarkReport report;
+        try {
+            report = benchmark.run(telnetPort);
+        } finally {
+            bootstrap.destroy();
+        }
+
+        File output = new File(option(options, "output", "target/arthas-overhead-benchmark.json"));
+        write(report, output);
+        System.out.println("result saved to " + output.getAbsolutePath());
+
+        String compare = options.get("compare");
+        if (compare != null) {
+            compare(read(new File(compare)), report);
+        }
+        // arthas 和 netty 的线程不都是 daemon
+        System.exit(0);
+    }
+
+    BenchmarkReport run(int telnetPort) throws Exception {
+        BenchmarkReport report = new BenchmarkReport();
+        report.setArthasVersion(ArthasBanner.version());
+        report.setJavaVersion(System.getProperty("java.version"));
+        report.setVmName(System.getProperty("java.vm.name") + " " + System.getProperty("java.vm.version"));
+        report.setCpus(Runtime.getRuntime().availableProcessors());
+        report.setTimestamp(System.currentTimeMillis());
+        report.setWarmupSeconds(warmupSeconds);
+        report.setDurationSeconds(durationSeconds);
+
+        ClassLoader workloadClassLoader = createWorkloadClassLoader();
+
+        TermClient client = new TermClient("127.0.0.1", telnetPort);
+        try {
+            client.await(COMMAND_TIMEOUT_SECONDS, TimeUnit.SECONDS, "[arthas@");
+            for (String name : workloads) {
+                Workload workload = WORKLOADS.get(name);
+                int workloadThreads = threads > 0 ? threads : Math.max(1, workload.threads);
+                Result baseline = null;
+                for (String command : commands) {
+                    Result result = run(client, workloadClassLoader, workload, command, workloadThreads);
+                    if (baseline == null) {
+                        baseline = result;
+                    }
+                    result.setThroughputRatio(ratio(result.getThroughput(), baseline.getThroughput()));
+                    result.setP99Ratio(ratio(result.getP99(), baseline.getP99()));
+                    result.setAllocationRatio(ratio(result.getAllocatedBytesPerOp(), baseline.getAllocatedBytesPerOp()));
+                    report.getResults().add(result);
+                    print(result);
+                }
+            }
+        } finally {
+            client.close();
+        }
+        return report;
+    }
+
+    private Result run(TermClient client, ClassLoader classLoader, Workload workload, String command, int threads)
+            throws Exception {
+        Class<?> workloadClass = classLoader.loadClass(workload.workloadClassName());
+        String targetClassName = workload.targetClass != null ? workload.targetClass : workloadClass.getName();
+        String commandLine = COMMANDS.get(command);
+        if (commandLine != null) {
+            commandLine = commandLine.replace("{class}", targetClassName).replace("{method}", workload.method);
+        }
+
+        List<Callable<?>> tasks = new ArrayList<Callable<?>>(threads);
+        for (int i = 0; i < threads; ++i) {
+            tasks.add((Callable<?>) workloadClass.newInstance());
+        }
+
+        if (commandLine != null) {
+            client.clear();
+            client.send(commandLine);
+            String matched = client.await(COMMAND_TIMEOUT_SECONDS, TimeUnit.SECONDS, "Affect(class count: ",
+                    "No class or method is affected");
+            if (!"Affect(class count: ".equals(matched)) {
+                throw new IllegalStateException("command did not enhance any method: " + commandLine);
+            }
+        }
+        try {
+            measure(tasks, warmupSeconds, client);
+            Result result = measure(tasks, durationSeconds, client);
+            result.setWorkload(workload.name);
+            result.setCommand(command);
+            result.setCommandLine(commandLine);
+            return result;
+        } finally {
+            if (commandLine != null) {
+                client.interrupt();
+                client.await(COMMAND_TIMEOUT_SECONDS, TimeUnit.SECONDS, "[arthas@");
+                client.clear();
+                client.send("reset");
+                client.await(COMMAND_TIMEOUT_SECONDS, TimeUnit.SECONDS, "Affect(class count: ");
+                client.await(COMMAND_TIMEOUT_SECONDS, TimeUnit.SECONDS, "[arthas@");
+            }
+        }
+    }
+
+    private Result measure(List<Callable<?>> tasks, int seconds, TermClient client) throws Exception {
+        CountDownLatch start = new CountDownLatch(1);
+        List<Worker> workers = new ArrayList<Worker>(tasks.size());
+        for (int i = 0; i < tasks.size(); ++i) {
+            Worker worker = new Worker("arthas-benchmark-worker-" + i, tasks.get(i), start);
+            worker.start();
+            workers.add(worker);
+        }
+
+        long gcCount = 0;
+        long gcTime = 0;
+        for (GarbageCollectorMXBean gc : ManagementFactory.getGarbageCollectorMXBeans()) {
+            gcCount -= gc.getCollectionCount();
+            gcTime -= gc.getCollectionTime();
+        }
+        long jvmAllocated = -totalAllocatedBytes();
+        long outputBytes = -client.getReceivedBytes();
+        long startTime = System.nanoTime();
+
+        start.countDown();
+        Thread.sleep(TimeUnit.SECONDS.toMillis(seconds));
+        for (Worker worker : workers) {
+            worker.running = false;
+        }
+        for (Worker worker : workers) {
+            worker.join();
+        }
+
+        long elapsed = System.nanoTime() - startTime;
+        jvmAllocated += totalAllocatedBytes();
+        outputBytes += client.getReceivedBytes();
+        for (GarbageCollectorMXBean gc : ManagementFactory.getGarbageCollectorMXBeans()) {
+            gcCount += gc.getCollectionCount();
+            gcTime += gc.getCollectionTime();
+        }
+
+        LatencyHistogram.Snapshot snapshot = new LatencyHistogram.Snapshot();
+        long operations = 0;
+        long allocated = 0;
+        for (Worker worker : workers) {
+            if (worker.error != null) {
+                throw new IllegalStateException("workload failed", worker.error);
+            }
+            snapshot.merge(worker.histogram.snapshot());
+            operations += worker.operations;
+            allocated += worker.allocatedBytes;
+        }
+
+        Result result = new Result();
+        result.setThreads(tasks.size());
+        result.setOperations(operations);
+        result.setDurationMillis(TimeUnit.NANOSECONDS.toMillis(elapsed));
+        result.setThroughput(operations * 1e9 / elapsed);
+        result.setP50(snapshot.percentile(50));
+        result.setP90(snapshot.percentile(90));
+        result.setP99(snapshot.percentile(99));
+        result.setP999(snapshot.percentile(99.9));
+        result.setMax(snapshot.getMax());
+        result.setAllocatedBytesPerOp(allocationMXBean == null || operations == 0 ? -1 : (double) allocated / operations);
+        result.setJvmAllocatedMBPerSecond(allocationMXBean == null ? -1 : jvmAllocated * 1e9 / elapsed / (1024 * 1024));
+        result.setGcCount(gcCount);
+        result.setGcTimeMillis(gcTime);
+        result.setOutputBytes(outputBytes);
+        return result;
+    }
+
+    /**
+     * 所有存活线程分配的字节数，测量期间结束的线程会被漏掉
+     */
+    private long totalAllocatedBytes() {
+        if (allocationMXBean == null) {
+            return 0;
+        }
+        long total = 0;
+        long[] ids = allocationMXBean.getAllThreadIds();
+        for (long allocated : allocationMXBean.getThreadAllocatedBytes(ids)) {
+            if (allocated > 0) {
+                total += allocated;
+            }
+        }
+        return total;
+    }
+
+    /**
+     * workload 的类和 MathGame 用一个 parent 为 null 的 ClassLoader 加载，通过 Callable 调用
+     */
+    private static ClassLoader createWorkloadClassLoader() {
+        URL workloads = MathGameWorkload.class.getProtectionDomain().getCodeSource().getLocation();
+        URL demo = MathGame.class.getProtectionDomain().getCodeSource().getLocation();
+        return new URLClassLoader(new URL[] { workloads, demo }, null);
+    }
+
+    private class Worker extends Thread {
+        private final Callable<?> task;
+        private final CountDownLatch start;
+        /**
+         * 单位是纳秒
+         */
+        private final LatencyHistogram histogram = new LatencyHistogram();
+        private volatile boolean running = true;
+        private long operations;
+        private long allocatedBytes;
+        private Throwable error;
+
+        Worker(String name, Callable<?> task, CountDownLatch start) {
+            super(name);
+            this.task = task;
+            this.start = start;
+        }
+
+        @Override
+        public void run() {
+            try {
+                start.await();
+                long allocated = allocatedBytes();
+                long count = 0;
+                while (running) {
+                    long begin = System.nanoTime();
+                    task.call();
+                    histogram.record(System.nanoTime() - begin);
+                    count++;
+                }
+                operations = count;
+                allocatedBytes = allocatedBytes() - allocated;
+            } catch (Throwable e) {
+                error = e;
+            }
+        }
+
+        private long allocatedBytes() {
+            return allocationMXBean == null ? 0 : allocationMXBean.getThreadAllocatedBytes(getId());
+        }
+    }
+
+    private static void print(Result result) {
+        System.out.println(String.format(
+                "%-10s %-8s threads: %3d, ops/s: %12.1f (%5.3f), p50: %8d ns, p99: %9d ns (%6.2f), max: %10d ns, "
+                        + "alloc/op: %10.1f B (%6.2f), jvm alloc: %8.1f MB/s, gc: %d/%d ms, output: %d KB",
+                result.getWorkload(), result.getCommand(), result.getThreads(), result.getThroughput(),
+                result.getThroughputRatio(), result.getP50(), result.getP99(), result.getP99Ratio(), result.getMax(),
+                result.getAllocatedBytesPerOp(), result.getAllocationRatio(), result.getJvmAllocatedMBPerSecond(),
+                result.getGcCount(), result.getGcTimeMillis(), result.getOutputBytes() / 1024));
+    }
+
+    /**
+     * 机器和 jvm 可能不一样，所以主要对比相对 baseline 的比例
+     */
+    static void compare(BenchmarkReport old, BenchmarkReport current) {
+        Map<String, Result> oldResults = new HashMap<String, Result>();
+        for (Result result : old.getResults()) {
+            oldResults.put(result.getWorkload() + "/" + result.getCommand(), result);
+        }
+        System.out.println(String.format("compare %s (java %s) with %s (java %s)", old.getArthasVersion(),
+                old.getJavaVersion(), current.getArthasVersion(), current.getJavaVersion()));
+        for (Result result : current.getResults()) {
+            Result oldResult = oldResults.get(result.getWorkload() + "/" + result.getCommand());
+            if (oldResult == null) {
+                continue;
+            }
+            System.out.println(String.format(
+                    "%-10s %-8s ops/s ratio: %5.3f -> %5.3f (%+6.1f%%), p99 ratio: %6.2f -> %6.2f (%+6.1f%%), "
+                            + "alloc ratio: %6.2f -> %6.2f (%+6.1f%%), ops/s: %+6.1f%%, p99: %+6.1f%%",
+                    result.getWorkload(), result.getCommand(), oldResult.getThroughputRatio(),
+                    result.getThroughputRatio(), change(oldResult.getThroughputRatio(), result.getThroughputRatio()),
+                    oldResult.getP99Ratio(), result.getP99Ratio(), change(oldResult.getP99Ratio(), result.getP99Ratio()),
+                    oldResult.getAllocationRatio(), result.getAllocationRatio(),
+                    change(oldResult.getAllocationRatio(), result.getAllocationRatio()),
+                    change(oldResult.getThroughput(), result.getThroughput()),
+                    change(oldResult.getP99(), result.getP99())));
+        }
+    }
+
+    private static double ratio(double value, double baseline) {
+        return baseline > 0 ? value / baseline : 0;
+    }
+
+    private static double change(double old, double current) {
+        return old > 0 ? (current - old) * 100 / old : 0;
+    }
+
+    private static void write(BenchmarkReport report, File file) throws IOException {
+        File parent = file.getAbsoluteFile().getParentFile();
+        if (parent != null) {
+            parent.mkdirs();
+        }
+        OutputStream out = new FileOutputStream(file);
+        try {
+            out.write(JSON.toJSONString(report, SerializerFeature.PrettyFormat).getBytes("UTF-8"));
+        } finally {
+            IOUtils.close(out);
+        }
+    }
+
+    private static BenchmarkReport read(File file) throws IOException {
+        FileInputStream in = new FileInputStream(file);
+        try {
+            return JSON.parseObject(IOUtils.toString(in), BenchmarkReport.class);
+        } finally {
+            IOUtils.close(in);
+        }
+    }
+
+    private static Map<String, String> parseOptions(String[] args) {
+        Map<String, String> options = new HashMap<String, String>();
+        for (int i = 0; i < args.length; ++i) {
+            if (!args[i].startsWith("--") || i + 1 >= args.length) {
+                throw new IllegalArgumentException("illegal argument: " + args[i] + ", expected: --name value");
+            }
+            options.put(args[i].substring(2), args[++i]);
+        }
+        return options;
+    }
+
+    private static String option(Map<String, String> options, String name, String defaultValue) {
+        String value = options.get(name);
+        return value != null ? value : defaultValue;
+    }
+
+    private static List<String> split(Map<String, String> options, String name, String defaultValue) {
+        List<String> values = new ArrayList<String>();
+        for (String value : option(options, name, defaultValue).split(",")) {
+            if (value.trim().length() > 0) {
+                values.add(value.trim());
+            }
+        }
+        return values;
+    }
+
+    private static String join(Iterable<String> values) {
+        StringBuilder sb = new StringBuilder();
+        for (String value : values) {
+            if (sb.length() > 0) {
+                sb.append(',');
+            }
+            sb.append(value);
+        }
+        return sb.toString();
+    }
+
+    private static class Workload {
+        final String name;
+        final String simpleClassName;
+        /**
+         * 被增强的类，null 表示就是 workload 类本身
+         */
+        final String targetClass;
+        final String method;
+        /**
+         * 默认的线程数，0 表示用 --threads
+         */
+        final int threads;
+
+        Workload(String name, String simpleClassName, String targetClass, String method, int threads) {
+            this.name = name;
+            this.simpleClassName = simpleClassName;
+            this.targetClass = targetClass;
+            this.method = method;
+            this.threads = threads;
+        }
+
+        String workloadClassName() {
+            return MathGameWorkload.class.getPackage().getName() + "." + simpleClassName;
+        }
+    }
+}
@@ -0,0 +1,121 @@
+package com.taobao.arthas.core.benchmark;
+
+import java.io.IOException;
+import java.io.InputStream;
+import java.io.OutputStream;
+import java.net.InetSocketAddress;
+import java.net.Socket;
+import java.util.Arrays;
+import java.util.concurrent.TimeUnit;
+import java.util.concurrent.TimeoutException;
+
+/**
+ * <pre>
+ * 连接 telnet 端口执行命令，和用户在终端里执行一样，命令的输出会经过 view 渲染和 term 发送。
+ * 后台线程一直读取输出，统计输出的字节数，不会因为 client 读得慢而影响被测的应用。
+ * 不处理 telnet 协商，只按 ISO-8859-1 保留最近的输出，用来等待 Affect( 、提示符这样的文本。
+ * </pre>
+ */
+class TermClient {
+    private static final byte CTRL_C = 0x03;
+    private static final int MAX_PENDING = 64 * 1024;
+
+    private final Socket socket;
+    private final OutputStream out;
+    private final StringBuilder pending = new StringBuilder();
+    private volatile long receivedBytes;
+    private volatile boolean closed;
+
+    TermClient(String host, int port) throws IOException {
+        socket = new Socket();
+        socket.connect(new InetSocketAddress(host, port), 5000);
+        out = socket.getOutputStream();
+        final InputStream in = socket.getInputStream();
+        Thread reader = new Thread("arthas-benchmark-term-reader") {
+            @Override
+            public void run() {
+                byte[] buffer = new byte[64 * 1024];
+                try {
+                    int n;
+                    while ((n = in.read(buffer)) >= 0) {
+                        receivedBytes += n;
+                        synchronized (pending) {
+                            pending.append(new String(buffer, 0, n, "ISO-8859-1"));
+                            if (pending.length() > MAX_PENDING) {
+                                pending.delete(0, pending.length() - MAX_PENDING / 2);
+                            }
+                            pending.notifyAll();
+                        }
+                    }
+                } catch (IOException e) {
+                    // socket 被关闭
+                } finally {
+                    closed = true;
+                    synchronized (pending) {
+                        pending.notifyAll();
+                    }
+                }
+            }
+        };
+        reader.setDaemon(true);
+        reader.start();
+    }
+
+    void send(String line) throws IOException {
+        out.write((line + "\n").getBytes("UTF-8"));
+        out.flush();
+    }
+
+    void interrupt() throws IOException {
+        out.write(CTRL_C);
+        out.flush();
+    }
+
+    /**
+     * 丢弃之前的输出，后面的 await 只匹配新的输出
+     */
+    void clear() {
+        synchronized (pending) {
+            pending.setLength(0);
+        }
+    }
+
+    /**
+     * 等待输出里出现任意一个 text，并丢弃匹配位置之前的输出
+     *
+     * @return 匹配到的 text
+     */
+    String await(long timeout, TimeUnit unit, String... texts) throws InterruptedException, TimeoutException {
+        long deadline = System.nanoTime() + unit.toNanos(timeout);
+        synchronized (pending) {
+            while (true) {
+                for (String text : texts) {
+                    int index = pending.indexOf(text);
+                    if (index >= 0) {
+                        pending.delete(0, index + text.length());
+                        return text;
+                    }
+                }
+                long remaining = deadline - System.nanoTime();
+                if (closed || remaining <= 0) {
+                    String tail = pending.substring(Math.max(0, pending.length() - 1024));
+                    throw new TimeoutException("waiting for " + Arrays.toString(texts)
+                            + (closed ? " but connection closed" : " timeout") + ", last output: " + tail);
+                }
+                pending.wait(Math.max(1, TimeUnit.NANOSECONDS.toMillis(remaining)));
+            }
+        }
+    }
+
+    long getReceivedBytes() {
+        return receivedBytes;
+    }
+
+    void close() {
+        try {
+            socket.close();
+        } catch (IOException e) {
+            // ignore
+        }
+    }
+}
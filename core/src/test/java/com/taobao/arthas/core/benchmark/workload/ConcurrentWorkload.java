@@ -0,0 +1,32 @@
+package com.taobao.arthas.core.benchmark.workload;
+
+import java.util.concurrent.Callable;
+import java.util.concurrent.ConcurrentHashMap;
+import java.util.concurrent.ConcurrentMap;
+import java.util.concurrent.atomic.AtomicLong;
+
+/**
+ * 很多线程同时调用一个很短的方法，更新共享的计数器，测试 listener 在并发下的开销
+ */
+public class ConcurrentWorkload implements Callable<Object> {
+    private static final ConcurrentMap<Integer, AtomicLong> counters = new ConcurrentHashMap<Integer, AtomicLong>();
+
+    private int counter;
+
+    @Override
+    public Object call() {
+        return handle(counter++ & 1023);
+    }
+
+    public long handle(int key) {
+        AtomicLong value = counters.get(key);
+        if (value == null) {
+            AtomicLong newValue = new AtomicLong();
+            value = counters.putIfAbsent(key, newValue);
+            if (value == null) {
+                value = newValue;
+            }
+        }
+        return value.incrementAndGet();
+    }
+}
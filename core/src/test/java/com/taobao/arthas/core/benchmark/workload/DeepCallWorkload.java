@@ -0,0 +1,43 @@
+package com.taobao.arthas.core.benchmark.workload;
+
+import java.util.concurrent.Callable;
+
+/**
+ * 很深的调用树：每一层调用下一层两次，一共 6 层，63 次调用，增强 level* 时每次调用都会经过 listener
+ */
+public class DeepCallWorkload implements Callable<Object> {
+    private long seed = 1;
+
+    @Override
+    public Object call() {
+        seed = level0(seed);
+        return seed;
+    }
+
+    long level0(long value) {
+        return level1(value) ^ level1(value + 1);
+    }
+
+    long level1(long value) {
+        return level2(value) + level2(value * 3);
+    }
+
+    long level2(long value) {
+        return level3(value) ^ level3(value + 7);
+    }
+
+    long level3(long value) {
+        return level4(value) + level4(value * 5);
+    }
+
+    long level4(long value) {
+        return level5(value) ^ level5(value + 11);
+    }
+
+    long level5(long value) {
+        value ^= value << 13;
+        value ^= value >>> 7;
+        value ^= value << 17;
+        return value;
+    }
+}
@@ -0,0 +1,65 @@
+package com.taobao.arthas.core.benchmark.workload;
+
+import java.util.ArrayList;
+import java.util.HashMap;
+import java.util.List;
+import java.util.Map;
+import java.util.concurrent.Callable;
+
+/**
+ * 参数是比较大的对象图：200 个订单，每个订单有属性和明细，watch -x 2 时会展开参数
+ */
+public class LargeArgumentWorkload implements Callable<Object> {
+    private final Map<String, Object> request = new HashMap<String, Object>();
+
+    public LargeArgumentWorkload() {
+        List<Order> orders = new ArrayList<Order>();
+        for (int i = 0; i < 200; ++i) {
+            Order order = new Order();
+            order.id = "order-" + i;
+            order.attributes.put("channel", i % 2 == 0 ? "web" : "app");
+            order.attributes.put("remark", "remark of order " + i);
+            for (int j = 0; j < 5; ++j) {
+                order.items.add(new Item("sku-" + i + "-" + j, j + 1, (i * 31 + j) * 100L));
+            }
+            orders.add(order);
+        }
+        request.put("orders", orders);
+        request.put("user", "benchmark");
+        request.put("payload", new byte[16 * 1024]);
+    }
+
+    @Override
+    public Object call() {
+        return handle(request);
+    }
+
+    @SuppressWarnings("unchecked")
+    public long handle(Map<String, Object> request) {
+        long total = 0;
+        for (Order order : (List<Order>) request.get("orders")) {
+            for (Item item : order.items) {
+                total += item.price * item.count;
+            }
+        }
+        return total;
+    }
+
+    public static class Order {
+        String id;
+        Map<String, String> attributes = new HashMap<String, String>();
+        List<Item> items = new ArrayList<Item>();
+    }
+
+    public static class Item {
+        final String sku;
+        final int count;
+        final long price;
+
+        Item(String sku, int count, long price) {
+            this.sku = sku;
+            this.count = count;
+            this.price = price;
+        }
+    }
+}
@@ -0,0 +1,23 @@
+package com.taobao.arthas.core.benchmark.workload;
+
+import java.util.concurrent.Callable;
+
+import demo.MathGame;
+
+/**
+ * 调用 demo 里的 MathGame.primeFactors，每次分解不同的数，和 demo 的 run() 一样会有少量的非法参数
+ */
+public class MathGameWorkload implements Callable<Object> {
+    private final MathGame game = new MathGame();
+    private int counter;
+
+    @Override
+    public Object call() {
+        int number = (counter++ * 7919) % 100000;
+        try {
+            return game.primeFactors(number);
+        } catch (IllegalArgumentException e) {
+            return e;
+        }
+    }
+}
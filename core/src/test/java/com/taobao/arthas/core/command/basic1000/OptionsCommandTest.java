@@ -0,0 +1,44 @@
+package com.taobao.arthas.core.command.basic1000;
+
+import org.assertj.core.api.Assertions;
+import org.junit.After;
+import org.junit.Test;
+import org.mockito.Mockito;
+
+import com.taobao.arthas.core.GlobalOptions;
+import com.taobao.arthas.core.shell.command.CommandProcess;
+
+/**
+ *
+ * @see OptionsCommand
+ */
+public class OptionsCommandTest {
+
+    @After
+    public void after() {
+        GlobalOptions.ttEviction = "fifo";
+    }
+
+    @Test
+    public void testChangeValueInValues() {
+        CommandProcess process = Mockito.mock(CommandProcess.class);
+        change(process, "tt-eviction", "LRU ");
+        Mockito.verify(process).end(0, null);
+        Assertions.assertThat(GlobalOptions.ttEviction).isEqualTo("lru");
+    }
+
+    @Test
+    public void testRejectValueNotInValues() {
+        CommandProcess process = Mockito.mock(CommandProcess.class);
+        change(process, "tt-eviction", "lfu");
+        Mockito.verify(process).end(Mockito.eq(-1), Mockito.contains("[fifo, lru]"));
+        Assertions.assertThat(GlobalOptions.ttEviction).isEqualTo("fifo");
+    }
+
+    private static void change(CommandProcess process, String name, String value) {
+        OptionsCommand command = new OptionsCommand();
+        command.setOptionName(name);
+        command.setOptionValue(value);
+        command.process(process);
+    }
+}
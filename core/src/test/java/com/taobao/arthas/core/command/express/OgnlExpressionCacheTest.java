@@ -0,0 +1,121 @@
+package com.taobao.arthas.core.command.express;
+
+import java.net.URL;
+import java.net.URLClassLoader;
+import java.util.Arrays;
+
+import org.assertj.core.api.Assertions;
+import org.junit.After;
+import org.junit.Test;
+
+import com.taobao.arthas.core.GlobalOptions;
+
+import ognl.Node;
+import ognl.Ognl;
+
+/**
+ *
+ * @see OgnlExpressionCache
+ */
+public class OgnlExpressionCacheTest {
+
+    @After
+    public void after() {
+        GlobalOptions.ognlCompile = false;
+    }
+
+    @Test
+    public void testParseOnce() throws Exception {
+        Assertions.assertThat(OgnlExpressionCache.get("params[0] + 1", CustomClassResolver.customClassResolver))
+                .isSameAs(OgnlExpressionCache.get("params[0] + 1", CustomClassResolver.customClassResolver));
+    }
+
+    @Test
+    public void testKeyByClassLoader() throws Exception {
+        ClassLoader loader1 = new URLClassLoader(new URL[0]);
+        ClassLoader loader2 = new URLClassLoader(new URL[0]);
+        String express = "@java.lang.Integer@MAX_VALUE";
+        OgnlExpressionCache.CachedExpression expression = OgnlExpressionCache.get(express,
+                new ClassLoaderClassResolver(loader1));
+        Assertions.assertThat(OgnlExpressionCache.get(express, new ClassLoaderClassResolver(loader1)))
+                .isSameAs(expression);
+        Assertions.assertThat(OgnlExpressionCache.get(express, new ClassLoaderClassResolver(loader2)))
+                .isNotSameAs(expression);
+    }
+
+    @Test
+    public void testEvictLeastRecentlyUsed() throws Exception {
+        OgnlExpressionCache.CachedExpression hot = OgnlExpressionCache.get("params[0] + 2",
+                CustomClassResolver.customClassResolver);
+        for (int i = 0; i < OgnlExpressionCache.MAX_SIZE * 2; ++i) {
+            OgnlExpressionCache.get("params[0] + " + (i + 100), CustomClassResolver.customClassResolver);
+            // 常用的表达式不会被淘汰
+            Assertions.assertThat(OgnlExpressionCache.get("params[0] + 2", CustomClassResolver.customClassResolver))
+                    .isSameAs(hot);
+        }
+        Assertions.assertThat(OgnlExpressionCache.size()).isEqualTo(OgnlExpressionCache.MAX_SIZE);
+    }
+
+    @Test
+    public void testSideEffectFree() throws Exception {
+        Assertions.assertThat(OgnlExpressionCache.isSideEffectFree((Node) Ognl.parseExpression("params[0].length > 1")))
+                .isTrue();
+        Assertions.assertThat(OgnlExpressionCache.isSideEffectFree((Node) Ognl.parseExpression("#x = params[0]")))
+                .isFalse();
+        Assertions.assertThat(OgnlExpressionCache.isSideEffectFree((Node) Ognl.parseExpression("params[0].clear()")))
+                .isFalse();
+    }
+
+    @Test
+    public void testCompileWithoutSideEffect() throws Exception {
+        GlobalOptions.ognlCompile = true;
+        Root root = new Root(1);
+        ExpressFactory.threadLocalExpress(root).get("increment()");
+        Assertions.assertThat(root.counter).isEqualTo(1);
+    }
+
+    @Test
+    public void testResetBindVariables() throws Exception {
+        Express express = ExpressFactory.threadLocalExpress(new Root(1)).bind("cost", 10);
+        Assertions.assertThat(express.is("params[0] == 1 && #cost > 5")).isTrue();
+
+        express = ExpressFactory.threadLocalExpress(new Root(2));
+        Assertions.assertThat(express.get("#cost")).isNull();
+        Assertions.assertThat(express.get("params[0]")).isEqualTo(2);
+    }
+
+    @Test
+    public void testCompile() throws Exception {
+        GlobalOptions.ognlCompile = true;
+        for (int i = 0; i < 3; ++i) {
+            Express express = ExpressFactory.threadLocalExpress(new Root(i));
+            Assertions.assertThat(express.get("params.length")).isEqualTo(1);
+            Assertions.assertThat(express.is("params[0] == " + i)).isTrue();
+        }
+        // 编译后的代码类型不匹配时回退到解释执行
+        Express express = ExpressFactory.threadLocalExpress(new Root("abc"));
+        Assertions.assertThat(express.get("params[0]")).isEqualTo("abc");
+    }
+
+    public static class Root {
+        private final Object[] params;
+        private int counter;
+
+        Root(Object... params) {
+            this.params = params;
+        }
+
+        public Object[] getParams() {
+            return params;
+        }
+
+        public int increment() {
+            return ++counter;
+        }
+
+        @Override
+        public String toString() {
+            return Arrays.toString(params);
+        }
+    }
+}
@@ -0,0 +1,66 @@
+package com.taobao.arthas.core.command.klass100;
+
+import java.io.File;
+import java.util.HashMap;
+import java.util.Map;
+
+import org.assertj.core.api.Assertions;
+import org.junit.Rule;
+import org.junit.Test;
+import org.junit.rules.TemporaryFolder;
+
+import com.taobao.arthas.core.util.FileUtils;
+
+/**
+ *
+ * @see JadCache
+ */
+public class JadCacheTest {
+
+    @Rule
+    public TemporaryFolder folder = new TemporaryFolder();
+
+    @Test
+    public void testSourceKey() throws Exception {
+        File classFile = folder.newFile("A.class");
+        FileUtils.writeByteArrayToFile(classFile, new byte[] { 1, 2, 3 });
+        Map<Class<?>, File> classFiles = new HashMap<Class<?>, File>();
+        classFiles.put(JadCacheTest.class, classFile);
+
+        String key = JadCache.sourceKey(classFiles, null, false);
+        Assertions.assertThat(key).isNotNull().isEqualTo(JadCache.sourceKey(classFiles, "", false));
+        Assertions.assertThat(JadCache.sourceKey(classFiles, "test", false)).isNotEqualTo(key);
+        Assertions.assertThat(JadCache.sourceKey(classFiles, null, true)).isNotEqualTo(key);
+
+        FileUtils.writeByteArrayToFile(classFile, new byte[] { 1, 2, 4 });
+        Assertions.assertThat(JadCache.sourceKey(classFiles, null, false)).isNotEqualTo(key);
+
+        classFile.delete();
+        Assertions.assertThat(JadCache.sourceKey(classFiles, null, false)).isNull();
+    }
+
+    @Test
+    public void testSourceOnDisk() throws Exception {
+        File directory = new File(folder.getRoot(), "jad");
+        new JadCache(directory).putSource("abc", "public class A {}");
+
+        JadCache cache = new JadCache(directory);
+        Assertions.assertThat(cache.getSource("abc")).isEqualTo("public class A {}");
+        Assertions.assertThat(cache.getSource("abd")).isNull();
+    }
+
+    @Test
+    public void testDump() throws Exception {
+        File classFile = folder.newFile("B.class");
+        FileUtils.writeByteArrayToFile(classFile, new byte[] { 1, 2, 3 });
+        JadCache cache = new JadCache(folder.getRoot());
+
+        cache.putDump(JadCacheTest.class, classFile, 1);
+        Assertions.assertThat(cache.getDump(JadCacheTest.class, 1)).isEqualTo(classFile);
+        Assertions.assertThat(cache.getDump(String.class, 1)).isNull();
+
+        // 字节码被修改过之后不再使用 dump 的文件
+        Assertions.assertThat(cache.getDump(JadCacheTest.class, 2)).isNull();
+        Assertions.assertThat(cache.getDump(JadCacheTest.class, 1)).isNull();
+    }
+}
@@ -0,0 +1,55 @@
+package com.taobao.arthas.core.command.monitor200;
+
+import java.util.Calendar;
+import java.util.List;
+
+import org.assertj.core.api.Assertions;
+import org.junit.Test;
+
+import com.taobao.arthas.core.command.monitor200.ContinuousProfiler.ProfileWindow;
+
+/**
+ *
+ * @see ContinuousProfiler
+ */
+public class ContinuousProfilerTest {
+
+    @Test
+    public void testRing() throws Exception {
+        ContinuousProfiler continuous = new ContinuousProfiler(null, "start,event=cpu,", "cpu", 60, 3);
+        long start = System.currentTimeMillis() - 5 * 60000;
+        for (int i = 1; i <= 5; ++i) {
+            long windowStart = start + (i - 1) * 60000L;
+            continuous.add(new ProfileWindow(i, windowStart, windowStart + 60000, "cpu", "a;b " + i + "\na;c 1\n"));
+        }
+
+        List<ProfileWindow> windows = continuous.windows();
+        Assertions.assertThat(windows).hasSize(3);
+        Assertions.assertThat(windows.get(0).getId()).isEqualTo(3);
+        Assertions.assertThat(windows.get(2).getId()).isEqualTo(5);
+        Assertions.assertThat(windows.get(2).getSamples()).isEqualTo(6);
+        Assertions.assertThat(windows.get(2).collapsed()).isEqualTo("a;b 5\na;c 1\n");
+
+        Assertions.assertThat(continuous.find("4").getId()).isEqualTo(4);
+        Assertions.assertThat(continuous.find("1")).isNull();
+        Assertions.assertThat(continuous.status()).contains("windows: 3/3");
+    }
+
+    @Test
+    public void testParseTime() {
+        Calendar calendar = Calendar.getInstance();
+        calendar.set(2020, Calendar.JANUARY, 2, 10, 30, 0);
+        calendar.set(Calendar.MILLISECOND, 0);
+        long now = calendar.getTimeInMillis();
+
+        Assertions.assertThat(now - ContinuousProfiler.parseTime("10:20", now)).isEqualTo(10 * 60000);
+        Assertions.assertThat(now - ContinuousProfiler.parseTime("10:29:30", now)).isEqualTo(30000);
+        // 比当前时间晚，认为是昨天
+        Assertions.assertThat(now - ContinuousProfiler.parseTime("10:40", now)).isEqualTo(24 * 3600000 - 10 * 60000);
+    }
+
+    @Test(expected = IllegalArgumentException.class)
+    public void testParseIllegalTime() {
+        ContinuousProfiler.parseTime("yesterday", System.currentTimeMillis());
+    }
+}
@@ -0,0 +1,63 @@
+package com.taobao.arthas.core.command.monitor200;
+
+import java.util.Locale;
+import java.util.Map;
+
+import org.assertj.core.api.Assertions;
+import org.junit.Test;
+
+/**
+ *
+ * @see FlameGraph
+ */
+public class FlameGraphTest {
+
+    private static final String COLLAPSED = "java.lang.Thread.run;demo.MathGame.main;demo.MathGame.run 30\n"
+            + "java.lang.Thread.run;demo.MathGame.main;demo.MathGame.primeFactors 60\n"
+            + "java.lang.Thread.run;demo.MathGame.main;demo.MathGame.run 10\n"
+            + "bad line\n";
+
+    @Test
+    public void testParseCollapsed() {
+        Map<String, Long> stacks = FlameGraph.parseCollapsed(COLLAPSED);
+        Assertions.assertThat(stacks).hasSize(2);
+        Assertions.assertThat(stacks.get("java.lang.Thread.run;demo.MathGame.main;demo.MathGame.run")).isEqualTo(40);
+        Assertions.assertThat(FlameGraph.totalSamples(stacks)).isEqualTo(100);
+        Assertions.assertThat(FlameGraph.totalSamples(COLLAPSED)).isEqualTo(100);
+    }
+
+    @Test
+    public void testRender() {
+        String svg = FlameGraph.render("window <1>", FlameGraph.parseCollapsed(COLLAPSED), null);
+        Assertions.assertThat(svg).startsWith("<?xml").endsWith("</svg>\n");
+        Assertions.assertThat(svg).contains("window &lt;1&gt;");
+        Assertions.assertThat(svg).contains("<title>all (100 samples, 100.00%)</title>");
+        Assertions.assertThat(svg).contains("<title>demo.MathGame.primeFactors (60 samples, 60.00%)</title>");
+    }
+
+    @Test
+    public void testRenderDiff() {
+        Map<String, Long> baseline = FlameGraph
+                .parseCollapsed("java.lang.Thread.run;demo.MathGame.main;demo.MathGame.run 80\n"
+                        + "java.lang.Thread.run;demo.MathGame.main;demo.MathGame.primeFactors 20\n");
+        String svg = FlameGraph.render("diff", FlameGraph.parseCollapsed(COLLAPSED), baseline);
+        // primeFactors 从 20% 变成 60%
+        Assertions.assertThat(svg).contains("demo.MathGame.primeFactors (60 samples, 60.00%, +40.00% vs baseline)");
+        Assertions.assertThat(svg).contains("demo.MathGame.run (40 samples, 40.00%, -40.00% vs baseline)");
+        Assertions.assertThat(svg).contains("fill=\"rgb(255,55,55)\"").contains("fill=\"rgb(55,55,255)\"");
+    }
+
+    @Test
+    public void testRenderWithDefaultLocale() {
+        Locale locale = Locale.getDefault();
+        // 德语的小数点是逗号
+        Locale.setDefault(Locale.GERMANY);
+        try {
+            String svg = FlameGraph.render("diff", FlameGraph.parseCollapsed(COLLAPSED),
+                    FlameGraph.parseCollapsed("java.lang.Thread.run;demo.MathGame.main;demo.MathGame.run 100\n"));
+            Assertions.assertThat(svg).contains("demo.MathGame.run (40 samples, 40.00%, -60.00% vs baseline)");
+        } finally {
+            Locale.setDefault(locale);
+        }
+    }
+}
@@ -0,0 +1,115 @@
+package com.taobao.arthas.core.command.monitor200;
+
+import java.io.ByteArrayOutputStream;
+import java.io.File;
+import java.io.FileInputStream;
+import java.io.IOException;
+import java.io.InputStream;
+import java.io.SequenceInputStream;
+import java.util.ArrayList;
+import java.util.Collections;
+import java.util.List;
+import java.util.Random;
+import java.util.zip.GZIPInputStream;
+
+import org.assertj.core.api.Assertions;
+import org.junit.Rule;
+import org.junit.Test;
+import org.junit.rules.TemporaryFolder;
+
+import com.taobao.arthas.core.util.FileUtils;
+
+/**
+ *
+ * @see HeapDumpStreamer
+ */
+public class HeapDumpStreamerTest {
+
+    @Rule
+    public TemporaryFolder folder = new TemporaryFolder();
+
+    private File source(int size) throws IOException {
+        byte[] data = new byte[size];
+        Random random = new Random(1);
+        for (int i = 0; i < size; ++i) {
+            // 可以压缩的数据
+            data[i] = (byte) random.nextInt(16);
+        }
+        File source = folder.newFile("dump.hprof");
+        FileUtils.writeByteArrayToFile(source, data);
+        return source;
+    }
+
+    private static byte[] readAll(InputStream in) throws IOException {
+        try {
+            ByteArrayOutputStream out = new ByteArrayOutputStream();
+            byte[] buffer = new byte[8192];
+            int n;
+            while ((n = in.read(buffer)) != -1) {
+                out.write(buffer, 0, n);
+            }
+            return out.toByteArray();
+        } finally {
+            in.close();
+        }
+    }
+
+    @Test
+    public void testChunkName() {
+        Assertions.assertThat(HeapDumpStreamer.chunkName("/tmp/dump.hprof.gz", 0)).isEqualTo("/tmp/dump.hprof.gz.0000");
+        Assertions.assertThat(HeapDumpStreamer.chunkName("dump.hprof.gz", 12)).isEqualTo("dump.hprof.gz.0012");
+    }
+
+    @Test
+    public void testConcatenatedChunks() throws IOException {
+        File source = source(300 * 1024);
+        File target = new File(folder.getRoot(), "dump.hprof.gz");
+        HeapDumpStreamer streamer = new HeapDumpStreamer(source, target, 100 * 1024, 0);
+        List<File> chunks = streamer.compress();
+
+        // 正好是分片大小的整数倍，不会多出空的分片
+        Assertions.assertThat(chunks).hasSize(3);
+        Assertions.assertThat(streamer.getReadBytes()).isEqualTo(source.length());
+        long written = 0;
+        List<InputStream> inputs = new ArrayList<InputStream>();
+        for (File chunk : chunks) {
+            Assertions.assertThat(chunk.getName()).startsWith("dump.hprof.gz.");
+            written += chunk.length();
+            inputs.add(new FileInputStream(chunk));
+        }
+        Assertions.assertThat(streamer.getWrittenBytes()).isEqualTo(written);
+        Assertions.assertThat(written).isLessThan(source.length());
+        for (String name : folder.getRoot().list()) {
+            Assertions.assertThat(name).doesNotEndWith(".tmp");
+        }
+
+        // 拼接起来是一个合法的 gzip 文件
+        byte[] data = readAll(new GZIPInputStream(new SequenceInputStream(Collections.enumeration(inputs))));
+        Assertions.assertThat(data).isEqualTo(readAll(new FileInputStream(source)));
+    }
+
+    @Test
+    public void testSingleFile() throws IOException {
+        File source = source(50 * 1024);
+        File target = new File(folder.getRoot(), "dump.hprof.gz");
+        List<File> files = new HeapDumpStreamer(source, target, 0, 0).compress();
+        Assertions.assertThat(files).containsExactly(target);
+        Assertions.assertThat(readAll(new GZIPInputStream(new FileInputStream(target))))
+                .isEqualTo(readAll(new FileInputStream(source)));
+    }
+
+    @Test
+    public void testMaxSize() throws IOException {
+        File source = source(200 * 1024);
+        File target = new File(folder.getRoot(), "dump.hprof.gz");
+        HeapDumpStreamer streamer = new HeapDumpStreamer(source, target, 64 * 1024, source.length() + 1024);
+        try {
+            streamer.compress();
+            Assertions.fail("should exceed the max size");
+        } catch (IOException e) {
+            Assertions.assertThat(e.getMessage()).contains("exceeds the max size");
+        }
+        // 超过限制时删除已经生成的分片
+        Assertions.assertThat(folder.getRoot().list()).containsExactly("dump.hprof");
+    }
+}
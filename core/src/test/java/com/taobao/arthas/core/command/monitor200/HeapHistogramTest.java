@@ -0,0 +1,50 @@
+package com.taobao.arthas.core.command.monitor200;
+
+import java.util.List;
+
+import org.assertj.core.api.Assertions;
+import org.junit.Test;
+
+import com.taobao.arthas.core.command.model.ClassHistogramVO;
+
+/**
+ *
+ * @see HeapHistogram
+ */
+public class HeapHistogramTest {
+
+    @Test
+    public void testParseJdk8() {
+        String output = "\n num     #instances         #bytes  class name\n"
+                + "----------------------------------------------\n"
+                + "   1:          2000         160000  [C\n"
+                + "   2:           500         480000  [B\n"
+                + "   3:          1000          24000  java.lang.String\n"
+                + "Total          3500         664000\n";
+        HeapHistogram histogram = HeapHistogram.parse(output);
+        Assertions.assertThat(histogram.getClassCount()).isEqualTo(3);
+        Assertions.assertThat(histogram.getTotalInstances()).isEqualTo(3500);
+        Assertions.assertThat(histogram.getTotalBytes()).isEqualTo(664000);
+
+        List<ClassHistogramVO> top = histogram.top(2);
+        Assertions.assertThat(top).hasSize(2);
+        Assertions.assertThat(top.get(0).getClassName()).isEqualTo("[B");
+        Assertions.assertThat(top.get(0).getInstances()).isEqualTo(500);
+        Assertions.assertThat(top.get(1).getClassName()).isEqualTo("[C");
+        Assertions.assertThat(histogram.top(10)).hasSize(3);
+    }
+
+    @Test
+    public void testParseWithModule() {
+        String output = " num     #instances         #bytes  class name (module)\n"
+                + "-------------------------------------------------------\n"
+                + "   1:          1234         567890  [B (java.base@11.0.2)\n"
+                + "   2:            10            240  com.example.Foo\n";
+        HeapHistogram histogram = HeapHistogram.parse(output);
+        Assertions.assertThat(histogram.getClassCount()).isEqualTo(2);
+        Assertions.assertThat(histogram.top(1).get(0).getClassName()).isEqualTo("[B");
+        // 没有 Total 行时累加每个类
+        Assertions.assertThat(histogram.getTotalInstances()).isEqualTo(1244);
+        Assertions.assertThat(histogram.getTotalBytes()).isEqualTo(568130);
+    }
+}
@@ -0,0 +1,124 @@
+package com.taobao.arthas.core.command.monitor200;
+
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.List;
+import java.util.concurrent.TimeUnit;
+
+import org.assertj.core.api.Assertions;
+import org.junit.Test;
+
+import com.taobao.arthas.core.command.model.ThreadVO;
+import com.taobao.arthas.core.command.monitor200.ThreadCpuSampler.Snapshot;
+
+/**
+ *
+ * @see ThreadCpuSampler
+ */
+public class ThreadCpuSamplerTest {
+
+    private static final long SECOND = TimeUnit.SECONDS.toNanos(1);
+    private static final long MS = TimeUnit.MILLISECONDS.toNanos(1);
+
+    @Test
+    public void testWindow() {
+        ThreadCpuSampler sampler = new ThreadCpuSampler();
+        // 每秒采样一次，线程 1 每秒用 100ms cpu，线程 2 只在最后 1 秒用了 500ms
+        for (int i = 0; i <= 120; i++) {
+            long thread2 = i == 120 ? 500 * MS : 0;
+            sampler.add(new Snapshot(i * SECOND, new long[] { 1, 2 }, new long[] { i * 100 * MS, thread2 }, null));
+        }
+        Snapshot latest = sampler.latestSnapshot();
+
+        // 最近 1 秒
+        List<ThreadVO> threads = ThreadCpuSampler.compute(threads(1, 2), latest,
+                sampler.findBaseline(latest.timeNanos - SECOND), false);
+        Assertions.assertThat(threads.get(0).getId()).isEqualTo(2);
+        Assertions.assertThat(threads.get(0).getCpu()).isEqualTo(50.0);
+        Assertions.assertThat(threads.get(1).getCpu()).isEqualTo(10.0);
+
+        // 最近 1 分钟，从粗粒度的历史里找到基准
+        Snapshot baseline = sampler.findBaseline(latest.timeNanos - 60 * SECOND);
+        Assertions.assertThat(baseline.timeNanos).isEqualTo(60 * SECOND);
+        threads = ThreadCpuSampler.compute(threads(1, 2), latest, baseline, false);
+        Assertions.assertThat(threads.get(0).getId()).isEqualTo(1);
+        Assertions.assertThat(threads.get(0).getDeltaTime()).isEqualTo(6000);
+        Assertions.assertThat(threads.get(0).getTime()).isEqualTo(12000);
+
+        // 历史不够 15 分钟时使用最早的采样
+        Assertions.assertThat(sampler.findBaseline(latest.timeNanos - 15 * 60 * SECOND).timeNanos).isEqualTo(0);
+    }
+
+    @Test
+    public void testNewThread() {
+        ThreadCpuSampler sampler = new ThreadCpuSampler();
+        sampler.add(new Snapshot(0, new long[] { 1 }, new long[] { 0 }, null));
+        sampler.add(new Snapshot(SECOND, new long[] { 1, 3 }, new long[] { 0, 200 * MS }, null));
+        List<ThreadVO> threads = ThreadCpuSampler.compute(threads(1, 3, 4), sampler.latestSnapshot(),
+                sampler.findBaseline(0), false);
+        // 窗口内新建的线程，所有的 cpu 时间都算在窗口内；已经退出的线程 cpu 为 0
+        Assertions.assertThat(threads.get(0).getId()).isEqualTo(3);
+        Assertions.assertThat(threads.get(0).getCpu()).isEqualTo(20.0);
+        Assertions.assertThat(threads.get(2).getCpu()).isEqualTo(0.0);
+    }
+
+    @Test
+    public void testTakeSnapshot() {
+        Snapshot snapshot = ThreadCpuSampler.takeSnapshot();
+        long[] ids = snapshot.ids.clone();
+        Arrays.sort(ids);
+        Assertions.assertThat(snapshot.ids).isEqualTo(ids);
+        Assertions.assertThat(Arrays.binarySearch(snapshot.ids, Thread.currentThread().getId())).isGreaterThanOrEqualTo(0);
+        Assertions.assertThat(snapshot.cpuTimes).hasSize(ids.length);
+    }
+
+    @Test
+    public void testGetThreads() throws Exception {
+        ThreadCpuSampler sampler = new ThreadCpuSampler();
+        Assertions.assertThat(ids(sampler.getThreads())).contains(Thread.currentThread().getId());
+
+        // 新启动的线程不在缓存里，会重新遍历 ThreadGroup
+        final Object lock = new Object();
+        Thread thread = new Thread("thread-cpu-sampler-test") {
+            @Override
+            public void run() {
+                synchronized (lock) {
+                    try {
+                        lock.wait();
+                    } catch (InterruptedException e) {
+                        // ignore
+                    }
+                }
+            }
+        };
+        thread.setDaemon(true);
+        thread.start();
+        try {
+            List<ThreadVO> threads = sampler.getThreads();
+            Assertions.assertThat(ids(threads)).contains(thread.getId());
+        } finally {
+            thread.interrupt();
+            thread.join();
+        }
+        Assertions.assertThat(ids(sampler.getThreads())).doesNotContain(thread.getId());
+    }
+
+    private static List<Long> ids(List<ThreadVO> threads) {
+        List<Long> ids = new ArrayList<Long>(threads.size());
+        for (ThreadVO thread : threads) {
+            ids.add(thread.getId());
+        }
+        return ids;
+    }
+
+    private static List<ThreadVO> threads(long... ids) {
+        List<ThreadVO> threads = new ArrayList<ThreadVO>();
+        for (long id : ids) {
+            ThreadVO thread = new ThreadVO();
+            thread.setId(id);
+            thread.setName("thread-" + id);
+            threads.add(thread);
+        }
+        return threads;
+    }
+}
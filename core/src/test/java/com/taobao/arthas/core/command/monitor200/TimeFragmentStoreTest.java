@@ -0,0 +1,126 @@
+package com.taobao.arthas.core.command.monitor200;
+
+import java.util.Date;
+import java.util.List;
+import java.util.concurrent.Executor;
+
+import org.assertj.core.api.Assertions;
+import org.junit.After;
+import org.junit.Rule;
+import org.junit.Test;
+import org.junit.rules.TemporaryFolder;
+
+import com.taobao.arthas.core.GlobalOptions;
+import com.taobao.arthas.core.advisor.Advice;
+import com.taobao.arthas.core.advisor.ArthasMethod;
+import com.taobao.arthas.core.command.model.TimeFragmentVO;
+
+/**
+ *
+ * @see TimeFragmentStore
+ */
+public class TimeFragmentStoreTest {
+
+    @Rule
+    public TemporaryFolder folder = new TemporaryFolder();
+
+    @After
+    public void after() {
+        GlobalOptions.ttMaxRecords = 10000;
+        GlobalOptions.ttEviction = "fifo";
+        GlobalOptions.ttSpill = false;
+        GlobalOptions.ttSpillMaxBytes = 256 * 1024 * 1024;
+    }
+
+    @Test
+    public void testFifoEviction() {
+        GlobalOptions.ttMaxRecords = 3;
+        TimeFragmentStore store = new TimeFragmentStore();
+        for (int i = 0; i < 5; ++i) {
+            store.put(i, timeFragment(i));
+        }
+        Assertions.assertThat(store.size()).isEqualTo(3);
+        Assertions.assertThat(store.indexes()).containsExactly(2, 3, 4);
+    }
+
+    @Test
+    public void testLruEviction() {
+        GlobalOptions.ttMaxRecords = 3;
+        GlobalOptions.ttEviction = "lru";
+        TimeFragmentStore store = new TimeFragmentStore();
+        store.put(0, timeFragment(0));
+        store.put(1, timeFragment(1));
+        store.put(2, timeFragment(2));
+        store.get(0);
+        store.put(3, timeFragment(3));
+        Assertions.assertThat(store.indexes()).containsExactly(0, 2, 3);
+    }
+
+    @Test
+    public void testRemoveAndClear() {
+        TimeFragmentStore store = new TimeFragmentStore();
+        store.put(1, timeFragment(1));
+        store.put(2, timeFragment(2));
+        Assertions.assertThat(store.remove(1)).isTrue();
+        Assertions.assertThat(store.remove(1)).isFalse();
+        Assertions.assertThat(store.get(2)).isNotNull();
+        store.clear();
+        Assertions.assertThat(store.size()).isEqualTo(0);
+    }
+
+    @Test
+    public void testSpill() throws Exception {
+        GlobalOptions.ttMaxRecords = 2;
+        GlobalOptions.ttSpill = true;
+        GlobalOptions.ttSpillMaxBytes = 1024 * 1024;
+        TimeFragmentStore store = new TimeFragmentStore(folder.newFile("tt-spill.dat"), new Executor() {
+            @Override
+            public void execute(Runnable command) {
+                command.run();
+            }
+        });
+        for (int i = 0; i < 5; ++i) {
+            store.put(i, timeFragment(i));
+        }
+        Assertions.assertThat(store.size()).isEqualTo(5);
+        Assertions.assertThat(store.indexes()).containsExactly(0, 1, 2, 3, 4);
+
+        // 磁盘上的记录从元数据生成列表，不包括参数
+        List<TimeFragmentVO> list = store.list();
+        Assertions.assertThat(list).hasSize(5);
+        Assertions.assertThat(list.get(0).getIndex()).isEqualTo(0);
+        Assertions.assertThat(list.get(0).getClassName()).isEqualTo("java.lang.String");
+        Assertions.assertThat(list.get(0).getObject()).isEqualTo("NULL");
+        Assertions.assertThat(list.get(0).getParams()).isNull();
+
+        TimeFragment restored = store.get(0);
+        Assertions.assertThat(restored.getAdvice().getParams()).containsExactly(0);
+        Assertions.assertThat(restored.getAdvice().getReturnObj()).isEqualTo("0");
+
+        Assertions.assertThat(store.remove(1)).isTrue();
+        Assertions.assertThat(store.get(1)).isNull();
+        Assertions.assertThat(store.size()).isEqualTo(4);
+
+        store.clear();
+        Assertions.assertThat(store.size()).isEqualTo(0);
+        Assertions.assertThat(store.list()).isEmpty();
+    }
+
+    @Test
+    public void testSerializeNotSerializable() throws Exception {
+        Object notSerializable = new Object();
+        byte[] data = TimeFragmentStore.serialize(new Object[] { new Object[] { "abc", 1, notSerializable }, null, null });
+        Object[] values = (Object[]) TimeFragmentStore.deserialize(data, getClass().getClassLoader());
+        Object[] params = (Object[]) values[0];
+        Assertions.assertThat(params[0]).isEqualTo("abc");
+        Assertions.assertThat(params[1]).isEqualTo(1);
+        Assertions.assertThat((String) params[2]).startsWith("java.lang.Object@");
+    }
+
+    private static TimeFragment timeFragment(int i) {
+        ArthasMethod method = new ArthasMethod(String.class, "valueOf", "(I)Ljava/lang/String;");
+        Advice advice = Advice.newForAfterRetuning(String.class.getClassLoader(), String.class, method, null,
+                new Object[] { i }, String.valueOf(i));
+        return new TimeFragment(advice, new Date(), 1.0);
+    }
+}
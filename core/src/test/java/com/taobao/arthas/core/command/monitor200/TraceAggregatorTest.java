@@ -0,0 +1,93 @@
+package com.taobao.arthas.core.command.monitor200;
+
+import java.io.File;
+import java.nio.charset.Charset;
+import java.util.Collections;
+import java.util.List;
+
+import org.assertj.core.api.Assertions;
+import org.junit.Rule;
+import org.junit.Test;
+import org.junit.rules.TemporaryFolder;
+
+import com.taobao.arthas.core.command.model.MethodNode;
+import com.taobao.arthas.core.command.model.TraceAggregateModel;
+import com.taobao.arthas.core.command.model.TraceNode;
+import com.taobao.arthas.core.util.FileUtils;
+
+/**
+ *
+ * @see TraceAggregator
+ */
+public class TraceAggregatorTest {
+
+    @Rule
+    public TemporaryFolder folder = new TemporaryFolder();
+
+    private static TraceEntity invoke(boolean isThrow) {
+        TraceEntity traceEntity = new TraceEntity(null);
+        traceEntity.begin("demo.MathGame", "run", -1, false);
+        traceEntity.begin("demo/MathGame", "primeFactors", 24, true);
+        traceEntity.end(isThrow);
+        if (!isThrow) {
+            traceEntity.begin("demo/MathGame", "print", 25, true);
+            traceEntity.end();
+        }
+        traceEntity.end();
+        return traceEntity;
+    }
+
+    @Test
+    public void testMerge() {
+        TraceAggregator aggregator = new TraceAggregator();
+        for (int i = 0; i < 10; ++i) {
+            aggregator.merge(invoke(i % 5 == 0));
+        }
+
+        TraceAggregateModel model = aggregator.snapshotAndReset(5);
+        Assertions.assertThat(model.getInvocations()).isEqualTo(10);
+        Assertions.assertThat(model.getCycle()).isEqualTo(5);
+        Assertions.assertThat(model.getNodes()).hasSize(1);
+
+        MethodNode run = (MethodNode) model.getNodes().get(0);
+        Assertions.assertThat(run.getTimes()).isEqualTo(10);
+        Assertions.assertThat(run.getP99Cost()).isNotNull();
+        List<TraceNode> children = run.getChildren();
+        Assertions.assertThat(children).hasSize(2);
+        MethodNode primeFactors = (MethodNode) children.get(0);
+        Assertions.assertThat(primeFactors.getClassName()).isEqualTo("demo.MathGame");
+        Assertions.assertThat(primeFactors.getTimes()).isEqualTo(10);
+        Assertions.assertThat(primeFactors.getThrow()).isTrue();
+        Assertions.assertThat(primeFactors.getMark()).isEqualTo("throws Exception: 2");
+        Assertions.assertThat(((MethodNode) children.get(1)).getTimes()).isEqualTo(8);
+
+        // 取出之后清零
+        Assertions.assertThat(aggregator.snapshotAndReset(5).getInvocations()).isZero();
+    }
+
+    @Test
+    public void testExportCollapsed() throws Exception {
+        MethodNode run = methodNode("run", 10000000);
+        run.addChild(methodNode("primeFactors", 6000000));
+        run.addChild(methodNode("print", 1000000));
+        List<TraceNode> nodes = Collections.<TraceNode>singletonList(run);
+
+        File file = new File(folder.getRoot(), "trace/trace.collapsed");
+        TraceAggregator.exportCollapsed(nodes, file);
+        TraceAggregator.exportCollapsed(nodes, file);
+
+        String content = FileUtils.readFileToString(file, Charset.forName("UTF-8"));
+        Assertions.assertThat(content).isEqualTo("demo.MathGame.run 3000\n"
+                + "demo.MathGame.run;demo.MathGame.primeFactors 6000\n"
+                + "demo.MathGame.run;demo.MathGame.print 1000\n"
+                + "demo.MathGame.run 3000\n"
+                + "demo.MathGame.run;demo.MathGame.primeFactors 6000\n"
+                + "demo.MathGame.run;demo.MathGame.print 1000\n");
+    }
+
+    private static MethodNode methodNode(String methodName, long totalCost) {
+        MethodNode methodNode = new MethodNode("demo.MathGame", methodName, -1, false);
+        methodNode.setTotalCost(totalCost);
+        return methodNode;
+    }
+}
@@ -0,0 +1,85 @@
+package com.taobao.arthas.core.command.monitor200;
+
+import java.util.List;
+
+import org.assertj.core.api.Assertions;
+import org.junit.Test;
+
+import com.taobao.arthas.core.command.model.MethodNode;
+import com.taobao.arthas.core.command.model.ThreadNode;
+import com.taobao.arthas.core.command.model.ThrowNode;
+import com.taobao.arthas.core.command.model.TraceModel;
+import com.taobao.arthas.core.command.model.TraceNode;
+
+/**
+ *
+ * @see TraceEntity
+ */
+public class TraceEntityTest {
+
+    @Test
+    public void testMergeSameInvoke() {
+        TraceEntity traceEntity = new TraceEntity(null);
+        traceEntity.begin("demo.MathGame", "run", -1, false);
+        for (int i = 0; i < 3; ++i) {
+            traceEntity.begin("demo/MathGame", "primeFactors", 24, true);
+            traceEntity.end();
+        }
+        traceEntity.begin("demo/MathGame", "print", 25, true);
+        traceEntity.end();
+        traceEntity.end();
+
+        TraceModel model = traceEntity.getModel();
+        Assertions.assertThat(model.getRoot()).isInstanceOf(ThreadNode.class);
+        Assertions.assertThat(model.getNodeCount()).isEqualTo(5);
+
+        MethodNode run = (MethodNode) model.getRoot().getChildren().get(0);
+        Assertions.assertThat(run.getMethodName()).isEqualTo("run");
+        Assertions.assertThat(run.getTimes()).isEqualTo(1);
+
+        List<TraceNode> children = run.getChildren();
+        Assertions.assertThat(children).hasSize(2);
+        MethodNode primeFactors = (MethodNode) children.get(0);
+        Assertions.assertThat(primeFactors.getClassName()).isEqualTo("demo.MathGame");
+        Assertions.assertThat(primeFactors.getTimes()).isEqualTo(3);
+        Assertions.assertThat(primeFactors.getTotalCost()).isGreaterThanOrEqualTo(primeFactors.getMaxCost());
+        Assertions.assertThat(primeFactors.getMaxCost()).isGreaterThanOrEqualTo(primeFactors.getMinCost());
+        Assertions.assertThat(primeFactors.parent()).isSameAs(run);
+        Assertions.assertThat(((MethodNode) children.get(1)).getLineNumber()).isEqualTo(25);
+    }
+
+    @Test
+    public void testThrow() {
+        TraceEntity traceEntity = new TraceEntity(null);
+        traceEntity.begin("demo.MathGame", "run", -1, false);
+        traceEntity.begin("demo/MathGame", "primeFactors", 24, true);
+        traceEntity.end(true);
+        Exception exception = new IllegalArgumentException("number is: -1, need >= 2");
+        traceEntity.end(exception);
+
+        MethodNode run = (MethodNode) traceEntity.getModel().getRoot().getChildren().get(0);
+        Assertions.assertThat(run.getThrow()).isTrue();
+        Assertions.assertThat(((MethodNode) run.getChildren().get(0)).getThrow()).isTrue();
+        ThrowNode throwNode = (ThrowNode) run.getChildren().get(1);
+        Assertions.assertThat(throwNode.getException()).isEqualTo(IllegalArgumentException.class.getName());
+        Assertions.assertThat(throwNode.getMessage()).isEqualTo("number is: -1, need >= 2");
+        Assertions.assertThat(throwNode.getLineNumber()).isEqualTo(exception.getStackTrace()[0].getLineNumber());
+    }
+
+    @Test
+    public void testReuse() {
+        TraceEntity traceEntity = new TraceEntity(null);
+        for (int round = 0; round < 3; ++round) {
+            traceEntity.begin("demo.MathGame", "run", -1, false);
+            for (int i = 0; i < 100; ++i) {
+                traceEntity.begin("demo/MathGame", "m" + i, i, true);
+                traceEntity.end();
+            }
+            traceEntity.end();
+            TraceModel model = traceEntity.getModel();
+            Assertions.assertThat(model.getNodeCount()).isEqualTo(101);
+            Assertions.assertThat(model.getRoot().getChildren().get(0).getChildren()).hasSize(100);
+            traceEntity.reset();
+        }
+    }
+}
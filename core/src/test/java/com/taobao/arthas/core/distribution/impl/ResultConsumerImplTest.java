@@ -0,0 +1,97 @@
+package com.taobao.arthas.core.distribution.impl;
+
+import java.util.List;
+
+import org.assertj.core.api.Assertions;
+import org.junit.Test;
+
+import com.taobao.arthas.core.command.model.InputStatus;
+import com.taobao.arthas.core.command.model.InputStatusModel;
+import com.taobao.arthas.core.command.model.MessageModel;
+import com.taobao.arthas.core.command.model.ResultModel;
+import com.taobao.arthas.core.distribution.ConsumerStats;
+import com.taobao.arthas.core.distribution.DropPolicy;
+
+/**
+ *
+ * @see ResultConsumerImpl
+ */
+public class ResultConsumerImplTest {
+
+    private static String message(ResultModel result) {
+        return ((MessageModel) result).getMessage();
+    }
+
+    @Test
+    public void testDropOldest() {
+        ResultConsumerImpl consumer = new ResultConsumerImpl(3, DropPolicy.DROP_OLDEST);
+        for (int i = 0; i < 5; ++i) {
+            consumer.appendResult(new MessageModel(String.valueOf(i)));
+        }
+        List<ResultModel> results = consumer.pollResults();
+        Assertions.assertThat(results).hasSize(3);
+        Assertions.assertThat(message(results.get(0))).isEqualTo("2");
+        Assertions.assertThat(message(results.get(2))).isEqualTo("4");
+
+        ConsumerStats stats = consumer.getStats();
+        Assertions.assertThat(stats.getReceived()).isEqualTo(5);
+        Assertions.assertThat(stats.getDropped()).isEqualTo(2);
+        Assertions.assertThat(stats.getDelivered()).isEqualTo(3);
+        Assertions.assertThat(stats.getLag()).isZero();
+    }
+
+    @Test
+    public void testDropNewest() {
+        ResultConsumerImpl consumer = new ResultConsumerImpl(3, DropPolicy.DROP_NEWEST);
+        for (int i = 0; i < 5; ++i) {
+            boolean accepted = consumer.appendResult(new MessageModel(String.valueOf(i)));
+            Assertions.assertThat(accepted).isEqualTo(i < 3);
+        }
+        Assertions.assertThat(consumer.getStats().getLag()).isEqualTo(3);
+        List<ResultModel> results = consumer.pollResults();
+        Assertions.assertThat(message(results.get(0))).isEqualTo("0");
+        Assertions.assertThat(message(results.get(2))).isEqualTo("2");
+    }
+
+    @Test
+    public void testCoalesce() {
+        ResultConsumerImpl consumer = new ResultConsumerImpl(3, DropPolicy.COALESCE);
+        consumer.appendResult(new InputStatusModel(InputStatus.ALLOW_INPUT));
+        consumer.appendResult(new MessageModel("0"));
+        consumer.appendResult(new MessageModel("1"));
+        // 丢弃最早的 MessageModel，保留 InputStatusModel
+        consumer.appendResult(new MessageModel("2"));
+
+        List<ResultModel> results = consumer.pollResults();
+        Assertions.assertThat(results).hasSize(3);
+        Assertions.assertThat(results.get(0)).isInstanceOf(InputStatusModel.class);
+        Assertions.assertThat(message(results.get(1))).isEqualTo("1");
+        Assertions.assertThat(message(results.get(2))).isEqualTo("2");
+    }
+
+    @Test
+    public void testLongPollingWakeUp() throws Exception {
+        final ResultConsumerImpl consumer = new ResultConsumerImpl(10, DropPolicy.DROP_OLDEST);
+        Thread producer = new Thread(new Runnable() {
+            @Override
+            public void run() {
+                try {
+                    Thread.sleep(200);
+                } catch (InterruptedException e) {
+                    // ignore
+                }
+                consumer.appendResult(new MessageModel("hello"));
+            }
+        });
+        producer.start();
+
+        long start = System.currentTimeMillis();
+        List<ResultModel> results = consumer.pollResults();
+        long cost = System.currentTimeMillis() - start;
+        producer.join();
+
+        Assertions.assertThat(results).hasSize(1);
+        // 有结果时马上返回，不会等到长轮询超时
+        Assertions.assertThat(cost).isLessThan(1500);
+    }
+}
@@ -0,0 +1,31 @@
+package com.taobao.arthas.core.shell.command.impl;
+
+import java.lang.reflect.Field;
+
+import org.assertj.core.api.Assertions;
+import org.junit.Test;
+
+import com.taobao.arthas.core.command.basic1000.EchoCommand;
+import com.taobao.middleware.cli.CLI;
+
+/**
+ *
+ * @see AnnotatedCommandImpl
+ */
+public class AnnotatedCommandImplTest {
+
+    @Test
+    public void testLazyCli() throws Exception {
+        AnnotatedCommandImpl command = new AnnotatedCommandImpl(EchoCommand.class);
+        Field cliField = AnnotatedCommandImpl.class.getDeclaredField("cli");
+        cliField.setAccessible(true);
+
+        Assertions.assertThat(command.name()).isEqualTo("echo");
+        Assertions.assertThat(cliField.get(command)).isNull();
+
+        CLI cli = command.cli();
+        Assertions.assertThat(cli.getName()).isEqualTo("echo");
+        Assertions.assertThat(cli.getOption("help")).isNotNull();
+        Assertions.assertThat(command.cli()).isSameAs(cli);
+    }
+}
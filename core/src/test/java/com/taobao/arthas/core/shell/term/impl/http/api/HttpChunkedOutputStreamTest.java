@@ -0,0 +1,78 @@
+package com.taobao.arthas.core.shell.term.impl.http.api;
+
+import java.io.ByteArrayOutputStream;
+import java.io.IOException;
+
+import org.assertj.core.api.Assertions;
+import org.junit.Test;
+
+import io.netty.channel.ChannelHandlerContext;
+import io.netty.channel.ChannelInboundHandlerAdapter;
+import io.netty.channel.embedded.EmbeddedChannel;
+import io.netty.handler.codec.http.HttpContent;
+
+/**
+ *
+ * @see HttpChunkedOutputStream
+ * @see InflightBytesBudget
+ */
+public class HttpChunkedOutputStreamTest {
+
+    @Test
+    public void testSplitChunks() throws IOException {
+        EmbeddedChannel channel = new EmbeddedChannel(new ChannelInboundHandlerAdapter());
+        ChannelHandlerContext ctx = channel.pipeline().firstContext();
+        InflightBytesBudget budget = new InflightBytesBudget(1024);
+
+        HttpChunkedOutputStream out = new HttpChunkedOutputStream(ctx, budget, 16, 1000);
+        byte[] data = new byte[40];
+        for (int i = 0; i < data.length; ++i) {
+            data[i] = (byte) i;
+        }
+        out.write(data, 0, 30);
+        out.write(data[30]);
+        out.write(data, 31, 9);
+        out.close();
+
+        Assertions.assertThat(out.getBytesWritten()).isEqualTo(40);
+        ByteArrayOutputStream received = new ByteArrayOutputStream();
+        int chunks = 0;
+        HttpContent content;
+        while ((content = channel.readOutbound()) != null) {
+            chunks++;
+            byte[] bytes = new byte[content.content().readableBytes()];
+            content.content().readBytes(bytes);
+            received.write(bytes);
+            content.release();
+        }
+        Assertions.assertThat(chunks).isEqualTo(3);
+        Assertions.assertThat(received.toByteArray()).isEqualTo(data);
+        // 写完成后额度全部归还
+        Assertions.assertThat(budget.getInflightBytes()).isEqualTo(0);
+    }
+
+    @Test
+    public void testBudget() throws InterruptedException {
+        InflightBytesBudget budget = new InflightBytesBudget(100);
+        // 没有在途数据时总是允许，即使超过上限
+        Assertions.assertThat(budget.acquire(200, 10)).isTrue();
+        Assertions.assertThat(budget.acquire(1, 10)).isFalse();
+        budget.release(200);
+        Assertions.assertThat(budget.acquire(60, 10)).isTrue();
+        Assertions.assertThat(budget.acquire(40, 10)).isTrue();
+        Assertions.assertThat(budget.acquire(1, 10)).isFalse();
+        Assertions.assertThat(budget.getInflightBytes()).isEqualTo(100);
+    }
+
+    @Test
+    public void testAbortReleaseBudget() throws IOException {
+        EmbeddedChannel channel = new EmbeddedChannel(new ChannelInboundHandlerAdapter());
+        InflightBytesBudget budget = new InflightBytesBudget(1024);
+        HttpChunkedOutputStream out = new HttpChunkedOutputStream(channel.pipeline().firstContext(), budget, 16, 1000);
+        out.write(new byte[8]);
+        Assertions.assertThat(budget.getInflightBytes()).isEqualTo(16);
+        out.abort();
+        Assertions.assertThat(budget.getInflightBytes()).isEqualTo(0);
+        Assertions.assertThat((Object) channel.readOutbound()).isNull();
+    }
+}
@@ -0,0 +1,82 @@
+package com.taobao.arthas.core.util;
+
+import java.lang.instrument.Instrumentation;
+import java.util.AbstractList;
+import java.util.ArrayList;
+import java.util.Collections;
+import java.util.HashMap;
+import java.util.HashSet;
+import java.util.LinkedList;
+import java.util.List;
+import java.util.Map;
+import java.util.Set;
+
+import org.assertj.core.api.Assertions;
+import org.junit.Test;
+import org.mockito.Mockito;
+
+import com.taobao.arthas.core.advisor.TransformerManager;
+import com.taobao.arthas.core.util.matcher.EqualsMatcher;
+import com.taobao.arthas.core.util.matcher.WildcardMatcher;
+
+/**
+ *
+ * @see LoadedClassIndex
+ */
+public class LoadedClassIndexTest {
+
+    private static final Class<?>[] CLASSES = new Class<?>[] { Object.class, AbstractList.class, ArrayList.class,
+            LinkedList.class, List.class, String.class, LoadedClassIndexTest.class };
+
+    private LoadedClassIndex createIndex() {
+        Instrumentation inst = Mockito.mock(Instrumentation.class);
+        Mockito.when(inst.getAllLoadedClasses()).thenReturn(CLASSES);
+        return new LoadedClassIndex(inst, null);
+    }
+
+    @Test
+    public void testLiteralPrefixAndSuffix() {
+        Assertions.assertThat(LoadedClassIndex.literalPrefix("java.util.*List")).isEqualTo("java.util.");
+        Assertions.assertThat(LoadedClassIndex.literalSuffix("java.util.*List")).isEqualTo("List");
+        Assertions.assertThat(LoadedClassIndex.literalPrefix("*")).isEmpty();
+        Assertions.assertThat(LoadedClassIndex.literalPrefix("java.lang.String")).isEqualTo("java.lang.String");
+    }
+
+    @Test
+    public void testSearch() {
+        LoadedClassIndex index = createIndex();
+        Assertions.assertThat(index.search(new EqualsMatcher<String>("java.lang.String"), Integer.MAX_VALUE))
+                .containsOnly(String.class);
+        Assertions.assertThat(index.search(new WildcardMatcher("java.util.*List"), Integer.MAX_VALUE))
+                .containsOnly(AbstractList.class, ArrayList.class, LinkedList.class, List.class);
+        Assertions.assertThat(index.search(new WildcardMatcher("*Index*"), Integer.MAX_VALUE))
+                .containsOnly(LoadedClassIndexTest.class);
+        Assertions.assertThat(index.search(new WildcardMatcher("java.*"), 2)).hasSize(2);
+    }
+
+    @Test
+    public void testIncrementalRefresh() throws Exception {
+        Instrumentation inst = Mockito.mock(Instrumentation.class);
+        Mockito.when(inst.getAllLoadedClasses()).thenReturn(CLASSES);
+        LoadedClassIndex index = new LoadedClassIndex(inst, new TransformerManager(inst));
+
+        Assertions.assertThat(index.search(new EqualsMatcher<String>("java.util.HashMap"), Integer.MAX_VALUE))
+                .isEmpty();
+        // 新加载的类只解析类名，不再扫描所有的类
+        index.transform(null, "java/util/HashMap", null, null, null);
+        index.transform(null, "com/example/NotExist", null, null, null);
+        Assertions.assertThat(index.search(new EqualsMatcher<String>("java.util.HashMap"), Integer.MAX_VALUE))
+                .containsOnly(HashMap.class);
+        Assertions.assertThat(index.searchSubClass(new HashSet<Class<?>>(Collections.<Class<?>>singleton(Map.class))))
+                .containsOnly(Map.class, HashMap.class);
+        Mockito.verify(inst, Mockito.times(1)).getAllLoadedClasses();
+    }
+
+    @Test
+    public void testSearchSubClass() {
+        LoadedClassIndex index = createIndex();
+        Set<Class<?>> classSet = new HashSet<Class<?>>(Collections.<Class<?>>singleton(List.class));
+        Assertions.assertThat(index.searchSubClass(classSet))
+                .containsOnly(List.class, AbstractList.class, ArrayList.class, LinkedList.class);
+    }
+}
@@ -0,0 +1,103 @@
+package com.taobao.arthas.core.util.metrics;
+
+import org.assertj.core.api.Assertions;
+import org.junit.Test;
+
+/**
+ * 
+ * @see LatencyHistogram
+ */
+public class LatencyHistogramTest {
+
+    @Test
+    public void testBucketIndex() {
+        for (long value = 0; value < 100000; ++value) {
+            int index = LatencyHistogram.bucketIndex(value);
+            Assertions.assertThat(LatencyHistogram.bucketUpperBound(index)).isGreaterThanOrEqualTo(value);
+            if (index > 0) {
+                Assertions.assertThat(LatencyHistogram.bucketUpperBound(index - 1)).isLessThan(value);
+            }
+        }
+        Assertions.assertThat(LatencyHistogram.bucketIndex(Long.MAX_VALUE))
+                .isEqualTo(LatencyHistogram.BUCKET_COUNT - 1);
+    }
+
+    @Test
+    public void testPercentile() {
+        LatencyHistogram histogram = new LatencyHistogram();
+        for (int i = 1; i <= 1000; ++i) {
+            histogram.record(i);
+        }
+        LatencyHistogram.Snapshot snapshot = histogram.snapshotAndReset();
+
+        Assertions.assertThat(snapshot.getCount()).isEqualTo(1000);
+        Assertions.assertThat(snapshot.getMax()).isEqualTo(1000);
+        Assertions.assertThat(snapshot.percentile(50)).isBetween(500L, 500L + 500L / 16);
+        Assertions.assertThat(snapshot.percentile(99)).isBetween(990L, 1000L);
+        Assertions.assertThat(snapshot.percentile(100)).isEqualTo(1000);
+
+        Assertions.assertThat(histogram.snapshot().getCount()).isEqualTo(0);
+    }
+
+    @Test
+    public void testMerge() {
+        LatencyHistogram h1 = new LatencyHistogram();
+        LatencyHistogram h2 = new LatencyHistogram();
+        h1.record(10);
+        h2.record(20);
+        h2.record(3000);
+
+        LatencyHistogram.Snapshot merged = h1.snapshot().merge(h2.snapshot());
+        Assertions.assertThat(merged.getCount()).isEqualTo(3);
+        Assertions.assertThat(merged.getMax()).isEqualTo(3000);
+        Assertions.assertThat(merged.percentile(50)).isEqualTo(20);
+    }
+
+    @Test
+    public void testConcurrentRecord() throws InterruptedException {
+        final LatencyHistogram histogram = new LatencyHistogram(4);
+        Thread[] threads = new Thread[8];
+        for (int i = 0; i < threads.length; ++i) {
+            final int max = (i + 1) * 100;
+            threads[i] = new Thread(new Runnable() {
+                @Override
+                public void run() {
+                    for (int j = 0; j < 10000; ++j) {
+                        histogram.record(j % max + 1);
+                    }
+                }
+            });
+            threads[i].start();
+        }
+        for (Thread thread : threads) {
+            thread.join();
+        }
+        LatencyHistogram.Snapshot snapshot = histogram.snapshotAndReset();
+        Assertions.assertThat(snapshot.getCount()).isEqualTo(80000);
+        Assertions.assertThat(snapshot.getMax()).isEqualTo(800);
+        Assertions.assertThat(histogram.snapshot().getCount()).isEqualTo(0);
+        Assertions.assertThat(histogram.snapshot().getMax()).isEqualTo(0);
+    }
+
+    @Test
+    public void testStripedCounter() throws InterruptedException {
+        final StripedCounter counter = new StripedCounter(4);
+        Thread[] threads = new Thread[8];
+        for (int i = 0; i < threads.length; ++i) {
+            threads[i] = new Thread(new Runnable() {
+                @Override
+                public void run() {
+                    for (int j = 0; j < 10000; ++j) {
+                        counter.increment();
+                    }
+                }
+            });
+            threads[i].start();
+        }
+        for (Thread thread : threads) {
+            thread.join();
+        }
+        Assertions.assertThat(counter.sumThenReset()).isEqualTo(80000);
+        Assertions.assertThat(counter.sum()).isEqualTo(0);
+    }
+}
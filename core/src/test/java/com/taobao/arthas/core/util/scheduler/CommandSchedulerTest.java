@@ -0,0 +1,187 @@
+package com.taobao.arthas.core.util.scheduler;
+
+import java.util.ArrayList;
+import java.util.Collections;
+import java.util.List;
+import java.util.concurrent.CountDownLatch;
+import java.util.concurrent.RejectedExecutionException;
+import java.util.concurrent.TimeUnit;
+import java.util.concurrent.atomic.AtomicInteger;
+
+import org.assertj.core.api.Assertions;
+import org.junit.After;
+import org.junit.Test;
+
+import com.taobao.arthas.core.command.model.SchedulerLaneVO;
+
+/**
+ *
+ * @see CommandScheduler
+ */
+public class CommandSchedulerTest {
+
+    private CommandScheduler scheduler;
+
+    @After
+    public void tearDown() {
+        if (scheduler != null) {
+            scheduler.shutdown();
+        }
+    }
+
+    /**
+     * 单个工作线程被占住时，排队的任务按 session 轮流执行，交互命令优先
+     */
+    @Test
+    public void testFairnessAndPriority() throws InterruptedException {
+        scheduler = new CommandScheduler(1, 100);
+        final CountDownLatch blocker = new CountDownLatch(1);
+        final CountDownLatch started = new CountDownLatch(1);
+        scheduler.execute("s0", TaskPriority.INTERACTIVE, new Runnable() {
+            @Override
+            public void run() {
+                started.countDown();
+                try {
+                    blocker.await();
+                } catch (InterruptedException e) {
+                    // ignore
+                }
+            }
+        });
+        Assertions.assertThat(started.await(5, TimeUnit.SECONDS)).isTrue();
+
+        final List<String> order = Collections.synchronizedList(new ArrayList<String>());
+        final CountDownLatch done = new CountDownLatch(5);
+        scheduler.execute("s1", TaskPriority.BACKGROUND, record(order, done, "bg"));
+        scheduler.execute("s1", TaskPriority.INTERACTIVE, record(order, done, "s1-a"));
+        scheduler.execute("s1", TaskPriority.INTERACTIVE, record(order, done, "s1-b"));
+        scheduler.execute("s1", TaskPriority.INTERACTIVE, record(order, done, "s1-c"));
+        scheduler.execute("s2", TaskPriority.INTERACTIVE, record(order, done, "s2-a"));
+
+        blocker.countDown();
+        Assertions.assertThat(done.await(5, TimeUnit.SECONDS)).isTrue();
+        Assertions.assertThat(order).containsExactly("s1-a", "s2-a", "s1-b", "s1-c", "bg");
+    }
+
+    @Test
+    public void testRejectWhenQueueFull() throws InterruptedException {
+        scheduler = new CommandScheduler(1, 1);
+        final CountDownLatch blocker = new CountDownLatch(1);
+        final CountDownLatch started = new CountDownLatch(1);
+        scheduler.execute(new Runnable() {
+            @Override
+            public void run() {
+                started.countDown();
+                try {
+                    blocker.await();
+                } catch (InterruptedException e) {
+                    // ignore
+                }
+            }
+        });
+        Assertions.assertThat(started.await(5, TimeUnit.SECONDS)).isTrue();
+        scheduler.execute(new Runnable() {
+            @Override
+            public void run() {
+            }
+        });
+        try {
+            scheduler.execute(new Runnable() {
+                @Override
+                public void run() {
+                }
+            });
+            Assertions.fail("should be rejected");
+        } catch (RejectedExecutionException e) {
+            // expected
+        }
+        blocker.countDown();
+
+        SchedulerLaneVO interactive = scheduler.getLaneStats().get(TaskPriority.INTERACTIVE.ordinal());
+        Assertions.assertThat(interactive.getSubmitted()).isEqualTo(2);
+        Assertions.assertThat(interactive.getRejected()).isEqualTo(1);
+    }
+
+    @Test
+    public void testScheduleAtFixedRate() throws InterruptedException {
+        scheduler = new CommandScheduler(2, 100);
+        final AtomicInteger count = new AtomicInteger();
+        final CountDownLatch latch = new CountDownLatch(3);
+        ScheduledTask task = scheduler.scheduleAtFixedRate("s1", TaskPriority.PERIODIC, new Runnable() {
+            @Override
+            public void run() {
+                count.incrementAndGet();
+                latch.countDown();
+            }
+        }, 0, 20, TimeUnit.MILLISECONDS);
+        Assertions.assertThat(latch.await(5, TimeUnit.SECONDS)).isTrue();
+        task.cancel();
+        Thread.sleep(100);
+        int executed = count.get();
+        Thread.sleep(200);
+        Assertions.assertThat(task.isCancelled()).isTrue();
+        Assertions.assertThat(count.get()).isEqualTo(executed);
+    }
+
+    /**
+     * 队列满了被拒绝之后，固定延迟和只执行一次的任务在队列空出来之后还会执行
+     */
+    @Test
+    public void testRetryWhenQueueFull() throws InterruptedException {
+        scheduler = new CommandScheduler(1, 1);
+        final CountDownLatch blocker = new CountDownLatch(1);
+        final CountDownLatch started = new CountDownLatch(1);
+        scheduler.execute(new Runnable() {
+            @Override
+            public void run() {
+                started.countDown();
+                try {
+                    blocker.await();
+                } catch (InterruptedException e) {
+                    // ignore
+                }
+            }
+        });
+        Assertions.assertThat(started.await(5, TimeUnit.SECONDS)).isTrue();
+        // 占满 PERIODIC 的队列
+        scheduler.execute(null, TaskPriority.PERIODIC, new Runnable() {
+            @Override
+            public void run() {
+            }
+        });
+
+        final CountDownLatch fixedDelay = new CountDownLatch(2);
+        ScheduledTask task = scheduler.scheduleWithFixedDelay("s1", TaskPriority.PERIODIC, new Runnable() {
+            @Override
+            public void run() {
+                fixedDelay.countDown();
+            }
+        }, 0, 20, TimeUnit.MILLISECONDS);
+        final CountDownLatch once = new CountDownLatch(1);
+        scheduler.schedule("s1", TaskPriority.PERIODIC, new Runnable() {
+            @Override
+            public void run() {
+                once.countDown();
+            }
+        }, 0, TimeUnit.MILLISECONDS);
+
+        Thread.sleep(200);
+        SchedulerLaneVO periodic = scheduler.getLaneStats().get(TaskPriority.PERIODIC.ordinal());
+        Assertions.assertThat(periodic.getRejected()).isGreaterThan(0);
+
+        blocker.countDown();
+        Assertions.assertThat(fixedDelay.await(5, TimeUnit.SECONDS)).isTrue();
+        Assertions.assertThat(once.await(5, TimeUnit.SECONDS)).isTrue();
+        task.cancel();
+    }
+
+    private static Runnable record(final List<String> order, final CountDownLatch done, final String name) {
+        return new Runnable() {
+            @Override
+            public void run() {
+                order.add(name);
+                done.countDown();
+            }
+        };
+    }
+}
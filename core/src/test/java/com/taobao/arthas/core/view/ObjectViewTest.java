@@ -206,11 +206,7 @@ public class ObjectViewTest {
                 "    code=@Integer[100],\n" +
                 "    c1=@NestedClass[\n" +
                 "        code=@Integer[1],\n" +
-                "        c1=@NestedClass[\n" +
-                "            code=@Integer[1],\n" +
-                "            c1=@NestedClass[com.taobao.arthas.core.view.ObjectViewTest$NestedClass@ffffffff],\n" +
-                "            c2=@NestedClass[com.taobao.arthas.core.view.ObjectViewTest$NestedClass@ffffffff],\n" +
-                "        ],\n" +
+                "        c1=@NestedClass[<cyclic reference>],\n" +
                 "        c2=@NestedClass[\n" +
                 "            code=@Integer[2],\n" +
                 "            c1=@NestedClass[com.taobao.arthas.core.view.ObjectViewTest$NestedClass@ffffffff],\n" +
@@ -224,11 +220,7 @@ public class ObjectViewTest {
                 "            c1=@NestedClass[com.taobao.arthas.core.view.ObjectViewTest$NestedClass@ffffffff],\n" +
                 "            c2=@NestedClass[com.taobao.arthas.core.view.ObjectViewTest$NestedClass@ffffffff],\n" +
                 "        ],\n" +
-                "        c2=@NestedClass[\n" +
-                "            code=@Integer[2],\n" +
-                "            c1=@NestedClass[com.taobao.arthas.core.view.ObjectViewTest$NestedClass@ffffffff],\n" +
-                "            c2=@NestedClass[com.taobao.arthas.core.view.ObjectViewTest$NestedClass@ffffffff],\n" +
-                "        ],\n" +
+                "        c2=@NestedClass[<cyclic reference>],\n" +
                 "    ],\n" +
                 "]";
         Assert.assertEquals(expected, replaceHashCode(objectView.draw()));
@@ -246,6 +238,116 @@ public class ObjectViewTest {
         Assert.assertEquals(expected, objectView.draw());
     }
 
+    @Test
+    public void testMaxElements() {
+        List<Integer> data = new ArrayList<Integer>();
+        for (int i = 0; i < 5; i++) {
+            data.add(i);
+        }
+        ObjectView objectView = new ObjectView(data, 3, 1000, 1000, 2);
+        String expected = "@ArrayList[\n" +
+                "    @Integer[0],\n" +
+                "    @Integer[1],\n" +
+                "    ...(3 more)\n" +
+                "]";
+        Assert.assertEquals(expected, objectView.draw());
+    }
+
+    @Test
+    public void testMaxNodes() {
+        List<Integer> data = new ArrayList<Integer>();
+        for (int i = 0; i < 5; i++) {
+            data.add(i);
+        }
+        // 列表本身也算一个节点
+        ObjectView objectView = new ObjectView(data, 3, 1000, 3, 1000);
+        String expected = "@ArrayList[\n" +
+                "    @Integer[0],\n" +
+                "    @Integer[1],\n" +
+                "    ... Object node count exceeds node limit: 3, try to specify a smaller -x expand level "
+                + "or change the render-max-nodes option, check the help command for more.";
+        Assert.assertEquals(expected, objectView.draw());
+    }
+
+    @Test
+    public void testCyclicReference() {
+        List<Object> data = new ArrayList<Object>();
+        data.add("aaa");
+        data.add(data);
+        ObjectView objectView = new ObjectView(data, 3);
+        String expected = "@ArrayList[\n" +
+                "    @String[aaa],\n" +
+                "    @ArrayList[<cyclic reference>],\n" +
+                "]";
+        Assert.assertEquals(expected, objectView.draw());
+    }
+
+    @Test
+    public void testDrawToAppendable() throws Exception {
+        Map<String, String> data = new LinkedHashMap<String, String>();
+        data.put("key1", "value1");
+        StringBuilder out = new StringBuilder("result=");
+        new ObjectView(data, 3).draw(out);
+        Assert.assertEquals("result=@LinkedHashMap[\n" +
+                "    @String[key1]:@String[value1],\n" +
+                "]", out.toString());
+    }
+
+    @Test
+    public void testSnapshot() {
+        List<String> data = new ArrayList<String>();
+        data.add("aaa");
+        Object snapshot = ObjectView.snapshot(data, 3);
+        data.add("bbb");
+
+        String expected = "@ArrayList[\n" +
+                "    @String[aaa],\n" +
+                "]";
+        Assert.assertEquals(expected, new ObjectView(snapshot, 3).draw());
+        Assert.assertEquals("@ArrayList[isEmpty=false;size=1]", new ObjectView(snapshot, 0).draw());
+        Assert.assertSame(data, ObjectView.snapshot(data, 0));
+    }
+
+    @Test
+    public void testSnapshotObject() {
+        SonBean sonBean = new SonBean();
+        sonBean.setI(10);
+        sonBean.setJ("test");
+        Object snapshot = ObjectView.snapshot(sonBean, 3);
+        sonBean.setJ("changed");
+
+        String result = new ObjectView(snapshot, 3).draw();
+        Assert.assertTrue(result.startsWith("@SonBean["));
+        Assert.assertTrue(result.contains("j=@String[test]"));
+        Assert.assertTrue(result.contains("i=@Integer[10]"));
+    }
+
+    @Test
+    public void testSnapshotNested() {
+        List<String> inner = new ArrayList<String>();
+        inner.add("aaa");
+        Map<String, List<String>> data = new LinkedHashMap<String, List<String>>();
+        data.put("key1", inner);
+        Object snapshot = ObjectView.snapshot(data, 2);
+        inner.add("bbb");
+        data.put("key2", inner);
+
+        String expected = "@LinkedHashMap[\n" +
+                "    @String[key1]:@ArrayList[\n" +
+                "        @String[aaa],\n" +
+                "    ],\n" +
+                "]";
+        Assert.assertEquals(expected, new ObjectView(snapshot, 2).draw());
+
+        // 没有展开的最后一层在渲染时读取
+        snapshot = ObjectView.snapshot(data, 1);
+        inner.add("ccc");
+        Assert.assertEquals("@LinkedHashMap[\n" +
+                "    @String[key1]:@ArrayList[isEmpty=false;size=3],\n" +
+                "    @String[key2]:@ArrayList[isEmpty=false;size=3],\n" +
+                "]", new ObjectView(snapshot, 1).draw());
+    }
+
     private String replaceHashCode(String input) {
         return input.replaceAll("@[0-9a-f]+", "@ffffffff");
     }
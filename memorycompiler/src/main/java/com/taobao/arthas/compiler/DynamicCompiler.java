@@ -1,7 +1,9 @@
 package com.taobao.arthas.compiler;
 
+import java.io.IOException;
 import java.util.ArrayList;
 import java.util.Collection;
+import java.util.HashMap;
 import java.util.List;
 import java.util.Locale;
 import java.util.Map;
@@ -14,16 +16,34 @@ import javax.tools.JavaFileObject;
 import javax.tools.StandardJavaFileManager;
 import javax.tools.ToolProvider;
 
+/**
+ * <pre>
+ * 同一个 DynamicCompiler 可以多次 addSource/build，多次编译之间复用：
+ * 1. JavaCompiler 和 StandardJavaFileManager
+ * 2. PackageInternalsFinder 里 ClassLoader 的 package 索引
+ * 3. 编译结果：这次 addSource 的所有文件和上次编译的完全一样时（文件集合和源码都相同）直接返回上次的结果，
+ *    只要有一个文件不同就全部重新编译，避免没有变化的文件依赖了变化的文件时拿到过期的 class
+ * 每次 build 使用新的 DynamicClassLoader，结果里包含这次 addSource 的所有文件的 class。
+ * </pre>
+ */
 public class DynamicCompiler {
     private final JavaCompiler javaCompiler = ToolProvider.getSystemJavaCompiler();
     private final StandardJavaFileManager standardFileManager;
     private final List<String> options = new ArrayList<String>();
-    private final DynamicClassLoader dynamicClassLoader;
+    private final ClassLoader parentClassLoader;
+    private final PackageInternalsFinder finder;
+    private DynamicClassLoader dynamicClassLoader;
 
     private final Collection<JavaFileObject> compilationUnits = new ArrayList<JavaFileObject>();
     private final List<Diagnostic<? extends JavaFileObject>> errors = new ArrayList<Diagnostic<? extends JavaFileObject>>();
     private final List<Diagnostic<? extends JavaFileObject>> warnings = new ArrayList<Diagnostic<? extends JavaFileObject>>();
 
+    /**
+     * 上次编译成功的源文件 uri -> 源码，以及编译结果
+     */
+    private Map<String, String> lastSources;
+    private Map<String, byte[]> lastByteCodes;
+
     public DynamicCompiler(ClassLoader classLoader) {
         if (javaCompiler == null) {
             throw new IllegalStateException(
@@ -33,7 +53,9 @@ public class DynamicCompiler {
         standardFileManager = javaCompiler.getStandardFileManager(null, null, null);
 
         options.add("-Xlint:unchecked");
+        parentClassLoader = classLoader;
         dynamicClassLoader = new DynamicClassLoader(classLoader);
+        finder = new PackageInternalsFinder(classLoader);
     }
 
     public void addSource(String className, String source) {
@@ -45,103 +67,86 @@ public class DynamicCompiler {
     }
 
     public Map<String, Class<?>> build() {
-
-        errors.clear();
-        warnings.clear();
-
-        JavaFileManager fileManager = new DynamicJavaFileManager(standardFileManager, dynamicClassLoader);
-
-        DiagnosticCollector<JavaFileObject> collector = new DiagnosticCollector<JavaFileObject>();
-        JavaCompiler.CompilationTask task = javaCompiler.getTask(null, fileManager, collector, options, null,
-                        compilationUnits);
-
         try {
-
-            if (!compilationUnits.isEmpty()) {
-                boolean result = task.call();
-
-                if (!result || collector.getDiagnostics().size() > 0) {
-
-                    for (Diagnostic<? extends JavaFileObject> diagnostic : collector.getDiagnostics()) {
-                        switch (diagnostic.getKind()) {
-                        case NOTE:
-                        case MANDATORY_WARNING:
-                        case WARNING:
-                            warnings.add(diagnostic);
-                            break;
-                        case OTHER:
-                        case ERROR:
-                        default:
-                            errors.add(diagnostic);
-                            break;
-                        }
-
-                    }
-
-                    if (!errors.isEmpty()) {
-                        throw new DynamicCompilerException("Compilation Error", errors);
-                    }
-                }
-            }
-
+            compile();
             return dynamicClassLoader.getClasses();
         } catch (Throwable e) {
             throw new DynamicCompilerException(e, errors);
         } finally {
             compilationUnits.clear();
-
         }
-
     }
 
     public Map<String, byte[]> buildByteCodes() {
+        try {
+            compile();
+            return dynamicClassLoader.getByteCodes();
+        } catch (ClassFormatError e) {
+            throw new DynamicCompilerException(e, errors);
+        } catch (IOException e) {
+            throw new DynamicCompilerException(e, errors);
+        } finally {
+            compilationUnits.clear();
+        }
+    }
 
+    /**
+     * 源文件集合和上次完全一样时直接使用上次的结果，否则全部重新编译
+     */
+    private void compile() throws IOException {
         errors.clear();
         warnings.clear();
+        dynamicClassLoader = new DynamicClassLoader(parentClassLoader);
 
-        JavaFileManager fileManager = new DynamicJavaFileManager(standardFileManager, dynamicClassLoader);
+        Map<String, String> sources = new HashMap<String, String>();
+        for (JavaFileObject unit : compilationUnits) {
+            sources.put(unit.toUri().toString(), unit.getCharContent(true).toString());
+        }
+        if (lastByteCodes != null && sources.equals(lastSources)) {
+            for (Map.Entry<String, byte[]> entry : lastByteCodes.entrySet()) {
+                dynamicClassLoader.registerCompiledSource(new MemoryByteCode(entry.getKey(), entry.getValue()));
+            }
+            return;
+        }
+        lastSources = null;
+        lastByteCodes = null;
+
+        // 上次没有找到的 package 可能已经被加载了
+        finder.clearMisses();
+        DynamicJavaFileManager fileManager = new DynamicJavaFileManager(standardFileManager, dynamicClassLoader,
+                        finder);
 
         DiagnosticCollector<JavaFileObject> collector = new DiagnosticCollector<JavaFileObject>();
         JavaCompiler.CompilationTask task = javaCompiler.getTask(null, fileManager, collector, options, null,
                         compilationUnits);
 
-        try {
-
-            if (!compilationUnits.isEmpty()) {
-                boolean result = task.call();
-
-                if (!result || collector.getDiagnostics().size() > 0) {
-
-                    for (Diagnostic<? extends JavaFileObject> diagnostic : collector.getDiagnostics()) {
-                        switch (diagnostic.getKind()) {
-                        case NOTE:
-                        case MANDATORY_WARNING:
-                        case WARNING:
-                            warnings.add(diagnostic);
-                            break;
-                        case OTHER:
-                        case ERROR:
-                        default:
-                            errors.add(diagnostic);
-                            break;
-                        }
-
-                    }
-
-                    if (!errors.isEmpty()) {
-                        throw new DynamicCompilerException("Compilation Error", errors);
-                    }
+        boolean result = task.call();
+
+        if (!result || collector.getDiagnostics().size() > 0) {
+
+            for (Diagnostic<? extends JavaFileObject> diagnostic : collector.getDiagnostics()) {
+                switch (diagnostic.getKind()) {
+                case NOTE:
+                case MANDATORY_WARNING:
+                case WARNING:
+                    warnings.add(diagnostic);
+                    break;
+                case OTHER:
+                case ERROR:
+                default:
+                    errors.add(diagnostic);
+                    break;
                 }
-            }
 
-            return dynamicClassLoader.getByteCodes();
-        } catch (ClassFormatError e) {
-            throw new DynamicCompilerException(e, errors);
-        } finally {
-            compilationUnits.clear();
+            }
 
+            if (!errors.isEmpty()) {
+                throw new DynamicCompilerException("Compilation Error", errors);
+            }
         }
 
+        lastSources = sources;
+        lastByteCodes = dynamicClassLoader.getByteCodes();
     }
 
     private List<String> diagnosticToString(List<Diagnostic<? extends JavaFileObject>> diagnostics) {
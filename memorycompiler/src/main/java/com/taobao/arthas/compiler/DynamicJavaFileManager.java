@@ -22,10 +22,14 @@ public class DynamicJavaFileManager extends ForwardingJavaFileManager<JavaFileMa
     private final List<MemoryByteCode> byteCodes = new ArrayList<MemoryByteCode>();
 
     public DynamicJavaFileManager(JavaFileManager fileManager, DynamicClassLoader classLoader) {
+        this(fileManager, classLoader, new PackageInternalsFinder(classLoader));
+    }
+
+    public DynamicJavaFileManager(JavaFileManager fileManager, DynamicClassLoader classLoader,
+                    PackageInternalsFinder finder) {
         super(fileManager);
         this.classLoader = classLoader;
-
-        finder = new PackageInternalsFinder(classLoader);
+        this.finder = finder;
     }
 
     @Override
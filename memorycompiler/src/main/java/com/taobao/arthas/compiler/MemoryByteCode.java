@@ -46,6 +46,15 @@ public class MemoryByteCode extends SimpleJavaFileObject {
         this.byteArrayOutputStream = byteArrayOutputStream;
     }
 
+    /**
+     * 上次编译的结果
+     */
+    public MemoryByteCode(String className, byte[] byteCode) {
+        this(className);
+        this.byteArrayOutputStream = new ByteArrayOutputStream(byteCode.length);
+        this.byteArrayOutputStream.write(byteCode, 0, byteCode.length);
+    }
+
     @Override
     public OutputStream openOutputStream() throws IOException {
         if (byteArrayOutputStream == null) {
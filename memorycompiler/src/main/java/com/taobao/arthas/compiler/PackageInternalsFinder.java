@@ -28,32 +28,68 @@ import java.net.URI;
 import java.net.URL;
 import java.util.ArrayList;
 import java.util.Collection;
+import java.util.Collections;
 import java.util.Enumeration;
+import java.util.HashMap;
+import java.util.Iterator;
 import java.util.List;
+import java.util.Map;
 import java.util.jar.JarEntry;
 
+/**
+ * <pre>
+ * 查找 ClassLoader 里某个 package 下的 class。
+ * 结果会被缓存，同一个 finder 可以在多次编译之间复用：
+ * 1. package 对应的 URL（ClassLoader#getResources）只查询一次。没有找到的 package 只在一次编译里缓存，
+ *    之后可能被加载，每次编译前调用 {@link #clearMisses()} 清掉
+ * 2. jar 包在第一次用到时遍历一次所有的 entry，按目录建立索引，之后不再遍历
+ * 3. 目录里的 class 文件在目录修改过之后重新列出
+ * </pre>
+ */
 public class PackageInternalsFinder {
     private final ClassLoader classLoader;
     private static final String CLASS_FILE_EXTENSION = ".class";
 
+    private final Map<String, List<URL>> packageUrls = new HashMap<String, List<URL>>();
+    private final Map<String, Map<String, List<String>>> jarIndexes = new HashMap<String, Map<String, List<String>>>();
+    private final Map<File, DirectoryListing> directoryListings = new HashMap<File, DirectoryListing>();
+
     public PackageInternalsFinder(ClassLoader classLoader) {
         this.classLoader = classLoader;
     }
 
-    public List<JavaFileObject> find(String packageName) throws IOException {
-        String javaPackageName = packageName.replaceAll("\\.", "/");
+    public synchronized List<JavaFileObject> find(String packageName) throws IOException {
+        List<URL> urls = packageUrls.get(packageName);
+        if (urls == null) {
+            String javaPackageName = packageName.replaceAll("\\.", "/");
+            urls = new ArrayList<URL>(1);
+            Enumeration<URL> urlEnumeration = classLoader.getResources(javaPackageName);
+            while (urlEnumeration.hasMoreElements()) { // one URL for each jar on the classpath that has the given package
+                urls.add(urlEnumeration.nextElement());
+            }
+            packageUrls.put(packageName, urls.isEmpty() ? Collections.<URL>emptyList() : urls);
+        }
 
         List<JavaFileObject> result = new ArrayList<JavaFileObject>();
-
-        Enumeration<URL> urlEnumeration = classLoader.getResources(javaPackageName);
-        while (urlEnumeration.hasMoreElements()) { // one URL for each jar on the classpath that has the given package
-            URL packageFolderURL = urlEnumeration.nextElement();
+        for (URL packageFolderURL : urls) {
             result.addAll(listUnder(packageName, packageFolderURL));
         }
 
         return result;
     }
 
+    /**
+     * 清掉没有找到的 package 的缓存
+     */
+    public synchronized void clearMisses() {
+        Iterator<List<URL>> it = packageUrls.values().iterator();
+        while (it.hasNext()) {
+            if (it.next().isEmpty()) {
+                it.remove();
+            }
+        }
+    }
+
     private Collection<JavaFileObject> listUnder(String packageName, URL packageFolderURL) {
         File directory = new File(packageFolderURL.getFile());
         if (directory.isDirectory()) { // browse local .class files - useful for local execution
@@ -70,13 +106,19 @@ public class PackageInternalsFinder {
 
             JarURLConnection jarConn = (JarURLConnection) packageFolderURL.openConnection();
             String rootEntryName = jarConn.getEntryName();
-            int rootEnd = rootEntryName.length() + 1;
+            if (rootEntryName.endsWith("/")) {
+                rootEntryName = rootEntryName.substring(0, rootEntryName.length() - 1);
+            }
+
+            Map<String, List<String>> index = jarIndexes.get(jarUri);
+            if (index == null) {
+                index = indexJar(jarConn);
+                jarIndexes.put(jarUri, index);
+            }
 
-            Enumeration<JarEntry> entryEnum = jarConn.getJarFile().entries();
-            while (entryEnum.hasMoreElements()) {
-                JarEntry jarEntry = entryEnum.nextElement();
-                String name = jarEntry.getName();
-                if (name.startsWith(rootEntryName) && name.indexOf('/', rootEnd) == -1 && name.endsWith(CLASS_FILE_EXTENSION)) {
+            List<String> names = index.get(rootEntryName);
+            if (names != null) {
+                for (String name : names) {
                     URI uri = URI.create(jarUri + "!/" + name);
                     String binaryName = name.replaceAll("/", ".");
                     binaryName = binaryName.replaceAll(CLASS_FILE_EXTENSION + "$", "");
@@ -90,7 +132,37 @@ public class PackageInternalsFinder {
         return result;
     }
 
+    /**
+     * 遍历 jar 包里所有的 entry，按所在的目录分组
+     */
+    private Map<String, List<String>> indexJar(JarURLConnection jarConn) throws IOException {
+        Map<String, List<String>> index = new HashMap<String, List<String>>();
+        Enumeration<JarEntry> entryEnum = jarConn.getJarFile().entries();
+        while (entryEnum.hasMoreElements()) {
+            JarEntry jarEntry = entryEnum.nextElement();
+            String name = jarEntry.getName();
+            if (!name.endsWith(CLASS_FILE_EXTENSION)) {
+                continue;
+            }
+            int lastSlash = name.lastIndexOf('/');
+            String dir = lastSlash < 0 ? "" : name.substring(0, lastSlash);
+            List<String> names = index.get(dir);
+            if (names == null) {
+                names = new ArrayList<String>();
+                index.put(dir, names);
+            }
+            names.add(name);
+        }
+        return index;
+    }
+
     private List<JavaFileObject> processDir(String packageName, File directory) {
+        DirectoryListing listing = directoryListings.get(directory);
+        long lastModified = directory.lastModified();
+        if (listing != null && listing.lastModified == lastModified) {
+            return listing.files;
+        }
+
         List<JavaFileObject> result = new ArrayList<JavaFileObject>();
 
         File[] childFiles = directory.listFiles();
@@ -106,6 +178,17 @@ public class PackageInternalsFinder {
             }
         }
 
+        directoryListings.put(directory, new DirectoryListing(lastModified, result));
         return result;
     }
+
+    private static class DirectoryListing {
+        private final long lastModified;
+        private final List<JavaFileObject> files;
+
+        DirectoryListing(long lastModified, List<JavaFileObject> files) {
+            this.lastModified = lastModified;
+            this.files = files;
+        }
+    }
 }
@@ -6,6 +6,7 @@ import java.io.InputStream;
 import java.net.URL;
 import java.net.URLClassLoader;
 import java.nio.charset.Charset;
+import java.util.Arrays;
 import java.util.Map;
 
 import org.apache.commons.io.IOUtils;
@@ -42,4 +43,47 @@ public class DynamicCompilerTest {
         Assert.assertTrue("TestLogger2", byteCodes.containsKey("com.hello.TestLogger2"));
     }
 
+    @Test
+    public void testIncrementalBuild() throws IOException {
+        String jarPath = LoggerFactory.class.getProtectionDomain().getCodeSource().getLocation().getFile();
+        File file = new File(jarPath);
+
+        URLClassLoader classLoader = new URLClassLoader(new URL[] { file.toURI().toURL() },
+                        ClassLoader.getSystemClassLoader().getParent());
+
+        DynamicCompiler dynamicCompiler = new DynamicCompiler(classLoader);
+
+        InputStream logger1Stream = DynamicCompilerTest.class.getClassLoader().getResourceAsStream("TestLogger1.java");
+        InputStream logger2Stream = DynamicCompilerTest.class.getClassLoader().getResourceAsStream("TestLogger2.java");
+        String logger1 = IOUtils.toString(logger1Stream, Charset.defaultCharset());
+        String logger2 = IOUtils.toString(logger2Stream, Charset.defaultCharset());
+
+        dynamicCompiler.addSource("TestLogger2", logger2);
+        dynamicCompiler.addSource("TestLogger1", logger1);
+        Map<String, byte[]> first = dynamicCompiler.buildByteCodes();
+
+        // 源文件集合完全一样，直接返回上次的结果
+        dynamicCompiler.addSource("TestLogger1", logger1);
+        dynamicCompiler.addSource("TestLogger2", logger2);
+        Map<String, byte[]> second = dynamicCompiler.buildByteCodes();
+        Assert.assertEquals(first.keySet(), second.keySet());
+        Assert.assertArrayEquals(first.get("com.test.TestLogger1"), second.get("com.test.TestLogger1"));
+        Assert.assertArrayEquals(first.get("com.hello.TestLogger2"), second.get("com.hello.TestLogger2"));
+
+        // 有一个文件变化时全部重新编译
+        dynamicCompiler.addSource("TestLogger2", logger2.replace("{", "{\n    public void hello() {}\n"));
+        dynamicCompiler.addSource("TestLogger1", logger1);
+        Map<String, byte[]> third = dynamicCompiler.buildByteCodes();
+
+        Assert.assertTrue("TestLogger1", third.containsKey("com.test.TestLogger1"));
+        Assert.assertTrue("TestLogger2", third.containsKey("com.hello.TestLogger2"));
+        Assert.assertFalse(Arrays.equals(first.get("com.hello.TestLogger2"), third.get("com.hello.TestLogger2")));
+
+        // 只编译其中一个文件时不会返回上次其它文件的结果
+        dynamicCompiler.addSource("TestLogger1", logger1);
+        Map<String, byte[]> fourth = dynamicCompiler.buildByteCodes();
+        Assert.assertTrue("TestLogger1", fourth.containsKey("com.test.TestLogger1"));
+        Assert.assertFalse("TestLogger2", fourth.containsKey("com.hello.TestLogger2"));
+    }
+
 }
@@ -81,6 +81,31 @@ public class SpyAPI {
         spyInstance.atInvokeException(clazz, invokeInfo, target, throwable);
     }
 
+    public static void atEnter(Class<?> clazz, int siteId, Object target, Object[] args) {
+        spyInstance.atEnter(clazz, siteId, target, args);
+    }
+
+    public static void atExit(Class<?> clazz, int siteId, Object target, Object[] args, Object returnObject) {
+        spyInstance.atExit(clazz, siteId, target, args, returnObject);
+    }
+
+    public static void atExceptionExit(Class<?> clazz, int siteId, Object target, Object[] args,
+            Throwable throwable) {
+        spyInstance.atExceptionExit(clazz, siteId, target, args, throwable);
+    }
+
+    public static void atBeforeInvoke(Class<?> clazz, int siteId, Object target) {
+        spyInstance.atBeforeInvoke(clazz, siteId, target);
+    }
+
+    public static void atAfterInvoke(Class<?> clazz, int siteId, Object target) {
+        spyInstance.atAfterInvoke(clazz, siteId, target);
+    }
+
+    public static void atInvokeException(Class<?> clazz, int siteId, Object target, Throwable throwable) {
+        spyInstance.atInvokeException(clazz, siteId, target, throwable);
+    }
+
     public static abstract class AbstractSpy {
         public abstract void atEnter(Class<?> clazz, String methodInfo, Object target,
                 Object[] args);
@@ -96,6 +121,22 @@ public class SpyAPI {
         public abstract void atAfterInvoke(Class<?> clazz, String invokeInfo, Object target);
 
         public abstract void atInvokeException(Class<?> clazz, String invokeInfo, Object target, Throwable throwable);
+
+        /**
+         * 以下为按 site id 分发的版本，site id 在增强时分配，运行时不需要再解析字符串
+         */
+        public abstract void atEnter(Class<?> clazz, int siteId, Object target, Object[] args);
+
+        public abstract void atExit(Class<?> clazz, int siteId, Object target, Object[] args, Object returnObject);
+
+        public abstract void atExceptionExit(Class<?> clazz, int siteId, Object target, Object[] args,
+                Throwable throwable);
+
+        public abstract void atBeforeInvoke(Class<?> clazz, int siteId, Object target);
+
+        public abstract void atAfterInvoke(Class<?> clazz, int siteId, Object target);
+
+        public abstract void atInvokeException(Class<?> clazz, int siteId, Object target, Throwable throwable);
     }
 
     static class NopSpy extends AbstractSpy {
@@ -129,5 +170,29 @@ public class SpyAPI {
 
         }
 
+        @Override
+        public void atEnter(Class<?> clazz, int siteId, Object target, Object[] args) {
+        }
+
+        @Override
+        public void atExit(Class<?> clazz, int siteId, Object target, Object[] args, Object returnObject) {
+        }
+
+        @Override
+        public void atExceptionExit(Class<?> clazz, int siteId, Object target, Object[] args, Throwable throwable) {
+        }
+
+        @Override
+        public void atBeforeInvoke(Class<?> clazz, int siteId, Object target) {
+        }
+
+        @Override
+        public void atAfterInvoke(Class<?> clazz, int siteId, Object target) {
+        }
+
+        @Override
+        public void atInvokeException(Class<?> clazz, int siteId, Object target, Throwable throwable) {
+        }
+
     }
 }
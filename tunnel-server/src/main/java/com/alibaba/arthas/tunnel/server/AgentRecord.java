@@ -0,0 +1,49 @@
+package com.alibaba.arthas.tunnel.server;
+
+/**
+ * agent 注册在 AgentRegistry 里的信息，可以在 tunnel server 节点之间共享
+ * 
+ * @see AgentRegistry
+ */
+public class AgentRecord {
+
+    /**
+     * agent 连接的 tunnel server 节点地址，host:port
+     */
+    private String nodeAddress;
+    private String host;
+    private int port;
+
+    public AgentRecord() {
+    }
+
+    public AgentRecord(String nodeAddress, String host, int port) {
+        this.nodeAddress = nodeAddress;
+        this.host = host;
+        this.port = port;
+    }
+
+    public String getNodeAddress() {
+        return nodeAddress;
+    }
+
+    public void setNodeAddress(String nodeAddress) {
+        this.nodeAddress = nodeAddress;
+    }
+
+    public String getHost() {
+        return host;
+    }
+
+    public void setHost(String host) {
+        this.host = host;
+    }
+
+    public int getPort() {
+        return port;
+    }
+
+    public void setPort(int port) {
+        this.port = port;
+    }
+}
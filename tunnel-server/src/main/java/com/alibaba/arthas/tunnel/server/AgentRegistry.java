@@ -0,0 +1,36 @@
+package com.alibaba.arthas.tunnel.server;
+
+import java.util.Collection;
+import java.util.Map;
+import java.util.Optional;
+
+/**
+ * <pre>
+ * 保存 agent id 到 tunnel server 节点的映射。多个 tunnel server 节点共享同一个 registry 时，
+ * 浏览器连接到任意一个节点，都可以通过 agent 所在的节点转发到 agent。
+ * 默认是 MemoryAgentRegistry，只在当前节点内可见；FileAgentRegistry 用共享目录在节点之间共享。
+ * 也可以在 spring 里提供自己的 AgentRegistry bean，比如基于 redis/zookeeper 的实现。
+ * </pre>
+ * 
+ * @see MemoryAgentRegistry
+ * @see FileAgentRegistry
+ */
+public interface AgentRegistry {
+
+    void register(String agentId, AgentRecord record);
+
+    /**
+     * 只删除注册在 nodeAddress 上的记录，agent 可能已经重新连接到了其它节点
+     */
+    void unregister(String agentId, String nodeAddress);
+
+    Optional<AgentRecord> find(String agentId);
+
+    Map<String, AgentRecord> list();
+
+    /**
+     * 节点定时刷新自己的 agent，有过期时间的实现可以用来续期和清理已经下线的节点的记录
+     */
+    default void refresh(String nodeAddress, Collection<String> agentIds) {
+    }
+}
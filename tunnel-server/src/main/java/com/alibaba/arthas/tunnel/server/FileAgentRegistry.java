@@ -0,0 +1,185 @@
+package com.alibaba.arthas.tunnel.server;
+
+import java.io.File;
+import java.io.FileInputStream;
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.io.InputStream;
+import java.io.OutputStream;
+import java.io.UnsupportedEncodingException;
+import java.net.URLDecoder;
+import java.net.URLEncoder;
+import java.util.Collection;
+import java.util.HashMap;
+import java.util.Map;
+import java.util.Optional;
+import java.util.Properties;
+
+import org.slf4j.Logger;
+import org.slf4j.LoggerFactory;
+
+/**
+ * <pre>
+ * 用一个共享目录（比如 NFS，或者本机上的多个节点）保存 agent 的注册信息，每个 agent 一个文件。
+ * 文件的修改时间就是心跳时间，节点通过 refresh 定时续期，超过 expireMillis 没有续期的记录认为已经失效，
+ * 节点异常退出时不会留下永久的脏数据。
+ * </pre>
+ * 
+ * @see AgentRegistry
+ */
+public class FileAgentRegistry implements AgentRegistry {
+    private final static Logger logger = LoggerFactory.getLogger(FileAgentRegistry.class);
+
+    private static final String SUFFIX = ".properties";
+    private static final String NODE_ADDRESS = "nodeAddress";
+    private static final String HOST = "host";
+    private static final String PORT = "port";
+
+    private final File directory;
+    private final long expireMillis;
+
+    public FileAgentRegistry(File directory, long expireMillis) {
+        this.directory = directory;
+        this.expireMillis = expireMillis;
+        if (!directory.mkdirs() && !directory.isDirectory()) {
+            throw new IllegalArgumentException("can not create agent registry directory: " + directory);
+        }
+    }
+
+    @Override
+    public void register(String agentId, AgentRecord record) {
+        Properties properties = new Properties();
+        properties.setProperty(NODE_ADDRESS, record.getNodeAddress());
+        if (record.getHost() != null) {
+            properties.setProperty(HOST, record.getHost());
+        }
+        properties.setProperty(PORT, String.valueOf(record.getPort()));
+
+        File file = recordFile(agentId);
+        // 先写临时文件再改名，其它节点不会读到写了一半的文件
+        File tmp = new File(directory, file.getName() + "." + Thread.currentThread().getId() + ".tmp");
+        try {
+            try (OutputStream out = new FileOutputStream(tmp)) {
+                properties.store(out, null);
+            }
+            if (!tmp.renameTo(file)) {
+                file.delete();
+                if (!tmp.renameTo(file)) {
+                    logger.error("register agent to file error, agentId: {}, file: {}", agentId, file);
+                }
+            }
+        } catch (IOException e) {
+            logger.error("register agent to file error, agentId: {}, file: {}", agentId, file, e);
+        } finally {
+            tmp.delete();
+        }
+    }
+
+    @Override
+    public void unregister(String agentId, String nodeAddress) {
+        File file = recordFile(agentId);
+        AgentRecord record = read(file);
+        if (record != null && nodeAddress.equals(record.getNodeAddress())) {
+            file.delete();
+        }
+    }
+
+    @Override
+    public Optional<AgentRecord> find(String agentId) {
+        File file = recordFile(agentId);
+        if (isExpired(file)) {
+            return Optional.empty();
+        }
+        return Optional.ofNullable(read(file));
+    }
+
+    @Override
+    public Map<String, AgentRecord> list() {
+        Map<String, AgentRecord> result = new HashMap<String, AgentRecord>();
+        File[] files = directory.listFiles();
+        if (files == null) {
+            return result;
+        }
+        for (File file : files) {
+            String name = file.getName();
+            if (!name.endsWith(SUFFIX) || isExpired(file)) {
+                continue;
+            }
+            AgentRecord record = read(file);
+            if (record != null) {
+                result.put(decode(name.substring(0, name.length() - SUFFIX.length())), record);
+            }
+        }
+        return result;
+    }
+
+    @Override
+    public void refresh(String nodeAddress, Collection<String> agentIds) {
+        long now = System.currentTimeMillis();
+        for (String agentId : agentIds) {
+            File file = recordFile(agentId);
+            AgentRecord record = read(file);
+            if (record != null && nodeAddress.equals(record.getNodeAddress())) {
+                file.setLastModified(now);
+            }
+        }
+
+        File[] files = directory.listFiles();
+        if (files == null) {
+            return;
+        }
+        for (File file : files) {
+            if (file.getName().endsWith(SUFFIX) && isExpired(file)) {
+                file.delete();
+            }
+        }
+    }
+
+    private boolean isExpired(File file) {
+        return System.currentTimeMillis() - file.lastModified() > expireMillis;
+    }
+
+    private File recordFile(String agentId) {
+        return new File(directory, encode(agentId) + SUFFIX);
+    }
+
+    private static AgentRecord read(File file) {
+        if (!file.isFile()) {
+            return null;
+        }
+        Properties properties = new Properties();
+        try (InputStream in = new FileInputStream(file)) {
+            properties.load(in);
+        } catch (IOException e) {
+            // 可能刚好被其它节点删除
+            return null;
+        }
+        String nodeAddress = properties.getProperty(NODE_ADDRESS);
+        if (nodeAddress == null) {
+            return null;
+        }
+        int port = 0;
+        try {
+            port = Integer.parseInt(properties.getProperty(PORT, "0"));
+        } catch (NumberFormatException e) {
+            // ignore
+        }
+        return new AgentRecord(nodeAddress, properties.getProperty(HOST), port);
+    }
+
+    private static String encode(String agentId) {
+        try {
+            return URLEncoder.encode(agentId, "UTF-8").replace("*", "%2A");
+        } catch (UnsupportedEncodingException e) {
+            throw new IllegalStateException(e);
+        }
+    }
+
+    private static String decode(String name) {
+        try {
+            return URLDecoder.decode(name, "UTF-8");
+        } catch (UnsupportedEncodingException e) {
+            throw new IllegalStateException(e);
+        }
+    }
+}
@@ -0,0 +1,36 @@
+package com.alibaba.arthas.tunnel.server;
+
+import java.util.Collections;
+import java.util.Map;
+import java.util.Optional;
+import java.util.concurrent.ConcurrentHashMap;
+
+/**
+ * 默认的 AgentRegistry，只保存当前节点的 agent
+ * 
+ * @see AgentRegistry
+ */
+public class MemoryAgentRegistry implements AgentRegistry {
+
+    private final Map<String, AgentRecord> records = new ConcurrentHashMap<String, AgentRecord>();
+
+    @Override
+    public void register(String agentId, AgentRecord record) {
+        records.put(agentId, record);
+    }
+
+    @Override
+    public void unregister(String agentId, String nodeAddress) {
+        records.computeIfPresent(agentId, (id, record) -> nodeAddress.equals(record.getNodeAddress()) ? null : record);
+    }
+
+    @Override
+    public Optional<AgentRecord> find(String agentId) {
+        return Optional.ofNullable(records.get(agentId));
+    }
+
+    @Override
+    public Map<String, AgentRecord> list() {
+        return Collections.unmodifiableMap(records);
+    }
+}
@@ -5,19 +5,47 @@ import org.slf4j.LoggerFactory;
 
 import io.netty.buffer.Unpooled;
 import io.netty.channel.Channel;
-import io.netty.channel.ChannelFutureListener;
 import io.netty.channel.ChannelHandlerContext;
 import io.netty.channel.ChannelInboundHandlerAdapter;
 import io.netty.util.ReferenceCountUtil;
 
+/**
+ * <pre>
+ * 把收到的消息原样转发到 relayChannel，不复制数据，消息的引用计数交给 relayChannel 的写操作。
+ * 每次读只 write，读完一批（channelReadComplete）再 flush。
+ * relayChannel 写不过来（不可写）时停止读取当前 channel，relayChannel 重新可写时，
+ * relayChannel 上的 RelayHandler 在 channelWritabilityChanged 里恢复读取。
+ * </pre>
+ */
 public final class RelayHandler extends ChannelInboundHandlerAdapter {
 
     private final static Logger logger = LoggerFactory.getLogger(RelayHandler.class);
 
     private final Channel relayChannel;
 
+    private final RelayStats relayStats;
+
     public RelayHandler(Channel relayChannel) {
+        this(relayChannel, null);
+    }
+
+    public RelayHandler(Channel relayChannel, RelayStats relayStats) {
         this.relayChannel = relayChannel;
+        this.relayStats = relayStats;
+    }
+
+    @Override
+    public void handlerAdded(ChannelHandlerContext ctx) {
+        if (relayStats != null) {
+            relayStats.channelOpened();
+        }
+    }
+
+    @Override
+    public void handlerRemoved(ChannelHandlerContext ctx) {
+        if (relayStats != null) {
+            relayStats.channelClosed();
+        }
     }
 
     @Override
@@ -28,19 +56,36 @@ public final class RelayHandler extends ChannelInboundHandlerAdapter {
     @Override
     public void channelRead(ChannelHandlerContext ctx, Object msg) {
         if (relayChannel.isActive()) {
-            relayChannel.writeAndFlush(msg);
+            if (relayStats != null) {
+                relayStats.record(msg);
+            }
+            relayChannel.write(msg, relayChannel.voidPromise());
+            if (!relayChannel.isWritable()) {
+                // 先停止读再 flush，flush 之后如果马上变为可写，channelWritabilityChanged 会恢复读取
+                ctx.channel().config().setAutoRead(false);
+                relayChannel.flush();
+            }
         } else {
             ReferenceCountUtil.release(msg);
         }
     }
 
     @Override
-    public void channelInactive(ChannelHandlerContext ctx) {
-        if (relayChannel.isActive()) {
-            if (relayChannel.isActive()) {
-                relayChannel.writeAndFlush(Unpooled.EMPTY_BUFFER).addListener(ChannelFutureListener.CLOSE);
-            }
+    public void channelReadComplete(ChannelHandlerContext ctx) {
+        relayChannel.flush();
+    }
+
+    @Override
+    public void channelWritabilityChanged(ChannelHandlerContext ctx) {
+        if (ctx.channel().isWritable()) {
+            relayChannel.config().setAutoRead(true);
         }
+        ctx.fireChannelWritabilityChanged();
+    }
+
+    @Override
+    public void channelInactive(ChannelHandlerContext ctx) {
+        ChannelUtils.closeOnFlush(relayChannel);
     }
 
     @Override
@@ -0,0 +1,82 @@
+package com.alibaba.arthas.tunnel.server;
+
+import java.util.LinkedHashMap;
+import java.util.Map;
+import java.util.concurrent.TimeUnit;
+import java.util.concurrent.atomic.AtomicInteger;
+import java.util.concurrent.atomic.LongAdder;
+
+import io.netty.buffer.ByteBuf;
+import io.netty.buffer.ByteBufHolder;
+
+/**
+ * 当前节点转发的统计，每秒的吞吐量由 TunnelServer 定时调用 sample 计算
+ * 
+ * @see RelayHandler
+ */
+public class RelayStats {
+
+    private final AtomicInteger activeRelayChannels = new AtomicInteger();
+    private final LongAdder messages = new LongAdder();
+    private final LongAdder bytes = new LongAdder();
+
+    private long lastSampleTime = System.nanoTime();
+    private long lastMessages;
+    private long lastBytes;
+    private volatile double messagesPerSecond;
+    private volatile double bytesPerSecond;
+
+    void channelOpened() {
+        activeRelayChannels.incrementAndGet();
+    }
+
+    void channelClosed() {
+        activeRelayChannels.decrementAndGet();
+    }
+
+    void record(Object msg) {
+        messages.increment();
+        if (msg instanceof ByteBufHolder) {
+            bytes.add(((ByteBufHolder) msg).content().readableBytes());
+        } else if (msg instanceof ByteBuf) {
+            bytes.add(((ByteBuf) msg).readableBytes());
+        }
+    }
+
+    synchronized void sample() {
+        long now = System.nanoTime();
+        long currentMessages = messages.sum();
+        long currentBytes = bytes.sum();
+        double seconds = (now - lastSampleTime) / (double) TimeUnit.SECONDS.toNanos(1);
+        if (seconds > 0) {
+            messagesPerSecond = (currentMessages - lastMessages) / seconds;
+            bytesPerSecond = (currentBytes - lastBytes) / seconds;
+        }
+        lastSampleTime = now;
+        lastMessages = currentMessages;
+        lastBytes = currentBytes;
+    }
+
+    public int getActiveRelayChannels() {
+        return activeRelayChannels.get();
+    }
+
+    public long getMessages() {
+        return messages.sum();
+    }
+
+    public long getBytes() {
+        return bytes.sum();
+    }
+
+    public Map<String, Object> toMap() {
+        Map<String, Object> result = new LinkedHashMap<String, Object>();
+        // 每个转发连接两端各有一个 RelayHandler
+        result.put("activeRelayChannels", getActiveRelayChannels());
+        result.put("messages", getMessages());
+        result.put("bytes", getBytes());
+        result.put("messagesPerSecond", messagesPerSecond);
+        result.put("bytesPerSecond", bytesPerSecond);
+        return result;
+    }
+}
@@ -0,0 +1,182 @@
+package com.alibaba.arthas.tunnel.server;
+
+import java.net.URI;
+import java.util.concurrent.TimeUnit;
+
+import javax.net.ssl.SSLEngine;
+import javax.net.ssl.SSLParameters;
+
+import org.slf4j.Logger;
+import org.slf4j.LoggerFactory;
+
+import io.netty.bootstrap.Bootstrap;
+import io.netty.channel.Channel;
+import io.netty.channel.ChannelFuture;
+import io.netty.channel.ChannelFutureListener;
+import io.netty.channel.ChannelHandler;
+import io.netty.channel.ChannelHandlerContext;
+import io.netty.channel.ChannelInboundHandlerAdapter;
+import io.netty.channel.ChannelInitializer;
+import io.netty.channel.ChannelPipeline;
+import io.netty.channel.socket.SocketChannel;
+import io.netty.channel.socket.nio.NioSocketChannel;
+import io.netty.handler.codec.http.DefaultHttpHeaders;
+import io.netty.handler.codec.http.HttpClientCodec;
+import io.netty.handler.codec.http.HttpObjectAggregator;
+import io.netty.handler.codec.http.websocketx.CloseWebSocketFrame;
+import io.netty.handler.codec.http.websocketx.WebSocketClientHandshakerFactory;
+import io.netty.handler.codec.http.websocketx.WebSocketClientProtocolHandler;
+import io.netty.handler.codec.http.websocketx.WebSocketClientProtocolHandler.ClientHandshakeStateEvent;
+import io.netty.handler.codec.http.websocketx.WebSocketVersion;
+import io.netty.handler.ssl.SslContext;
+import io.netty.handler.ssl.SslHandler;
+import io.netty.util.concurrent.ScheduledFuture;
+
+/**
+ * <pre>
+ * 浏览器要连接的 agent 在其它 tunnel server 节点上时，当前节点以浏览器的身份连接到 agent 所在的节点，
+ * 握手成功之后在两个 websocket 连接之间用 RelayHandler 转发 frame：
+ * browser <-> 当前节点 <-> agent 所在节点 <-> arthas agent
+ * 转发的连接带上 forwarded 参数，agent 所在节点不会再转发，避免 registry 不一致时循环转发。
+ * </pre>
+ */
+class TunnelNodeRelay {
+    private final static Logger logger = LoggerFactory.getLogger(TunnelNodeRelay.class);
+
+    static final String FORWARDED_PARAMETER = "forwarded";
+
+    private static final int MAX_FRAME_SIZE = 65536;
+    private static final long HANDSHAKE_TIMEOUT_SECONDS = 20;
+
+    private TunnelNodeRelay() {
+    }
+
+    /**
+     * @param frameHandler 握手成功之后从浏览器连接上移除，之后的 frame 都交给 RelayHandler
+     */
+    static void relay(final TunnelServer tunnelServer, final ChannelHandlerContext browserCtx,
+            final ChannelHandler frameHandler, String nodeAddress, String agentId, String websocketPath)
+            throws Exception {
+        URI node = new URI("tcp://" + nodeAddress);
+        final URI uri = new URI(tunnelServer.isSsl() ? "wss" : "ws", null, node.getHost(), node.getPort(),
+                websocketPath,
+                "method=connectArthas&id=" + agentId + "&" + FORWARDED_PARAMETER + "=" + tunnelServer.getNodeAddress(),
+                null);
+        final SslContext sslCtx = tunnelServer.getRelaySslContext();
+        final boolean verifyHostname = !tunnelServer.isRelayTrustAll();
+        final Channel browserChannel = browserCtx.channel();
+        final HandshakeHandler handshakeHandler = new HandshakeHandler(tunnelServer, browserChannel, frameHandler);
+
+        logger.info("relay browser connection to tunnel server node: {}, agentId: {}", nodeAddress, agentId);
+
+        Bootstrap bootstrap = new Bootstrap();
+        // 和浏览器连接使用同一个 EventLoop，转发时不需要跨线程
+        bootstrap.group(browserChannel.eventLoop()).channel(NioSocketChannel.class)
+                .handler(new ChannelInitializer<SocketChannel>() {
+                    @Override
+                    protected void initChannel(SocketChannel ch) {
+                        ChannelPipeline pipeline = ch.pipeline();
+                        if (sslCtx != null) {
+                            SslHandler sslHandler = sslCtx.newHandler(ch.alloc(), uri.getHost(), uri.getPort());
+                            if (verifyHostname) {
+                                // netty 默认只校验证书链，不校验证书和节点地址是否匹配
+                                SSLEngine engine = sslHandler.engine();
+                                SSLParameters sslParameters = engine.getSSLParameters();
+                                sslParameters.setEndpointIdentificationAlgorithm("HTTPS");
+                                engine.setSSLParameters(sslParameters);
+                            }
+                            pipeline.addLast(sslHandler);
+                        }
+                        pipeline.addLast(new HttpClientCodec());
+                        pipeline.addLast(new HttpObjectAggregator(MAX_FRAME_SIZE));
+                        pipeline.addLast(new WebSocketClientProtocolHandler(WebSocketClientHandshakerFactory
+                                .newHandshaker(uri, WebSocketVersion.V13, null, true, new DefaultHttpHeaders(),
+                                        MAX_FRAME_SIZE)));
+                        pipeline.addLast(handshakeHandler);
+                    }
+                });
+
+        ChannelFuture connectFuture = bootstrap.connect(uri.getHost(), uri.getPort());
+        final Channel nodeChannel = connectFuture.channel();
+
+        final ScheduledFuture<?> timeout = browserChannel.eventLoop().schedule(new Runnable() {
+            @Override
+            public void run() {
+                if (!handshakeHandler.relayed) {
+                    logger.error("relay to tunnel server node timeout, uri: {}", uri);
+                    nodeChannel.close();
+                }
+            }
+        }, HANDSHAKE_TIMEOUT_SECONDS, TimeUnit.SECONDS);
+
+        connectFuture.addListener(new ChannelFutureListener() {
+            @Override
+            public void operationComplete(ChannelFuture future) {
+                if (!future.isSuccess()) {
+                    logger.error("connect to tunnel server node error, uri: {}", uri, future.cause());
+                }
+            }
+        });
+        nodeChannel.closeFuture().addListener(new ChannelFutureListener() {
+            @Override
+            public void operationComplete(ChannelFuture future) {
+                timeout.cancel(false);
+                // 转发建立之前节点连接就断开了：连接失败，超时，或者 agent 所在节点找不到 agent
+                if (!handshakeHandler.relayed) {
+                    closeBrowser(browserChannel, "Can not relay to tunnel server node of arthas agent: " + agentId);
+                }
+            }
+        });
+        browserChannel.closeFuture().addListener(new ChannelFutureListener() {
+            @Override
+            public void operationComplete(ChannelFuture future) {
+                ChannelUtils.closeOnFlush(nodeChannel);
+            }
+        });
+    }
+
+    private static void closeBrowser(Channel browserChannel, String reason) {
+        if (browserChannel.isActive()) {
+            browserChannel.writeAndFlush(new CloseWebSocketFrame(2000, reason))
+                    .addListener(ChannelFutureListener.CLOSE);
+        }
+    }
+
+    private static class HandshakeHandler extends ChannelInboundHandlerAdapter {
+        private final TunnelServer tunnelServer;
+        private final Channel browserChannel;
+        private final ChannelHandler frameHandler;
+        private volatile boolean relayed;
+
+        HandshakeHandler(TunnelServer tunnelServer, Channel browserChannel, ChannelHandler frameHandler) {
+            this.tunnelServer = tunnelServer;
+            this.browserChannel = browserChannel;
+            this.frameHandler = frameHandler;
+        }
+
+        @Override
+        public void userEventTriggered(ChannelHandlerContext ctx, Object evt) throws Exception {
+            if (evt == ClientHandshakeStateEvent.HANDSHAKE_COMPLETE) {
+                Channel nodeChannel = ctx.channel();
+                if (!browserChannel.isActive()) {
+                    nodeChannel.close();
+                    return;
+                }
+                if (browserChannel.pipeline().context(frameHandler) != null) {
+                    browserChannel.pipeline().remove(frameHandler);
+                }
+                relayed = true;
+                ctx.pipeline().replace(this, "relay", new RelayHandler(browserChannel, tunnelServer.getRelayStats()));
+                browserChannel.pipeline().addLast(new RelayHandler(nodeChannel, tunnelServer.getRelayStats()));
+            } else {
+                ctx.fireUserEventTriggered(evt);
+            }
+        }
+
+        @Override
+        public void exceptionCaught(ChannelHandlerContext ctx, Throwable cause) {
+            logger.error("relay to tunnel server node error", cause);
+            ctx.close();
+        }
+    }
+}
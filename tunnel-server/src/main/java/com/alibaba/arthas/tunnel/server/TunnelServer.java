@@ -1,10 +1,20 @@
 package com.alibaba.arthas.tunnel.server;
 
+import java.io.File;
+import java.net.InetAddress;
+import java.util.ArrayList;
+import java.util.LinkedHashMap;
 import java.util.Map;
 import java.util.Optional;
+import java.util.concurrent.CompletableFuture;
 import java.util.concurrent.ConcurrentHashMap;
+import java.util.concurrent.Executors;
+import java.util.concurrent.RejectedExecutionException;
+import java.util.concurrent.ScheduledExecutorService;
 import java.util.concurrent.TimeUnit;
 
+import javax.net.ssl.SSLException;
+
 import org.apache.commons.lang3.StringUtils;
 import org.slf4j.Logger;
 import org.slf4j.LoggerFactory;
@@ -18,6 +28,7 @@ import io.netty.handler.logging.LogLevel;
 import io.netty.handler.logging.LoggingHandler;
 import io.netty.handler.ssl.SslContext;
 import io.netty.handler.ssl.SslContextBuilder;
+import io.netty.handler.ssl.util.InsecureTrustManagerFactory;
 import io.netty.handler.ssl.util.SelfSignedCertificate;
 import io.netty.util.concurrent.DefaultThreadFactory;
 
@@ -29,25 +40,71 @@ import io.netty.util.concurrent.DefaultThreadFactory;
 public class TunnelServer {
     private final static Logger logger = LoggerFactory.getLogger(TunnelServer.class);
 
+    private static final int RELAY_STATS_SAMPLE_SECONDS = 10;
+
     private boolean ssl;
     private String host;
     private int port;
 
+    /**
+     * 当前节点的地址，host:port，其它节点通过这个地址转发浏览器的连接。默认是 host（或者本机 ip）和 port
+     */
+    private String nodeAddress;
+
+    /**
+     * 当前节点上连接的 agent
+     */
     private Map<String, AgentInfo> agentInfoMap = new ConcurrentHashMap<String, AgentInfo>();
 
+    /**
+     * 所有节点共享的 agent 注册信息
+     */
+    private AgentRegistry agentRegistry = new MemoryAgentRegistry();
+
+    private long registryRefreshSeconds = 30;
+
+    /**
+     * ssl 使用的证书和私钥（PEM），没有配置时使用自签名的证书
+     */
+    private File certificate;
+    private File privateKey;
+
+    /**
+     * ssl 时转发到其它节点信任的证书（PEM），null 表示使用 jvm 默认的信任证书
+     */
+    private File relayTrustCertificates;
+
+    /**
+     * 转发到其它节点时不校验证书和主机名，只用于测试
+     */
+    private boolean relayTrustAll = false;
+
+    private SslContext relaySslContext;
+
+    private final RelayStats relayStats = new RelayStats();
+
     private Map<String, ClientConnectionInfo> clientConnectionInfoMap = new ConcurrentHashMap<String, ClientConnectionInfo>();
 
     private EventLoopGroup bossGroup = new NioEventLoopGroup(1, new DefaultThreadFactory("arthas-TunnelServer-boss", true));
     private EventLoopGroup workerGroup = new NioEventLoopGroup(new DefaultThreadFactory("arthas-TunnelServer-worker", true));
 
+    private final ScheduledExecutorService registryExecutor = Executors
+            .newSingleThreadScheduledExecutor(new DefaultThreadFactory("arthas-TunnelServer-registry", true));
+
     private Channel channel;
 
     public void start() throws Exception {
         // Configure SSL.
         final SslContext sslCtx;
         if (ssl) {
-            SelfSignedCertificate ssc = new SelfSignedCertificate();
-            sslCtx = SslContextBuilder.forServer(ssc.certificate(), ssc.privateKey()).build();
+            if (certificate != null && privateKey != null) {
+                sslCtx = SslContextBuilder.forServer(certificate, privateKey).build();
+            } else {
+                // 自签名的证书每次启动都不一样，其它节点无法信任，多节点转发时需要配置证书
+                SelfSignedCertificate ssc = new SelfSignedCertificate();
+                sslCtx = SslContextBuilder.forServer(ssc.certificate(), ssc.privateKey()).build();
+            }
+            relaySslContext = createRelaySslContext();
         } else {
             sslCtx = null;
         }
@@ -62,7 +119,15 @@ public class TunnelServer {
             channel = b.bind(host, port).sync().channel();
         }
 
-        logger.info("Tunnel server listen at {}:{}", host, port);
+        if (StringUtils.isBlank(nodeAddress)) {
+            String nodeHost = StringUtils.isBlank(host) || "0.0.0.0".equals(host)
+                    ? InetAddress.getLocalHost().getHostAddress()
+                    : host;
+            nodeAddress = nodeHost + ":" + port;
+        }
+
+        logger.info("Tunnel server listen at {}:{}, node address: {}, agent registry: {}", host, port, nodeAddress,
+                agentRegistry.getClass().getName());
 
         workerGroup.scheduleWithFixedDelay(new Runnable() {
             @Override
@@ -73,6 +138,36 @@ public class TunnelServer {
             }
 
         }, 60, 60, TimeUnit.SECONDS);
+
+        // registry 里的记录可能有过期时间，定时续期当前节点的 agent。放到单独的线程里，不阻塞 io
+        registryExecutor.scheduleWithFixedDelay(new Runnable() {
+            @Override
+            public void run() {
+                try {
+                    agentRegistry.refresh(nodeAddress, new ArrayList<String>(agentInfoMap.keySet()));
+                } catch (Throwable e) {
+                    logger.error("refresh agent registry error", e);
+                }
+            }
+        }, registryRefreshSeconds, registryRefreshSeconds, TimeUnit.SECONDS);
+
+        workerGroup.scheduleAtFixedRate(new Runnable() {
+            @Override
+            public void run() {
+                relayStats.sample();
+            }
+        }, RELAY_STATS_SAMPLE_SECONDS, RELAY_STATS_SAMPLE_SECONDS, TimeUnit.SECONDS);
+    }
+
+    private SslContext createRelaySslContext() throws SSLException {
+        SslContextBuilder builder = SslContextBuilder.forClient();
+        if (relayTrustAll) {
+            logger.warn("relay to tunnel server nodes trusts all certificates, do not use it in production");
+            builder.trustManager(InsecureTrustManagerFactory.INSTANCE);
+        } else if (relayTrustCertificates != null) {
+            builder.trustManager(relayTrustCertificates);
+        }
+        return builder.build();
     }
 
     public void stop() {
@@ -81,18 +176,74 @@ public class TunnelServer {
         }
         bossGroup.shutdownGracefully();
         workerGroup.shutdownGracefully();
+        registryExecutor.shutdownNow();
+        for (String id : agentInfoMap.keySet()) {
+            agentRegistry.unregister(id, nodeAddress);
+        }
     }
 
+    /**
+     * 只查找连接在当前节点上的 agent
+     */
     public Optional<AgentInfo> findAgent(String id) {
         return Optional.ofNullable(this.agentInfoMap.get(id));
     }
 
+    /**
+     * 查找 agent 连接的其它节点。registry 可能有文件或者网络 io，在 registry 线程里执行，不阻塞 netty 的 io 线程
+     * 
+     * @return 其它节点的地址，agent 不存在或者就在当前节点时返回 empty
+     */
+    public CompletableFuture<Optional<String>> findAgentNode(String id) {
+        return CompletableFuture.supplyAsync(() -> agentRegistry.find(id).map(AgentRecord::getNodeAddress)
+                .filter(address -> !address.equals(nodeAddress)), registryExecutor);
+    }
+
+    /**
+     * 当前节点马上可以找到 agent，共享的 registry 在 registry 线程里异步更新
+     */
     public void addAgent(String id, AgentInfo agentInfo) {
         agentInfoMap.put(id, agentInfo);
+        final AgentRecord record = new AgentRecord(nodeAddress, agentInfo.getHost(), agentInfo.getPort());
+        executeRegistry(() -> agentRegistry.register(id, record), "register agent " + id);
     }
 
     public AgentInfo removeAgent(String id) {
-        return agentInfoMap.remove(id);
+        AgentInfo agentInfo = agentInfoMap.remove(id);
+        if (agentInfo != null) {
+            executeRegistry(() -> agentRegistry.unregister(id, nodeAddress), "unregister agent " + id);
+        }
+        return agentInfo;
+    }
+
+    /**
+     * registry 线程是单线程的，同一个 agent 的 register/unregister 按顺序执行
+     */
+    private void executeRegistry(Runnable task, String description) {
+        try {
+            registryExecutor.execute(() -> {
+                try {
+                    task.run();
+                } catch (Throwable e) {
+                    logger.error("{} error", description, e);
+                }
+            });
+        } catch (RejectedExecutionException e) {
+            // 已经 stop，stop 时会注销当前节点所有的 agent
+            logger.debug("registry executor is shutdown, skip {}", description);
+        }
+    }
+
+    /**
+     * 当前节点的连接数和转发统计
+     */
+    public Map<String, Object> nodeStats() {
+        Map<String, Object> result = new LinkedHashMap<String, Object>();
+        result.put("nodeAddress", nodeAddress);
+        result.put("agents", agentInfoMap.size());
+        result.put("clientConnections", clientConnectionInfoMap.size());
+        result.put("relay", relayStats.toMap());
+        return result;
     }
 
     public Optional<ClientConnectionInfo> findClientConnection(String id) {
@@ -131,6 +282,73 @@ public class TunnelServer {
         this.port = port;
     }
 
+    public String getNodeAddress() {
+        return nodeAddress;
+    }
+
+    public void setNodeAddress(String nodeAddress) {
+        this.nodeAddress = nodeAddress;
+    }
+
+    public AgentRegistry getAgentRegistry() {
+        return agentRegistry;
+    }
+
+    public void setAgentRegistry(AgentRegistry agentRegistry) {
+        this.agentRegistry = agentRegistry;
+    }
+
+    public long getRegistryRefreshSeconds() {
+        return registryRefreshSeconds;
+    }
+
+    public void setRegistryRefreshSeconds(long registryRefreshSeconds) {
+        this.registryRefreshSeconds = registryRefreshSeconds;
+    }
+
+    /**
+     * 转发到其它节点的 ssl 配置，没有打开 ssl 时返回 null
+     */
+    SslContext getRelaySslContext() {
+        return relaySslContext;
+    }
+
+    public File getCertificate() {
+        return certificate;
+    }
+
+    public void setCertificate(File certificate) {
+        this.certificate = certificate;
+    }
+
+    public File getPrivateKey() {
+        return privateKey;
+    }
+
+    public void setPrivateKey(File privateKey) {
+        this.privateKey = privateKey;
+    }
+
+    public File getRelayTrustCertificates() {
+        return relayTrustCertificates;
+    }
+
+    public void setRelayTrustCertificates(File relayTrustCertificates) {
+        this.relayTrustCertificates = relayTrustCertificates;
+    }
+
+    public boolean isRelayTrustAll() {
+        return relayTrustAll;
+    }
+
+    public void setRelayTrustAll(boolean relayTrustAll) {
+        this.relayTrustAll = relayTrustAll;
+    }
+
+    public RelayStats getRelayStats() {
+        return relayStats;
+    }
+
     public Map<String, AgentInfo> getAgentInfoMap() {
         return agentInfoMap;
     }
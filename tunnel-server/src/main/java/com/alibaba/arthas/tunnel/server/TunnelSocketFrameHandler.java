@@ -18,6 +18,7 @@ import org.springframework.util.MultiValueMap;
 import org.springframework.web.util.UriComponentsBuilder;
 
 import io.netty.channel.Channel;
+import io.netty.channel.ChannelFutureListener;
 import io.netty.channel.ChannelHandlerContext;
 import io.netty.channel.SimpleChannelInboundHandler;
 import io.netty.handler.codec.http.QueryStringDecoder;
@@ -76,7 +77,7 @@ public class TunnelSocketFrameHandler extends SimpleChannelInboundHandler<WebSoc
     }
 
     private void connectArthas(ChannelHandlerContext tunnelSocketCtx, MultiValueMap<String, String> parameters)
-            throws URISyntaxException {
+            throws Exception {
 
         List<String> agentId = parameters.getOrDefault("id", Collections.emptyList());
 
@@ -121,8 +122,9 @@ public class TunnelSocketFrameHandler extends SimpleChannelInboundHandler<WebSoc
                         // outboundChannel is form arthas agent
                         outboundChannel.pipeline().removeLast();
 
-                        outboundChannel.pipeline().addLast(new RelayHandler(tunnelSocketCtx.channel()));
-                        tunnelSocketCtx.pipeline().addLast(new RelayHandler(outboundChannel));
+                        outboundChannel.pipeline()
+                                .addLast(new RelayHandler(tunnelSocketCtx.channel(), tunnelServer.getRelayStats()));
+                        tunnelSocketCtx.pipeline().addLast(new RelayHandler(outboundChannel, tunnelServer.getRelayStats()));
                     } else {
                         logger.error("wait for agent connect error. agentId: {}, clientConnectionId: {}", agentId,
                                 clientConnectionId);
@@ -154,13 +156,37 @@ public class TunnelSocketFrameHandler extends SimpleChannelInboundHandler<WebSoc
                         agentId, clientConnectionId);
                 tunnelSocketCtx.close();
             }
+        } else if (parameters.containsKey(TunnelNodeRelay.FORWARDED_PARAMETER)) {
+            // 已经是其它节点转发过来的连接不再转发
+            agentNotFound(tunnelSocketCtx, agentId.get(0));
         } else {
-            tunnelSocketCtx.channel().writeAndFlush(new CloseWebSocketFrame(2000, "Can not find arthas agent by id: "+ agentId));
-            logger.error("Can not find arthas agent by id: {}", agentId);
-            throw new IllegalArgumentException("Can not find arthas agent by id: " + agentId);
+            // agent 连接在其它节点上时转发过去。registry 可能读文件，在 registry 线程查找，结果回到 io 线程处理
+            final String id = agentId.get(0);
+            tunnelServer.findAgentNode(id).whenComplete((agentNode, error) -> tunnelSocketCtx.executor().execute(() -> {
+                if (error != null) {
+                    logger.error("find arthas agent node error, id: {}", id, error);
+                }
+                if (agentNode == null || !agentNode.isPresent()) {
+                    agentNotFound(tunnelSocketCtx, id);
+                    return;
+                }
+                try {
+                    TunnelNodeRelay.relay(tunnelServer, tunnelSocketCtx, this, agentNode.get(), id,
+                            TunnelSocketServerInitializer.WEBSOCKET_PATH);
+                } catch (Exception e) {
+                    logger.error("relay to tunnel server node error, id: {}", id, e);
+                    tunnelSocketCtx.close();
+                }
+            }));
         }
     }
 
+    private void agentNotFound(ChannelHandlerContext tunnelSocketCtx, String agentId) {
+        logger.error("Can not find arthas agent by id: {}", agentId);
+        tunnelSocketCtx.channel().writeAndFlush(new CloseWebSocketFrame(2000, "Can not find arthas agent by id: " + agentId))
+                .addListener(ChannelFutureListener.CLOSE);
+    }
+
     private void agentRegister(ChannelHandlerContext ctx, String requestUri) throws URISyntaxException {
         // generate a random agent id
         String id = RandomStringUtils.random(20, true, true).toUpperCase();
@@ -16,7 +16,7 @@ import io.netty.handler.ssl.SslContext;
  */
 public class TunnelSocketServerInitializer extends ChannelInitializer<SocketChannel> {
 
-    private static final String WEBSOCKET_PATH = "/ws";
+    static final String WEBSOCKET_PATH = "/ws";
 
     private final SslContext sslCtx;
 
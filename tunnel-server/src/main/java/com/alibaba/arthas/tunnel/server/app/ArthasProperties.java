@@ -27,6 +27,37 @@ public class ArthasProperties {
         private int port;
         private boolean ssl;
 
+        /**
+         * 当前节点被其它节点访问的地址，host:port，默认是 host（或者本机 ip）和 port
+         */
+        private String nodeAddress;
+
+        /**
+         * 多个节点共享的目录，用来保存 agent 注册信息。为空时只在当前节点内查找 agent
+         */
+        private String registryDirectory;
+
+        /**
+         * 共享的 agent 注册信息多长时间没有续期就认为失效
+         */
+        private int registryExpireSeconds = 120;
+
+        /**
+         * ssl 使用的证书和私钥，PEM 格式。为空时使用自签名的证书
+         */
+        private String certificate;
+        private String privateKey;
+
+        /**
+         * ssl 时转发到其它节点信任的证书，PEM 格式。为空时使用 jvm 默认的信任证书
+         */
+        private String relayTrustCertificates;
+
+        /**
+         * ssl 时转发到其它节点不校验证书和主机名，只用于测试
+         */
+        private boolean relayTrustAll = false;
+
         public String getHost() {
             return host;
         }
@@ -43,6 +74,62 @@ public class ArthasProperties {
             this.port = port;
         }
 
+        public String getNodeAddress() {
+            return nodeAddress;
+        }
+
+        public void setNodeAddress(String nodeAddress) {
+            this.nodeAddress = nodeAddress;
+        }
+
+        public String getRegistryDirectory() {
+            return registryDirectory;
+        }
+
+        public void setRegistryDirectory(String registryDirectory) {
+            this.registryDirectory = registryDirectory;
+        }
+
+        public String getCertificate() {
+            return certificate;
+        }
+
+        public void setCertificate(String certificate) {
+            this.certificate = certificate;
+        }
+
+        public String getPrivateKey() {
+            return privateKey;
+        }
+
+        public void setPrivateKey(String privateKey) {
+            this.privateKey = privateKey;
+        }
+
+        public String getRelayTrustCertificates() {
+            return relayTrustCertificates;
+        }
+
+        public void setRelayTrustCertificates(String relayTrustCertificates) {
+            this.relayTrustCertificates = relayTrustCertificates;
+        }
+
+        public boolean isRelayTrustAll() {
+            return relayTrustAll;
+        }
+
+        public void setRelayTrustAll(boolean relayTrustAll) {
+            this.relayTrustAll = relayTrustAll;
+        }
+
+        public int getRegistryExpireSeconds() {
+            return registryExpireSeconds;
+        }
+
+        public void setRegistryExpireSeconds(int registryExpireSeconds) {
+            this.registryExpireSeconds = registryExpireSeconds;
+        }
+
         public boolean isSsl() {
             return ssl;
         }
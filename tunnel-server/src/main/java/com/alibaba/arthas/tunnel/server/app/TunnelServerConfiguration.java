@@ -1,9 +1,15 @@
 package com.alibaba.arthas.tunnel.server.app;
 
+import java.io.File;
+import java.util.concurrent.TimeUnit;
+
+import org.apache.commons.lang3.StringUtils;
 import org.springframework.beans.factory.annotation.Autowired;
 import org.springframework.context.annotation.Bean;
 import org.springframework.context.annotation.Configuration;
 
+import com.alibaba.arthas.tunnel.server.AgentRegistry;
+import com.alibaba.arthas.tunnel.server.FileAgentRegistry;
 import com.alibaba.arthas.tunnel.server.TunnelServer;
 
 @Configuration
@@ -12,13 +18,35 @@ public class TunnelServerConfiguration {
     @Autowired
     ArthasProperties arthasProperties;
 
+    /**
+     * 用户提供的 AgentRegistry 优先，其次是 arthas.server.registryDirectory 配置的共享目录
+     */
+    @Autowired(required = false)
+    AgentRegistry agentRegistry;
+
     @Bean(initMethod = "start", destroyMethod = "stop")
     public TunnelServer tunnelServer() {
         TunnelServer tunnelServer = new TunnelServer();
 
-        tunnelServer.setHost(arthasProperties.getServer().getHost());
-        tunnelServer.setPort(arthasProperties.getServer().getPort());
-        tunnelServer.setSsl(arthasProperties.getServer().isSsl());
+        ArthasProperties.Server server = arthasProperties.getServer();
+        tunnelServer.setHost(server.getHost());
+        tunnelServer.setPort(server.getPort());
+        tunnelServer.setSsl(server.isSsl());
+        tunnelServer.setNodeAddress(server.getNodeAddress());
+        if (StringUtils.isNotBlank(server.getCertificate()) && StringUtils.isNotBlank(server.getPrivateKey())) {
+            tunnelServer.setCertificate(new File(server.getCertificate()));
+            tunnelServer.setPrivateKey(new File(server.getPrivateKey()));
+        }
+        if (StringUtils.isNotBlank(server.getRelayTrustCertificates())) {
+            tunnelServer.setRelayTrustCertificates(new File(server.getRelayTrustCertificates()));
+        }
+        tunnelServer.setRelayTrustAll(server.isRelayTrustAll());
+        if (agentRegistry != null) {
+            tunnelServer.setAgentRegistry(agentRegistry);
+        } else if (StringUtils.isNotBlank(server.getRegistryDirectory())) {
+            tunnelServer.setAgentRegistry(new FileAgentRegistry(new File(server.getRegistryDirectory()),
+                    TimeUnit.SECONDS.toMillis(server.getRegistryExpireSeconds())));
+        }
         return tunnelServer;
     }
 
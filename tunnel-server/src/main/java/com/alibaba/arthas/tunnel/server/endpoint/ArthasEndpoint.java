@@ -27,6 +27,8 @@ public class ArthasEndpoint {
 
         result.put("agents", tunnelServer.getAgentInfoMap());
         result.put("clientConnections", tunnelServer.getClientConnectionInfoMap());
+        result.put("node", tunnelServer.nodeStats());
+        result.put("registeredAgents", tunnelServer.getAgentRegistry().list());
 
         return result;
     }
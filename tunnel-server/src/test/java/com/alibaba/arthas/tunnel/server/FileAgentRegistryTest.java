@@ -0,0 +1,63 @@
+package com.alibaba.arthas.tunnel.server;
+
+import java.io.File;
+import java.util.Collections;
+import java.util.concurrent.TimeUnit;
+
+import org.assertj.core.api.Assertions;
+import org.junit.Rule;
+import org.junit.Test;
+import org.junit.rules.TemporaryFolder;
+
+/**
+ *
+ * @see FileAgentRegistry
+ */
+public class FileAgentRegistryTest {
+
+    @Rule
+    public TemporaryFolder folder = new TemporaryFolder();
+
+    @Test
+    public void testShareBetweenNodes() throws Exception {
+        File directory = folder.newFolder();
+        FileAgentRegistry node1 = new FileAgentRegistry(directory, TimeUnit.MINUTES.toMillis(1));
+        FileAgentRegistry node2 = new FileAgentRegistry(directory, TimeUnit.MINUTES.toMillis(1));
+
+        node1.register("agent/1", new AgentRecord("10.0.0.1:7777", "192.168.1.1", 12345));
+
+        AgentRecord record = node2.find("agent/1").get();
+        Assertions.assertThat(record.getNodeAddress()).isEqualTo("10.0.0.1:7777");
+        Assertions.assertThat(record.getHost()).isEqualTo("192.168.1.1");
+        Assertions.assertThat(record.getPort()).isEqualTo(12345);
+        Assertions.assertThat(node2.list()).containsOnlyKeys("agent/1");
+
+        // agent 已经重新连接到了 node1，node2 上旧连接的断开不能删除新的记录
+        node2.unregister("agent/1", "10.0.0.2:7777");
+        Assertions.assertThat(node2.find("agent/1")).isPresent();
+
+        node1.unregister("agent/1", "10.0.0.1:7777");
+        Assertions.assertThat(node2.find("agent/1")).isNotPresent();
+    }
+
+    @Test
+    public void testExpire() throws Exception {
+        File directory = folder.newFolder();
+        FileAgentRegistry registry = new FileAgentRegistry(directory, TimeUnit.MINUTES.toMillis(1));
+
+        registry.register("a", new AgentRecord("node1:7777", null, 0));
+        registry.register("b", new AgentRecord("node2:7777", null, 0));
+        long expired = System.currentTimeMillis() - TimeUnit.MINUTES.toMillis(2);
+        for (File file : directory.listFiles()) {
+            file.setLastModified(expired);
+        }
+        Assertions.assertThat(registry.find("a")).isNotPresent();
+        Assertions.assertThat(registry.list()).isEmpty();
+
+        // 只续期自己节点上的 agent，过期的记录被清理
+        registry.register("a", new AgentRecord("node1:7777", null, 0));
+        registry.refresh("node1:7777", Collections.singletonList("a"));
+        Assertions.assertThat(registry.list()).containsOnlyKeys("a");
+        Assertions.assertThat(directory.listFiles()).hasSize(1);
+    }
+}
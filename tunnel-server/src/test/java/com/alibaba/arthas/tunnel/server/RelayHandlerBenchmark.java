@@ -0,0 +1,67 @@
+package com.alibaba.arthas.tunnel.server;
+
+import java.util.concurrent.TimeUnit;
+
+import org.openjdk.jmh.annotations.Benchmark;
+import org.openjdk.jmh.annotations.BenchmarkMode;
+import org.openjdk.jmh.annotations.Fork;
+import org.openjdk.jmh.annotations.Measurement;
+import org.openjdk.jmh.annotations.Mode;
+import org.openjdk.jmh.annotations.OutputTimeUnit;
+import org.openjdk.jmh.annotations.Param;
+import org.openjdk.jmh.annotations.Scope;
+import org.openjdk.jmh.annotations.Setup;
+import org.openjdk.jmh.annotations.State;
+import org.openjdk.jmh.annotations.Warmup;
+import org.openjdk.jmh.runner.Runner;
+import org.openjdk.jmh.runner.RunnerException;
+import org.openjdk.jmh.runner.options.Options;
+import org.openjdk.jmh.runner.options.OptionsBuilder;
+
+import io.netty.buffer.Unpooled;
+import io.netty.channel.embedded.EmbeddedChannel;
+import io.netty.handler.codec.http.websocketx.BinaryWebSocketFrame;
+import io.netty.handler.codec.http.websocketx.WebSocketFrame;
+
+/**
+ * RelayHandler 转发 frame 的吞吐量
+ *
+ * <pre>
+ * 运行： mvn -pl tunnel-server test-compile exec:java -Dexec.classpathScope=test \
+ *      -Dexec.mainClass=com.alibaba.arthas.tunnel.server.RelayHandlerBenchmark
+ * </pre>
+ */
+@State(Scope.Benchmark)
+@BenchmarkMode(Mode.Throughput)
+@OutputTimeUnit(TimeUnit.SECONDS)
+@Warmup(iterations = 3, time = 1)
+@Measurement(iterations = 5, time = 1)
+@Fork(1)
+public class RelayHandlerBenchmark {
+
+    @Param({ "128", "1024", "16384" })
+    private int size;
+
+    private byte[] payload;
+    private EmbeddedChannel source;
+    private EmbeddedChannel target;
+
+    @Setup
+    public void setup() {
+        payload = new byte[size];
+        target = new EmbeddedChannel();
+        source = new EmbeddedChannel(new RelayHandler(target, new RelayStats()));
+    }
+
+    @Benchmark
+    public void relay() {
+        source.writeInbound(new BinaryWebSocketFrame(Unpooled.wrappedBuffer(payload)));
+        WebSocketFrame frame = target.readOutbound();
+        frame.release();
+    }
+
+    public static void main(String[] args) throws RunnerException {
+        Options options = new OptionsBuilder().include(RelayHandlerBenchmark.class.getSimpleName()).build();
+        new Runner(options).run();
+    }
+}
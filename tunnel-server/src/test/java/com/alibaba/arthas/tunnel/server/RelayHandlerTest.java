@@ -0,0 +1,63 @@
+package com.alibaba.arthas.tunnel.server;
+
+import org.assertj.core.api.Assertions;
+import org.junit.Test;
+
+import io.netty.buffer.ByteBuf;
+import io.netty.buffer.Unpooled;
+import io.netty.channel.embedded.EmbeddedChannel;
+import io.netty.handler.codec.http.websocketx.BinaryWebSocketFrame;
+import io.netty.handler.codec.http.websocketx.WebSocketFrame;
+
+/**
+ *
+ * @see RelayHandler
+ */
+public class RelayHandlerTest {
+
+    @Test
+    public void testRelayWithoutCopy() {
+        RelayStats stats = new RelayStats();
+        EmbeddedChannel target = new EmbeddedChannel();
+        EmbeddedChannel source = new EmbeddedChannel(new RelayHandler(target, stats));
+
+        WebSocketFrame frame = new BinaryWebSocketFrame(Unpooled.wrappedBuffer(new byte[100]));
+        source.writeInbound(frame);
+
+        Object relayed = target.readOutbound();
+        Assertions.assertThat(relayed).isSameAs(frame);
+        Assertions.assertThat(frame.refCnt()).isEqualTo(1);
+        frame.release();
+
+        Assertions.assertThat(stats.getMessages()).isEqualTo(1);
+        Assertions.assertThat(stats.getBytes()).isEqualTo(100);
+        Assertions.assertThat(stats.getActiveRelayChannels()).isEqualTo(1);
+    }
+
+    @Test
+    public void testResumeReadWhenWritable() {
+        EmbeddedChannel target = new EmbeddedChannel();
+        EmbeddedChannel source = new EmbeddedChannel(new RelayHandler(target));
+        target.pipeline().addLast(new RelayHandler(source));
+
+        source.config().setAutoRead(false);
+        target.pipeline().fireChannelWritabilityChanged();
+        Assertions.assertThat(source.config().isAutoRead()).isTrue();
+    }
+
+    @Test
+    public void testRelayLargeMessage() {
+        EmbeddedChannel target = new EmbeddedChannel();
+        EmbeddedChannel source = new EmbeddedChannel(new RelayHandler(target));
+        target.pipeline().addLast(new RelayHandler(source));
+
+        // 超过 high water mark，target 暂时不可写，flush 之后恢复读取
+        ByteBuf buf = Unpooled.wrappedBuffer(new byte[target.config().getWriteBufferHighWaterMark() + 1]);
+        source.writeInbound(buf);
+
+        Assertions.assertThat((Object) target.readOutbound()).isSameAs(buf);
+        Assertions.assertThat(target.isWritable()).isTrue();
+        Assertions.assertThat(source.config().isAutoRead()).isTrue();
+        buf.release();
+    }
+}